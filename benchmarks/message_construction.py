@@ -0,0 +1,132 @@
+"""
+Benchmark building a large conversation history.
+
+Compares validated construction, pydantic's `model_construct` and kintu's `trusted`
+path. Each mode runs in a fresh interpreter so RSS numbers are not polluted by earlier
+runs. Expect `trusted` to take about as long as `validated` but hold about a third less
+memory.
+
+    python benchmarks/message_construction.py [--messages 100000]
+"""
+
+import argparse
+import gc
+import json
+import os
+import resource
+import subprocess
+import sys
+import time
+
+MODES = ["validated", "model_construct", "trusted"]
+
+# The repository root, so kintu imports without being installed
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def rss_bytes() -> int:
+    """Current resident set size, falling back to the peak where /proc is unavailable."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except OSError:
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == "darwin" else peak * 1024
+
+
+def build(mode: str, count: int) -> list:
+    from kintu.types.content import TextContent, ToolCallContent, ToolResultContent
+    from kintu.types.message import Message
+    from kintu.types.role import Role
+
+    messages = []
+    for i in range(count // 4):
+        tool_id = f"call_{i}"
+        if mode == "validated":
+            messages.append(Message(role=Role.USER, content=TextContent(text=f"Question {i}")))
+            messages.append(Message(role=Role.ASSISTANT, content=TextContent(text=f"Answer {i}")))
+            call = ToolCallContent(tool_id=tool_id, tool_name="lookup", input={"i": i})
+            messages.append(Message(role=Role.ASSISTANT, content=call))
+            result = ToolResultContent(tool_id=tool_id, results=[TextContent(text=str(i))])
+            messages.append(Message(role=Role.TOOL, content=result))
+        elif mode == "model_construct":
+            messages.append(
+                Message.model_construct(
+                    role=Role.USER, content=TextContent.model_construct(text=f"Question {i}")
+                )
+            )
+            messages.append(
+                Message.model_construct(
+                    role=Role.ASSISTANT, content=TextContent.model_construct(text=f"Answer {i}")
+                )
+            )
+            call = ToolCallContent.model_construct(
+                tool_id=tool_id, tool_name="lookup", input={"i": i}
+            )
+            messages.append(Message.model_construct(role=Role.ASSISTANT, content=call))
+            result = ToolResultContent.model_construct(
+                tool_id=tool_id, results=[TextContent.model_construct(text=str(i))]
+            )
+            messages.append(Message.model_construct(role=Role.TOOL, content=result))
+        else:
+            messages.append(Message.trusted(Role.USER, TextContent.trusted(text=f"Question {i}")))
+            messages.append(
+                Message.trusted(Role.ASSISTANT, TextContent.trusted(text=f"Answer {i}"))
+            )
+            call = ToolCallContent.trusted(tool_id=tool_id, tool_name="lookup", input={"i": i})
+            messages.append(Message.trusted(Role.ASSISTANT, call))
+            result = ToolResultContent.trusted(
+                tool_id=tool_id, results=[TextContent.trusted(text=str(i))]
+            )
+            messages.append(Message.trusted(Role.TOOL, result))
+    return messages
+
+
+def run_one(mode: str, count: int) -> dict:
+    # Import and warm up before measuring, so only the history itself is counted
+    build(mode, 100)
+    gc.collect()
+    before = rss_bytes()
+    start = time.perf_counter()
+    messages = build(mode, count)
+    seconds = time.perf_counter() - start
+    gc.collect()
+    return {
+        "mode": mode,
+        "messages": len(messages),
+        "seconds": seconds,
+        "rss_bytes": rss_bytes() - before,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--messages", type=int, default=100_000)
+    parser.add_argument("--mode", choices=MODES, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.mode is not None:
+        print(json.dumps(run_one(args.mode, args.messages)))
+        return
+
+    path = os.environ.get("PYTHONPATH")
+    env = {**os.environ, "PYTHONPATH": ROOT if not path else os.pathsep.join([ROOT, path])}
+    print(f"{'mode':<16}{'messages':>10}{'seconds':>10}{'us/msg':>9}{'RSS MiB':>10}")
+    for mode in MODES:
+        output = subprocess.run(
+            [sys.executable, __file__, "--mode", mode, "--messages", str(args.messages)],
+            check=True,
+            capture_output=True,
+            text=True,
+            env=env,
+        ).stdout
+        result = json.loads(output)
+        print(
+            f"{mode:<16}{result['messages']:>10}{result['seconds']:>10.3f}"
+            f"{result['seconds'] / result['messages'] * 1e6:>9.2f}"
+            f"{result['rss_bytes'] / 2**20:>10.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
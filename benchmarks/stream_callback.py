@@ -0,0 +1,102 @@
+"""
+Benchmark stream callback overhead per token.
+
+Simulates a fast model (one token per chunk) feeding an SSE relay, where every callback
+call writes one frame to a downstream socket and awaits drain(). Compares stream_callback
+(one frame per chunk) with stream_batch_callback (one frame per batch window). Chunks go
+through the real LiteLLM stream accumulator and StreamChunk construction, so the numbers
+include kintu's per-chunk work.
+
+    python benchmarks/stream_callback.py [--tokens 200000] [--max-chunks 64]
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import socket
+import sys
+import time
+
+# The repository root, so kintu imports without being installed
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from kintu.client.backends.litellm import LiteLLMBackend  # noqa: E402
+from kintu.client.stream_batcher import StreamBatcher  # noqa: E402
+from kintu.types.complete import StreamBatchWindow, StreamChunk  # noqa: E402
+
+
+async def run(tokens: int, mode: str, window: StreamBatchWindow) -> tuple[float, int]:
+    """Stream `tokens` chunks, returning (CPU seconds, callback calls)."""
+    accumulator = LiteLLMBackend().stream_accumulator()
+    relay, downstream = socket.socketpair()
+    _, writer = await asyncio.open_connection(sock=relay)
+    drain_task = asyncio.create_task(_discard(downstream))
+    calls = 0
+
+    async def send(text: str) -> None:
+        nonlocal calls
+        calls += 1
+        writer.write(f"data: {json.dumps(text)}\n\n".encode())
+        await writer.drain()
+
+    async def relay_chunk(chunk: StreamChunk) -> None:
+        await send("".join(delta.text for delta in chunk.deltas))
+
+    async def relay_batch(chunks: list[StreamChunk]) -> None:
+        await send("".join(delta.text for chunk in chunks for delta in chunk.deltas))
+
+    batcher = StreamBatcher(relay_batch, window) if mode == "batch" else None
+    start = time.process_time()
+    for index in range(tokens):
+        event = {"choices": [{"delta": {"content": " tok"}}]}
+        chunk = StreamChunk(
+            provider_data=event,
+            timestamp=time.time(),
+            chunk_index=index,
+            deltas=accumulator.add(event),
+        )
+        if batcher is not None:
+            await batcher.add(chunk)
+        elif mode == "chunk":
+            await relay_chunk(chunk)
+        # Stand-in for the socket read between chunks
+        await asyncio.sleep(0)
+    if batcher is not None:
+        await batcher.close()
+    accumulator.finish()
+    seconds = time.process_time() - start
+    writer.close()
+    await writer.wait_closed()
+    await drain_task
+    return seconds, calls
+
+
+async def _discard(sock: socket.socket) -> None:
+    """The relay's downstream client: read and drop everything."""
+    reader, writer = await asyncio.open_connection(sock=sock)
+    while await reader.read(65536):
+        pass
+    writer.close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--tokens", type=int, default=200_000)
+    parser.add_argument("--max-chunks", type=int, default=64)
+    parser.add_argument("--max-delay", type=float, default=0.02)
+    args = parser.parse_args()
+
+    window = StreamBatchWindow(max_chunks=args.max_chunks, max_delay=args.max_delay)
+    # Streaming without any callback, subtracted to isolate the cost of delivery
+    baseline, _ = asyncio.run(run(args.tokens, "none", window))
+    print(f"no callback: {baseline / args.tokens * 1e6:.2f} us/token CPU")
+    print(f"{'delivery':<22}{'callbacks':>10}{'CPU s':>8}{'callback us/token':>19}")
+    for name, mode in [("stream_callback", "chunk"), ("stream_batch_callback", "batch")]:
+        seconds, calls = asyncio.run(run(args.tokens, mode, window))
+        overhead = (seconds - baseline) / args.tokens * 1e6
+        print(f"{name:<22}{calls:>10}{seconds:>8.2f}{overhead:>19.2f}")
+
+
+if __name__ == "__main__":
+    main()
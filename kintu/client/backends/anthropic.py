@@ -0,0 +1,525 @@
+import json
+import time
+from typing import Any
+
+import httpx
+
+from kintu.client.backends.base import (
+    FileRefs,
+    ParsedReply,
+    PreparedRequest,
+    SDKBackend,
+    StreamAccumulator,
+    api_error,
+    image_media_type_and_data,
+    is_system_role,
+    resolve_max_tokens,
+    scale_temperature,
+    tool_json_schema,
+)
+from kintu.client.request_body import Base64Blob, BufferReader, StreamingJSONBody
+from kintu.client.translation_cache import MessageTranslationCache
+from kintu.types.batch import BatchJob, BatchStatus
+from kintu.types.complete import CompleteInput, LLMUsage, StreamDelta, StreamDeltaType
+from kintu.types.content import (
+    AnthropicCodeInterpreterToolResult,
+    AnthropicRedactedThinkingContent,
+    AnthropicServerToolUse,
+    AnthropicWebSearchIndividualResult,
+    AnthropicWebSearchToolResult,
+    Content,
+    DocumentContent,
+    ImageContent,
+    TextContent,
+    ThinkingContent,
+    ToolCallContent,
+    ToolResultContent,
+)
+from kintu.types.errors import BatchError, ProviderAPIError, UnsupportedContentError
+from kintu.types.file_reference import FileReference
+from kintu.types.llmsdk import LLMSDK
+from kintu.types.message import Message
+from kintu.types.model_spec import ModelSpec
+from kintu.types.provider import Provider
+from kintu.types.provider_config import AnthropicConfig, AnthropicToolChoice
+from kintu.types.role import Role
+
+ANTHROPIC_VERSION = "2023-06-01"
+FILES_API_BETA = "files-api-2025-04-14"
+
+
+class AnthropicBackend(SDKBackend):
+    """Anthropic Messages API."""
+
+    llmsdk = LLMSDK.ANTHROPIC
+    supports_files = True
+    supports_batches = True
+
+    def build_request(
+        self,
+        inp: CompleteInput,
+        spec: ModelSpec,
+        api_key: str,
+        file_refs: FileRefs | None = None,
+        translations: MessageTranslationCache | None = None,
+    ) -> PreparedRequest:
+        config = inp.provider_configs.anthropic if inp.provider_configs else None
+        file_refs = file_refs or {}
+
+        system: list[dict[str, Any]] = []
+        messages: list[dict[str, Any]] = []
+        for message in inp.messages:
+            role, blocks = self.translate_cached(
+                translations, message, file_refs, lambda: self.translate_message(message, file_refs)
+            )
+            if role == "system":
+                system.extend(blocks)
+            elif messages and messages[-1]["role"] == role:
+                # The Messages API expects alternating turns, so merge same-role neighbours
+                messages[-1]["content"].extend(blocks)
+            else:
+                messages.append({"role": role, "content": list(blocks)})
+
+        body: dict[str, Any] = {
+            "model": spec.provider_model_id,
+            "max_tokens": resolve_max_tokens(inp, spec),
+            "messages": messages,
+        }
+        if system:
+            body["system"] = system
+        temperature = scale_temperature(inp.temperature, spec)
+        if temperature is not None:
+            body["temperature"] = temperature
+        if inp.tools:
+            body["tools"] = [
+                {
+                    "name": tool.name,
+                    "description": tool.description,
+                    "input_schema": tool_json_schema(tool),
+                }
+                for tool in inp.tools
+            ]
+        if inp.stream:
+            body["stream"] = True
+
+        headers = {
+            "x-api-key": api_key,
+            "anthropic-version": ANTHROPIC_VERSION,
+        }
+        beta_headers: list[str] = []
+        if config is not None:
+            self._apply_config(body, config)
+            beta_headers.extend(config.additional_beta_headers or [])
+        if file_refs and FILES_API_BETA not in beta_headers:
+            beta_headers.append(FILES_API_BETA)
+        if beta_headers:
+            headers["anthropic-beta"] = ",".join(beta_headers)
+
+        return PreparedRequest(path="/v1/messages", headers=headers, json_body=body)
+
+    def _apply_config(self, body: dict[str, Any], config: AnthropicConfig) -> None:
+        if config.stop_sequences is not None:
+            body["stop_sequences"] = config.stop_sequences
+        if config.top_p is not None:
+            body["top_p"] = config.top_p
+        if config.top_k is not None:
+            body["top_k"] = config.top_k
+        if config.container_id is not None:
+            body["container"] = config.container_id
+        if config.thinking_enabled:
+            thinking: dict[str, Any] = {"type": "enabled"}
+            if config.thinking_budget is not None:
+                thinking["budget_tokens"] = config.thinking_budget
+            body["thinking"] = thinking
+
+        tool_choice: dict[str, Any] | None = None
+        if config.tool_choice is not None:
+            tool_choice = {"type": config.tool_choice.value}
+            if config.tool_choice == AnthropicToolChoice.TOOL:
+                tool_choice["name"] = config.tool_choice_specific_name
+        if config.disable_parallel_tool_use is not None:
+            tool_choice = tool_choice or {"type": "auto"}
+            tool_choice["disable_parallel_tool_use"] = config.disable_parallel_tool_use
+        if tool_choice is not None:
+            body["tool_choice"] = tool_choice
+
+    def translate_message(
+        self, message: Message, file_refs: FileRefs
+    ) -> tuple[str, list[dict[str, Any]]]:
+        """Translate a Message into an Anthropic role and its content blocks."""
+        if is_system_role(message.role):
+            if not isinstance(message.content, TextContent):
+                raise UnsupportedContentError("Anthropic system messages must be TextContent")
+            return "system", [{"type": "text", "text": message.content.text}]
+        role = "assistant" if message.role == Role.ASSISTANT else "user"
+        return role, [self.translate_content(message.content, file_refs)]
+
+    def translate_content(self, content: Content, file_refs: FileRefs) -> dict[str, Any]:
+        file_ref = file_refs.get(id(content))
+        if file_ref is not None:
+            block_type = "image" if isinstance(content, ImageContent) else "document"
+            return {"type": block_type, "source": {"type": "file", "file_id": file_ref.file_id}}
+        if isinstance(content, TextContent):
+            return {"type": "text", "text": content.text}
+        if isinstance(content, ImageContent):
+            media_type, data = image_media_type_and_data(content)
+            return {
+                "type": "image",
+                "source": {"type": "base64", "media_type": media_type, "data": data},
+            }
+        if isinstance(content, DocumentContent):
+            return {
+                "type": "document",
+                "source": {
+                    "type": "base64",
+                    "media_type": "application/pdf",
+                    "data": Base64Blob(content.document),
+                },
+            }
+        if isinstance(content, ThinkingContent):
+            return {
+                "type": "thinking",
+                "thinking": content.thinking,
+                "signature": content.encrypted_data,
+            }
+        if isinstance(content, AnthropicRedactedThinkingContent):
+            return {"type": "redacted_thinking", "data": content.data}
+        if isinstance(content, ToolCallContent):
+            return {
+                "type": "tool_use",
+                "id": content.tool_id,
+                "name": content.tool_name,
+                "input": content.input,
+            }
+        if isinstance(content, ToolResultContent):
+            return {
+                "type": "tool_result",
+                "tool_use_id": content.tool_id,
+                "content": [
+                    self.translate_content(result, file_refs) for result in content.results
+                ],
+                "is_error": content.is_error,
+            }
+        if isinstance(content, AnthropicServerToolUse):
+            return {
+                "type": "server_tool_use",
+                "id": content.tool_id,
+                "name": content.tool_name,
+                "input": content.input,
+            }
+        if isinstance(content, AnthropicWebSearchToolResult):
+            search_content: Any
+            if content.error is not None:
+                search_content = {
+                    "type": "web_search_tool_result_error",
+                    "error_code": content.error,
+                }
+            else:
+                search_content = [
+                    {"type": "web_search_result", **result.model_dump(exclude_none=True)}
+                    for result in content.search_results
+                ]
+            return {
+                "type": "web_search_tool_result",
+                "tool_use_id": content.tool_use_id,
+                "content": search_content,
+            }
+        if isinstance(content, AnthropicCodeInterpreterToolResult):
+            return {
+                "type": "code_execution_tool_result",
+                "tool_use_id": content.tool_use_id,
+                "content": {
+                    "type": "code_execution_result",
+                    "return_code": content.return_code,
+                    "stdout": content.stdout,
+                    "stderr": content.stderr,
+                    "content": [
+                        {"type": "code_execution_output", "file_id": file_id}
+                        for file_id in content.files
+                    ],
+                },
+            }
+        raise UnsupportedContentError(
+            f"{type(content).__name__} is not supported by the Anthropic backend"
+        )
+
+    async def upload_file(
+        self,
+        http: httpx.AsyncClient,
+        api_key: str,
+        data: bytes | memoryview,
+        mime_type: str,
+        filename: str,
+    ) -> FileReference:
+        response = await http.post(
+            "/v1/files",
+            headers={
+                "x-api-key": api_key,
+                "anthropic-version": ANTHROPIC_VERSION,
+                "anthropic-beta": FILES_API_BETA,
+            },
+            files={"file": (filename, BufferReader(data), mime_type)},
+        )
+        if response.status_code >= 400:
+            raise api_error(response, response.text)
+        # Anthropic keeps files until they are deleted
+        return FileReference(
+            provider=Provider.ANTHROPIC, file_id=response.json()["id"], mime_type=mime_type
+        )
+
+    async def submit_batch(
+        self,
+        http: httpx.AsyncClient,
+        api_key: str,
+        spec: ModelSpec,
+        requests: list[PreparedRequest],
+    ) -> BatchJob:
+        beta_headers: list[str] = []
+        for request in requests:
+            for beta in request.headers.get("anthropic-beta", "").split(","):
+                if beta and beta not in beta_headers:
+                    beta_headers.append(beta)
+        headers = self._batch_headers(api_key)
+        if beta_headers:
+            headers["anthropic-beta"] = ",".join(beta_headers)
+        body = StreamingJSONBody(
+            {
+                "requests": [
+                    {"custom_id": str(index), "params": request.json_body}
+                    for index, request in enumerate(requests)
+                ]
+            }
+        )
+        response = await http.post(
+            "/v1/messages/batches",
+            headers={**headers, "Content-Type": "application/json"},
+            content=body.read(),
+        )
+        if response.status_code >= 400:
+            raise api_error(response, response.text)
+        data = response.json()
+        return BatchJob(
+            id=data["id"],
+            provider=Provider.ANTHROPIC,
+            model=spec.model_id,
+            status=_batch_status(data),
+            request_count=len(requests),
+            submitted_at=time.time(),
+            provider_data=data,
+        )
+
+    async def poll_batch(self, http: httpx.AsyncClient, api_key: str, job: BatchJob) -> BatchJob:
+        response = await http.get(
+            f"/v1/messages/batches/{job.id}", headers=self._batch_headers(api_key)
+        )
+        if response.status_code >= 400:
+            raise api_error(response, response.text)
+        data = response.json()
+        return job.model_copy(update={"status": _batch_status(data), "provider_data": data})
+
+    async def cancel_batch(self, http: httpx.AsyncClient, api_key: str, job: BatchJob) -> BatchJob:
+        response = await http.post(
+            f"/v1/messages/batches/{job.id}/cancel", headers=self._batch_headers(api_key)
+        )
+        if response.status_code >= 400:
+            raise api_error(response, response.text)
+        data = response.json()
+        return job.model_copy(update={"status": _batch_status(data), "provider_data": data})
+
+    async def batch_results(
+        self, http: httpx.AsyncClient, api_key: str, job: BatchJob
+    ) -> dict[int, dict[str, Any] | BatchError]:
+        response = await http.get(
+            f"/v1/messages/batches/{job.id}/results", headers=self._batch_headers(api_key)
+        )
+        if response.status_code >= 400:
+            raise api_error(response, response.text)
+        results: dict[int, dict[str, Any] | BatchError] = {}
+        for line in response.text.splitlines():
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            index = int(record["custom_id"])
+            result = record["result"]
+            if result["type"] == "succeeded":
+                results[index] = result["message"]
+            else:
+                # errored, canceled or expired
+                error = result.get("error") or result["type"]
+                results[index] = BatchError(
+                    f"Batch request {index} {result['type']}: {error}", error
+                )
+        return results
+
+    def _batch_headers(self, api_key: str) -> dict[str, str]:
+        return {"x-api-key": api_key, "anthropic-version": ANTHROPIC_VERSION}
+
+    def parse_response(self, data: dict[str, Any]) -> ParsedReply:
+        messages = [
+            Message(role=Role.ASSISTANT, content=self.parse_block(block))
+            for block in data.get("content", [])
+        ]
+        return ParsedReply(messages=messages, usage=self.parse_usage(data.get("usage", {})))
+
+    def parse_block(self, block: dict[str, Any]) -> Content:
+        block_type = block["type"]
+        if block_type == "text":
+            return TextContent(text=block["text"])
+        if block_type == "thinking":
+            return ThinkingContent(
+                thinking=block["thinking"], encrypted_data=block.get("signature")
+            )
+        if block_type == "redacted_thinking":
+            return AnthropicRedactedThinkingContent(data=block["data"])
+        if block_type == "tool_use":
+            return ToolCallContent(
+                tool_id=block["id"], tool_name=block["name"], input=block.get("input") or {}
+            )
+        if block_type == "server_tool_use":
+            return AnthropicServerToolUse(
+                tool_id=block["id"], tool_name=block["name"], input=block.get("input") or {}
+            )
+        if block_type == "web_search_tool_result":
+            results = block.get("content")
+            if isinstance(results, dict):
+                return AnthropicWebSearchToolResult(
+                    search_results=[],
+                    tool_use_id=block["tool_use_id"],
+                    error=results.get("error_code"),
+                )
+            return AnthropicWebSearchToolResult(
+                search_results=[
+                    AnthropicWebSearchIndividualResult.model_validate(result)
+                    for result in results or []
+                ],
+                tool_use_id=block["tool_use_id"],
+            )
+        if block_type == "code_execution_tool_result":
+            result = block.get("content") or {}
+            return AnthropicCodeInterpreterToolResult(
+                tool_use_id=block["tool_use_id"],
+                return_code=result.get("return_code", 0),
+                stdout=result.get("stdout", ""),
+                stderr=result.get("stderr", ""),
+                files=[output["file_id"] for output in result.get("content", [])],
+                error_code=result.get("error_code"),
+            )
+        raise UnsupportedContentError(f"Unknown Anthropic content block type: {block_type}")
+
+    def parse_usage(self, usage: dict[str, Any]) -> LLMUsage:
+        # Anthropic reports thinking tokens as part of output_tokens
+        return LLMUsage(
+            input_uncached_tokens=usage.get("input_tokens") or 0,
+            input_cached_tokens=usage.get("cache_read_input_tokens") or 0,
+            input_cache_write_tokens=usage.get("cache_creation_input_tokens") or 0,
+            completion_tokens=usage.get("output_tokens") or 0,
+            provider_usage=usage,
+        )
+
+    def stream_accumulator(self) -> "AnthropicStreamAccumulator":
+        return AnthropicStreamAccumulator(self)
+
+
+# Delta type -> (block field, delta field, kintu delta type)
+STREAM_DELTA_FIELDS: dict[str, tuple[str, str, StreamDeltaType | None]] = {
+    "text_delta": ("text", "text", StreamDeltaType.TEXT),
+    "thinking_delta": ("thinking", "thinking", StreamDeltaType.THINKING),
+    "signature_delta": ("signature", "signature", None),
+    "input_json_delta": ("partial_json", "partial_json", StreamDeltaType.TOOL_CALL),
+}
+
+# HTTP status of each Messages API error type, for errors that arrive as a stream event
+STREAM_ERROR_STATUSES = {
+    "invalid_request_error": 400,
+    "authentication_error": 401,
+    "permission_error": 403,
+    "not_found_error": 404,
+    "request_too_large": 413,
+    "rate_limit_error": 429,
+    "api_error": 500,
+    "overloaded_error": 529,
+}
+
+
+class AnthropicStreamAccumulator(StreamAccumulator):
+    """Builds content blocks from Messages API stream events, finishing each at its stop."""
+
+    def __init__(self, backend: AnthropicBackend):
+        self.backend = backend
+        self.usage: dict[str, Any] = {}
+        self.blocks: dict[int, dict[str, Any]] = {}
+        self.fragments: dict[int, dict[str, list[str]]] = {}
+        self.contents: dict[int, Content] = {}
+
+    def add(self, event: dict[str, Any]) -> list[StreamDelta]:
+        event_type = event.get("type")
+        if event_type == "message_start":
+            self.usage.update(event["message"].get("usage") or {})
+        elif event_type == "content_block_start":
+            block = event["content_block"]
+            self.blocks[event["index"]] = dict(block)
+            self.fragments[event["index"]] = {}
+            if block["type"] == "tool_use":
+                return [
+                    StreamDelta(
+                        type=StreamDeltaType.TOOL_CALL,
+                        index=event["index"],
+                        tool_id=block["id"],
+                        tool_name=block["name"],
+                    )
+                ]
+        elif event_type == "content_block_delta":
+            delta = event["delta"]
+            fields = STREAM_DELTA_FIELDS.get(delta["type"])
+            if fields is not None:
+                block_field, delta_field, delta_type = fields
+                fragments = self.fragments[event["index"]]
+                fragments.setdefault(block_field, []).append(delta[delta_field])
+                if delta_type is not None:
+                    return [
+                        StreamDelta(type=delta_type, index=event["index"], text=delta[delta_field])
+                    ]
+        elif event_type == "content_block_stop":
+            self._finish_block(event["index"])
+        elif event_type == "message_delta":
+            self.usage.update(event.get("usage") or {})
+        elif event_type == "error":
+            # Sent after the 200, e.g. when the model is overloaded mid-reply
+            error = event.get("error") or {}
+            error_type = error.get("type", "api_error")
+            raise ProviderAPIError(
+                f"Anthropic stream failed with {error_type}: {error.get('message', '')}",
+                status_code=STREAM_ERROR_STATUSES.get(error_type, 500),
+                body=json.dumps(event),
+            )
+        return []
+
+    def finish(self) -> ParsedReply:
+        # Blocks still open when the stream ended
+        for index in list(self.blocks):
+            self._finish_block(index)
+        messages = [
+            Message(role=Role.ASSISTANT, content=self.contents[index])
+            for index in sorted(self.contents)
+        ]
+        return ParsedReply(messages=messages, usage=self.backend.parse_usage(self.usage))
+
+    def _finish_block(self, index: int) -> None:
+        block = self.blocks.pop(index, None)
+        if block is None:
+            return
+        for field, fragments in self.fragments.pop(index).items():
+            joined = "".join(fragments)
+            if field == "partial_json":
+                if joined:
+                    block["input"] = json.loads(joined)
+            else:
+                block[field] = block.get(field, "") + joined
+        self.contents[index] = self.backend.parse_block(block)
+
+
+def _batch_status(data: dict[str, Any]) -> BatchStatus:
+    # Message batches always end with results; failures are per request
+    if data["processing_status"] == "ended":
+        return BatchStatus.COMPLETED
+    return BatchStatus.IN_PROGRESS
@@ -0,0 +1,226 @@
+import abc
+from collections.abc import Callable, Hashable, Iterator
+from typing import Any, TypeVar
+
+import httpx
+from pydantic import BaseModel
+
+from kintu.client.translation_cache import MessageTranslationCache
+from kintu.types.batch import BatchJob
+from kintu.types.complete import CompleteInput, LLMUsage, StreamDelta
+from kintu.types.content import Content, ImageContent, ToolResultContent
+from kintu.types.errors import BatchError, ProviderAPIError, UnsupportedContentError
+from kintu.types.file_reference import FileReference
+from kintu.types.llmsdk import LLMSDK
+from kintu.types.message import Message
+from kintu.types.model_spec import ModelSpec
+from kintu.types.role import Role
+from kintu.types.tool import Tool
+from kintu.utilities import image_to_base64
+
+T = TypeVar("T")
+
+
+class PreparedRequest(BaseModel):
+    """
+    An HTTP request ready to be sent through the provider's connection pool.
+
+    json_body may contain Base64Blob values, which are encoded as the body is streamed.
+    """
+
+    method: str = "POST"
+    path: str
+    headers: dict[str, str]
+    json_body: dict[str, Any]
+
+
+# Uploaded files to reference instead of sending inline, keyed by id() of the Content
+FileRefs = dict[int, FileReference]
+
+
+class ParsedReply(BaseModel):
+    """The kintu view of a provider response."""
+
+    messages: list[Message]
+    usage: LLMUsage
+
+
+class SDKBackend(abc.ABC):
+    """
+    Translates between kintu types and one LLM SDK's HTTP wire format.
+
+    Backends are stateless. They build requests and parse responses; the client owns the
+    connection pools, credentials and timing.
+    """
+
+    llmsdk: LLMSDK
+    supports_files: bool = False  # Whether upload_file is implemented
+    supports_batches: bool = False  # Whether the batch methods are implemented
+
+    @abc.abstractmethod
+    def build_request(
+        self,
+        inp: CompleteInput,
+        spec: ModelSpec,
+        api_key: str,
+        file_refs: FileRefs | None = None,
+        translations: MessageTranslationCache | None = None,
+    ) -> PreparedRequest:
+        """
+        Build the HTTP request for a completion, referencing any uploaded files and reusing
+        message translations from earlier turns.
+        """
+        ...
+
+    def translate_cached(
+        self,
+        translations: MessageTranslationCache | None,
+        message: Message,
+        file_refs: FileRefs,
+        translate: Callable[[], T],
+        context: Hashable = None,
+    ) -> T:
+        """
+        Translate a message through the translation cache, if there is one.
+
+        Cached translations are shared between requests, so callers must copy anything they
+        go on to mutate (e.g. when merging neighbouring messages).
+        """
+        if translations is None:
+            return translate()
+        file_ids = tuple(
+            file_refs[id(content)].file_id
+            for content in iter_contents(message.content)
+            if id(content) in file_refs
+        )
+        return translations.get_or_translate(self.llmsdk, message, (file_ids, context), translate)
+
+    async def upload_file(
+        self,
+        http: httpx.AsyncClient,
+        api_key: str,
+        data: bytes | memoryview,
+        mime_type: str,
+        filename: str,
+    ) -> FileReference:
+        """Upload content to the provider's Files API."""
+        raise UnsupportedContentError(f"{self.llmsdk.value} does not support file uploads")
+
+    async def submit_batch(
+        self,
+        http: httpx.AsyncClient,
+        api_key: str,
+        spec: ModelSpec,
+        requests: list[PreparedRequest],
+    ) -> BatchJob:
+        """Submit requests to the provider's batch API, with their indices as custom ids."""
+        raise BatchError(f"{self.llmsdk.value} has no batch API")
+
+    async def poll_batch(self, http: httpx.AsyncClient, api_key: str, job: BatchJob) -> BatchJob:
+        """The job with its current status."""
+        raise BatchError(f"{self.llmsdk.value} has no batch API")
+
+    async def batch_results(
+        self, http: httpx.AsyncClient, api_key: str, job: BatchJob
+    ) -> dict[int, dict[str, Any] | BatchError]:
+        """Each request's response body (as parse_response takes it) or error, by index."""
+        raise BatchError(f"{self.llmsdk.value} has no batch API")
+
+    async def cancel_batch(self, http: httpx.AsyncClient, api_key: str, job: BatchJob) -> BatchJob:
+        """Ask the provider to stop the job; it may still finish requests in progress."""
+        raise BatchError(f"{self.llmsdk.value} has no batch API")
+
+    @abc.abstractmethod
+    def parse_response(self, data: dict[str, Any]) -> ParsedReply:
+        """Parse a non-streaming response body."""
+        ...
+
+    @abc.abstractmethod
+    def stream_accumulator(self) -> "StreamAccumulator":
+        """A fresh accumulator for one streamed response."""
+        ...
+
+    def parse_stream(self, events: list[dict[str, Any]]) -> ParsedReply:
+        """Rebuild the complete reply from every decoded stream event."""
+        accumulator = self.stream_accumulator()
+        for event in events:
+            accumulator.add(event)
+        return accumulator.finish()
+
+
+class StreamAccumulator(abc.ABC):
+    """
+    Folds decoded stream events into a reply as they arrive.
+
+    Events are not kept: text deltas are collected as fragments and joined once, so a
+    long stream costs roughly the size of its output rather than of every event.
+    """
+
+    @abc.abstractmethod
+    def add(self, event: dict[str, Any]) -> list[StreamDelta]:
+        """Fold one decoded stream event into the reply, returning its typed deltas."""
+        ...
+
+    @abc.abstractmethod
+    def finish(self) -> ParsedReply:
+        """The complete reply, once the stream has ended."""
+        ...
+
+
+def scale_temperature(temperature: float | None, spec: ModelSpec) -> float | None:
+    """Scale a 0-1 kintu temperature into the model's native temperature range."""
+    if temperature is None:
+        return None
+    low, high = spec.temperature_range
+    return low + temperature * (high - low)
+
+
+def resolve_max_tokens(inp: CompleteInput, spec: ModelSpec) -> int:
+    """Use the requested max tokens, falling back to the model's maximum."""
+    return inp.max_tokens if inp.max_tokens is not None else spec.max_output_tokens
+
+
+def tool_json_schema(tool: Tool) -> dict[str, Any]:
+    """JSON schema for a tool's input."""
+    return tool.input_schema.model_json_schema()
+
+
+# PIL formats every provider accepts inline, with their media types
+INLINE_IMAGE_MEDIA_TYPES = {
+    "PNG": "image/png",
+    "JPEG": "image/jpeg",
+    "WEBP": "image/webp",
+}
+
+
+def image_media_type_and_data(content: ImageContent) -> tuple[str, str]:
+    """
+    Encode an image for inline transport, returning (media type, base64 data).
+
+    Images decoded from a supported format (e.g. by ImagePreprocessor) keep that format;
+    anything else is sent as PNG.
+    """
+    format = content.image.format if content.image.format in INLINE_IMAGE_MEDIA_TYPES else "PNG"
+    return INLINE_IMAGE_MEDIA_TYPES[format], image_to_base64(content.image, format)
+
+
+def iter_contents(content: Content) -> Iterator[Content]:
+    """Yield content and everything nested inside it (tool result contents)."""
+    yield content
+    if isinstance(content, ToolResultContent):
+        for result in content.results:
+            yield from iter_contents(result)
+
+
+def is_system_role(role: Role) -> bool:
+    return role in (Role.SYSTEM, Role.DEVELOPER)
+
+
+def api_error(response: httpx.Response, body: str) -> ProviderAPIError:
+    """Build the ProviderAPIError for a failed response."""
+    return ProviderAPIError(
+        f"{response.request.url.host} returned HTTP {response.status_code}: {body[:500]}",
+        status_code=response.status_code,
+        body=body,
+        headers=dict(response.headers),
+    )
@@ -0,0 +1,527 @@
+import json
+import re
+import time
+from collections.abc import AsyncIterator
+from datetime import datetime
+from typing import Any
+
+import httpx
+
+from kintu.client.backends.base import (
+    FileRefs,
+    ParsedReply,
+    PreparedRequest,
+    SDKBackend,
+    StreamAccumulator,
+    api_error,
+    image_media_type_and_data,
+    is_system_role,
+    resolve_max_tokens,
+    scale_temperature,
+    tool_json_schema,
+)
+from kintu.client.request_body import Base64Blob, StreamingJSONBody, iter_chunks
+from kintu.client.translation_cache import MessageTranslationCache
+from kintu.types.batch import BatchJob, BatchStatus
+from kintu.types.complete import CompleteInput, LLMUsage, StreamDelta, StreamDeltaType
+from kintu.types.content import (
+    Content,
+    DocumentContent,
+    GeminiCodeExecutionResult,
+    GeminiServerToolUse,
+    GeminiWebSearchResult,
+    ImageContent,
+    TextContent,
+    ThinkingContent,
+    ToolCallContent,
+    ToolResultContent,
+)
+from kintu.types.errors import BatchError, UnsupportedContentError
+from kintu.types.file_reference import FileReference
+from kintu.types.llmsdk import LLMSDK
+from kintu.types.message import Message
+from kintu.types.model_spec import ModelSpec
+from kintu.types.provider import Provider
+from kintu.types.provider_config import GeminiConfig
+from kintu.types.role import Role
+
+
+class GeminiBackend(SDKBackend):
+    """Gemini generateContent REST API."""
+
+    llmsdk = LLMSDK.GEMINI
+    supports_files = True
+    supports_batches = True
+
+    def build_request(
+        self,
+        inp: CompleteInput,
+        spec: ModelSpec,
+        api_key: str,
+        file_refs: FileRefs | None = None,
+        translations: MessageTranslationCache | None = None,
+    ) -> PreparedRequest:
+        config = inp.provider_configs.gemini if inp.provider_configs else None
+        file_refs = file_refs or {}
+
+        # functionResponse parts are matched to their call by name, which ToolResultContent
+        # does not carry, so look it up from the preceding tool calls
+        tool_names = {
+            message.content.tool_id: message.content.tool_name
+            for message in inp.messages
+            if isinstance(message.content, ToolCallContent)
+        }
+
+        system_parts: list[dict[str, Any]] = []
+        contents: list[dict[str, Any]] = []
+        for message in inp.messages:
+            # A tool result's translation depends on the name of its call
+            tool_name = (
+                tool_names.get(message.content.tool_id)
+                if isinstance(message.content, ToolResultContent)
+                else None
+            )
+            role, parts = self.translate_cached(
+                translations,
+                message,
+                file_refs,
+                lambda: self.translate_message(message, tool_names, file_refs),
+                context=tool_name,
+            )
+            if role == "system":
+                system_parts.extend(parts)
+            elif contents and contents[-1]["role"] == role:
+                contents[-1]["parts"].extend(parts)
+            else:
+                contents.append({"role": role, "parts": list(parts)})
+
+        generation_config: dict[str, Any] = {"maxOutputTokens": resolve_max_tokens(inp, spec)}
+        temperature = scale_temperature(inp.temperature, spec)
+        if temperature is not None:
+            generation_config["temperature"] = temperature
+
+        body: dict[str, Any] = {"contents": contents, "generationConfig": generation_config}
+        if system_parts:
+            body["systemInstruction"] = {"parts": system_parts}
+        if inp.tools:
+            body["tools"] = [
+                {
+                    "functionDeclarations": [
+                        {
+                            "name": tool.name,
+                            "description": tool.description,
+                            "parametersJsonSchema": tool_json_schema(tool),
+                        }
+                        for tool in inp.tools
+                    ]
+                }
+            ]
+        if config is not None:
+            self._apply_config(body, generation_config, config)
+
+        method = "streamGenerateContent?alt=sse" if inp.stream else "generateContent"
+        return PreparedRequest(
+            path=f"/v1beta/models/{spec.provider_model_id}:{method}",
+            headers={"x-goog-api-key": api_key},
+            json_body=body,
+        )
+
+    def _apply_config(
+        self, body: dict[str, Any], generation_config: dict[str, Any], config: GeminiConfig
+    ) -> None:
+        if config.top_p is not None:
+            generation_config["topP"] = config.top_p
+        if config.top_k is not None:
+            generation_config["topK"] = config.top_k
+        if config.stop_sequences is not None:
+            generation_config["stopSequences"] = config.stop_sequences
+        if config.response_mime_type is not None:
+            generation_config["responseMimeType"] = config.response_mime_type
+        if config.response_schema is not None:
+            generation_config["responseJsonSchema"] = config.response_schema
+        if config.seed is not None:
+            generation_config["seed"] = config.seed
+
+        thinking_config: dict[str, Any] = {}
+        if config.thinking_include_thoughts is not None:
+            thinking_config["includeThoughts"] = config.thinking_include_thoughts
+        if config.thinking_budget is not None:
+            thinking_config["thinkingBudget"] = config.thinking_budget
+        if thinking_config:
+            generation_config["thinkingConfig"] = thinking_config
+
+        if config.tool_choice is not None or config.tool_choice_allowed_tools is not None:
+            calling_config: dict[str, Any] = {}
+            if config.tool_choice is not None:
+                calling_config["mode"] = config.tool_choice.value.upper()
+            if config.tool_choice_allowed_tools is not None:
+                calling_config["allowedFunctionNames"] = config.tool_choice_allowed_tools
+            body["toolConfig"] = {"functionCallingConfig": calling_config}
+
+    def translate_message(
+        self, message: Message, tool_names: dict[str, str], file_refs: FileRefs
+    ) -> tuple[str, list[dict[str, Any]]]:
+        """Translate a Message into a Gemini role and its parts."""
+        if is_system_role(message.role):
+            if not isinstance(message.content, TextContent):
+                raise UnsupportedContentError("Gemini system instructions must be TextContent")
+            return "system", [{"text": message.content.text}]
+        role = "model" if message.role == Role.ASSISTANT else "user"
+        return role, self.translate_content(message.content, tool_names, file_refs)
+
+    def translate_content(
+        self, content: Content, tool_names: dict[str, str], file_refs: FileRefs
+    ) -> list[dict[str, Any]]:
+        file_ref = file_refs.get(id(content))
+        if file_ref is not None:
+            return [{"fileData": {"mimeType": file_ref.mime_type, "fileUri": file_ref.uri}}]
+        if isinstance(content, TextContent):
+            return [{"text": content.text}]
+        if isinstance(content, ImageContent):
+            media_type, data = image_media_type_and_data(content)
+            return [{"inlineData": {"mimeType": media_type, "data": data}}]
+        if isinstance(content, DocumentContent):
+            data = Base64Blob(content.document)
+            return [{"inlineData": {"mimeType": "application/pdf", "data": data}}]
+        if isinstance(content, ThinkingContent):
+            part: dict[str, Any] = {"text": content.thinking, "thought": True}
+            if content.encrypted_data is not None:
+                part["thoughtSignature"] = content.encrypted_data
+            return [part]
+        if isinstance(content, ToolCallContent):
+            return [
+                {
+                    "functionCall": {
+                        "id": content.tool_id,
+                        "name": content.tool_name,
+                        "args": content.input,
+                    }
+                }
+            ]
+        if isinstance(content, ToolResultContent):
+            if content.tool_id not in tool_names:
+                raise UnsupportedContentError(
+                    f"No tool call found for Gemini tool result {content.tool_id}"
+                )
+            output: dict[str, Any] = {
+                "error" if content.is_error else "output": "\n".join(
+                    result.text for result in content.results if isinstance(result, TextContent)
+                )
+            }
+            parts: list[dict[str, Any]] = [
+                {
+                    "functionResponse": {
+                        "id": content.tool_id,
+                        "name": tool_names[content.tool_id],
+                        "response": output,
+                    }
+                }
+            ]
+            # Non-text results (e.g. screenshots) follow the response as regular parts
+            for result in content.results:
+                if not isinstance(result, TextContent):
+                    parts.extend(self.translate_content(result, tool_names, file_refs))
+            return parts
+        if isinstance(content, GeminiServerToolUse):
+            return [{"executableCode": content.input}]
+        if isinstance(content, GeminiCodeExecutionResult):
+            result: dict[str, Any] = {"outcome": content.outcome}
+            if content.output is not None:
+                result["output"] = content.output
+            return [{"codeExecutionResult": result}]
+        if isinstance(content, GeminiWebSearchResult):
+            # Grounding metadata is response-only; nothing to send back
+            return []
+        raise UnsupportedContentError(
+            f"{type(content).__name__} is not supported by the Gemini backend"
+        )
+
+    async def upload_file(
+        self,
+        http: httpx.AsyncClient,
+        api_key: str,
+        data: bytes | memoryview,
+        mime_type: str,
+        filename: str,
+    ) -> FileReference:
+        # Resumable upload: one request to open the session, one to send the bytes
+        size = memoryview(data).nbytes
+        start = await http.post(
+            "/upload/v1beta/files",
+            headers={
+                "x-goog-api-key": api_key,
+                "X-Goog-Upload-Protocol": "resumable",
+                "X-Goog-Upload-Command": "start",
+                "X-Goog-Upload-Header-Content-Length": str(size),
+                "X-Goog-Upload-Header-Content-Type": mime_type,
+            },
+            json={"file": {"display_name": filename}},
+        )
+        if start.status_code >= 400:
+            raise api_error(start, start.text)
+
+        async def chunks() -> AsyncIterator[bytes]:
+            for chunk in iter_chunks(data):
+                yield chunk
+
+        response = await http.post(
+            start.headers["X-Goog-Upload-URL"],
+            headers={
+                "x-goog-api-key": api_key,
+                "Content-Length": str(size),
+                "X-Goog-Upload-Offset": "0",
+                "X-Goog-Upload-Command": "upload, finalize",
+            },
+            content=chunks(),
+        )
+        if response.status_code >= 400:
+            raise api_error(response, response.text)
+        uploaded = response.json()["file"]
+        expires_at = None
+        if uploaded.get("expirationTime"):
+            expires_at = parse_timestamp(uploaded["expirationTime"])
+        return FileReference(
+            provider=Provider.GEMINI,
+            file_id=uploaded["name"],
+            uri=uploaded["uri"],
+            mime_type=uploaded.get("mimeType", mime_type),
+            expires_at=expires_at,
+        )
+
+    async def submit_batch(
+        self,
+        http: httpx.AsyncClient,
+        api_key: str,
+        spec: ModelSpec,
+        requests: list[PreparedRequest],
+    ) -> BatchJob:
+        body = StreamingJSONBody(
+            {
+                "batch": {
+                    "display_name": f"kintu-{spec.provider_model_id}",
+                    "input_config": {
+                        "requests": {
+                            "requests": [
+                                {"request": request.json_body, "metadata": {"key": str(index)}}
+                                for index, request in enumerate(requests)
+                            ]
+                        }
+                    },
+                }
+            }
+        )
+        response = await http.post(
+            f"/v1beta/models/{spec.provider_model_id}:batchGenerateContent",
+            headers={"x-goog-api-key": api_key, "Content-Type": "application/json"},
+            content=body.read(),
+        )
+        if response.status_code >= 400:
+            raise api_error(response, response.text)
+        data = response.json()
+        return BatchJob(
+            id=data["name"],
+            provider=Provider.GEMINI,
+            model=spec.model_id,
+            status=_batch_status(data),
+            request_count=len(requests),
+            submitted_at=time.time(),
+            provider_data=data,
+        )
+
+    async def poll_batch(self, http: httpx.AsyncClient, api_key: str, job: BatchJob) -> BatchJob:
+        # The batch is a long-running operation, named batches/<id>
+        response = await http.get(f"/v1beta/{job.id}", headers={"x-goog-api-key": api_key})
+        if response.status_code >= 400:
+            raise api_error(response, response.text)
+        data = response.json()
+        return job.model_copy(update={"status": _batch_status(data), "provider_data": data})
+
+    async def cancel_batch(self, http: httpx.AsyncClient, api_key: str, job: BatchJob) -> BatchJob:
+        response = await http.post(f"/v1beta/{job.id}:cancel", headers={"x-goog-api-key": api_key})
+        if response.status_code >= 400:
+            raise api_error(response, response.text)
+        # The cancel call returns nothing: read the batch back for its state
+        return await self.poll_batch(http, api_key, job)
+
+    async def batch_results(
+        self, http: httpx.AsyncClient, api_key: str, job: BatchJob
+    ) -> dict[int, dict[str, Any] | BatchError]:
+        # Inline requests get inline responses, in the finished operation
+        output = (job.provider_data.get("response") or {}).get("inlinedResponses") or {}
+        results: dict[int, dict[str, Any] | BatchError] = {}
+        for position, item in enumerate(output.get("inlinedResponses") or []):
+            index = int((item.get("metadata") or {}).get("key", position))
+            if "error" in item:
+                error = item["error"]
+                results[index] = BatchError(f"Batch request {index} failed: {error}", error)
+            else:
+                results[index] = item["response"]
+        return results
+
+    def parse_response(self, data: dict[str, Any]) -> ParsedReply:
+        messages: list[Message] = []
+        candidates = data.get("candidates") or []
+        if candidates:
+            candidate = candidates[0]
+            parts = (candidate.get("content") or {}).get("parts") or []
+            for content in self.parse_parts(parts):
+                messages.append(Message(role=Role.ASSISTANT, content=content))
+            grounding = candidate.get("groundingMetadata")
+            if grounding and grounding.get("groundingChunks"):
+                search_result = GeminiWebSearchResult(
+                    tool_use_id="google_search",
+                    search_results=grounding["groundingChunks"],
+                )
+                messages.append(Message(role=Role.ASSISTANT, content=search_result))
+        usage = self.parse_usage(data.get("usageMetadata") or {})
+        return ParsedReply(messages=messages, usage=usage)
+
+    def parse_parts(self, parts: list[dict[str, Any]]) -> list[Content]:
+        contents: list[Content] = []
+        last_code_id: str | None = None
+        for index, part in enumerate(parts):
+            if "functionCall" in part:
+                call = part["functionCall"]
+                contents.append(
+                    ToolCallContent(
+                        tool_id=call.get("id") or f"{call['name']}_{index}",
+                        tool_name=call["name"],
+                        input=call.get("args") or {},
+                    )
+                )
+            elif "executableCode" in part:
+                last_code_id = f"code_execution_{index}"
+                contents.append(
+                    GeminiServerToolUse(
+                        tool_id=last_code_id,
+                        tool_name="code_execution",
+                        tool_type="code_execution",
+                        input=part["executableCode"],
+                    )
+                )
+            elif "codeExecutionResult" in part:
+                result = part["codeExecutionResult"]
+                contents.append(
+                    GeminiCodeExecutionResult(
+                        tool_use_id=last_code_id or f"code_execution_{index}",
+                        outcome=result.get("outcome", "OUTCOME_OK"),
+                        output=result.get("output"),
+                    )
+                )
+            elif part.get("thought"):
+                contents.append(
+                    ThinkingContent(
+                        thinking=part.get("text", ""),
+                        encrypted_data=part.get("thoughtSignature"),
+                    )
+                )
+            elif "text" in part:
+                contents.append(TextContent(text=part["text"]))
+        return contents
+
+    def parse_usage(self, usage: dict[str, Any]) -> LLMUsage:
+        prompt = usage.get("promptTokenCount") or 0
+        cached = usage.get("cachedContentTokenCount") or 0
+        return LLMUsage(
+            input_uncached_tokens=prompt - cached,
+            input_cached_tokens=cached,
+            completion_tokens=usage.get("candidatesTokenCount") or 0,
+            reasoning_tokens=usage.get("thoughtsTokenCount") or 0,
+            provider_usage=usage,
+        )
+
+    def stream_accumulator(self) -> "GeminiStreamAccumulator":
+        return GeminiStreamAccumulator(self)
+
+
+BATCH_STATES = {
+    "PENDING": BatchStatus.IN_PROGRESS,
+    "RUNNING": BatchStatus.IN_PROGRESS,
+    "SUCCEEDED": BatchStatus.COMPLETED,
+    "FAILED": BatchStatus.FAILED,
+    "CANCELLED": BatchStatus.CANCELLED,
+    "EXPIRED": BatchStatus.EXPIRED,
+}
+
+
+def _batch_status(data: dict[str, Any]) -> BatchStatus:
+    # e.g. BATCH_STATE_RUNNING, or JOB_STATE_RUNNING in some API versions
+    state = (data.get("metadata") or {}).get("state", "")
+    return BATCH_STATES.get(state.rpartition("_STATE_")[2], BatchStatus.IN_PROGRESS)
+
+
+def parse_timestamp(value: str) -> float:
+    """Parse an RFC 3339 timestamp (as used by Google APIs) into Unix time."""
+    # fromisoformat on Python 3.10 accepts neither "Z" nor nanosecond precision
+    value = re.sub(r"(\.\d{6})\d+", r"\1", value).replace("Z", "+00:00")
+    return datetime.fromisoformat(value).timestamp()
+
+
+class GeminiStreamAccumulator(StreamAccumulator):
+    """
+    Concatenates the parts of partial GenerateContentResponses, merging adjacent text
+    fragments, and keeps the last reported usage.
+    """
+
+    def __init__(self, backend: GeminiBackend):
+        self.backend = backend
+        self.parts: list[dict[str, Any]] = []
+        # Fragments of the last part, while it is text that later events may extend
+        self.text_fragments: list[str] = []
+        self.grounding: dict[str, Any] | None = None
+        self.usage: dict[str, Any] = {}
+
+    def add(self, event: dict[str, Any]) -> list[StreamDelta]:
+        deltas: list[StreamDelta] = []
+        self.usage = event.get("usageMetadata") or self.usage
+        for candidate in event.get("candidates") or []:
+            self.grounding = candidate.get("groundingMetadata") or self.grounding
+            for part in (candidate.get("content") or {}).get("parts") or []:
+                previous = self.parts[-1] if self.parts else None
+                if (
+                    previous is not None
+                    and "text" in part
+                    and "text" in previous
+                    and bool(part.get("thought")) == bool(previous.get("thought"))
+                ):
+                    self.text_fragments.append(part["text"])
+                    if "thoughtSignature" in part:
+                        previous["thoughtSignature"] = part["thoughtSignature"]
+                else:
+                    self._join_text()
+                    self.parts.append(dict(part))
+                    if "text" in part:
+                        self.text_fragments = [part["text"]]
+                delta = self._delta(part)
+                if delta is not None:
+                    deltas.append(delta)
+        return deltas
+
+    def _delta(self, part: dict[str, Any]) -> StreamDelta | None:
+        index = len(self.parts) - 1
+        if "text" in part:
+            delta_type = StreamDeltaType.THINKING if part.get("thought") else StreamDeltaType.TEXT
+            return StreamDelta(type=delta_type, index=index, text=part["text"])
+        if "functionCall" in part:
+            call = part["functionCall"]
+            # Gemini sends each function call whole
+            return StreamDelta(
+                type=StreamDeltaType.TOOL_CALL,
+                index=index,
+                text=json.dumps(call.get("args") or {}),
+                tool_id=call.get("id"),
+                tool_name=call.get("name"),
+            )
+        return None
+
+    def finish(self) -> ParsedReply:
+        self._join_text()
+        candidate: dict[str, Any] = {"content": {"parts": self.parts}}
+        if self.grounding is not None:
+            candidate["groundingMetadata"] = self.grounding
+        return self.backend.parse_response({"candidates": [candidate], "usageMetadata": self.usage})
+
+    def _join_text(self) -> None:
+        if self.text_fragments:
+            self.parts[-1]["text"] = "".join(self.text_fragments)
+            self.text_fragments = []
@@ -0,0 +1,278 @@
+import json
+from typing import Any
+
+from kintu.client.backends.base import (
+    FileRefs,
+    ParsedReply,
+    PreparedRequest,
+    SDKBackend,
+    StreamAccumulator,
+    image_media_type_and_data,
+    resolve_max_tokens,
+    scale_temperature,
+    tool_json_schema,
+)
+from kintu.client.translation_cache import MessageTranslationCache
+from kintu.types.complete import CompleteInput, LLMUsage, StreamDelta, StreamDeltaType
+from kintu.types.content import (
+    Content,
+    ImageContent,
+    TextContent,
+    ThinkingContent,
+    ToolCallContent,
+    ToolResultContent,
+)
+from kintu.types.errors import UnsupportedContentError
+from kintu.types.llmsdk import LLMSDK
+from kintu.types.message import Message
+from kintu.types.model_spec import ModelSpec
+from kintu.types.role import Role
+
+
+class LiteLLMBackend(SDKBackend):
+    """
+    OpenAI-compatible Chat Completions API, as served by the providers LiteLLM routes to.
+
+    Groq and Together both expose this API directly, so kintu speaks it over its own
+    connection pools rather than going through the LiteLLM package.
+    """
+
+    llmsdk = LLMSDK.LITELLM
+
+    def build_request(
+        self,
+        inp: CompleteInput,
+        spec: ModelSpec,
+        api_key: str,
+        file_refs: FileRefs | None = None,
+        translations: MessageTranslationCache | None = None,
+    ) -> PreparedRequest:
+        # Groq and Together have no Files API, so content is always sent inline
+        messages: list[dict[str, Any]] = []
+        for message in inp.messages:
+            translated = self.translate_cached(
+                translations, message, {}, lambda: self.translate_message(message)
+            )
+            if translated is None:
+                continue
+            previous = messages[-1] if messages else None
+            if previous is not None and self._can_merge(previous, translated):
+                self._merge(previous, translated)
+            else:
+                # Copied because _merge extends it in place and translations may be cached
+                messages.append(self._copy(translated))
+
+        body: dict[str, Any] = {
+            "model": spec.provider_model_id,
+            "messages": messages,
+            "max_tokens": resolve_max_tokens(inp, spec),
+        }
+        temperature = scale_temperature(inp.temperature, spec)
+        if temperature is not None:
+            body["temperature"] = temperature
+        if inp.tools:
+            body["tools"] = [
+                {
+                    "type": "function",
+                    "function": {
+                        "name": tool.name,
+                        "description": tool.description,
+                        "parameters": tool_json_schema(tool),
+                    },
+                }
+                for tool in inp.tools
+            ]
+        if inp.stream:
+            body["stream"] = True
+            body["stream_options"] = {"include_usage": True}
+
+        headers = {"Authorization": f"Bearer {api_key}"}
+        return PreparedRequest(path="/v1/chat/completions", headers=headers, json_body=body)
+
+    def translate_message(self, message: Message) -> dict[str, Any] | None:
+        """Translate a Message into a chat message, or None if it has no wire form."""
+        content = message.content
+        if isinstance(content, ThinkingContent):
+            # Chat Completions has no way to send prior reasoning back
+            return None
+        if isinstance(content, ToolCallContent):
+            return {
+                "role": "assistant",
+                "content": None,
+                "tool_calls": [
+                    {
+                        "id": content.tool_id,
+                        "type": "function",
+                        "function": {
+                            "name": content.tool_name,
+                            "arguments": json.dumps(content.input),
+                        },
+                    }
+                ],
+            }
+        if isinstance(content, ToolResultContent):
+            texts: list[str] = []
+            for result in content.results:
+                if not isinstance(result, TextContent):
+                    raise UnsupportedContentError("Chat Completions tool results must be text")
+                texts.append(result.text)
+            return {"role": "tool", "tool_call_id": content.tool_id, "content": "\n".join(texts)}
+
+        if message.role in (Role.ASSISTANT, Role.SYSTEM, Role.DEVELOPER):
+            if not isinstance(content, TextContent):
+                raise UnsupportedContentError(
+                    f"{type(content).__name__} is not supported in {message.role.value} messages"
+                )
+            role = "system" if message.role == Role.DEVELOPER else message.role.value
+            return {"role": role, "content": content.text}
+        return {"role": "user", "content": [self.translate_user_part(content)]}
+
+    def translate_user_part(self, content: Content) -> dict[str, Any]:
+        if isinstance(content, TextContent):
+            return {"type": "text", "text": content.text}
+        if isinstance(content, ImageContent):
+            media_type, data = image_media_type_and_data(content)
+            return {"type": "image_url", "image_url": {"url": f"data:{media_type};base64,{data}"}}
+        raise UnsupportedContentError(
+            f"{type(content).__name__} is not supported by the LiteLLM backend"
+        )
+
+    def _can_merge(self, previous: dict[str, Any], current: dict[str, Any]) -> bool:
+        if previous["role"] != current["role"]:
+            return False
+        if current["role"] == "user":
+            return True
+        # Assistant text and tool calls from the same turn belong in one message
+        return current["role"] == "assistant"
+
+    def _copy(self, message: dict[str, Any]) -> dict[str, Any]:
+        copied = dict(message)
+        for key in ("content", "tool_calls"):
+            if isinstance(copied.get(key), list):
+                copied[key] = list(copied[key])
+        return copied
+
+    def _merge(self, previous: dict[str, Any], current: dict[str, Any]) -> None:
+        if current["role"] == "user":
+            previous["content"].extend(current["content"])
+            return
+        if current.get("content"):
+            if previous.get("content"):
+                previous["content"] += "\n" + current["content"]
+            else:
+                previous["content"] = current["content"]
+        if current.get("tool_calls"):
+            previous.setdefault("tool_calls", []).extend(current["tool_calls"])
+
+    def parse_response(self, data: dict[str, Any]) -> ParsedReply:
+        messages: list[Message] = []
+        choices = data.get("choices") or []
+        if choices:
+            for content in self.parse_message(choices[0].get("message") or {}):
+                messages.append(Message(role=Role.ASSISTANT, content=content))
+        return ParsedReply(messages=messages, usage=self.parse_usage(data.get("usage") or {}))
+
+    def parse_message(self, message: dict[str, Any]) -> list[Content]:
+        contents: list[Content] = []
+        # Groq and Together return reasoning alongside the answer for thinking models
+        reasoning = message.get("reasoning") or message.get("reasoning_content")
+        if reasoning:
+            contents.append(ThinkingContent(thinking=reasoning))
+        if message.get("content"):
+            contents.append(TextContent(text=message["content"]))
+        for call in message.get("tool_calls") or []:
+            function = call["function"]
+            contents.append(
+                ToolCallContent(
+                    tool_id=call["id"],
+                    tool_name=function["name"],
+                    input=json.loads(function.get("arguments") or "{}"),
+                )
+            )
+        return contents
+
+    def parse_usage(self, usage: dict[str, Any]) -> LLMUsage:
+        prompt = usage.get("prompt_tokens") or 0
+        cached = (usage.get("prompt_tokens_details") or {}).get("cached_tokens") or 0
+        completion = usage.get("completion_tokens") or 0
+        reasoning = (usage.get("completion_tokens_details") or {}).get("reasoning_tokens") or 0
+        return LLMUsage(
+            input_uncached_tokens=prompt - cached,
+            input_cached_tokens=cached,
+            completion_tokens=completion - reasoning,
+            reasoning_tokens=reasoning,
+            provider_usage=usage,
+        )
+
+    def stream_accumulator(self) -> "LiteLLMStreamAccumulator":
+        return LiteLLMStreamAccumulator(self)
+
+
+class LiteLLMStreamAccumulator(StreamAccumulator):
+    """Joins Chat Completions deltas for the first choice, including tool call fragments."""
+
+    def __init__(self, backend: LiteLLMBackend):
+        self.backend = backend
+        self.content: list[str] = []
+        self.reasoning: list[str] = []
+        self.tool_call_ids: dict[int, str] = {}
+        self.tool_names: dict[int, str] = {}
+        # Tool call index -> argument fragments
+        self.tool_calls: dict[int, list[str]] = {}
+        self.usage: dict[str, Any] = {}
+
+    def add(self, event: dict[str, Any]) -> list[StreamDelta]:
+        deltas: list[StreamDelta] = []
+        self.usage = event.get("usage") or self.usage
+        for choice in event.get("choices") or []:
+            if choice.get("index", 0) != 0:
+                continue
+            delta = choice.get("delta") or {}
+            if delta.get("content"):
+                self.content.append(delta["content"])
+                deltas.append(
+                    StreamDelta(type=StreamDeltaType.TEXT, index=0, text=delta["content"])
+                )
+            reasoning = delta.get("reasoning") or delta.get("reasoning_content")
+            if reasoning:
+                self.reasoning.append(reasoning)
+                deltas.append(StreamDelta(type=StreamDeltaType.THINKING, index=0, text=reasoning))
+            for call_delta in delta.get("tool_calls") or []:
+                index = call_delta.get("index", len(self.tool_calls))
+                arguments = self.tool_calls.setdefault(index, [])
+                # Providers either send the id and name once or repeat them on every fragment
+                if call_delta.get("id"):
+                    self.tool_call_ids[index] = call_delta["id"]
+                function = call_delta.get("function") or {}
+                name = None
+                if function.get("name") and index not in self.tool_names:
+                    name = self.tool_names[index] = function["name"]
+                if function.get("arguments"):
+                    arguments.append(function["arguments"])
+                deltas.append(
+                    StreamDelta(
+                        type=StreamDeltaType.TOOL_CALL,
+                        index=index,
+                        text=function.get("arguments") or "",
+                        tool_id=call_delta.get("id"),
+                        tool_name=name,
+                    )
+                )
+        return deltas
+
+    def finish(self) -> ParsedReply:
+        message: dict[str, Any] = {
+            "content": "".join(self.content),
+            "reasoning": "".join(self.reasoning),
+            "tool_calls": [
+                {
+                    "id": self.tool_call_ids.get(index, ""),
+                    "function": {
+                        "name": self.tool_names.get(index, ""),
+                        "arguments": "".join(self.tool_calls[index]),
+                    },
+                }
+                for index in sorted(self.tool_calls)
+            ],
+        }
+        return self.backend.parse_response({"choices": [{"message": message}], "usage": self.usage})
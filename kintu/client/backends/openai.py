@@ -0,0 +1,474 @@
+import json
+import time
+from typing import Any
+
+import httpx
+
+from kintu.client.backends.base import (
+    FileRefs,
+    ParsedReply,
+    PreparedRequest,
+    SDKBackend,
+    StreamAccumulator,
+    api_error,
+    image_media_type_and_data,
+    resolve_max_tokens,
+    scale_temperature,
+    tool_json_schema,
+)
+from kintu.client.request_body import Base64Blob, BufferReader, StreamingJSONBody
+from kintu.client.translation_cache import MessageTranslationCache
+from kintu.types.batch import BatchJob, BatchStatus
+from kintu.types.complete import CompleteInput, LLMUsage, StreamDelta, StreamDeltaType
+from kintu.types.content import (
+    Content,
+    DocumentContent,
+    ImageContent,
+    OpenAIServerToolUse,
+    TextContent,
+    ThinkingContent,
+    ToolCallContent,
+    ToolResultContent,
+)
+from kintu.types.errors import (
+    BatchError,
+    ProviderAPIError,
+    ProviderConnectionError,
+    UnsupportedContentError,
+)
+from kintu.types.file_reference import FileReference
+from kintu.types.llmsdk import LLMSDK
+from kintu.types.message import Message
+from kintu.types.model_spec import ModelSpec
+from kintu.types.provider import Provider
+from kintu.types.provider_config import OpenAIConfig, OpenAIToolChoice
+from kintu.types.role import Role
+
+# Output item types that represent server-side tool calls
+SERVER_TOOL_ITEM_TYPES = {
+    "web_search_call": "web_search",
+    "code_interpreter_call": "code_interpreter",
+    "file_search_call": "file_search",
+    "image_generation_call": "image_generation",
+}
+
+BATCH_STATUSES = {
+    "validating": BatchStatus.IN_PROGRESS,
+    "in_progress": BatchStatus.IN_PROGRESS,
+    "finalizing": BatchStatus.IN_PROGRESS,
+    "cancelling": BatchStatus.IN_PROGRESS,
+    "completed": BatchStatus.COMPLETED,
+    "failed": BatchStatus.FAILED,
+    "expired": BatchStatus.EXPIRED,
+    "cancelled": BatchStatus.CANCELLED,
+}
+
+# HTTP status of each Responses API error code, for errors that arrive as a stream event
+STREAM_ERROR_STATUSES = {
+    "invalid_prompt": 400,
+    "rate_limit_exceeded": 429,
+    "insufficient_quota": 429,
+    "server_error": 500,
+}
+
+# Stream events carrying deltas of the output, by the kind of output they extend
+STREAM_DELTA_TYPES = {
+    "response.output_text.delta": StreamDeltaType.TEXT,
+    "response.reasoning_summary_text.delta": StreamDeltaType.THINKING,
+    "response.function_call_arguments.delta": StreamDeltaType.TOOL_CALL,
+}
+
+
+class OpenAIBackend(SDKBackend):
+    """OpenAI Responses API."""
+
+    llmsdk = LLMSDK.OPENAI
+    supports_files = True
+    supports_batches = True
+
+    def build_request(
+        self,
+        inp: CompleteInput,
+        spec: ModelSpec,
+        api_key: str,
+        file_refs: FileRefs | None = None,
+        translations: MessageTranslationCache | None = None,
+    ) -> PreparedRequest:
+        config = inp.provider_configs.openai if inp.provider_configs else None
+        file_refs = file_refs or {}
+
+        items: list[dict[str, Any]] = []
+        for message in inp.messages:
+            items.extend(
+                self.translate_cached(
+                    translations,
+                    message,
+                    file_refs,
+                    lambda: self.translate_message(message, file_refs),
+                )
+            )
+
+        body: dict[str, Any] = {
+            "model": spec.provider_model_id,
+            "input": items,
+            "max_output_tokens": resolve_max_tokens(inp, spec),
+        }
+        temperature = scale_temperature(inp.temperature, spec)
+        if temperature is not None:
+            body["temperature"] = temperature
+        if inp.tools:
+            body["tools"] = [
+                {
+                    "type": "function",
+                    "name": tool.name,
+                    "description": tool.description,
+                    "parameters": tool_json_schema(tool),
+                }
+                for tool in inp.tools
+            ]
+        if inp.stream:
+            body["stream"] = True
+        if config is not None:
+            self._apply_config(body, config)
+
+        headers = {"Authorization": f"Bearer {api_key}"}
+        return PreparedRequest(path="/v1/responses", headers=headers, json_body=body)
+
+    def _apply_config(self, body: dict[str, Any], config: OpenAIConfig) -> None:
+        if config.max_completion_tokens is not None:
+            body["max_output_tokens"] = config.max_completion_tokens
+        if config.store is not None:
+            body["store"] = config.store
+            if not config.store:
+                # Without server-side storage, reasoning must round-trip in encrypted form
+                body["include"] = ["reasoning.encrypted_content"]
+        if config.metadata is not None:
+            body["metadata"] = config.metadata
+        if config.prompt_cache_key is not None:
+            body["prompt_cache_key"] = config.prompt_cache_key
+        if config.parallel_tool_calls is not None:
+            body["parallel_tool_calls"] = config.parallel_tool_calls
+        if config.top_p is not None:
+            body["top_p"] = config.top_p
+        if config.tool_choice is not None:
+            if config.tool_choice == OpenAIToolChoice.SPECIFIC:
+                body["tool_choice"] = {"type": "function", "name": config.tool_choice_specific_name}
+            else:
+                body["tool_choice"] = config.tool_choice.value
+        if config.reasoning_effort is not None:
+            body["reasoning"] = {"effort": config.reasoning_effort.value}
+
+    def translate_message(self, message: Message, file_refs: FileRefs) -> list[dict[str, Any]]:
+        """Translate a Message into Responses API input items."""
+        content = message.content
+        if isinstance(content, ThinkingContent):
+            item: dict[str, Any] = {
+                "type": "reasoning",
+                "summary": [{"type": "summary_text", "text": content.thinking}]
+                if content.thinking
+                else [],
+            }
+            if content.reasoning_id is not None:
+                item["id"] = content.reasoning_id
+            if content.encrypted_data is not None:
+                item["encrypted_content"] = content.encrypted_data
+            return [item]
+        if isinstance(content, ToolCallContent):
+            item = {
+                "type": "function_call",
+                "call_id": content.tool_id,
+                "name": content.tool_name,
+                "arguments": json.dumps(content.input),
+            }
+            if content.openai_id is not None:
+                item["id"] = content.openai_id
+            return [item]
+        if isinstance(content, ToolResultContent):
+            return [
+                {
+                    "type": "function_call_output",
+                    "call_id": content.tool_id,
+                    "output": self._tool_output(content),
+                }
+            ]
+        if isinstance(content, OpenAIServerToolUse):
+            # Server tool calls are stored by OpenAI and referenced by id
+            return [{"type": "item_reference", "id": content.tool_id}]
+
+        if message.role == Role.ASSISTANT:
+            if not isinstance(content, TextContent):
+                raise UnsupportedContentError(
+                    f"{type(content).__name__} is not supported in OpenAI assistant messages"
+                )
+            part: dict[str, Any] = {"type": "output_text", "text": content.text}
+        else:
+            part = self.translate_input_part(content, file_refs)
+        role = message.role.value if message.role != Role.TOOL else Role.USER.value
+        return [{"type": "message", "role": role, "content": [part]}]
+
+    def translate_input_part(self, content: Content, file_refs: FileRefs) -> dict[str, Any]:
+        file_ref = file_refs.get(id(content))
+        if file_ref is not None:
+            part_type = "input_image" if isinstance(content, ImageContent) else "input_file"
+            return {"type": part_type, "file_id": file_ref.file_id}
+        if isinstance(content, TextContent):
+            return {"type": "input_text", "text": content.text}
+        if isinstance(content, ImageContent):
+            media_type, data = image_media_type_and_data(content)
+            return {"type": "input_image", "image_url": f"data:{media_type};base64,{data}"}
+        if isinstance(content, DocumentContent):
+            return {
+                "type": "input_file",
+                "filename": content._openai_filename or "document.pdf",
+                "file_data": Base64Blob(content.document, prefix="data:application/pdf;base64,"),
+            }
+        raise UnsupportedContentError(
+            f"{type(content).__name__} is not supported by the OpenAI backend"
+        )
+
+    def _tool_output(self, content: ToolResultContent) -> str:
+        texts: list[str] = []
+        for result in content.results:
+            if not isinstance(result, TextContent):
+                raise UnsupportedContentError("OpenAI function call outputs must be TextContent")
+            texts.append(result.text)
+        return "\n".join(texts)
+
+    async def upload_file(
+        self,
+        http: httpx.AsyncClient,
+        api_key: str,
+        data: bytes | memoryview,
+        mime_type: str,
+        filename: str,
+    ) -> FileReference:
+        response = await http.post(
+            "/v1/files",
+            headers={"Authorization": f"Bearer {api_key}"},
+            data={"purpose": "user_data"},
+            files={"file": (filename, BufferReader(data), mime_type)},
+        )
+        if response.status_code >= 400:
+            raise api_error(response, response.text)
+        uploaded = response.json()
+        return FileReference(
+            provider=Provider.OPENAI,
+            file_id=uploaded["id"],
+            mime_type=mime_type,
+            expires_at=uploaded.get("expires_at"),
+        )
+
+    async def submit_batch(
+        self,
+        http: httpx.AsyncClient,
+        api_key: str,
+        spec: ModelSpec,
+        requests: list[PreparedRequest],
+    ) -> BatchJob:
+        # The requests go up as a JSONL file, which the batch then references
+        lines = b"".join(
+            StreamingJSONBody(
+                {
+                    "custom_id": str(index),
+                    "method": request.method,
+                    "url": request.path,
+                    "body": request.json_body,
+                }
+            ).read()
+            + b"\n"
+            for index, request in enumerate(requests)
+        )
+        headers = {"Authorization": f"Bearer {api_key}"}
+        upload = await http.post(
+            "/v1/files",
+            headers=headers,
+            data={"purpose": "batch"},
+            files={"file": ("batch.jsonl", lines, "application/jsonl")},
+        )
+        if upload.status_code >= 400:
+            raise api_error(upload, upload.text)
+        response = await http.post(
+            "/v1/batches",
+            headers=headers,
+            json={
+                "input_file_id": upload.json()["id"],
+                "endpoint": "/v1/responses",
+                "completion_window": "24h",
+            },
+        )
+        if response.status_code >= 400:
+            raise api_error(response, response.text)
+        data = response.json()
+        return BatchJob(
+            id=data["id"],
+            provider=Provider.OPENAI,
+            model=spec.model_id,
+            status=BATCH_STATUSES[data["status"]],
+            request_count=len(requests),
+            submitted_at=time.time(),
+            provider_data=data,
+        )
+
+    async def poll_batch(self, http: httpx.AsyncClient, api_key: str, job: BatchJob) -> BatchJob:
+        response = await http.get(
+            f"/v1/batches/{job.id}", headers={"Authorization": f"Bearer {api_key}"}
+        )
+        if response.status_code >= 400:
+            raise api_error(response, response.text)
+        data = response.json()
+        return job.model_copy(
+            update={"status": BATCH_STATUSES[data["status"]], "provider_data": data}
+        )
+
+    async def cancel_batch(self, http: httpx.AsyncClient, api_key: str, job: BatchJob) -> BatchJob:
+        response = await http.post(
+            f"/v1/batches/{job.id}/cancel", headers={"Authorization": f"Bearer {api_key}"}
+        )
+        if response.status_code >= 400:
+            raise api_error(response, response.text)
+        data = response.json()
+        return job.model_copy(
+            update={"status": BATCH_STATUSES[data["status"]], "provider_data": data}
+        )
+
+    async def batch_results(
+        self, http: httpx.AsyncClient, api_key: str, job: BatchJob
+    ) -> dict[int, dict[str, Any] | BatchError]:
+        results: dict[int, dict[str, Any] | BatchError] = {}
+        # Successes and failures come back in separate files
+        for field in ("output_file_id", "error_file_id"):
+            file_id = job.provider_data.get(field)
+            if not file_id:
+                continue
+            response = await http.get(
+                f"/v1/files/{file_id}/content", headers={"Authorization": f"Bearer {api_key}"}
+            )
+            if response.status_code >= 400:
+                raise api_error(response, response.text)
+            for line in response.text.splitlines():
+                if not line.strip():
+                    continue
+                record = json.loads(line)
+                index = int(record["custom_id"])
+                reply = record.get("response") or {}
+                if record.get("error") or reply.get("status_code", 200) >= 400:
+                    error = record.get("error") or reply.get("body")
+                    results[index] = BatchError(f"Batch request {index} failed: {error}", error)
+                else:
+                    results[index] = reply["body"]
+        return results
+
+    def parse_response(self, data: dict[str, Any]) -> ParsedReply:
+        messages: list[Message] = []
+        for item in data.get("output", []):
+            for content in self.parse_item(item):
+                messages.append(Message(role=Role.ASSISTANT, content=content))
+        return ParsedReply(messages=messages, usage=self.parse_usage(data.get("usage") or {}))
+
+    def parse_item(self, item: dict[str, Any]) -> list[Content]:
+        item_type = item["type"]
+        if item_type == "message":
+            return [
+                TextContent(text=part["text"])
+                for part in item.get("content", [])
+                if part["type"] == "output_text"
+            ]
+        if item_type == "reasoning":
+            summary = "\n".join(part["text"] for part in item.get("summary") or [])
+            return [
+                ThinkingContent(
+                    thinking=summary,
+                    reasoning_id=item.get("id"),
+                    encrypted_data=item.get("encrypted_content"),
+                )
+            ]
+        if item_type == "function_call":
+            arguments = item.get("arguments") or "{}"
+            return [
+                ToolCallContent(
+                    tool_id=item["call_id"],
+                    tool_name=item["name"],
+                    input=json.loads(arguments),
+                    openai_id=item.get("id"),
+                )
+            ]
+        if item_type in SERVER_TOOL_ITEM_TYPES:
+            tool_input = {
+                key: value for key, value in item.items() if key not in ("id", "type", "status")
+            }
+            return [
+                OpenAIServerToolUse(
+                    tool_id=item["id"],
+                    tool_name=SERVER_TOOL_ITEM_TYPES[item_type],
+                    tool_type=item_type,
+                    input=tool_input,
+                )
+            ]
+        raise UnsupportedContentError(f"Unknown OpenAI output item type: {item_type}")
+
+    def parse_usage(self, usage: dict[str, Any]) -> LLMUsage:
+        input_tokens = usage.get("input_tokens") or 0
+        cached = (usage.get("input_tokens_details") or {}).get("cached_tokens") or 0
+        output_tokens = usage.get("output_tokens") or 0
+        reasoning = (usage.get("output_tokens_details") or {}).get("reasoning_tokens") or 0
+        return LLMUsage(
+            input_uncached_tokens=input_tokens - cached,
+            input_cached_tokens=cached,
+            completion_tokens=output_tokens - reasoning,
+            reasoning_tokens=reasoning,
+            provider_usage=usage,
+        )
+
+    def stream_accumulator(self) -> "OpenAIStreamAccumulator":
+        return OpenAIStreamAccumulator(self)
+
+
+class OpenAIStreamAccumulator(StreamAccumulator):
+    """
+    Keeps only the terminal Responses API event, which carries the full response object.
+
+    The output deltas before it are redundant with that object, so they are dropped.
+    """
+
+    def __init__(self, backend: OpenAIBackend):
+        self.backend = backend
+        self.response: dict[str, Any] | None = None
+
+    def add(self, event: dict[str, Any]) -> list[StreamDelta]:
+        event_type = event.get("type")
+        if event_type in ("response.completed", "response.incomplete"):
+            self.response = event["response"]
+        elif event_type in ("response.failed", "error"):
+            error = event if event_type == "error" else event["response"].get("error") or {}
+            code = error.get("code") or "server_error"
+            raise ProviderAPIError(
+                f"OpenAI stream failed with {code}: {error.get('message', '')}",
+                status_code=STREAM_ERROR_STATUSES.get(code, 500),
+                body=json.dumps(event),
+            )
+        elif event_type in STREAM_DELTA_TYPES:
+            return [
+                StreamDelta(
+                    type=STREAM_DELTA_TYPES[event_type],
+                    index=event.get("output_index", 0),
+                    text=event.get("delta") or "",
+                )
+            ]
+        elif event_type == "response.output_item.added":
+            item = event.get("item") or {}
+            if item.get("type") == "function_call":
+                return [
+                    StreamDelta(
+                        type=StreamDeltaType.TOOL_CALL,
+                        index=event.get("output_index", 0),
+                        tool_id=item.get("call_id"),
+                        tool_name=item.get("name"),
+                    )
+                ]
+        return []
+
+    def finish(self) -> ParsedReply:
+        if self.response is None:
+            # Cut off before the terminal event, like a dropped connection
+            raise ProviderConnectionError("OpenAI stream ended without a completed response")
+        return self.backend.parse_response(self.response)
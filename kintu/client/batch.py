@@ -0,0 +1,183 @@
+import asyncio
+import time
+from collections.abc import Awaitable, Callable, Sequence
+from typing import TypeVar
+
+from kintu.client.kintu_client import KintuClient
+from kintu.credential_manager import ApiKey
+from kintu.model_library.model_library import get_spec
+from kintu.types.batch import BatchJob, BatchStatus
+from kintu.types.complete import CompleteInput, CompleteReply, RequestTiming
+from kintu.types.errors import BatchError
+from kintu.types.model import Model
+from kintu.types.provider import Provider
+
+T = TypeVar("T")
+
+DEFAULT_MAX_BATCH_SIZE = 10_000
+
+
+class BatchRunner:
+    """
+    Runs completions through the provider batch APIs of OpenAI, Anthropic and Gemini.
+
+    Batches cost half the regular price (see ModelPricing.batch_discount) and have their
+    own rate limits, but may take up to a day. Inputs are grouped by model, submitted in
+    batches of at most `max_batch_size`, and polled every `poll_interval` seconds until
+    the provider is done. Results are parsed like regular replies, so their LLMUsage is
+    normalized the same way; the batch's cost at batch prices is recorded in
+    `BatchJob.cost`. A reply's timing is the time from submission to results.
+
+    Requests use the client's pools, credentials, image preprocessing and translations,
+    but bypass its caches, rate limiter and retries. Streaming is not available. A batch
+    is only visible to the key that submitted it (keys may belong to different
+    organizations), so polls, results and cancels use that key (`BatchJob.api_key_id`).
+    """
+
+    def __init__(
+        self,
+        client: KintuClient,
+        poll_interval: float = 60.0,
+        max_batch_size: int = DEFAULT_MAX_BATCH_SIZE,
+    ):
+        self.client = client
+        self.poll_interval = poll_interval
+        self.max_batch_size = max_batch_size
+
+    async def submit(self, inputs: Sequence[CompleteInput]) -> BatchJob:
+        """Submit inputs, which must all be for one model, as one batch."""
+        models = {inp.model for inp in inputs}
+        if len(models) != 1:
+            raise BatchError(f"A batch is for one model, got {len(models)}")
+        spec = get_spec(models.pop())
+        backend = self.client.backends[spec.llmsdk]
+        if not backend.supports_batches:
+            raise BatchError(f"{spec.provider.value} has no batch API")
+        requests = []
+        for inp in inputs:
+            inp = inp.model_copy(update={"stream": False})
+            if self.client.image_preprocessor is not None:
+                inp = await self.client.image_preprocessor.preprocess(inp, spec)
+            requests.append(
+                backend.build_request(inp, spec, "", translations=self.client.translations)
+            )
+
+        async def submit(key: ApiKey) -> BatchJob:
+            http = self.client.pool.client(spec.provider)
+            job = await backend.submit_batch(http, key.secret, spec, requests)
+            return job.model_copy(update={"api_key_id": key.id})
+
+        return await self._with_key(spec.provider, None, submit)
+
+    async def poll(self, job: BatchJob) -> BatchJob:
+        """The job with its current status."""
+        backend = self.client.backends[get_spec(job.model).llmsdk]
+        http = self.client.pool.client(job.provider)
+        return await self._with_key(
+            job.provider, job.api_key_id, lambda key: backend.poll_batch(http, key.secret, job)
+        )
+
+    async def cancel(self, job: BatchJob) -> BatchJob:
+        """Ask the provider to stop the job. Requests it already finished keep results."""
+        backend = self.client.backends[get_spec(job.model).llmsdk]
+        http = self.client.pool.client(job.provider)
+        return await self._with_key(
+            job.provider, job.api_key_id, lambda key: backend.cancel_batch(http, key.secret, job)
+        )
+
+    async def wait(self, job: BatchJob) -> BatchJob:
+        """Poll the job until the provider is done with it."""
+        while job.status == BatchStatus.IN_PROGRESS:
+            await asyncio.sleep(self.poll_interval)
+            job = await self.poll(job)
+        return job
+
+    async def results(self, job: BatchJob) -> list[CompleteReply | BatchError]:
+        """
+        The reply or error of each request of a finished job, in submission order. Expired
+        and cancelled batches may still have results for the requests that finished.
+        """
+        if job.status == BatchStatus.IN_PROGRESS:
+            raise BatchError(f"Batch {job.id} is still in progress; wait for it first")
+        if job.status == BatchStatus.FAILED:
+            error = BatchError(f"Batch {job.id} failed", job.provider_data)
+            return [error] * job.request_count
+        spec = get_spec(job.model)
+        backend = self.client.backends[spec.llmsdk]
+        http = self.client.pool.client(job.provider)
+        bodies = await self._with_key(
+            job.provider, job.api_key_id, lambda key: backend.batch_results(http, key.secret, job)
+        )
+        elapsed = time.time() - job.submitted_at
+        results: list[CompleteReply | BatchError] = []
+        cost = 0.0
+        for index in range(job.request_count):
+            body = bodies.get(index)
+            if body is None:
+                results.append(BatchError(f"Batch {job.id} has no result for request {index}"))
+                continue
+            if isinstance(body, BatchError):
+                results.append(body)
+                continue
+            parsed = backend.parse_response(body)
+            cost += spec.pricing.cost(parsed.usage, batch=True)
+            results.append(
+                CompleteReply(
+                    messages=parsed.messages,
+                    model=spec.model_id,
+                    provider=spec.provider,
+                    usage=parsed.usage,
+                    timing=RequestTiming(ttft=elapsed, duration=elapsed),
+                    provider_response=body,
+                )
+            )
+        job.cost = cost
+        return results
+
+    async def run(
+        self, inputs: Sequence[CompleteInput], return_exceptions: bool = False
+    ) -> list[CompleteReply | BatchError]:
+        """
+        Submit inputs in batches, wait for all of them and return the replies in input
+        order. A failed request raises its BatchError, unless `return_exceptions` is set.
+        If a batch cannot be submitted, the batches already accepted are cancelled before
+        its error is raised, so none run on unattended.
+        """
+        groups: dict[Model, list[int]] = {}
+        for index, inp in enumerate(inputs):
+            groups.setdefault(inp.model, []).append(index)
+        chunks = [
+            indices[start : start + self.max_batch_size]
+            for indices in groups.values()
+            for start in range(0, len(indices), self.max_batch_size)
+        ]
+        submitted = await asyncio.gather(
+            *(self.submit([inputs[i] for i in chunk]) for chunk in chunks), return_exceptions=True
+        )
+        jobs = [job for job in submitted if isinstance(job, BatchJob)]
+        for error in submitted:
+            if isinstance(error, BaseException):
+                await asyncio.gather(*(self.cancel(job) for job in jobs), return_exceptions=True)
+                raise error
+        jobs = await asyncio.gather(*(self.wait(job) for job in jobs))
+        batches = await asyncio.gather(*(self.results(job) for job in jobs))
+
+        results: list[CompleteReply | BatchError | None] = [None] * len(inputs)
+        for chunk, batch in zip(chunks, batches):
+            for index, result in zip(chunk, batch):
+                if isinstance(result, BatchError) and not return_exceptions:
+                    raise result
+                results[index] = result
+        return [result for result in results if result is not None]
+
+    async def _with_key(
+        self, provider: Provider, key_id: str | None, call: Callable[[ApiKey], Awaitable[T]]
+    ) -> T:
+        key = self.client.credentials.acquire_key(provider, key_id)
+        try:
+            result = await call(key)
+        except BaseException as e:
+            self.client.credentials.release_key(key, error=e)
+            raise
+        self.client.credentials.release_key(key)
+        return result
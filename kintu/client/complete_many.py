@@ -0,0 +1,125 @@
+import asyncio
+import time
+from collections.abc import (
+    AsyncGenerator,
+    AsyncIterable,
+    AsyncIterator,
+    Awaitable,
+    Callable,
+    Iterable,
+)
+
+from pydantic import BaseModel
+
+from kintu.types.complete import CompleteInput, CompleteReply
+
+DEFAULT_MAX_CONCURRENCY = 16
+
+
+class CompleteManyProgress(BaseModel):
+    """Counts reported by complete_many after every completed input."""
+
+    submitted: int = 0
+    completed: int = 0
+    failed: int = 0
+    in_flight: int = 0
+    elapsed: float = 0.0  # Seconds since the first input was pulled
+
+
+async def _pull(
+    inputs: Iterable[CompleteInput] | AsyncIterable[CompleteInput],
+) -> AsyncGenerator[CompleteInput, None]:
+    if isinstance(inputs, AsyncIterable):
+        async for inp in inputs:
+            yield inp
+    else:
+        for inp in inputs:
+            yield inp
+
+
+async def complete_many(
+    complete: Callable[[CompleteInput], Awaitable[CompleteReply]],
+    inputs: Iterable[CompleteInput] | AsyncIterable[CompleteInput],
+    max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+    return_exceptions: bool = False,
+    ordered: bool = True,
+    max_buffered: int | None = None,
+    on_progress: Callable[[CompleteManyProgress], None] | None = None,
+) -> AsyncIterator[tuple[int, CompleteReply | BaseException]]:
+    """
+    Complete every input with at most `max_concurrency` requests in flight, yielding
+    `(index, reply)` pairs like enumerate: in input order, or with ordered=False as
+    soon as each reply arrives.
+
+    Inputs are pulled one at a time, only when a request slot is free, so a generator of
+    any length is never materialized. Nothing new is pulled while the caller is not
+    consuming: requests in flight finish, and then wait to be yielded. In input order, a
+    slow request holds later replies back; at most `max_buffered` (by default
+    `max_concurrency`) of them are kept before pulling stops until it arrives.
+
+    A failed input raises its error, cancelling the requests in flight, unless
+    `return_exceptions` is set, in which case the error is yielded in place of its reply.
+    Replies that arrived together with the error are yielded before it is raised (in
+    input order, those before the failed input). A request cancelled from within
+    fails with CancelledError.
+    `on_progress` is called with the counts after each input completes.
+    """
+    if max_buffered is None:
+        max_buffered = max_concurrency
+    source = _pull(inputs)
+    running: dict[asyncio.Task[CompleteReply], int] = {}
+    finished: dict[int, CompleteReply | BaseException] = {}  # Held back for input order
+    progress = CompleteManyProgress()
+    start = time.perf_counter()
+    pulled = 0
+    next_yield = 0
+    exhausted = False
+    try:
+        while True:
+            while not exhausted and len(running) < max_concurrency and len(finished) < max_buffered:
+                try:
+                    inp = await anext(source)
+                except StopAsyncIteration:
+                    exhausted = True
+                    break
+                running[asyncio.create_task(complete(inp))] = pulled
+                pulled += 1
+                progress.submitted += 1
+            if not running:
+                break
+            done, _ = await asyncio.wait(running, return_when=asyncio.FIRST_COMPLETED)
+            results: list[tuple[int, CompleteReply | BaseException]] = []
+            failure: tuple[int, BaseException] | None = None
+            for task in done:
+                index = running.pop(task)
+                # exception() raises for a cancelled task rather than returning its error
+                error = asyncio.CancelledError() if task.cancelled() else task.exception()
+                if error is None:
+                    progress.completed += 1
+                    results.append((index, task.result()))
+                    continue
+                progress.failed += 1
+                if return_exceptions:
+                    results.append((index, error))
+                elif failure is None or index < failure[0]:
+                    failure = (index, error)
+            if on_progress is not None:
+                progress.in_flight = len(running)
+                progress.elapsed = time.perf_counter() - start
+                on_progress(progress.model_copy())
+            if not ordered:
+                for result in sorted(results, key=lambda result: result[0]):
+                    yield result
+            else:
+                finished.update(results)
+                # Up to the failed input, as the ones after it come after its error
+                while next_yield in finished and (failure is None or next_yield < failure[0]):
+                    yield next_yield, finished.pop(next_yield)
+                    next_yield += 1
+            if failure is not None:
+                raise failure[1]
+    finally:
+        for task in running:
+            task.cancel()
+        await asyncio.gather(*running, return_exceptions=True)
+        await source.aclose()
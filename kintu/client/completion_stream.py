@@ -0,0 +1,122 @@
+import asyncio
+import warnings
+from collections.abc import Awaitable, Callable
+
+from kintu.types.complete import CompleteReply, StreamChunk
+
+OnChunk = Callable[[StreamChunk], Awaitable[None]]
+
+DEFAULT_BUFFER_SIZE = 64
+
+# The event loop only holds weak references to tasks. A stream dropped mid-read cancels
+# its task, which must then stay alive long enough to close the connection.
+_READ_TASKS: set[asyncio.Task[None]] = set()
+
+
+class _Done:
+    pass
+
+
+class _Failed:
+    def __init__(self, error: BaseException):
+        self.error = error
+
+
+class _Result:
+    reply: CompleteReply | None = None
+
+
+class CompletionStream:
+    """
+    Async iterator over the StreamChunks of a streaming completion (see KintuClient.stream).
+
+    A background task reads chunks off the connection into a buffer of at most
+    `buffer_size` chunks. When the buffer is full the task stops reading, so a slow
+    consumer pushes back on the socket rather than piling chunks up in memory. Once
+    iteration ends, `reply` holds the CompleteReply.
+
+    Use it with `async with` (or call `aclose()` in a `finally`): leaving the block
+    cancels the read and closes the connection, however the loop ended. A `break` out of
+    a bare `async for` cannot be seen by the stream, so the read and its connection stay
+    open for as long as the stream is referenced, e.g. by a variable; a stream collected
+    unclosed is cancelled with a ResourceWarning, and KintuClient.aclose closes any
+    stream still open.
+    """
+
+    def __init__(
+        self,
+        run: Callable[[OnChunk], Awaitable[CompleteReply]],
+        buffer_size: int = DEFAULT_BUFFER_SIZE,
+    ):
+        self._run = run
+        self._result = _Result()
+        self._buffer: asyncio.Queue[StreamChunk | _Done | _Failed] = asyncio.Queue(
+            maxsize=buffer_size
+        )
+        self._task: asyncio.Task[None] | None = None
+        self._finished = False
+
+    @property
+    def reply(self) -> CompleteReply | None:
+        return self._result.reply
+
+    def __aiter__(self) -> "CompletionStream":
+        return self
+
+    async def __anext__(self) -> StreamChunk:
+        if self._finished:
+            raise StopAsyncIteration
+        if self._task is None:
+            self._task = asyncio.create_task(_read(self._run, self._buffer, self._result))
+            _READ_TASKS.add(self._task)
+            self._task.add_done_callback(_READ_TASKS.discard)
+        item = await self._buffer.get()
+        if isinstance(item, _Done):
+            self._finished = True
+            raise StopAsyncIteration
+        if isinstance(item, _Failed):
+            self._finished = True
+            raise item.error
+        return item
+
+    async def __aenter__(self) -> "CompletionStream":
+        return self
+
+    async def __aexit__(self, *exc_info: object) -> None:
+        await self.aclose()
+
+    async def aclose(self) -> None:
+        """Stop reading and release the connection."""
+        self._finished = True
+        if self._task is not None and not self._task.done():
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+
+    def __del__(self) -> None:
+        if self._task is not None and not self._task.done():
+            warnings.warn(
+                "CompletionStream was not closed; use it with `async with` or call aclose()",
+                ResourceWarning,
+                stacklevel=1,
+            )
+            self._task.cancel()
+
+
+async def _read(
+    run: Callable[[OnChunk], Awaitable[CompleteReply]],
+    buffer: "asyncio.Queue[StreamChunk | _Done | _Failed]",
+    result: _Result,
+) -> None:
+    # Deliberately not a method: the task must not keep its CompletionStream alive, or a
+    # stream abandoned with `break` would never be collected and cancelled
+    try:
+        result.reply = await run(buffer.put)
+    except asyncio.CancelledError:
+        raise
+    except Exception as e:
+        await buffer.put(_Failed(e))
+        return
+    await buffer.put(_Done())
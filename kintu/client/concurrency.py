@@ -0,0 +1,184 @@
+import asyncio
+import enum
+import time
+from collections import deque
+
+from pydantic import BaseModel
+
+from kintu.types.errors import ProviderAPIError, ProviderConnectionError
+from kintu.types.model import Model
+from kintu.types.model_spec import ModelSpec
+from kintu.types.provider import Provider
+
+
+class CongestionReason(str, enum.Enum):
+    RATE_LIMITED = "rate_limited"  # HTTP 429
+    SERVER_ERROR = "server_error"  # HTTP 5xx
+    CONNECTION_ERROR = "connection_error"
+    LATENCY = "latency"  # TTFT spiked above the model's usual
+
+
+class CongestionEvent(BaseModel):
+    """A multiplicative decrease of a concurrency limit."""
+
+    provider: Provider
+    model: Model
+    reason: CongestionReason
+    timestamp: float
+    limit_before: float
+    limit_after: float
+
+
+class _Window:
+    def __init__(self, limit: float):
+        self.limit = limit
+        self.in_flight = 0
+        self.waiters: deque[asyncio.Future[None]] = deque()
+        # Bumped by every decrease. Requests sent before the last decrease already saw
+        # the congestion it reacted to, so they do not cut the limit again.
+        self.generation = 0
+        self.baseline_ttft: float | None = None
+        self.samples = 0
+
+
+class Permit:
+    """One in-flight request's slot, handed back with AdaptiveConcurrency.release."""
+
+    def __init__(self, spec: ModelSpec, window: _Window):
+        self.spec = spec
+        self.window = window
+        self.generation = window.generation
+
+
+class AdaptiveConcurrency:
+    """
+    AIMD limit on in-flight requests per Provider and Model.
+
+    Every healthy reply raises the limit by `increase / limit`, so the limit grows by
+    about `increase` per limit's worth of replies. A 429, a 5xx, a connection error, or a
+    TTFT above `latency_tolerance` times the model's usual TTFT multiplies the limit by
+    `decrease`. The usual TTFT is a moving average over all replies, spikes included, so
+    it follows a lasting change in the model's latency instead of flagging it forever.
+    Only streamed replies count towards it: without streaming, TTFT is the whole request
+    and mostly measures the output length.
+    Only one decrease is taken per round of requests: replies to requests sent before
+    the last decrease are not counted as new congestion.
+
+    The current limits are in `limits()`, and the latest decreases in `events`.
+    """
+
+    def __init__(
+        self,
+        initial_limit: float = 8,
+        min_limit: float = 1,
+        max_limit: float = 256,
+        increase: float = 1.0,
+        decrease: float = 0.5,
+        latency_tolerance: float = 2.0,
+        latency_samples: int = 20,
+        max_events: int = 1000,
+    ):
+        self.initial_limit = initial_limit
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.increase = increase
+        self.decrease = decrease
+        self.latency_tolerance = latency_tolerance
+        # Replies seen before TTFT spikes count, so the baseline has settled
+        self.latency_samples = latency_samples
+        self.events: deque[CongestionEvent] = deque(maxlen=max_events)
+        self._windows: dict[tuple[Provider, Model], _Window] = {}
+
+    def limits(self) -> dict[tuple[Provider, Model], float]:
+        return {key: window.limit for key, window in self._windows.items()}
+
+    def in_flight(self) -> dict[tuple[Provider, Model], int]:
+        return {key: window.in_flight for key, window in self._windows.items()}
+
+    async def acquire(self, spec: ModelSpec) -> Permit:
+        """Wait for a slot, first come first served."""
+        window = self._window(spec)
+        if window.waiters or window.in_flight >= int(window.limit):
+            waiter = asyncio.get_running_loop().create_future()
+            window.waiters.append(waiter)
+            try:
+                await waiter
+            except asyncio.CancelledError:
+                if waiter.done() and not waiter.cancelled():
+                    # Granted a slot just as the wait was cancelled: pass it on
+                    window.in_flight -= 1
+                    self._wake(window)
+                else:
+                    window.waiters.remove(waiter)
+                raise
+        else:
+            window.in_flight += 1
+        return Permit(spec, window)
+
+    def release(self, permit: Permit, ttft: float | None, error: BaseException | None) -> None:
+        """Hand a slot back, with the reply's TTFT or the error the request failed with."""
+        window = permit.window
+        window.in_flight -= 1
+        reason = _congestion_reason(error) if error is not None else None
+        if reason is None and ttft is not None:
+            reason = self._observe_ttft(window, ttft)
+        if reason is not None:
+            if permit.generation == window.generation:
+                self._decrease(permit.spec, window, reason)
+        elif error is None:
+            window.limit = min(self.max_limit, window.limit + self.increase / window.limit)
+        self._wake(window)
+
+    def _window(self, spec: ModelSpec) -> _Window:
+        key = (spec.provider, spec.model_id)
+        window = self._windows.get(key)
+        if window is None:
+            window = self._windows[key] = _Window(self.initial_limit)
+        return window
+
+    def _observe_ttft(self, window: _Window, ttft: float) -> CongestionReason | None:
+        baseline = window.baseline_ttft
+        window.samples += 1
+        if baseline is None:
+            window.baseline_ttft = ttft
+            return None
+        spike = window.samples > self.latency_samples and ttft > baseline * self.latency_tolerance
+        # Every reply moves the baseline, so a lasting shift in TTFT becomes the new normal
+        # within a few dozen replies; a spike counts only up to the tolerance, so one
+        # outlier cannot lift the baseline far
+        sample = min(ttft, baseline * self.latency_tolerance)
+        window.baseline_ttft = baseline + 0.1 * (sample - baseline)
+        return CongestionReason.LATENCY if spike else None
+
+    def _decrease(self, spec: ModelSpec, window: _Window, reason: CongestionReason) -> None:
+        before = window.limit
+        window.limit = max(self.min_limit, window.limit * self.decrease)
+        window.generation += 1
+        self.events.append(
+            CongestionEvent(
+                provider=spec.provider,
+                model=spec.model_id,
+                reason=reason,
+                timestamp=time.time(),
+                limit_before=before,
+                limit_after=window.limit,
+            )
+        )
+
+    def _wake(self, window: _Window) -> None:
+        while window.waiters and window.in_flight < int(window.limit):
+            waiter = window.waiters.popleft()
+            if not waiter.done():
+                window.in_flight += 1
+                waiter.set_result(None)
+
+
+def _congestion_reason(error: BaseException) -> CongestionReason | None:
+    if isinstance(error, ProviderAPIError):
+        if error.status_code == 429:
+            return CongestionReason.RATE_LIMITED
+        if error.status_code >= 500:
+            return CongestionReason.SERVER_ERROR
+    if isinstance(error, ProviderConnectionError):
+        return CongestionReason.CONNECTION_ERROR
+    return None
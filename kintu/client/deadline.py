@@ -0,0 +1,44 @@
+import asyncio
+import time
+from collections.abc import Awaitable
+from typing import TypeVar
+
+from kintu.types.errors import DeadlineExceededError
+
+T = TypeVar("T")
+
+
+def time_left(deadline: float | None) -> float | None:
+    """Seconds until a time.time() deadline, or None without a deadline."""
+    return None if deadline is None else deadline - time.time()
+
+
+def has_time(deadline: float | None, needed: float = 0.0) -> bool:
+    """Whether `needed` more seconds of work can finish before the deadline."""
+    left = time_left(deadline)
+    return left is None or left > needed
+
+
+async def within(deadline: float | None, work: Awaitable[T]) -> T:
+    """
+    Await work, cancelling it and raising DeadlineExceededError if the deadline passes
+    first. Cancellation reaches whatever work is waiting on: a connection, a stream
+    read, a rate limit or a retry's backoff.
+    """
+    left = time_left(deadline)
+    if left is None:
+        return await work
+    assert deadline is not None
+    if left <= 0:
+        if asyncio.iscoroutine(work):
+            work.close()
+        raise DeadlineExceededError("Deadline passed before the request started", deadline)
+    try:
+        return await asyncio.wait_for(work, left)
+    except asyncio.TimeoutError:
+        if has_time(deadline):
+            # Raised by the work itself, not the deadline
+            raise
+        raise DeadlineExceededError(
+            f"Deadline passed after {left:.3f}s before the reply arrived", deadline
+        ) from None
@@ -0,0 +1,119 @@
+import time
+from collections.abc import Awaitable, Callable
+
+from kintu.client.backends.base import iter_contents
+from kintu.client.deadline import has_time
+from kintu.client.retry import is_retryable
+from kintu.model_library.model_library import equivalents, get_spec
+from kintu.types.complete import CompleteInput, CompleteReply
+from kintu.types.content import ImageContent
+from kintu.types.errors import CircuitOpenError, DeadlineExceededError, RetriesExhaustedError
+from kintu.types.model import Model
+
+
+class Failover:
+    """
+    Fails over between deployments of the same model on different providers.
+
+    Models that share an `equivalence_group` in the model library serve the same
+    weights, e.g. gpt-oss-120b on Groq and on Together AI. A request goes to its own model
+    first; if that fails with a transient error (see `is_retryable`), an open circuit or
+    exhausted retries, it is sent to the next equivalent instead. Deployments that cannot
+    take the input (images without vision, tools without tool support, max_tokens above
+    their output limit) are skipped. Errors that would fail anywhere are raised at once.
+
+    A deployment that failed, or streamed a reply with a TTFT above its latency SLO, is
+    degraded for `cooldown` seconds: requests for it start at a healthy equivalent
+    instead, and degraded deployments are tried last. Non-streamed replies are not held
+    to the SLO, as their TTFT is the whole request and grows with the output length.
+
+    Past the input's deadline, or when the next deployment's latency SLO would end after
+    it, the request fails with DeadlineExceededError instead of moving on.
+    """
+
+    def __init__(
+        self,
+        latency_slo: dict[Model, float] | None = None,
+        default_latency_slo: float | None = None,
+        cooldown: float = 30.0,
+    ):
+        self.latency_slo = latency_slo or {}
+        self.default_latency_slo = default_latency_slo
+        self.cooldown = cooldown
+        self.failovers = 0  # Requests moved on to another deployment after an error
+        self.slow = 0  # Streamed replies over their latency SLO
+        self._degraded: dict[Model, float] = {}  # Until when, in time.monotonic
+
+    def slo(self, model: Model) -> float | None:
+        return self.latency_slo.get(model, self.default_latency_slo)
+
+    def degraded(self, model: Model) -> bool:
+        return self._degraded.get(model, 0.0) > time.monotonic()
+
+    def candidates(self, inp: CompleteInput) -> list[Model]:
+        """Deployments to try for inp, healthy ones first."""
+        models = [model for model in equivalents(inp.model) if accepts(model, inp)]
+        if inp.model not in models:
+            models.insert(0, inp.model)
+        healthy = [model for model in models if not self.degraded(model)]
+        degraded = sorted(
+            (model for model in models if self.degraded(model)), key=self._degraded.__getitem__
+        )
+        return healthy + degraded
+
+    async def run(
+        self,
+        inp: CompleteInput,
+        attempt: Callable[[CompleteInput], Awaitable[CompleteReply]],
+        can_retry: Callable[[], bool] | None = None,
+    ) -> CompleteReply:
+        """Call attempt with inp for each candidate deployment until one answers."""
+        candidates = self.candidates(inp)
+        for index, model in enumerate(candidates):
+            routed = inp if model == inp.model else inp.model_copy(update={"model": model})
+            try:
+                reply = await attempt(routed)
+            except Exception as e:
+                if not _fails_over(model, e) or (can_retry is not None and not can_retry()):
+                    raise
+                self._degrade(model)
+                if index == len(candidates) - 1:
+                    raise
+                if inp.deadline is not None and not has_time(
+                    inp.deadline, self.slo(candidates[index + 1]) or 0.0
+                ):
+                    raise DeadlineExceededError(
+                        f"No time to fail over from {model.value} before the deadline: {e}",
+                        deadline=inp.deadline,
+                    ) from e
+                self.failovers += 1
+                continue
+            slo = self.slo(model)
+            if slo is not None and routed.stream and reply.timing.ttft > slo:
+                self.slow += 1
+                self._degrade(model)
+            return reply
+        raise AssertionError("No candidate deployments")  # candidates always has inp.model
+
+    def _degrade(self, model: Model) -> None:
+        self._degraded[model] = time.monotonic() + self.cooldown
+
+
+def _fails_over(model: Model, error: Exception) -> bool:
+    if isinstance(error, CircuitOpenError | RetriesExhaustedError):
+        return True
+    return is_retryable(get_spec(model).llmsdk, error)
+
+
+def accepts(model: Model, inp: CompleteInput) -> bool:
+    """Whether model can take inp: vision for images, tools, and room for max_tokens."""
+    spec = get_spec(model)
+    if inp.tools and not spec.features.tools:
+        return False
+    if inp.max_tokens is not None and inp.max_tokens > spec.max_output_tokens:
+        return False
+    if not spec.features.vision:
+        for message in inp.messages:
+            if any(isinstance(c, ImageContent) for c in iter_contents(message.content)):
+                return False
+    return True
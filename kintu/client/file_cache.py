@@ -0,0 +1,186 @@
+import asyncio
+import base64
+import time
+import weakref
+from collections import OrderedDict
+from collections.abc import Iterator
+
+import httpx
+
+from kintu.client.backends.base import (
+    FileRefs,
+    SDKBackend,
+    image_media_type_and_data,
+    iter_contents,
+)
+from kintu.client.fingerprint import document_digest
+from kintu.types.content import Content, DocumentContent, ImageContent
+from kintu.types.file_reference import FileReference
+from kintu.types.message import Message
+from kintu.types.provider import Provider
+from kintu.utilities import image_digest, key_digest
+
+# Uploads are one extra round trip, so small content is cheaper to keep inline
+DEFAULT_MIN_BYTES = 256 * 1024
+
+
+def iter_uploadable(messages: list[Message]) -> Iterator[Content]:
+    """Yield every DocumentContent and ImageContent, including those inside tool results."""
+    for message in messages:
+        for content in iter_contents(message.content):
+            if isinstance(content, (DocumentContent, ImageContent)):
+                yield content
+
+
+class FileReferenceCache:
+    """
+    Uploads documents and images to a provider's Files API once and reuses the reference.
+
+    Entries are keyed by (provider, API key, content hash), so the same bytes sent as
+    different DocumentContent objects or on different turns share one upload. Files are
+    only visible to the organization that uploaded them, so each key (which may belong to
+    another organization) gets its own upload. Keys are stored hashed. References are dropped
+    `expiry_margin` seconds before the provider expires the file, and the least recently
+    used entries are evicted beyond `max_entries`. Evicted files are not deleted from the
+    provider, since in-flight requests may still reference them.
+    """
+
+    def __init__(
+        self,
+        min_bytes: int = DEFAULT_MIN_BYTES,
+        max_entries: int = 1024,
+        ttl: float | None = None,
+        expiry_margin: float = 300.0,
+    ):
+        self.min_bytes = min_bytes
+        self.max_entries = max_entries
+        self.ttl = ttl  # Local lifetime for files the provider keeps until deleted
+        self.expiry_margin = expiry_margin
+        self.hits = 0
+        self.uploads = 0
+        self.evictions = 0
+        # By (provider, key_digest of the API key, content digest)
+        self._entries: OrderedDict[tuple[Provider, str, str], FileReference] = OrderedDict()
+        self._in_flight: dict[tuple[Provider, str, str], asyncio.Future[FileReference]] = {}
+        # Hashing a large document is not free, so remember digests per live object
+        self._digests: dict[int, tuple[weakref.ref[Content], str]] = {}
+
+    def get(self, provider: Provider, digest: str, api_key: str) -> FileReference | None:
+        """Look up a live reference, dropping it if it is about to expire."""
+        key = (provider, key_digest(api_key), digest)
+        ref = self._entries.get(key)
+        if ref is None:
+            return None
+        if ref.is_expired(self.expiry_margin):
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return ref
+
+    def put(self, digest: str, ref: FileReference, api_key: str) -> None:
+        """
+        Store a reference to a file uploaded with api_key, evicting the least recently
+        used beyond max_entries.
+        """
+        if ref.expires_at is None and self.ttl is not None:
+            ref = ref.model_copy(update={"expires_at": time.time() + self.ttl})
+        key = (ref.provider, key_digest(api_key), digest)
+        self._entries[key] = ref
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    async def resolve(
+        self,
+        messages: list[Message],
+        provider: Provider,
+        backend: SDKBackend,
+        http: httpx.AsyncClient,
+        api_key: str,
+    ) -> FileRefs:
+        """
+        Get file references for every large document and image in messages, uploading
+        anything not already cached for this provider and api_key, the key the request
+        is sent with.
+        """
+        contents = [
+            content
+            for content in iter_uploadable(messages)
+            if self._size(content) >= self.min_bytes
+        ]
+        refs = await asyncio.gather(
+            *(self._resolve_one(content, provider, backend, http, api_key) for content in contents)
+        )
+        return {id(content): ref for content, ref in zip(contents, refs)}
+
+    async def _resolve_one(
+        self,
+        content: Content,
+        provider: Provider,
+        backend: SDKBackend,
+        http: httpx.AsyncClient,
+        api_key: str,
+    ) -> FileReference:
+        digest = self._digest(content)
+        ref = self.get(provider, digest, api_key)
+        if ref is not None:
+            self.hits += 1
+            return ref
+
+        key = (provider, key_digest(api_key), digest)
+        in_flight = self._in_flight.get(key)
+        if in_flight is not None:
+            # The same content is already being uploaded by a concurrent request
+            self.hits += 1
+            return await asyncio.shield(in_flight)
+
+        future: asyncio.Future[FileReference] = asyncio.get_running_loop().create_future()
+        self._in_flight[key] = future
+        try:
+            data, mime_type, filename = self._upload_payload(content)
+            ref = await backend.upload_file(http, api_key, data, mime_type, filename)
+            self.uploads += 1
+            self.put(digest, ref, api_key)
+            future.set_result(ref)
+            return ref
+        except BaseException as e:
+            future.set_exception(e)
+            # Retrieve the exception so an unawaited future does not log a warning
+            future.exception()
+            raise
+        finally:
+            del self._in_flight[key]
+
+    def _size(self, content: Content) -> int:
+        if isinstance(content, DocumentContent):
+            return memoryview(content.document).nbytes
+        if isinstance(content, ImageContent):
+            width, height = content.image.size
+            return width * height * len(content.image.getbands())
+        return 0
+
+    def _digest(self, content: Content) -> str:
+        memo = self._digests.get(id(content))
+        if memo is not None and memo[0]() is content:
+            return memo[1]
+        if isinstance(content, DocumentContent):
+            digest = "document:" + document_digest(content.document)
+        else:
+            assert isinstance(content, ImageContent)
+            digest = "image:" + image_digest(content.image)
+        key = id(content)
+        self._digests[key] = (weakref.ref(content, lambda _: self._digests.pop(key, None)), digest)
+        return digest
+
+    def _upload_payload(self, content: Content) -> tuple[bytes | memoryview, str, str]:
+        if isinstance(content, DocumentContent):
+            filename = content._openai_filename or "document.pdf"
+            return content.document, "application/pdf", filename
+        assert isinstance(content, ImageContent)
+        media_type, data = image_media_type_and_data(content)
+        extension = media_type.split("/")[1]
+        return base64.b64decode(data), media_type, f"image.{extension}"
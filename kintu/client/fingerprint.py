@@ -0,0 +1,95 @@
+import hashlib
+import json
+from typing import Any
+
+from kintu.client.backends.base import iter_contents
+from kintu.client.request_body import iter_chunks
+from kintu.types.complete import CompleteInput
+from kintu.types.content import (
+    Content,
+    DocumentContent,
+    ImageContent,
+    TextContent,
+    ToolResultContent,
+)
+from kintu.utilities import cached_image_digest, known_image_digest
+
+
+def fingerprint(inp: CompleteInput, text: bool = True) -> str:
+    """
+    Canonical hash of everything in a CompleteInput that determines the reply.
+
+    Covers the model, messages, temperature, max_tokens, tools and provider_configs.
+    Images are hashed by pixels and documents by bytes, so equal inputs built from
+    different objects share a fingerprint. Streaming settings are left out: they change
+    how the reply is delivered, not what it is.
+
+    With text=False, the text of TextContent messages is left out too, leaving the
+    structure of the input that near-duplicate matching requires to be equal.
+    """
+    canonical = {
+        "model": inp.model.value,
+        "messages": [
+            {"role": message.role.value, "content": _canonical_content(message.content, text)}
+            for message in inp.messages
+        ],
+        "temperature": inp.temperature,
+        "max_tokens": inp.max_tokens,
+        "tools": None
+        if inp.tools is None
+        else [
+            {
+                "name": tool.name,
+                "description": tool.description,
+                "input_schema": tool.input_schema.model_json_schema(),
+                "output_schema": tool.output_schema.model_json_schema(),
+            }
+            for tool in inp.tools
+        ],
+        "provider_configs": None
+        if inp.provider_configs is None
+        else inp.provider_configs.model_dump(mode="json"),
+    }
+    encoded = json.dumps(canonical, sort_keys=True, separators=(",", ":"), default=repr)
+    return hashlib.blake2b(encoded.encode("utf-8"), digest_size=16).hexdigest()
+
+
+def hashes_media(inp: CompleteInput) -> bool:
+    """
+    Whether fingerprinting inp hashes a document or an image not hashed before, which
+    is worth doing off the event loop.
+    """
+    for message in inp.messages:
+        for content in iter_contents(message.content):
+            if isinstance(content, DocumentContent):
+                return True
+            if isinstance(content, ImageContent) and known_image_digest(content.image) is None:
+                return True
+    return False
+
+
+def document_digest(document: bytes | memoryview) -> str:
+    """Content hash of a document's bytes, read in chunks so mmapped files stay lazy."""
+    hasher = hashlib.blake2b(digest_size=16)
+    for chunk in iter_chunks(document, chunk_size=1024 * 1024):
+        hasher.update(chunk)
+    return hasher.hexdigest()
+
+
+def _canonical_content(content: Content, text: bool = True) -> dict[str, Any]:
+    if isinstance(content, TextContent) and not text:
+        fields: dict[str, Any] = {}
+    elif isinstance(content, ImageContent):
+        fields = {"image": cached_image_digest(content.image)}
+    elif isinstance(content, DocumentContent):
+        fields = {"document": document_digest(content.document)}
+    elif isinstance(content, ToolResultContent):
+        fields = {
+            "tool_id": content.tool_id,
+            "is_error": content.is_error,
+            "results": [_canonical_content(result, text) for result in content.results],
+        }
+    else:
+        fields = content.model_dump(mode="json")
+    # The class name keeps e.g. TextContent and ThinkingContent with equal fields apart
+    return {"type": type(content).__name__, **fields}
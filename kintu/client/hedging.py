@@ -0,0 +1,141 @@
+import asyncio
+import math
+import time
+from collections import deque
+from collections.abc import Awaitable, Callable
+
+from kintu.client.completion_stream import OnChunk
+from kintu.client.failover import accepts
+from kintu.model_library.model_library import equivalents
+from kintu.types.complete import CompleteInput, CompleteReply, StreamChunk
+from kintu.types.model import Model
+
+Attempt = Callable[[CompleteInput, OnChunk | None], Awaitable[CompleteReply]]
+
+
+class Hedging:
+    """
+    Hedged requests: a backup is sent when the primary is slow to produce its first token.
+
+    The hedge delay for a model is the `percentile` of its last `window` TTFTs, once
+    `min_samples` have been seen; until then it is `initial_delay`, and without one
+    requests are not hedged. If the primary has produced nothing after the delay, the
+    same input is sent again: to an equivalent deployment on another provider when one
+    can take it (with `use_equivalents`), or else to the same model. Whichever request
+    streams its first chunk first (or, without streaming, replies first) wins, and the
+    other is cancelled. Only the winner's chunks reach the caller.
+
+    When the backup wins, the primary's TTFT is only known to be at least the time the
+    backup took to win, and that lower bound is what is recorded, so hedging does not
+    talk the percentile down to the backups' TTFTs.
+    """
+
+    def __init__(
+        self,
+        percentile: float = 0.95,
+        min_samples: int = 20,
+        window: int = 200,
+        initial_delay: float | None = None,
+        use_equivalents: bool = True,
+    ):
+        self.percentile = percentile
+        self.min_samples = min_samples
+        self.window = window
+        self.initial_delay = initial_delay
+        self.use_equivalents = use_equivalents
+        self.requests = 0
+        self.hedged = 0  # Requests that sent a backup
+        self.backup_wins = 0
+        self._ttfts: dict[Model, deque[float]] = {}
+
+    def delay(self, model: Model) -> float | None:
+        """Seconds to wait for the primary's first token before sending a backup."""
+        samples = self._ttfts.get(model)
+        if samples is None or len(samples) < self.min_samples:
+            return self.initial_delay
+        ordered = sorted(samples)
+        return ordered[max(0, math.ceil(self.percentile * len(ordered)) - 1)]
+
+    def observe(self, model: Model, ttft: float) -> None:
+        samples = self._ttfts.get(model)
+        if samples is None:
+            samples = self._ttfts[model] = deque(maxlen=self.window)
+        samples.append(ttft)
+
+    def backup(self, inp: CompleteInput) -> CompleteInput:
+        """The input to send as the backup of inp."""
+        if self.use_equivalents:
+            for model in equivalents(inp.model)[1:]:
+                if accepts(model, inp):
+                    return inp.model_copy(update={"model": model})
+        return inp
+
+    async def run(
+        self, inp: CompleteInput, attempt: Attempt, on_chunk: OnChunk | None
+    ) -> CompleteReply:
+        """Send inp with attempt, hedging it if the first chunk takes longer than the delay."""
+        self.requests += 1
+        delay = self.delay(inp.model)
+        if delay is None:
+            reply = await attempt(inp, on_chunk)
+            self.observe(inp.model, reply.timing.ttft)
+            return reply
+
+        start = time.perf_counter()
+        won: asyncio.Future[asyncio.Task[CompleteReply]] = (
+            asyncio.get_running_loop().create_future()
+        )
+
+        def claim() -> bool:
+            """Claim the win for the current task; False if another task won."""
+            task = asyncio.current_task()
+            assert task is not None
+            if not won.done():
+                won.set_result(task)
+            return won.result() is task
+
+        async def deliver(chunk: StreamChunk) -> None:
+            # A loser's chunks are dropped; it is cancelled as soon as the winner claims
+            if claim() and on_chunk is not None:
+                await on_chunk(chunk)
+
+        async def send(routed: CompleteInput) -> CompleteReply:
+            reply = await attempt(routed, deliver if routed.stream else on_chunk)
+            claim()
+            return reply
+
+        tasks = [asyncio.create_task(send(inp))]
+        hedged_at = 0.0
+        try:
+            await asyncio.wait({tasks[0], won}, timeout=delay, return_when=asyncio.FIRST_COMPLETED)
+            if not won.done() and not tasks[0].done():
+                self.hedged += 1
+                hedged_at = time.perf_counter() - start
+                tasks.append(asyncio.create_task(send(self.backup(inp))))
+            pending = set(tasks)
+            while not won.done():
+                done, pending = await asyncio.wait(
+                    pending | {won}, return_when=asyncio.FIRST_COMPLETED
+                )
+                pending.discard(won)
+                if not pending and not won.done():
+                    # Every request failed: raise the last failure
+                    error = next(task for task in done if task is not won).exception()
+                    assert error is not None
+                    raise error
+            winner = won.result()
+            for task in tasks:
+                if task is not winner:
+                    task.cancel()
+            reply = await winner
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+        if winner is tasks[0]:
+            self.observe(inp.model, reply.timing.ttft)
+        else:
+            self.backup_wins += 1
+            self.observe(inp.model, hedged_at + reply.timing.ttft)
+        return reply
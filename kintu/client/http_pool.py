@@ -0,0 +1,62 @@
+import httpx
+
+from kintu.types.provider import Provider
+
+# Base URL for each provider's HTTP API. Groq and Together are called through their
+# OpenAI-compatible endpoints, so every path below starts with /v1.
+DEFAULT_BASE_URLS: dict[Provider, str] = {
+    Provider.ANTHROPIC: "https://api.anthropic.com",
+    Provider.OPENAI: "https://api.openai.com",
+    Provider.GEMINI: "https://generativelanguage.googleapis.com",
+    Provider.GROQ: "https://api.groq.com/openai",
+    Provider.TOGETHER: "https://api.together.xyz",
+}
+
+DEFAULT_TIMEOUT = httpx.Timeout(600.0, connect=10.0)
+
+
+class HTTPPool:
+    """
+    One long-lived, keep-alive HTTP connection pool per Provider.
+
+    Clients are created lazily on first use and reused for every later call, so a warm
+    connection skips the TCP and TLS handshakes. Call `aclose()` (or use the owning
+    KintuClient as an async context manager) to release the sockets.
+    """
+
+    def __init__(
+        self,
+        base_urls: dict[Provider, str] | None = None,
+        max_connections: int = 100,
+        max_keepalive_connections: int = 20,
+        keepalive_expiry: float = 60.0,
+        timeout: httpx.Timeout = DEFAULT_TIMEOUT,
+    ):
+        # base_urls overrides the defaults per provider, e.g. to point at a local stub server
+        self.base_urls = {**DEFAULT_BASE_URLS, **(base_urls or {})}
+        self.limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections,
+            keepalive_expiry=keepalive_expiry,
+        )
+        self.timeout = timeout
+        self._clients: dict[Provider, httpx.AsyncClient] = {}
+
+    def client(self, provider: Provider) -> httpx.AsyncClient:
+        """Get the pooled client for a provider, creating it on first use."""
+        client = self._clients.get(provider)
+        if client is None or client.is_closed:
+            client = httpx.AsyncClient(
+                base_url=self.base_urls[provider],
+                limits=self.limits,
+                timeout=self.timeout,
+            )
+            self._clients[provider] = client
+        return client
+
+    async def aclose(self) -> None:
+        """Close every pooled client and its connections."""
+        clients = list(self._clients.values())
+        self._clients.clear()
+        for client in clients:
+            await client.aclose()
@@ -0,0 +1,181 @@
+import asyncio
+import base64
+import io
+import math
+import threading
+from collections import OrderedDict
+from concurrent.futures import Executor, ProcessPoolExecutor
+
+from PIL import Image
+
+from kintu.types.complete import CompleteInput
+from kintu.types.content import Content, ImageContent, ToolResultContent
+from kintu.types.errors import TooManyImagesError
+from kintu.types.message import Message
+from kintu.types.model_spec import ModelSpec, ModelVisionLimits
+from kintu.utilities import (
+    IMAGE_CACHE,
+    cached_image_digest,
+    encode_image,
+    image_digest,
+    remember_image_digest,
+)
+
+
+def fit_image(image: Image.Image, max_pixels: int | None, format: str, quality: int) -> bytes:
+    """
+    Downscale an image to at most max_pixels (keeping its aspect ratio) and encode it.
+
+    Module-level so it can run in a worker process.
+    """
+    width, height = image.size
+    if max_pixels is not None and width * height > max_pixels:
+        scale = math.sqrt(max_pixels / (width * height))
+        size = (max(1, int(width * scale)), max(1, int(height * scale)))
+        image = image.resize(size, Image.Resampling.LANCZOS)
+    return encode_image(image, format, quality=quality)
+
+
+def fit_and_digest(
+    image: Image.Image, max_pixels: int | None, format: str, quality: int
+) -> tuple[bytes, str]:
+    """
+    fit_image, plus the digest of the fitted image as it decodes, so a worker does the
+    decode and hash as well as the resize and encode.
+    """
+    data = fit_image(image, max_pixels, format, quality)
+    return data, image_digest(Image.open(io.BytesIO(data)))
+
+
+def count_images(messages: list[Message]) -> int:
+    """Count ImageContent in messages, including images inside tool results."""
+    return sum(len(_images_in(message.content)) for message in messages)
+
+
+def _images_in(content: Content) -> list[ImageContent]:
+    if isinstance(content, ImageContent):
+        return [content]
+    if isinstance(content, ToolResultContent):
+        return [image for result in content.results for image in _images_in(result)]
+    return []
+
+
+class ImagePreprocessor:
+    """
+    Fits ImageContent images to a model's vision limits before a request goes out.
+
+    Images larger than `ModelVisionLimits.max_pixels` are resized and recompressed to the
+    model's preferred format in a process pool, so large batches of screenshots do not
+    block the event loop. Images within the limits are left as they are: the backends
+    encode them once and cache the payload in IMAGE_CACHE. Results are memoized by pixel
+    digest, so an unchanged screenshot is only processed once across turns, and the
+    encoded payload is seeded into IMAGE_CACHE so the backends do not encode it again.
+    """
+
+    def __init__(
+        self,
+        max_workers: int | None = None,
+        executor: Executor | None = None,
+        jpeg_quality: int = 85,
+        max_cached: int = 256,
+    ):
+        self.max_workers = max_workers
+        self.jpeg_quality = jpeg_quality
+        self.max_cached = max_cached
+        self._executor = executor
+        self._owns_executor = executor is None
+        # Encoded payload and pixel digest of each fitted image
+        self._fitted: OrderedDict[tuple[str, int | None, str], tuple[bytes, str]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    @property
+    def executor(self) -> Executor:
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=self.max_workers)
+        return self._executor
+
+    def close(self) -> None:
+        """Shut down the worker pool if this preprocessor created it."""
+        if self._executor is not None and self._owns_executor:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    async def preprocess(self, inp: CompleteInput, spec: ModelSpec) -> CompleteInput:
+        """
+        Return a copy of inp with every image fit to the model's vision limits.
+
+        Raises TooManyImagesError if the request has more images than the model accepts.
+        """
+        limits = spec.vision_limits
+        if limits is None:
+            return inp
+        images = [image for message in inp.messages for image in _images_in(message.content)]
+        if not images:
+            return inp
+        if limits.max_images is not None and len(images) > limits.max_images:
+            raise TooManyImagesError(
+                f"{spec.model_label} accepts at most {limits.max_images} images per request, "
+                f"got {len(images)}"
+            )
+
+        pending = [image for image in images if self._needs_fitting(image.image, limits)]
+        if not pending:
+            return inp
+        fitted = await asyncio.gather(*(self._fit(image.image, limits) for image in pending))
+        replacements = {id(old): new for old, new in zip(pending, fitted)}
+        messages = [self._replace_images(message, replacements) for message in inp.messages]
+        return inp.model_copy(update={"messages": messages})
+
+    def _needs_fitting(self, image: Image.Image, limits: ModelVisionLimits) -> bool:
+        width, height = image.size
+        return limits.max_pixels is not None and width * height > limits.max_pixels
+
+    async def _fit(self, image: Image.Image, limits: ModelVisionLimits) -> ImageContent:
+        # A full-resolution hash, so off the event loop unless this image was hashed before
+        key = (
+            await asyncio.to_thread(cached_image_digest, image),
+            limits.max_pixels,
+            limits.preferred_format,
+        )
+        with self._lock:
+            entry = self._fitted.get(key)
+            if entry is not None:
+                self._fitted.move_to_end(key)
+        if entry is None:
+            loop = asyncio.get_running_loop()
+            entry = await loop.run_in_executor(
+                self.executor,
+                fit_and_digest,
+                image,
+                limits.max_pixels,
+                limits.preferred_format,
+                self.jpeg_quality,
+            )
+            with self._lock:
+                self._fitted[key] = entry
+                while len(self._fitted) > self.max_cached:
+                    self._fitted.popitem(last=False)
+
+        data, digest = entry
+        # Only the header is read here; with the digest known and the payload cached, the
+        # backends never need the pixels
+        fitted = Image.open(io.BytesIO(data))
+        remember_image_digest(fitted, digest)
+        IMAGE_CACHE.put((digest, limits.preferred_format), base64.b64encode(data).decode("utf-8"))
+        return ImageContent(image=fitted)
+
+    def _replace_images(self, message: Message, replacements: dict[int, ImageContent]) -> Message:
+        content = self._replace_content(message.content, replacements)
+        if content is message.content:
+            return message
+        return message.model_copy(update={"content": content})
+
+    def _replace_content(self, content: Content, replacements: dict[int, ImageContent]) -> Content:
+        if isinstance(content, ImageContent):
+            return replacements.get(id(content), content)
+        if isinstance(content, ToolResultContent):
+            results = [self._replace_content(result, replacements) for result in content.results]
+            if all(new is old for new, old in zip(results, content.results)):
+                return content
+            return content.model_copy(update={"results": results})
+        return content
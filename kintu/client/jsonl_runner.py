@@ -0,0 +1,244 @@
+import asyncio
+import json
+import os
+import sys
+from collections.abc import AsyncIterator
+from typing import IO, Any, TextIO
+
+from PIL import Image
+from pydantic import BaseModel
+
+from kintu.client.complete_many import DEFAULT_MAX_CONCURRENCY
+from kintu.client.kintu_client import KintuClient
+from kintu.client.response_cache import connect, write_transaction
+from kintu.model_library.model_library import get_spec
+from kintu.types.complete import CompleteInput, CompleteReply, Priority
+from kintu.types.content import Content, DocumentContent, ImageContent, TextContent
+from kintu.types.message import Message
+from kintu.types.model import Model
+from kintu.types.role import Role
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS done (
+    line INTEGER PRIMARY KEY,
+    output_end INTEGER NOT NULL
+);
+"""
+
+
+class JSONLRunSummary(BaseModel):
+    """Counts of one run_jsonl call."""
+
+    completed: int = 0
+    skipped: int = 0  # Completed by an earlier run, per the checkpoint
+    failed: int = 0
+    cost: float = 0.0  # USD, of the rows completed by this run
+
+
+def parse_row(row: dict[str, Any]) -> CompleteInput:
+    """
+    Build a CompleteInput from an input row:
+
+        {"id": "q1", "model": "claude-sonnet-4-20250514", "max_tokens": 100,
+         "temperature": 0.2, "messages": [{"role": "user", "content": "Hi"}]}
+
+    `id`, `max_tokens`, `temperature`, `priority` and `tenant` are optional. A message's
+    content is a string, or a dict with a type: {"type": "text", "text": ...},
+    {"type": "image", "path": ...} or {"type": "document", "path": ...}.
+    """
+    return CompleteInput(
+        model=Model(row["model"]),
+        messages=[
+            Message(role=Role(message["role"]), content=_parse_content(message["content"]))
+            for message in row["messages"]
+        ],
+        max_tokens=row.get("max_tokens"),
+        temperature=row.get("temperature"),
+        priority=Priority(row.get("priority", Priority.DEFAULT)),
+        tenant=row.get("tenant"),
+    )
+
+
+def _reads_files(row: dict[str, Any]) -> bool:
+    """Whether parsing row opens image or document files."""
+    return any(
+        isinstance(message["content"], dict) and "path" in message["content"]
+        for message in row["messages"]
+    )
+
+
+def _parse_content(content: str | dict[str, Any]) -> Content:
+    if isinstance(content, str):
+        return TextContent(text=content)
+    kind = content["type"]
+    if kind == "text":
+        return TextContent(text=content["text"])
+    if kind == "image":
+        with Image.open(content["path"]) as image:
+            image.load()
+            return ImageContent(image=image)
+    if kind == "document":
+        return DocumentContent.from_path(content["path"])
+    raise ValueError(f"Unknown content type {kind!r}")
+
+
+def reply_row(reply: CompleteReply) -> dict[str, Any]:
+    """The output fields of a reply. The raw provider response is left out."""
+    return {
+        "model": reply.model.value,
+        "provider": reply.provider.value,
+        "text": "".join(
+            message.content.text
+            for message in reply.messages
+            if isinstance(message.content, TextContent)
+        ),
+        "messages": [
+            {
+                "role": message.role.value,
+                "content": {
+                    "type": type(message.content).__name__,
+                    **message.content.model_dump(mode="json"),
+                },
+            }
+            for message in reply.messages
+        ],
+        "usage": reply.usage.model_dump(mode="json"),
+        "timing": reply.timing.model_dump(mode="json"),
+        "cost": get_spec(reply.model).pricing.cost(reply.usage),
+    }
+
+
+class _Checkpoint:
+    """
+    The input lines whose reply is in the output file, with the output's size after each.
+
+    A reply is appended to the output and synced to disk before its line is recorded, so
+    after a crash the output is truncated back to the last recorded size: a reply written
+    but not recorded is dropped and its line runs again, and the output never holds a
+    line twice. Should the output still be shorter than recorded, e.g. after it was cut
+    by hand, the lines whose replies are missing are forgotten and run again.
+    """
+
+    def __init__(self, path: str):
+        self._db = connect(path, 30.0, _SCHEMA)
+
+    def output_end(self) -> int | None:
+        """The output's size after the last recorded reply, or None before the first."""
+        return self._db.execute("SELECT MAX(output_end) FROM done").fetchone()[0]
+
+    def forget_after(self, output_end: int) -> None:
+        """Forget the lines whose reply ends past output_end."""
+        with write_transaction(self._db):
+            self._db.execute("DELETE FROM done WHERE output_end > ?", (output_end,))
+
+    def done(self, line: int) -> bool:
+        return self._db.execute("SELECT 1 FROM done WHERE line = ?", (line,)).fetchone() is not None
+
+    def record(self, line: int, output_end: int) -> None:
+        with write_transaction(self._db):
+            self._db.execute("INSERT INTO done VALUES (?, ?)", (line, output_end))
+
+    def close(self) -> None:
+        self._db.close()
+
+
+async def run_jsonl(
+    client: KintuClient,
+    input_path: str | os.PathLike[str],
+    output_path: str | os.PathLike[str],
+    checkpoint_path: str | os.PathLike[str] | None = None,
+    max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+    errors: TextIO | None = None,
+    overwrite: bool = False,
+) -> JSONLRunSummary:
+    """
+    Complete every row of a JSONL input file (see parse_row), appending one JSON line per
+    reply to the output file as replies arrive, with at most `max_concurrency` requests
+    in flight. An output line is `{"line": n, "id": ..., **reply_row(reply)}`, where `n`
+    is the 0-based line of the input row, as output lines are in completion order.
+
+    Completed lines are recorded in a SQLite checkpoint (by default `<output>.checkpoint`),
+    so running the same command again after a crash or interruption skips them instead
+    of paying for them twice. Rows that fail, including rows that cannot be parsed, are
+    reported to `errors` (by default stderr) and are not recorded: the next run retries
+    them. Both files are streamed, so neither is ever held in memory.
+
+    An output file that has content while the checkpoint has none (a new checkpoint
+    path, or a deleted checkpoint) raises FileExistsError rather than mixing runs, unless
+    `overwrite` is set, which empties it first.
+    """
+    output_path = os.fspath(output_path)
+    if checkpoint_path is None:
+        checkpoint_path = f"{output_path}.checkpoint"
+    errors = sys.stderr if errors is None else errors
+    summary = JSONLRunSummary()
+    checkpoint = _Checkpoint(os.fspath(checkpoint_path))
+    # Input line and id of each submitted input, by its complete_many index, until it finishes
+    pending: dict[int, tuple[int, Any]] = {}
+
+    def report(line: int, error: BaseException) -> None:
+        summary.failed += 1
+        print(f"line {line}: {type(error).__name__}: {error}", file=errors, flush=True)
+
+    async def inputs(rows: IO[str]) -> AsyncIterator[CompleteInput]:
+        submitted = 0
+        for line, text in enumerate(rows):
+            if not text.strip():
+                continue
+            if checkpoint.done(line):
+                summary.skipped += 1
+                continue
+            try:
+                row = json.loads(text)
+                # Opening and decoding images would stall the requests in flight
+                inp = (
+                    await asyncio.to_thread(parse_row, row) if _reads_files(row) else parse_row(row)
+                )
+            except Exception as e:
+                report(line, e)
+                continue
+            pending[submitted] = (line, row.get("id"))
+            submitted += 1
+            yield inp
+
+    try:
+        with open(output_path, "a+b") as output:
+            end = checkpoint.output_end()
+            size = output.seek(0, os.SEEK_END)
+            if end is not None and end > size:
+                # Replies the checkpoint recorded are gone: run their lines again
+                checkpoint.forget_after(size)
+                end = checkpoint.output_end() or 0
+            if end is not None:
+                # Drop replies written after the last checkpointed one
+                output.truncate(end)
+            elif size > 0:
+                if not overwrite:
+                    raise FileExistsError(
+                        f"{output_path} has content, but its checkpoint {checkpoint_path} "
+                        "records none of it; set overwrite (--overwrite) to replace it"
+                    )
+                output.truncate(0)
+            with open(input_path, encoding="utf-8") as rows:
+                results = client.complete_many(
+                    inputs(rows),
+                    max_concurrency=max_concurrency,
+                    return_exceptions=True,
+                    ordered=False,
+                )
+                async for index, result in results:
+                    line, row_id = pending.pop(index)
+                    if isinstance(result, BaseException):
+                        report(line, result)
+                        continue
+                    record = {"line": line, "id": row_id, **reply_row(result)}
+                    output.write(json.dumps(record).encode("utf-8") + b"\n")
+                    output.flush()
+                    # On disk before it is recorded, or a crash could lose a recorded reply
+                    await asyncio.to_thread(os.fsync, output.fileno())
+                    checkpoint.record(line, output.tell())
+                    summary.completed += 1
+                    summary.cost += record["cost"]
+    finally:
+        checkpoint.close()
+    return summary
@@ -0,0 +1,486 @@
+import asyncio
+import json
+import time
+import weakref
+from collections.abc import AsyncIterable, AsyncIterator, Callable, Iterable
+from typing import Any
+
+import httpx
+
+from kintu.client.backends.anthropic import AnthropicBackend
+from kintu.client.backends.base import ParsedReply, PreparedRequest, SDKBackend, api_error
+from kintu.client.backends.gemini import GeminiBackend
+from kintu.client.backends.litellm import LiteLLMBackend
+from kintu.client.backends.openai import OpenAIBackend
+from kintu.client.complete_many import (
+    DEFAULT_MAX_CONCURRENCY,
+    CompleteManyProgress,
+    complete_many,
+)
+from kintu.client.completion_stream import DEFAULT_BUFFER_SIZE, CompletionStream, OnChunk
+from kintu.client.concurrency import AdaptiveConcurrency
+from kintu.client.deadline import has_time, within
+from kintu.client.failover import Failover
+from kintu.client.file_cache import FileReferenceCache
+from kintu.client.fingerprint import fingerprint, hashes_media
+from kintu.client.hedging import Hedging
+from kintu.client.http_pool import HTTPPool
+from kintu.client.image_preprocessor import ImagePreprocessor
+from kintu.client.rate_limiter import RateLimiter
+from kintu.client.request_body import StreamingJSONBody
+from kintu.client.response_cache import ResponseCache
+from kintu.client.retry import RetryPolicy
+from kintu.client.scheduler import Scheduler
+from kintu.client.similar_cache import SimilarPromptCache
+from kintu.client.single_flight import SingleFlight
+from kintu.client.sse import iter_sse_events
+from kintu.client.stream_batcher import StreamBatcher
+from kintu.client.stream_recorder import StreamRecorder
+from kintu.client.translation_cache import MessageTranslationCache
+from kintu.credential_manager import CredentialManager
+from kintu.model_library.model_library import get_spec
+from kintu.types.complete import (
+    CompleteInput,
+    CompleteReply,
+    RequestTiming,
+    SpilledStreamChunks,
+    StreamChunk,
+)
+from kintu.types.content import construct_trusted
+from kintu.types.errors import DeadlineExceededError, ProviderConnectionError
+from kintu.types.llmsdk import LLMSDK
+from kintu.types.model_spec import ModelSpec
+
+
+class KintuClient:
+    """
+    LLMClient that routes each CompleteInput to the backend for its model's LLM SDK.
+
+    Requests go out over one keep-alive connection pool per Provider (see HTTPPool), so
+    repeated calls reuse warm connections instead of paying a TLS handshake each time.
+    Use as an async context manager, or call `aclose()`, to release the pools.
+
+    Optional components:
+    - image_preprocessor: fits images to the model's vision limits before sending
+    - file_cache: uploads large documents/images once and sends file references after
+    - translations: reuses each message's wire form across turns of a conversation
+    - response_cache: answers repeated non-streaming inputs from disk (see ResponseCache)
+    - single_flight: sends identical concurrent inputs upstream once (see SingleFlight)
+    - similar_cache: answers inputs whose text nearly matches a cached input's
+    - scheduler: queues requests for provider capacity by priority and tenant (see Scheduler)
+    - rate_limiter: holds requests back to stay within RPM/TPM limits (see RateLimiter)
+    - concurrency: adapts in-flight requests per model to congestion (see AdaptiveConcurrency)
+    - retry: retries transient errors, with optional per-provider circuit breakers
+    - failover: moves requests between providers serving the same model (see Failover)
+    - hedging: sends a backup request when the first token is late (see Hedging)
+    """
+
+    def __init__(
+        self,
+        credentials: CredentialManager | None = None,
+        pool: HTTPPool | None = None,
+        image_preprocessor: ImagePreprocessor | None = None,
+        file_cache: FileReferenceCache | None = None,
+        translations: MessageTranslationCache | None = None,
+        response_cache: ResponseCache | None = None,
+        single_flight: SingleFlight | None = None,
+        similar_cache: SimilarPromptCache | None = None,
+        scheduler: Scheduler | None = None,
+        rate_limiter: RateLimiter | None = None,
+        concurrency: AdaptiveConcurrency | None = None,
+        retry: RetryPolicy | None = None,
+        failover: Failover | None = None,
+        hedging: Hedging | None = None,
+    ):
+        self.credentials = credentials or CredentialManager()
+        self.pool = pool or HTTPPool()
+        self.image_preprocessor = image_preprocessor
+        self.file_cache = file_cache
+        self.translations = translations
+        self.response_cache = response_cache
+        self.single_flight = single_flight
+        self.similar_cache = similar_cache
+        self.scheduler = scheduler
+        self.rate_limiter = rate_limiter
+        self.concurrency = concurrency
+        self.retry = retry
+        self.failover = failover
+        self.hedging = hedging
+        self.backends: dict[LLMSDK, SDKBackend] = {
+            LLMSDK.ANTHROPIC: AnthropicBackend(),
+            LLMSDK.OPENAI: OpenAIBackend(),
+            LLMSDK.GEMINI: GeminiBackend(),
+            LLMSDK.LITELLM: LiteLLMBackend(),
+        }
+        # Streams not yet closed, for aclose to release their connections
+        self._streams: weakref.WeakSet[CompletionStream] = weakref.WeakSet()
+
+    async def __aenter__(self) -> "KintuClient":
+        return self
+
+    async def __aexit__(self, *exc_info: object) -> None:
+        await self.aclose()
+
+    async def aclose(self) -> None:
+        for stream in list(self._streams):
+            await stream.aclose()
+        await self.pool.aclose()
+        if self.image_preprocessor is not None:
+            self.image_preprocessor.close()
+        if self.response_cache is not None:
+            self.response_cache.close()
+        if self.similar_cache is not None:
+            self.similar_cache.close()
+
+    async def complete(self, inp: CompleteInput) -> CompleteReply:
+        """Send a completion to the model's provider and wait for the full reply."""
+        return await self._complete(inp, inp.stream_callback)
+
+    def stream(
+        self, inp: CompleteInput, buffer_size: int = DEFAULT_BUFFER_SIZE
+    ) -> CompletionStream:
+        """
+        Stream a completion as an async iterator of StreamChunks, each with its typed deltas.
+
+            async with client.stream(inp) as stream:
+                async for chunk in stream:
+                    ...
+            reply = stream.reply
+
+        Always close the stream, with `async with` or `aclose()`: a `break` out of a bare
+        `async for` leaves the connection open until the stream is collected (see
+        CompletionStream). The request is sent with streaming on regardless of
+        `inp.stream`. A `stream_callback` on the input is still called, before each chunk
+        is buffered.
+        """
+        inp = inp.model_copy(update={"stream": True})
+        callback = inp.stream_callback
+
+        async def run(on_chunk: OnChunk) -> CompleteReply:
+            return await self._complete(inp, _chain(callback, on_chunk))
+
+        stream = CompletionStream(run, buffer_size)
+        self._streams.add(stream)
+        return stream
+
+    def complete_many(
+        self,
+        inputs: Iterable[CompleteInput] | AsyncIterable[CompleteInput],
+        max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+        return_exceptions: bool = False,
+        ordered: bool = True,
+        max_buffered: int | None = None,
+        on_progress: Callable[[CompleteManyProgress], None] | None = None,
+    ) -> AsyncIterator[tuple[int, CompleteReply | BaseException]]:
+        """
+        Complete a (possibly huge, possibly async) iterable of inputs with bounded
+        concurrency, pulling inputs lazily. See `complete_many` for ordering and
+        backpressure.
+
+            async for index, reply in client.complete_many(inputs, max_concurrency=32):
+                ...
+        """
+        return complete_many(
+            self.complete,
+            inputs,
+            max_concurrency=max_concurrency,
+            return_exceptions=return_exceptions,
+            ordered=ordered,
+            max_buffered=max_buffered,
+            on_progress=on_progress,
+        )
+
+    async def _complete(self, inp: CompleteInput, on_chunk: OnChunk | None) -> CompleteReply:
+        return await within(inp.deadline, self._coalesced(inp, on_chunk))
+
+    async def _coalesced(self, inp: CompleteInput, on_chunk: OnChunk | None) -> CompleteReply:
+        batcher = None
+        if inp.stream and inp.stream_batch_callback is not None:
+            batcher = StreamBatcher(inp.stream_batch_callback, inp.stream_batch_window)
+            on_chunk = _chain(on_chunk, batcher.add)
+
+        key = None
+        if self.single_flight is not None or self.response_cache is not None:
+            # Hashing images and documents is too slow to do on the event loop
+            key = (
+                await asyncio.to_thread(fingerprint, inp) if hashes_media(inp) else fingerprint(inp)
+            )
+        try:
+            if self.single_flight is None or key is None:
+                reply = await self._cached(inp, on_chunk, key)
+            else:
+                # The shared request keeps the starter's deadline, so retries and failover
+                # still stop in time: SingleFlight only lets callers with an earlier (or
+                # equal) deadline join it. Each caller's own deadline is enforced in _complete.
+                reply = await self.single_flight.run(
+                    _flight_key(inp, key),
+                    on_chunk,
+                    lambda publish: self._cached(inp, publish, key),
+                    inp.deadline,
+                )
+            if batcher is not None:
+                await batcher.close()
+        finally:
+            if batcher is not None:
+                batcher.cancel()
+        return reply
+
+    async def _cached(
+        self, inp: CompleteInput, on_chunk: OnChunk | None, key: str | None
+    ) -> CompleteReply:
+        # Streaming inputs bypass the caches: a cached reply has no chunks to deliver
+        if inp.stream:
+            return await self._hedged(inp, on_chunk)
+        if self.response_cache is not None and key is not None:
+            reply = await self.response_cache.get(key)
+            if reply is not None:
+                return reply
+        signature = None
+        if self.similar_cache is not None:
+            signature = await self.similar_cache.sign(inp)
+            if signature is not None:
+                reply = await self.similar_cache.get(inp, signature)
+                if reply is not None:
+                    return reply
+        reply = await self._hedged(inp, on_chunk)
+        if self.response_cache is not None and key is not None:
+            await self.response_cache.put(key, reply)
+        if self.similar_cache is not None and signature is not None:
+            await self.similar_cache.put(inp, reply, signature)
+        return reply
+
+    async def _hedged(self, inp: CompleteInput, on_chunk: OnChunk | None) -> CompleteReply:
+        if self.hedging is None:
+            return await self._resilient(inp, on_chunk)
+        return await self.hedging.run(inp, self._resilient, on_chunk)
+
+    async def _resilient(self, inp: CompleteInput, on_chunk: OnChunk | None) -> CompleteReply:
+        """Send inp with failover and retries, where configured."""
+        # A stream is only sent again until its first chunk is out: chunks cannot be taken back
+        delivered = False
+        if on_chunk is not None:
+            callback = on_chunk
+
+            async def deliver(chunk: StreamChunk) -> None:
+                nonlocal delivered
+                delivered = True
+                await callback(chunk)
+
+            on_chunk = deliver
+
+        def can_retry() -> bool:
+            return not delivered
+
+        if self.failover is None:
+            return await self._retried(inp, on_chunk, can_retry)
+        return await self.failover.run(
+            inp, lambda routed: self._retried(routed, on_chunk, can_retry), can_retry
+        )
+
+    async def _retried(
+        self, inp: CompleteInput, on_chunk: OnChunk | None, can_retry: Callable[[], bool]
+    ) -> CompleteReply:
+        if self.retry is None:
+            return await self._request(inp, on_chunk)
+        return await self.retry.run(
+            get_spec(inp.model), lambda: self._request(inp, on_chunk), can_retry, inp.deadline
+        )
+
+    async def _request(self, inp: CompleteInput, on_chunk: OnChunk | None) -> CompleteReply:
+        # Each attempt acquires its own key, so a retry moves off a key that was throttled
+        spec = get_spec(inp.model)
+        if self.image_preprocessor is not None:
+            inp = await self.image_preprocessor.preprocess(inp, spec)
+        # With every key throttled, wait for the first to recover rather than send a 429
+        while (cooldown := self.credentials.cooldown_left(spec.provider)) > 0:
+            if inp.deadline is not None and not has_time(inp.deadline, cooldown):
+                raise DeadlineExceededError(
+                    f"Every {spec.provider.value} key is cooling down past the deadline",
+                    deadline=inp.deadline,
+                )
+            await asyncio.sleep(cooldown)
+        key = self.credentials.acquire_key(spec.provider)
+        try:
+            reply, headers = await self._request_with_key(inp, spec, key.secret, on_chunk)
+        except BaseException as e:
+            self.credentials.release_key(key, error=e)
+            raise
+        self.credentials.release_key(key, usage=reply.usage, headers=headers)
+        return reply
+
+    async def _request_with_key(
+        self, inp: CompleteInput, spec: ModelSpec, api_key: str, on_chunk: OnChunk | None
+    ) -> tuple[CompleteReply, dict[str, str]]:
+        backend = self.backends[spec.llmsdk]
+        http = self.pool.client(spec.provider)
+        file_refs = None
+        if self.file_cache is not None and backend.supports_files:
+            file_refs = await self.file_cache.resolve(
+                inp.messages, spec.provider, backend, http, api_key
+            )
+        request = backend.build_request(inp, spec, api_key, file_refs, self.translations)
+
+        slot = None
+        if self.scheduler is not None:
+            slot = await self.scheduler.acquire(inp, spec.provider)
+        reservation = None
+        permit = None
+        usage = None
+        failure: BaseException | None = None
+        try:
+            if self.rate_limiter is not None:
+                reservation = await self.rate_limiter.acquire(inp, spec, api_key)
+            if self.concurrency is not None:
+                permit = await self.concurrency.acquire(spec)
+            start = time.perf_counter()
+            if inp.stream:
+                parsed, provider_response, ttft, headers = await self._send_streaming(
+                    http, request, backend, inp, start, on_chunk
+                )
+            else:
+                parsed, provider_response, headers = await self._send(http, request, backend)
+                ttft = time.perf_counter() - start
+            usage = parsed.usage
+        except httpx.TransportError as e:
+            failure = ProviderConnectionError(f"Request to {spec.provider.value} failed: {e!r}")
+            raise failure from e
+        except BaseException as e:
+            failure = e
+            raise
+        finally:
+            if self.rate_limiter is not None and reservation is not None:
+                self.rate_limiter.reconcile(reservation, usage)
+            if self.concurrency is not None and permit is not None:
+                # A non-streamed reply's TTFT is its whole duration, which grows with the
+                # output length: only streamed replies give a latency signal
+                latency = ttft if failure is None and inp.stream else None
+                self.concurrency.release(permit, latency, failure)
+            if self.scheduler is not None and slot is not None:
+                self.scheduler.release(slot)
+        duration = time.perf_counter() - start
+
+        return self._build_reply(spec, parsed, provider_response, ttft, duration), headers
+
+    async def _send(
+        self, http: httpx.AsyncClient, request: PreparedRequest, backend: SDKBackend
+    ) -> tuple[ParsedReply, Any, dict[str, str]]:
+        headers, content = _encode_body(request)
+        response = await http.request(
+            request.method, request.path, headers=headers, content=content
+        )
+        if response.status_code >= 400:
+            raise api_error(response, response.text)
+        data = response.json()
+        return backend.parse_response(data), data, dict(response.headers)
+
+    async def _send_streaming(
+        self,
+        http: httpx.AsyncClient,
+        request: PreparedRequest,
+        backend: SDKBackend,
+        inp: CompleteInput,
+        start: float,
+        on_chunk: OnChunk | None,
+    ) -> tuple[ParsedReply, list[StreamChunk] | SpilledStreamChunks, float, dict[str, str]]:
+        accumulator = backend.stream_accumulator()
+        recorder: StreamRecorder | None = None
+        ttft: float | None = None
+        try:
+            headers, content = _encode_body(request)
+            recorder = StreamRecorder(inp.stream_retention, inp.stream_spill_dir)
+            async with http.stream(
+                request.method, request.path, headers=headers, content=content
+            ) as response:
+                if response.status_code >= 400:
+                    body = (await response.aread()).decode("utf-8", errors="replace")
+                    raise api_error(response, body)
+                response_headers = dict(response.headers)
+                async for event in iter_sse_events(response):
+                    if event.data == "[DONE]":
+                        break
+                    if ttft is None:
+                        ttft = time.perf_counter() - start
+                    data = json.loads(event.data)
+                    deltas = accumulator.add(data)
+                    timestamp = time.time()
+                    chunk = None
+                    if recorder.needs_chunks or on_chunk is not None:
+                        chunk = construct_trusted(
+                            StreamChunk,
+                            {
+                                "provider_data": data,
+                                "timestamp": timestamp,
+                                "chunk_index": recorder.count,
+                                "deltas": deltas,
+                            },
+                        )
+                    recorder.record(event.data, timestamp, chunk)
+                    if on_chunk is not None:
+                        assert chunk is not None
+                        # Awaited before reading on, so a slow consumer slows the read
+                        await on_chunk(chunk)
+            # Inside the try: a stream can end in a way that only finish() reports
+            parsed = accumulator.finish()
+        except BaseException:
+            if recorder is not None:
+                recorder.discard()
+            raise
+        if ttft is None:
+            ttft = time.perf_counter() - start
+        return parsed, recorder.result(), ttft, response_headers
+
+    def _build_reply(
+        self,
+        spec: ModelSpec,
+        parsed: ParsedReply,
+        provider_response: Any,
+        ttft: float,
+        duration: float,
+    ) -> CompleteReply:
+        return CompleteReply(
+            messages=parsed.messages,
+            model=spec.model_id,
+            provider=spec.provider,
+            usage=parsed.usage,
+            timing=RequestTiming(ttft=ttft, duration=duration),
+            provider_response=provider_response,
+        )
+
+
+def _encode_body(
+    request: PreparedRequest,
+) -> tuple[dict[str, str], bytes | AsyncIterator[bytes]]:
+    """
+    Serialize a request body. Bodies carrying Base64Blobs (documents) are streamed with
+    an explicit Content-Length; everything else is sent as a single buffer.
+    """
+    body = StreamingJSONBody(request.json_body)
+    headers = {
+        **request.headers,
+        "Content-Type": "application/json",
+        "Content-Length": str(len(body)),
+    }
+    return headers, body.aiter() if body.has_blobs else body.read()
+
+
+def _flight_key(inp: CompleteInput, key: str) -> str:
+    """
+    Coalesce only inputs whose replies also match in form, not just in content, and that
+    queue at the same priority: an INTERACTIVE caller never waits in a BULK leader's place.
+    """
+    return (
+        f"{key}:{inp.stream}:{inp.stream_retention.value}:{inp.stream_spill_dir}"
+        f":{inp.priority.value}"
+    )
+
+
+def _chain(first: OnChunk | None, second: OnChunk) -> OnChunk:
+    """Deliver each chunk to first (if any), then to second."""
+    if first is None:
+        return second
+
+    async def deliver(chunk: StreamChunk) -> None:
+        await first(chunk)
+        await second(chunk)
+
+    return deliver
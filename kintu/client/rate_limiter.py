@@ -0,0 +1,228 @@
+import asyncio
+import json
+import time
+from typing import Protocol
+
+from pydantic import BaseModel
+
+from kintu.client.backends.base import iter_contents, tool_json_schema
+from kintu.client.deadline import has_time
+from kintu.types.complete import CompleteInput, LLMUsage
+from kintu.types.content import DocumentContent, ImageContent, TextContent
+from kintu.types.errors import DeadlineExceededError
+from kintu.types.model import Model
+from kintu.types.model_spec import ModelSpec
+from kintu.types.provider import Provider
+from kintu.utilities import key_digest
+
+# Rough token estimates, only needed until the reply's LLMUsage settles the real count
+CHARS_PER_TOKEN = 4
+IMAGE_TOKENS = 1000
+DOCUMENT_TOKENS_PER_KB = 30
+DEFAULT_OUTPUT_TOKENS = 1024
+
+
+class RateLimit(BaseModel):
+    """Limits of one Provider (across its models) or one Model. None is unlimited."""
+
+    requests_per_minute: int | None = None
+    tokens_per_minute: int | None = None
+
+
+class Bucket(Protocol):
+    """A token bucket; see TokenBucket."""
+
+    @property
+    def level(self) -> float: ...
+
+    def take(self, amount: float) -> float: ...
+
+    def give(self, amount: float) -> None: ...
+
+
+class BucketStore(Protocol):
+    """Where a RateLimiter keeps its buckets, e.g. per process or shared between them."""
+
+    def bucket(self, name: str, per_minute: int) -> Bucket: ...
+
+
+def refill(level: float, updated: float, now: float, per_minute: float) -> float:
+    """Level of a bucket last updated at `updated`, at time `now`."""
+    return min(per_minute, level + (now - updated) * per_minute / 60.0)
+
+
+class TokenBucket:
+    """
+    Token bucket holding up to a minute's allowance and refilling continuously.
+
+    Takes never fail: the level may go negative, and the taker waits until the refill has
+    paid the debt back. Takers queue in the order they took, without a separate queue.
+    """
+
+    def __init__(self, per_minute: int):
+        self.per_minute = per_minute
+        self._level = float(per_minute)
+        self._updated = time.monotonic()
+
+    @property
+    def level(self) -> float:
+        self._refill()
+        return self._level
+
+    def take(self, amount: float) -> float:
+        """Take amount and return the seconds until it is covered."""
+        self._refill()
+        self._level -= amount
+        return max(0.0, -self._level * 60.0 / self.per_minute)
+
+    def give(self, amount: float) -> None:
+        """Return amount (or take more, if negative) after the fact."""
+        self._refill()
+        self._level = min(self.per_minute, self._level + amount)
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._level = refill(self._level, self._updated, now, self.per_minute)
+        self._updated = now
+
+
+class LocalBuckets:
+    """Buckets private to this process."""
+
+    def __init__(self) -> None:
+        self.buckets: dict[str, TokenBucket] = {}
+
+    def bucket(self, name: str, per_minute: int) -> TokenBucket:
+        bucket = self.buckets.get(name)
+        if bucket is None:
+            bucket = self.buckets[name] = TokenBucket(per_minute)
+        return bucket
+
+
+class Reservation:
+    """Requests and tokens taken for one request, until reconciled with its usage."""
+
+    def __init__(self, request_buckets: list[Bucket], token_buckets: list[Bucket]):
+        self.request_buckets = request_buckets
+        self.token_buckets = token_buckets
+        self.tokens = 0
+        self.wait = 0.0
+
+    def take(self, tokens: int) -> None:
+        self.tokens = tokens
+        waits = [bucket.take(1) for bucket in self.request_buckets]
+        waits += [bucket.take(tokens) for bucket in self.token_buckets]
+        self.wait = max(waits, default=0.0)
+
+    def release(self) -> None:
+        """Give everything back, for a request that was never sent."""
+        for bucket in self.request_buckets:
+            bucket.give(1)
+        for bucket in self.token_buckets:
+            bucket.give(self.tokens)
+
+
+class RateLimiter:
+    """
+    Client-side RPM/TPM limiter that shapes traffic before the provider has to throttle it.
+
+    `limits` maps a Provider, a Model, or both, to a RateLimit, applied per API key. A
+    request waits until every bucket that applies to it (its provider's and its model's,
+    for its key) has room for one request and its estimated tokens. The estimate covers
+    the input (text, tools, images and documents) plus the expected output, at most
+    max_tokens. Once the reply arrives the estimate is replaced by the actual
+    input_uncached, completion and reasoning tokens; a request that fails gives its
+    tokens back.
+
+    Buckets are kept in `store`: by default in this process, or in SharedBuckets so that
+    worker processes using the same keys stay under the limits together.
+    """
+
+    def __init__(
+        self,
+        limits: dict[Provider | Model, RateLimit],
+        output_tokens: int = DEFAULT_OUTPUT_TOKENS,
+        store: BucketStore | None = None,
+    ):
+        self.limits = limits
+        self.output_tokens = output_tokens
+        self.store = store or LocalBuckets()
+        self.requests = 0
+        self.throttled = 0  # Requests that had to wait
+        self.wait_time = 0.0  # Seconds spent waiting, summed over requests
+
+    def request_bucket(self, key: Provider | Model, api_key: str = "") -> Bucket | None:
+        limit = self.limits.get(key)
+        if limit is None or limit.requests_per_minute is None:
+            return None
+        return self.store.bucket(_bucket_name(key, api_key, "requests"), limit.requests_per_minute)
+
+    def token_bucket(self, key: Provider | Model, api_key: str = "") -> Bucket | None:
+        limit = self.limits.get(key)
+        if limit is None or limit.tokens_per_minute is None:
+            return None
+        return self.store.bucket(_bucket_name(key, api_key, "tokens"), limit.tokens_per_minute)
+
+    async def acquire(self, inp: CompleteInput, spec: ModelSpec, api_key: str = "") -> Reservation:
+        """
+        Reserve room for inp, waiting until its buckets have refilled enough. If that wait
+        would end past inp's deadline, raise DeadlineExceededError at once instead.
+        """
+        keys = (spec.provider, spec.model_id)
+        request_buckets = [self.request_bucket(key, api_key) for key in keys]
+        token_buckets = [self.token_bucket(key, api_key) for key in keys]
+        reservation = Reservation(
+            [bucket for bucket in request_buckets if bucket is not None],
+            [bucket for bucket in token_buckets if bucket is not None],
+        )
+        reservation.take(self.estimate_tokens(inp) if reservation.token_buckets else 0)
+        self.requests += 1
+        if reservation.wait > 0:
+            if inp.deadline is not None and not has_time(inp.deadline, reservation.wait):
+                reservation.release()
+                raise DeadlineExceededError(
+                    f"Rate limit wait of {reservation.wait:.1f}s ends past the deadline",
+                    deadline=inp.deadline,
+                )
+            self.throttled += 1
+            self.wait_time += reservation.wait
+            try:
+                await asyncio.sleep(reservation.wait)
+            except asyncio.CancelledError:
+                reservation.release()
+                raise
+        return reservation
+
+    def reconcile(self, reservation: Reservation, usage: LLMUsage | None) -> None:
+        """Settle a reservation with the reply's usage, or None if the request failed."""
+        if usage is None:
+            for bucket in reservation.token_buckets:
+                bucket.give(reservation.tokens)
+            return
+        actual = usage.input_uncached_tokens + usage.completion_tokens + usage.reasoning_tokens
+        for bucket in reservation.token_buckets:
+            bucket.give(reservation.tokens - actual)
+
+    def estimate_tokens(self, inp: CompleteInput) -> int:
+        chars = 0
+        tokens = 0
+        for message in inp.messages:
+            for content in iter_contents(message.content):
+                if isinstance(content, TextContent):
+                    chars += len(content.text)
+                elif isinstance(content, ImageContent):
+                    tokens += IMAGE_TOKENS
+                elif isinstance(content, DocumentContent):
+                    tokens += memoryview(content.document).nbytes // 1024 * DOCUMENT_TOKENS_PER_KB
+        for tool in inp.tools or []:
+            chars += len(tool.name) + len(tool.description)
+            chars += len(json.dumps(tool_json_schema(tool)))
+        output = self.output_tokens
+        if inp.max_tokens is not None:
+            output = min(output, inp.max_tokens)
+        return tokens + chars // CHARS_PER_TOKEN + output
+
+
+def _bucket_name(key: Provider | Model, api_key: str, kind: str) -> str:
+    # Keys are hashed so they never end up in shared memory
+    return f"{type(key).__name__}:{key.value}:{key_digest(api_key)}:{kind}"
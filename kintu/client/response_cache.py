@@ -0,0 +1,169 @@
+import asyncio
+import contextlib
+import os
+import pickle
+import sqlite3
+import threading
+import time
+from collections.abc import Iterator
+
+from kintu.types.complete import CompleteReply
+
+DEFAULT_MAX_BYTES = 1024 * 1024 * 1024
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS replies (
+    key TEXT PRIMARY KEY,
+    reply BLOB NOT NULL,
+    size INTEGER NOT NULL,
+    created_at REAL NOT NULL,
+    accessed_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS replies_created_at ON replies (created_at);
+CREATE INDEX IF NOT EXISTS replies_accessed_at ON replies (accessed_at);
+CREATE TABLE IF NOT EXISTS totals (
+    id INTEGER PRIMARY KEY CHECK (id = 0),
+    size INTEGER NOT NULL
+);
+INSERT OR IGNORE INTO totals VALUES (0, 0);
+CREATE TRIGGER IF NOT EXISTS replies_insert AFTER INSERT ON replies
+BEGIN
+    UPDATE totals SET size = size + new.size;
+END;
+CREATE TRIGGER IF NOT EXISTS replies_delete AFTER DELETE ON replies
+BEGIN
+    UPDATE totals SET size = size - old.size;
+END;
+"""
+
+
+def connect(path: str, busy_timeout: float, schema: str) -> sqlite3.Connection:
+    """Open a cache database shared between processes, creating its schema if needed."""
+    db = sqlite3.connect(path, timeout=busy_timeout, isolation_level=None, check_same_thread=False)
+    db.execute("PRAGMA journal_mode=WAL")
+    db.execute("PRAGMA synchronous=NORMAL")
+    db.executescript(f"BEGIN IMMEDIATE; {schema} COMMIT;")
+    return db
+
+
+@contextlib.contextmanager
+def write_transaction(db: sqlite3.Connection) -> Iterator[None]:
+    # Take the write lock up front, so two writers cannot deadlock upgrading a read
+    db.execute("BEGIN IMMEDIATE")
+    try:
+        yield
+    except BaseException:
+        db.execute("ROLLBACK")
+        raise
+    db.execute("COMMIT")
+
+
+class ResponseCache:
+    """
+    Persistent cache of CompleteReplies, keyed by the fingerprint of their CompleteInput.
+
+    Replies are stored in a SQLite database, so a cache outlives the process and can be
+    shared by processes on the same machine: the database runs in WAL mode, so readers
+    never wait on a writer, and writers queue on SQLite's lock for up to `busy_timeout`
+    seconds. Entries older than `ttl` seconds are misses. When the stored replies grow
+    past `max_bytes`, the least recently read ones are evicted.
+
+    Replies are pickled, so only open cache files you trust.
+    """
+
+    def __init__(
+        self,
+        path: str | os.PathLike[str],
+        ttl: float | None = None,
+        max_bytes: int | None = DEFAULT_MAX_BYTES,
+        busy_timeout: float = 30.0,
+    ):
+        self.path = os.fspath(path)
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        # Queries run on worker threads, one at a time per connection
+        self._lock = threading.Lock()
+        self._db = connect(self.path, busy_timeout, _SCHEMA)
+
+    async def get(self, key: str) -> CompleteReply | None:
+        return await asyncio.to_thread(self.get_sync, key)
+
+    async def put(self, key: str, reply: CompleteReply) -> None:
+        await asyncio.to_thread(self.put_sync, key, reply)
+
+    def get_sync(self, key: str) -> CompleteReply | None:
+        now = time.time()
+        with self._lock:
+            row = self._db.execute(
+                "SELECT reply FROM replies WHERE key = ? AND created_at > ?",
+                (key, self._cutoff(now)),
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            try:
+                reply = pickle.loads(row[0])
+            except Exception:
+                # Written by an incompatible version of kintu
+                self._db.execute("DELETE FROM replies WHERE key = ?", (key,))
+                self.misses += 1
+                return None
+            self._db.execute("UPDATE replies SET accessed_at = ? WHERE key = ?", (now, key))
+            self.hits += 1
+            return reply
+
+    def put_sync(self, key: str, reply: CompleteReply) -> None:
+        blob = pickle.dumps(reply, protocol=pickle.HIGHEST_PROTOCOL)
+        now = time.time()
+        with self._lock, write_transaction(self._db):
+            self._db.execute("DELETE FROM replies WHERE key = ?", (key,))
+            self._db.execute(
+                "INSERT INTO replies VALUES (?, ?, ?, ?, ?)", (key, blob, len(blob), now, now)
+            )
+            if self.ttl is not None:
+                expired = self._db.execute(
+                    "DELETE FROM replies WHERE created_at <= ?", (self._cutoff(now),)
+                )
+                self.evictions += expired.rowcount
+            if self.max_bytes is not None:
+                self._evict(self.max_bytes)
+
+    def size(self) -> int:
+        """Total bytes of the stored replies."""
+        with self._lock:
+            return self._db.execute("SELECT size FROM totals").fetchone()[0]
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM replies").fetchone()[0]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._db.execute("DELETE FROM replies")
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
+
+    def _cutoff(self, now: float) -> float:
+        return float("-inf") if self.ttl is None else now - self.ttl
+
+    def _evict(self, max_bytes: int) -> None:
+        excess = self._db.execute("SELECT size FROM totals").fetchone()[0] - max_bytes
+        while excess > 0:
+            rows = self._db.execute(
+                "SELECT key, size FROM replies ORDER BY accessed_at LIMIT 64"
+            ).fetchall()
+            if not rows:
+                return
+            victims = []
+            for key, size in rows:
+                victims.append((key,))
+                excess -= size
+                if excess <= 0:
+                    break
+            self._db.executemany("DELETE FROM replies WHERE key = ?", victims)
+            self.evictions += len(victims)
@@ -0,0 +1,248 @@
+import asyncio
+import enum
+import random
+import time
+from collections.abc import Awaitable, Callable
+from typing import TypeVar
+
+from kintu.client.deadline import has_time
+from kintu.types.errors import (
+    CircuitOpenError,
+    DeadlineExceededError,
+    ProviderAPIError,
+    ProviderConnectionError,
+    RetriesExhaustedError,
+)
+from kintu.types.llmsdk import LLMSDK
+from kintu.types.model_spec import ModelSpec
+from kintu.types.provider import Provider
+from kintu.utilities import retry_after
+
+T = TypeVar("T")
+
+_TRANSIENT = frozenset({408, 409, 425, 429, 500, 502, 503, 504})
+
+# HTTP statuses worth another attempt, per SDK. Anything else is the request's fault
+# (bad input, auth, unknown model) and fails the same way however often it is sent.
+RETRYABLE_STATUSES: dict[LLMSDK, frozenset[int]] = {
+    LLMSDK.ANTHROPIC: _TRANSIENT | {529},  # 529: overloaded
+    LLMSDK.OPENAI: _TRANSIENT,
+    LLMSDK.GEMINI: _TRANSIENT,
+    LLMSDK.LITELLM: _TRANSIENT | {498},  # 498: Groq flex tier out of capacity
+}
+
+# Markers in an error body that make an otherwise retryable status fatal
+FATAL_MARKERS: dict[LLMSDK, tuple[str, ...]] = {
+    LLMSDK.OPENAI: ("insufficient_quota",),  # 429 for an account out of credit
+    LLMSDK.LITELLM: ("insufficient_quota",),
+}
+
+
+def is_retryable(llmsdk: LLMSDK, error: BaseException) -> bool:
+    """Whether a request that failed with error may succeed if sent again."""
+    if isinstance(error, ProviderConnectionError):
+        return True
+    if not isinstance(error, ProviderAPIError):
+        return False
+    if error.status_code not in RETRYABLE_STATUSES[llmsdk]:
+        return False
+    return not any(marker in error.body for marker in FATAL_MARKERS.get(llmsdk, ()))
+
+
+def is_outage(error: BaseException) -> bool:
+    """Whether error says the provider is down, rather than busy or rejecting the request."""
+    if isinstance(error, ProviderConnectionError):
+        return True
+    return isinstance(error, ProviderAPIError) and error.status_code >= 500
+
+
+class CircuitState(str, enum.Enum):
+    CLOSED = "closed"  # Requests go through
+    OPEN = "open"  # Requests fail fast with CircuitOpenError
+    HALF_OPEN = "half_open"  # One trial request decides whether to close again
+
+
+class _Circuit:
+    def __init__(self) -> None:
+        self.state = CircuitState.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self.trial = False  # A half-open trial request is in flight
+
+
+class CircuitBreaker:
+    """
+    Per-Provider circuit breaker that fails fast while a provider is down.
+
+    After `failure_threshold` consecutive outages (5xx replies or connection errors) the
+    circuit opens and requests raise CircuitOpenError without being sent. After
+    `reset_timeout` seconds one trial request is let through: if the provider answers,
+    the circuit closes, and if not it opens for another `reset_timeout`. Any reply that
+    is not an outage, including a 429 or a 400, shows the provider is up. Errors raised
+    before or without a reply, such as TooManyImagesError or DeadlineExceededError, show
+    nothing either way and count as a cancelled request.
+    """
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.rejected = 0  # Requests failed fast while open
+        self._circuits: dict[Provider, _Circuit] = {}
+
+    def state(self, provider: Provider) -> CircuitState:
+        circuit = self._circuits.get(provider)
+        return CircuitState.CLOSED if circuit is None else circuit.state
+
+    def before_request(self, provider: Provider) -> None:
+        """Raise CircuitOpenError if provider's circuit does not let a request through."""
+        circuit = self._circuit(provider)
+        if circuit.state == CircuitState.OPEN:
+            elapsed = time.monotonic() - circuit.opened_at
+            if elapsed < self.reset_timeout:
+                self._reject(provider, self.reset_timeout - elapsed)
+            circuit.state = CircuitState.HALF_OPEN
+            circuit.trial = False
+        if circuit.state == CircuitState.HALF_OPEN:
+            if circuit.trial:
+                self._reject(provider, 0.0)
+            circuit.trial = True
+
+    def record(self, provider: Provider, error: BaseException | None) -> None:
+        """Record how a request let through by before_request ended."""
+        if error is not None and not isinstance(error, (ProviderAPIError, ProviderConnectionError)):
+            self.cancel(provider)
+            return
+        circuit = self._circuit(provider)
+        if error is None or not is_outage(error):
+            circuit.state = CircuitState.CLOSED
+            circuit.failures = 0
+            circuit.trial = False
+            return
+        circuit.failures += 1
+        if circuit.state == CircuitState.HALF_OPEN or circuit.failures >= self.failure_threshold:
+            circuit.state = CircuitState.OPEN
+            circuit.opened_at = time.monotonic()
+            circuit.trial = False
+
+    def cancel(self, provider: Provider) -> None:
+        """Forget a request that was cancelled before it showed anything about provider."""
+        self._circuit(provider).trial = False
+
+    def _circuit(self, provider: Provider) -> _Circuit:
+        circuit = self._circuits.get(provider)
+        if circuit is None:
+            circuit = self._circuits[provider] = _Circuit()
+        return circuit
+
+    def _reject(self, provider: Provider, retry_in: float) -> None:
+        self.rejected += 1
+        raise CircuitOpenError(
+            f"Circuit for {provider.value} is open; retry in {retry_in:.1f}s",
+            provider=provider.value,
+            retry_in=retry_in,
+        )
+
+
+class RetryPolicy:
+    """
+    Retries requests that failed with a transient error (see `is_retryable`).
+
+    Waits between attempts use decorrelated jitter: each wait is drawn uniformly between
+    `base_delay` and three times the previous wait, capped at `max_delay`, so clients
+    that failed together spread out instead of retrying in lockstep. A Retry-After (or
+    retry-after-ms) header on the error replaces the drawn wait; if it asks for more than
+    `max_retry_after` seconds, the request is not retried and the error is raised as it
+    is, with the wait in ProviderAPIError.retry_after. Fatal errors are raised as
+    they are, and a retryable error left after `max_attempts` attempts is raised as
+    RetriesExhaustedError.
+
+    With a `breaker`, every attempt first checks its provider's circuit, so requests to a
+    provider that is down fail fast with CircuitOpenError.
+
+    Given a deadline, a retry is only started if its wait plus the longest attempt so far
+    fits before it; otherwise the request fails with DeadlineExceededError right away.
+    """
+
+    def __init__(
+        self,
+        max_attempts: int = 4,
+        base_delay: float = 0.5,
+        max_delay: float = 30.0,
+        max_retry_after: float = 60.0,
+        breaker: CircuitBreaker | None = None,
+        rng: random.Random | None = None,
+    ):
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.max_retry_after = max_retry_after
+        self.breaker = breaker
+        self.rng = rng or random.Random()
+        self.retries = 0  # Attempts after the first, over all requests
+        self.exhausted = 0  # Requests that ran out of attempts
+        self.out_of_time = 0  # Requests not retried as they could not finish by the deadline
+
+    def next_delay(self, previous: float) -> float:
+        """Decorrelated jitter: the wait after one of `previous` seconds."""
+        upper = max(self.base_delay, previous * 3)
+        return min(self.max_delay, self.rng.uniform(self.base_delay, upper))
+
+    async def run(
+        self,
+        spec: ModelSpec,
+        attempt: Callable[[], Awaitable[T]],
+        can_retry: Callable[[], bool] | None = None,
+        deadline: float | None = None,
+    ) -> T:
+        """
+        Call attempt until it succeeds or fails for good. can_retry, if given, may veto a
+        retry, e.g. once a stream has delivered chunks the caller cannot take back.
+        """
+        delay = self.base_delay
+        last_error: Exception | None = None
+        longest = 0.0  # Seconds, of the attempts so far
+        for number in range(1, self.max_attempts + 1):
+            if self.breaker is not None:
+                self.breaker.before_request(spec.provider)
+            start = time.monotonic()
+            try:
+                result = await attempt()
+            except asyncio.CancelledError:
+                if self.breaker is not None:
+                    self.breaker.cancel(spec.provider)
+                raise
+            except Exception as e:
+                last_error = e
+                longest = max(longest, time.monotonic() - start)
+                if self.breaker is not None:
+                    self.breaker.record(spec.provider, e)
+                if not is_retryable(spec.llmsdk, e) or (can_retry is not None and not can_retry()):
+                    raise
+                if number == self.max_attempts:
+                    break
+                delay = self.next_delay(delay)
+                wait = retry_after(e.headers) if isinstance(e, ProviderAPIError) else None
+                if wait is not None and wait > self.max_retry_after:
+                    assert isinstance(e, ProviderAPIError)
+                    e.retry_after = wait
+                    raise
+                wait = delay if wait is None else wait
+                if deadline is not None and not has_time(deadline, wait + longest):
+                    self.out_of_time += 1
+                    raise DeadlineExceededError(
+                        f"No time to retry {spec.provider.value} before the deadline: {e}",
+                        deadline=deadline,
+                    ) from e
+                self.retries += 1
+                await asyncio.sleep(wait)
+                continue
+            if self.breaker is not None:
+                self.breaker.record(spec.provider, None)
+            return result
+        assert last_error is not None
+        self.exhausted += 1
+        raise RetriesExhaustedError(
+            f"Request to {spec.provider.value} failed after {number} attempts: {last_error}",
+            attempts=number,
+            last_error=last_error,
+        ) from last_error
@@ -0,0 +1,155 @@
+import asyncio
+import heapq
+import itertools
+import time
+
+from kintu.types.complete import CompleteInput, Priority
+from kintu.types.provider import Provider
+
+DEFAULT_CAPACITY = 32
+
+# Highest first
+_PRIORITIES = list(Priority)
+
+
+class _Lane:
+    """One Provider's capacity and its queues, one per Priority."""
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self.in_flight = 0
+        # Waiters by (start tag, arrival), smallest first
+        self.queues: dict[Priority, list[tuple[float, int, asyncio.Future[None]]]] = {
+            priority: [] for priority in _PRIORITIES
+        }
+        # Start tag of the waiter sent last, per Priority
+        self.virtual_time = dict.fromkeys(_PRIORITIES, 0.0)
+        # Where each tenant's next request starts, per Priority
+        self.next_start: dict[Priority, dict[str | None, float]] = {
+            priority: {} for priority in _PRIORITIES
+        }
+
+    def queued(self) -> int:
+        return sum(len(queue) for queue in self.queues.values())
+
+
+class Slot:
+    """One request's share of a Provider's capacity, handed back with Scheduler.release."""
+
+    def __init__(self, lane: _Lane):
+        self.lane = lane
+
+
+class Scheduler:
+    """
+    Queues requests for each Provider's capacity by priority, sharing it fairly between tenants.
+
+    At most `capacity[provider]` (default `default_capacity`) requests per Provider are in
+    flight; the rest wait in one queue per CompleteInput.priority. A freed slot goes to
+    the highest priority with a waiter, so an INTERACTIVE request only waits for a slot
+    to free up, never behind queued BULK ones.
+
+    Within a priority, slots are shared between CompleteInput.tenant tags in proportion to
+    `weights` (default `default_weight`), by start-time fair queuing: a tenant's queued
+    requests are spaced `1 / weight` apart in virtual time, and the earliest goes first.
+    A tenant with a thousand queued requests thus takes turns with one that has a single
+    request, instead of sending all of its own first.
+
+    Set capacity at or below what the provider sustains for the keys in use, so that
+    requests queue here, in order, rather than behind the rate limiter or the provider.
+    """
+
+    def __init__(
+        self,
+        capacity: dict[Provider, int] | None = None,
+        default_capacity: int = DEFAULT_CAPACITY,
+        weights: dict[str, float] | None = None,
+        default_weight: float = 1.0,
+    ):
+        self.capacity = capacity or {}
+        self.default_capacity = default_capacity
+        self.weights = weights or {}
+        self.default_weight = default_weight
+        self.requests = 0
+        self.queued_requests = 0  # Requests that had to wait
+        self.wait_time = 0.0  # Seconds spent waiting, summed over requests
+        self._lanes: dict[Provider, _Lane] = {}
+        self._arrivals = itertools.count()
+
+    def in_flight(self) -> dict[Provider, int]:
+        return {provider: lane.in_flight for provider, lane in self._lanes.items()}
+
+    def queued(self) -> dict[Provider, int]:
+        return {provider: lane.queued() for provider, lane in self._lanes.items()}
+
+    async def acquire(self, inp: CompleteInput, provider: Provider) -> Slot:
+        """Wait for a slot of the provider's capacity, by inp's priority and tenant."""
+        lane = self._lane(provider)
+        self.requests += 1
+        if lane.in_flight < lane.capacity and not lane.queued():
+            lane.in_flight += 1
+            return Slot(lane)
+
+        self.queued_requests += 1
+        start = time.perf_counter()
+        queue = lane.queues[inp.priority]
+        next_start = lane.next_start[inp.priority]
+        tag = max(lane.virtual_time[inp.priority], next_start.get(inp.tenant, 0.0))
+        next_start[inp.tenant] = tag + 1.0 / self._weight(inp.tenant)
+        entry = (tag, next(self._arrivals), asyncio.get_running_loop().create_future())
+        heapq.heappush(queue, entry)
+        # Entries of cancelled waiters may be all that kept the fast path from a free slot
+        self._dispatch(lane)
+        try:
+            await entry[2]
+        except asyncio.CancelledError:
+            if entry[2].done() and not entry[2].cancelled():
+                # Granted a slot just as the wait was cancelled: pass it on
+                self.release(Slot(lane))
+            elif entry in queue:
+                # Not yet skipped by _next
+                queue.remove(entry)
+                heapq.heapify(queue)
+            raise
+        finally:
+            self.wait_time += time.perf_counter() - start
+        return Slot(lane)
+
+    def release(self, slot: Slot) -> None:
+        slot.lane.in_flight -= 1
+        self._dispatch(slot.lane)
+
+    def _dispatch(self, lane: _Lane) -> None:
+        while lane.in_flight < lane.capacity:
+            waiter = self._next(lane)
+            if waiter is None:
+                break
+            waiter.set_result(None)
+            lane.in_flight += 1
+
+    def _lane(self, provider: Provider) -> _Lane:
+        lane = self._lanes.get(provider)
+        if lane is None:
+            capacity = self.capacity.get(provider, self.default_capacity)
+            lane = self._lanes[provider] = _Lane(capacity)
+        return lane
+
+    def _weight(self, tenant: str | None) -> float:
+        if tenant is None:
+            return self.default_weight
+        return self.weights.get(tenant, self.default_weight)
+
+    def _next(self, lane: _Lane) -> asyncio.Future[None] | None:
+        for priority in _PRIORITIES:
+            queue = lane.queues[priority]
+            while queue:
+                tag, _, waiter = heapq.heappop(queue)
+                if not queue:
+                    # Idle again: how far ahead tenants were no longer matters
+                    lane.next_start[priority].clear()
+                if waiter.done():
+                    # Cancelled, and its task has not run to take it out yet
+                    continue
+                lane.virtual_time[priority] = tag
+                return waiter
+        return None
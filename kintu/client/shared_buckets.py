@@ -0,0 +1,123 @@
+import fcntl
+import hashlib
+import mmap
+import os
+import struct
+import tempfile
+import threading
+import time
+from collections.abc import Iterator
+from contextlib import contextmanager
+
+from kintu.client.rate_limiter import refill
+
+# Slot: name hash (0 marks a free slot), level, last update (time.monotonic), per_minute
+_SLOT = struct.Struct("<Qddd")
+DEFAULT_SLOTS = 4096
+
+
+def _default_directory() -> str:
+    # /dev/shm is memory-backed on Linux, so the segment never touches the disk
+    return "/dev/shm" if os.path.isdir("/dev/shm") else tempfile.gettempdir()
+
+
+class SharedBuckets:
+    """
+    Token buckets in a memory-mapped segment shared by every process on the host.
+
+    Processes that open SharedBuckets with the same `name` see the same buckets, so
+    worker processes using one API key share its limits instead of each assuming the full
+    quota. Each take or give is one read-modify-write under an exclusive flock on the
+    segment, which makes reservations atomic across processes. Bucket names are hashed
+    into a fixed table of `slots`, so no coordinator process is needed. Time is
+    time.monotonic, which on Linux and macOS is one clock for the whole host.
+
+    The segment is a file named kintu-buckets-<name> in /dev/shm (or the temp directory),
+    created zeroed by whichever process opens it first. Unix only.
+    """
+
+    def __init__(
+        self, name: str = "default", directory: str | None = None, slots: int = DEFAULT_SLOTS
+    ):
+        self.path = os.path.join(directory or _default_directory(), f"kintu-buckets-{name}")
+        self.slots = slots
+        # flock excludes other processes; threads of this one share the descriptor
+        self._thread_lock = threading.Lock()
+        self._fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o600)
+        size = slots * _SLOT.size
+        with self._locked():
+            if os.fstat(self._fd).st_size < size:
+                os.ftruncate(self._fd, size)
+        self._map = mmap.mmap(self._fd, size)
+        self._buckets: dict[str, SharedTokenBucket] = {}
+
+    def bucket(self, name: str, per_minute: int) -> "SharedTokenBucket":
+        bucket = self._buckets.get(name)
+        if bucket is None:
+            bucket = self._buckets[name] = SharedTokenBucket(self, self._slot(name, per_minute))
+        return bucket
+
+    def close(self) -> None:
+        self._map.close()
+        os.close(self._fd)
+
+    def unlink(self) -> None:
+        """Remove the segment; processes that still have it open keep their mapping."""
+        os.unlink(self.path)
+
+    @contextmanager
+    def _locked(self) -> Iterator[None]:
+        with self._thread_lock:
+            fcntl.flock(self._fd, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(self._fd, fcntl.LOCK_UN)
+
+    def _slot(self, name: str, per_minute: int) -> int:
+        """Offset of the slot for name, claiming a free one (full) if it is new."""
+        digest = hashlib.blake2b(name.encode("utf-8"), digest_size=8).digest()
+        key = int.from_bytes(digest, "little") or 1
+        start = key % self.slots
+        with self._locked():
+            for probe in range(self.slots):
+                offset = (start + probe) % self.slots * _SLOT.size
+                slot_key = _SLOT.unpack_from(self._map, offset)[0]
+                if slot_key == key:
+                    return offset
+                if slot_key == 0:
+                    _SLOT.pack_into(
+                        self._map, offset, key, float(per_minute), time.monotonic(), per_minute
+                    )
+                    return offset
+        raise RuntimeError(f"All {self.slots} rate limit slots in {self.path} are taken")
+
+    def _update(self, offset: int, amount: float) -> tuple[float, float]:
+        """Refill the bucket at offset, add amount, and return its level and rate."""
+        with self._locked():
+            key, level, updated, per_minute = _SLOT.unpack_from(self._map, offset)
+            now = time.monotonic()
+            level = min(refill(level, updated, now, per_minute) + amount, per_minute)
+            _SLOT.pack_into(self._map, offset, key, level, now, per_minute)
+        return level, per_minute
+
+
+class SharedTokenBucket:
+    """A TokenBucket whose state lives in a SharedBuckets segment."""
+
+    def __init__(self, shared: SharedBuckets, offset: int):
+        self._shared = shared
+        self._offset = offset
+
+    @property
+    def level(self) -> float:
+        return self._shared._update(self._offset, 0.0)[0]
+
+    def take(self, amount: float) -> float:
+        """Take amount and return the seconds until it is covered."""
+        level, per_minute = self._shared._update(self._offset, -amount)
+        return max(0.0, -level * 60.0 / per_minute)
+
+    def give(self, amount: float) -> None:
+        """Return amount (or take more, if negative) after the fact."""
+        self._shared._update(self._offset, amount)
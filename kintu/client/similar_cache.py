@@ -0,0 +1,244 @@
+import asyncio
+import hashlib
+import os
+import pickle
+import random
+import re
+import threading
+import time
+from array import array
+from collections.abc import Iterator
+
+from kintu.client.backends.base import iter_contents
+from kintu.client.fingerprint import fingerprint
+from kintu.client.response_cache import connect, write_transaction
+from kintu.types.complete import CompleteInput, CompleteReply
+from kintu.types.content import TextContent
+from kintu.types.model import Model
+
+# 32 bands of 4 rows: inputs with Jaccard similarity 0.7 share a band 99.9% of the time,
+# and at 0.3 only 23% of the time, so candidates are mostly near-duplicates
+NUM_BANDS = 32
+BAND_ROWS = 4
+SHINGLE_WORDS = 3
+
+_PRIME = (1 << 61) - 1
+_MASK = (1 << 64) - 1
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    id INTEGER PRIMARY KEY,
+    signature BLOB NOT NULL,
+    reply BLOB NOT NULL,
+    created_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS entries_created_at ON entries (created_at);
+CREATE TABLE IF NOT EXISTS bands (
+    bucket INTEGER NOT NULL,
+    entry INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS bands_bucket ON bands (bucket);
+CREATE INDEX IF NOT EXISTS bands_entry ON bands (entry);
+"""
+
+
+def _permutations(count: int) -> list[tuple[int, int]]:
+    # Fixed seed: signatures persisted to disk must stay comparable across processes
+    rng = random.Random(0x6B696E7475)
+    return [(rng.randrange(1, _PRIME), rng.randrange(0, _PRIME)) for _ in range(count)]
+
+
+_PERMUTATIONS = _permutations(NUM_BANDS * BAND_ROWS)
+
+# Dates and clock times, e.g. 2025-03-17, 2025-03-17t18:42:05z, 17/03/2025 and 6:42 pm
+_TIMESTAMP = re.compile(
+    r"\b(?:\d{4}-\d{2}-\d{2}(?:t\d{2}:\d{2}(?::\d{2}(?:\.\d+)?)?(?:z|[+-]\d{2}:?\d{2})?)?"
+    r"|\d{1,2}/\d{1,2}/\d{2,4}"
+    r"|\d{1,2}:\d{2}(?::\d{2}(?:\.\d+)?)?(?:\s?[ap]m)?)\b"
+)
+
+
+def shingles(inp: CompleteInput) -> set[int]:
+    """
+    Hashes of the word n-grams of every TextContent in the input, in message order.
+
+    Text is lowercased and split on whitespace, so formatting differences vanish, and
+    dates and clock times are masked, so an embedded timestamp does not count as a
+    change. Each message starts with its role, so the same words in another role do not
+    match.
+    """
+    words: list[str] = []
+    for message in inp.messages:
+        words.append(f"\x00{message.role.value}")
+        for content in iter_contents(message.content):
+            if isinstance(content, TextContent):
+                words.extend(_TIMESTAMP.sub("\x00time", content.text.lower()).split())
+    grams = max(len(words) - SHINGLE_WORDS + 1, 1)
+    return {
+        int.from_bytes(
+            hashlib.blake2b(
+                "\x1f".join(words[start : start + SHINGLE_WORDS]).encode("utf-8"), digest_size=8
+            ).digest(),
+            "little",
+        )
+        for start in range(grams)
+    }
+
+
+def minhash(hashes: set[int]) -> array:
+    """MinHash signature of a set of shingle hashes, one value per permutation."""
+    if not hashes:
+        return array("Q", [_MASK] * len(_PERMUTATIONS))
+    return array("Q", [min((a * h + b) % _PRIME for h in hashes) for a, b in _PERMUTATIONS])
+
+
+def similarity(first: array, second: array) -> float:
+    """Estimated Jaccard similarity of the shingle sets behind two signatures."""
+    return sum(x == y for x, y in zip(first, second)) / len(first)
+
+
+class Signature:
+    """What SimilarPromptCache compares of an input: its structure and its text MinHash."""
+
+    def __init__(self, inp: CompleteInput):
+        self.structure = fingerprint(inp, text=False)
+        self.minhash = minhash(shingles(inp))
+
+
+class SimilarPromptCache:
+    """
+    Answers inputs whose text nearly matches an earlier input's, e.g. prompts that differ
+    only in whitespace, an embedded timestamp (masked, see `shingles`) or a word or two.
+
+    Text is compared by MinHash over word shingles (see `shingles`), located through an
+    LSH index of NUM_BANDS bands. Everything else must match exactly: the model,
+    parameters, tools, message roles and any images or documents (see `fingerprint` with
+    text=False). An input is answered from the most similar cached input whose estimated
+    Jaccard similarity reaches the threshold for its model. One changed word costs
+    SHINGLE_WORDS shingles, so in a 40-word prompt it leaves a similarity of about 0.86.
+    Models without a threshold, and all models when `default_threshold` is None, are
+    never matched.
+
+    Signing an input is the costly part of a lookup: the client signs once with `sign`
+    and passes the Signature to both `get` and the `put` after a miss.
+
+    The index lives in memory, or in a SQLite database at `path` that persists and can
+    be shared between processes like a ResponseCache. Past `max_entries`, the oldest
+    entries are evicted. Replies are pickled, so only open cache files you trust.
+    """
+
+    def __init__(
+        self,
+        path: str | os.PathLike[str] | None = None,
+        thresholds: dict[Model, float] | None = None,
+        default_threshold: float | None = 0.9,
+        max_entries: int | None = 100_000,
+        busy_timeout: float = 30.0,
+    ):
+        self.path = ":memory:" if path is None else os.fspath(path)
+        self.thresholds = thresholds or {}
+        self.default_threshold = default_threshold
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        self._db = connect(self.path, busy_timeout, _SCHEMA)
+
+    def threshold(self, model: Model) -> float | None:
+        return self.thresholds.get(model, self.default_threshold)
+
+    async def sign(self, inp: CompleteInput) -> Signature | None:
+        """The input's Signature, or None when its model is never matched."""
+        if self.threshold(inp.model) is None:
+            return None
+        return await asyncio.to_thread(Signature, inp)
+
+    async def get(
+        self, inp: CompleteInput, signature: Signature | None = None
+    ) -> CompleteReply | None:
+        if self.threshold(inp.model) is None:
+            return None
+        return await asyncio.to_thread(self.get_sync, inp, signature)
+
+    async def put(
+        self, inp: CompleteInput, reply: CompleteReply, signature: Signature | None = None
+    ) -> None:
+        if self.threshold(inp.model) is None:
+            return
+        await asyncio.to_thread(self.put_sync, inp, reply, signature)
+
+    def get_sync(
+        self, inp: CompleteInput, signature: Signature | None = None
+    ) -> CompleteReply | None:
+        threshold = self.threshold(inp.model)
+        if threshold is None:
+            return None
+        if signature is None:
+            signature = Signature(inp)
+        buckets = list(_buckets(signature))
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT id, signature FROM entries WHERE id IN ("
+                f"SELECT entry FROM bands WHERE bucket IN ({', '.join('?' * len(buckets))}))",
+                buckets,
+            ).fetchall()
+            best_id, best = None, threshold
+            for entry_id, blob in rows:
+                score = similarity(signature.minhash, array("Q", blob))
+                if score >= best:
+                    best_id, best = entry_id, score
+            if best_id is None:
+                self.misses += 1
+                return None
+            row = self._db.execute("SELECT reply FROM entries WHERE id = ?", (best_id,)).fetchone()
+        self.hits += 1
+        return pickle.loads(row[0])
+
+    def put_sync(
+        self, inp: CompleteInput, reply: CompleteReply, signature: Signature | None = None
+    ) -> None:
+        if signature is None:
+            signature = Signature(inp)
+        blob = pickle.dumps(reply, protocol=pickle.HIGHEST_PROTOCOL)
+        with self._lock, write_transaction(self._db):
+            cursor = self._db.execute(
+                "INSERT INTO entries (signature, reply, created_at) VALUES (?, ?, ?)",
+                (signature.minhash.tobytes(), blob, time.time()),
+            )
+            self._db.executemany(
+                "INSERT INTO bands VALUES (?, ?)",
+                [(bucket, cursor.lastrowid) for bucket in _buckets(signature)],
+            )
+            if self.max_entries is not None:
+                self._evict(self.max_entries)
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
+
+    def _evict(self, max_entries: int) -> None:
+        excess = self._db.execute("SELECT COUNT(*) FROM entries").fetchone()[0] - max_entries
+        if excess <= 0:
+            return
+        victims = self._db.execute(
+            "SELECT id FROM entries ORDER BY created_at LIMIT ?", (excess,)
+        ).fetchall()
+        self._db.executemany("DELETE FROM bands WHERE entry = ?", victims)
+        self._db.executemany("DELETE FROM entries WHERE id = ?", victims)
+        self.evictions += len(victims)
+
+
+def _buckets(signature: Signature) -> Iterator[int]:
+    """One LSH bucket per band, scoped to inputs of the same structure."""
+    for band in range(NUM_BANDS):
+        rows = signature.minhash[band * BAND_ROWS : (band + 1) * BAND_ROWS]
+        digest = hashlib.blake2b(
+            f"{signature.structure}:{band}:".encode("ascii") + rows.tobytes(), digest_size=8
+        ).digest()
+        # Signed, to fit SQLite's INTEGER
+        yield int.from_bytes(digest, "little", signed=True)
@@ -0,0 +1,146 @@
+import asyncio
+from collections.abc import Awaitable, Callable
+
+from kintu.client.completion_stream import OnChunk
+from kintu.types.complete import CompleteReply, StreamChunk
+
+Send = Callable[[OnChunk], Awaitable[CompleteReply]]
+
+DEFAULT_MAX_REPLAY_CHUNKS = 256
+
+
+class _Waiter:
+    def __init__(self, on_chunk: OnChunk | None):
+        self.on_chunk = on_chunk
+        # Set if on_chunk raised. Only this waiter fails; the shared request goes on.
+        self.failed: asyncio.Future[None] = asyncio.get_running_loop().create_future()
+
+    async def deliver(self, chunk: StreamChunk) -> None:
+        if self.on_chunk is None or self.failed.done():
+            return
+        try:
+            await self.on_chunk(chunk)
+        except Exception as e:
+            self.failed.set_exception(e)
+
+
+class _Flight:
+    def __init__(self, max_replay_chunks: int, deadline: float | None) -> None:
+        self.task: asyncio.Task[CompleteReply] | None = None
+        self.deadline = deadline  # Of the caller that started it, the latest of its waiters
+        self.waiters: list[_Waiter] = []
+        self.max_replay_chunks = max_replay_chunks
+        # Chunks so far, replayed to waiters that join mid-stream. None once there are
+        # more than max_replay_chunks: the flight then takes no new waiters.
+        self.chunks: list[StreamChunk] | None = []
+        self.replaying = 0  # Waiters still catching up, which need every chunk kept
+
+    def joinable(self, deadline: float | None) -> bool:
+        if self.deadline is not None and (deadline is None or deadline > self.deadline):
+            return False
+        return self.chunks is not None and len(self.chunks) <= self.max_replay_chunks
+
+    async def publish(self, chunk: StreamChunk) -> None:
+        if self.chunks is not None:
+            if len(self.chunks) < self.max_replay_chunks or self.replaying:
+                self.chunks.append(chunk)
+            else:
+                self.chunks = None
+        for waiter in list(self.waiters):
+            await waiter.deliver(chunk)
+
+
+class SingleFlight:
+    """
+    Coalesces identical in-flight completions into one upstream request.
+
+    The first caller for a key starts the request; callers with the same key that arrive
+    while it is in flight wait for it instead of sending their own. Every waiter gets the
+    same CompleteReply (or error), and for streams every waiter's callback sees every
+    chunk: a waiter that joins mid-stream first has the chunks so far replayed to it.
+
+    The request belongs to the flight, not to the caller that started it. Cancelling a
+    waiter only detaches it; the request is cancelled once no waiter is left.
+
+    A flight is bound by the deadline of the caller that started it, so callers only
+    join flights whose deadline is no earlier than their own: the request then never
+    gives up sooner than any of its waiters needs. A caller with a later deadline (or
+    none) starts its own flight, which later callers for the key join instead.
+
+    At most `max_replay_chunks` chunks are kept for replay, so a long stream is not held
+    in memory whatever its StreamRetention. Past that, the stream takes no new waiters:
+    callers arriving later send their own request. With 0, only callers that arrive
+    before the first chunk share a stream.
+    """
+
+    def __init__(self, max_replay_chunks: int = DEFAULT_MAX_REPLAY_CHUNKS) -> None:
+        self.max_replay_chunks = max_replay_chunks
+        self.requests = 0  # Upstream requests sent
+        self.coalesced = 0  # Callers that waited on another caller's request
+        self.abandoned = 0  # Requests cancelled because every waiter left
+        self._flights: dict[str, _Flight] = {}
+
+    @property
+    def in_flight(self) -> int:
+        return len(self._flights)
+
+    async def run(
+        self, key: str, on_chunk: OnChunk | None, send: Send, deadline: float | None = None
+    ) -> CompleteReply:
+        """
+        Return the reply of the in-flight request for key, calling send to start one.
+        send must be bound by `deadline`, the time.time() by which the caller needs it.
+        """
+        flight = self._flights.get(key)
+        if flight is None or not flight.joinable(deadline):
+            flight = self._start(key, send, deadline)
+            self.requests += 1
+        else:
+            self.coalesced += 1
+        assert flight.task is not None
+
+        # Subscribed without a callback until the replay below has caught up
+        waiter = _Waiter(None)
+        flight.waiters.append(waiter)
+        try:
+            # Replay by index: chunks published during the replay are picked up too, and
+            # once caught up the waiter receives the rest from publish
+            chunks = flight.chunks  # Kept, and still appended to, while replaying
+            if on_chunk is not None and chunks:
+                flight.replaying += 1
+                try:
+                    replayed = 0
+                    while replayed < len(chunks):
+                        await on_chunk(chunks[replayed])
+                        replayed += 1
+                finally:
+                    flight.replaying -= 1
+            waiter.on_chunk = on_chunk
+            await asyncio.wait({flight.task, waiter.failed}, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            self._leave(flight, waiter)
+        if waiter.failed.done():
+            waiter.failed.result()
+        return flight.task.result()
+
+    def _start(self, key: str, send: Send, deadline: float | None) -> _Flight:
+        flight = _Flight(self.max_replay_chunks, deadline)
+        flight.task = asyncio.create_task(send(flight.publish))
+
+        def finished(task: asyncio.Task[CompleteReply]) -> None:
+            if self._flights.get(key) is flight:
+                del self._flights[key]
+
+        flight.task.add_done_callback(finished)
+        self._flights[key] = flight
+        return flight
+
+    def _leave(self, flight: _Flight, waiter: _Waiter) -> None:
+        flight.waiters.remove(waiter)
+        if waiter.failed.done():
+            # Mark the callback error retrieved, in case the waiter was cancelled instead
+            waiter.failed.exception()
+        assert flight.task is not None
+        if not flight.waiters and not flight.task.done():
+            flight.task.cancel()
+            self.abandoned += 1
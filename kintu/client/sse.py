@@ -0,0 +1,32 @@
+from collections.abc import AsyncIterator
+
+import httpx
+from pydantic import BaseModel
+
+
+class SSEEvent(BaseModel):
+    """A single server-sent event."""
+
+    event: str | None = None
+    data: str
+
+
+async def iter_sse_events(response: httpx.Response) -> AsyncIterator[SSEEvent]:
+    """Parse a text/event-stream response body into events."""
+    event: str | None = None
+    data_lines: list[str] = []
+    async for line in response.aiter_lines():
+        if line == "":
+            # A blank line terminates the current event
+            if data_lines:
+                yield SSEEvent(event=event, data="\n".join(data_lines))
+            event = None
+            data_lines = []
+        elif line.startswith(":"):
+            continue  # Comment / keep-alive ping
+        elif line.startswith("event:"):
+            event = line[len("event:") :].strip()
+        elif line.startswith("data:"):
+            data_lines.append(line[len("data:") :].lstrip())
+    if data_lines:
+        yield SSEEvent(event=event, data="\n".join(data_lines))
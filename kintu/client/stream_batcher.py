@@ -0,0 +1,83 @@
+import asyncio
+
+from kintu.types.complete import AsyncStreamBatchCallback, StreamBatchWindow, StreamChunk
+
+
+class StreamBatcher:
+    """
+    Coalesces stream chunks into batches for a stream_batch_callback.
+
+    A batch is delivered once it holds `window.max_chunks` chunks, or `window.max_delay`
+    seconds after its first chunk arrived, whichever comes first. The delay is enforced
+    by a timer, so a stream that pauses (e.g. before a tool call) still delivers what it
+    has. Batches are delivered in order and one at a time.
+    """
+
+    def __init__(self, callback: AsyncStreamBatchCallback, window: StreamBatchWindow):
+        self.callback = callback
+        self.window = window
+        self.batches = 0
+        self._pending: list[StreamChunk] = []
+        # The timer for the pending batch, while it is still waiting
+        self._timer: asyncio.Task[None] | None = None
+        # Strong references to timers that fired and are delivering a batch
+        self._delivering: set[asyncio.Task[None]] = set()
+        self._error: Exception | None = None
+        self._lock = asyncio.Lock()
+
+    async def add(self, chunk: StreamChunk) -> None:
+        self._raise_timer_error()
+        self._pending.append(chunk)
+        if self.window.max_chunks is not None and len(self._pending) >= self.window.max_chunks:
+            # Awaited, so a slow callback slows the read instead of batches piling up
+            await self.flush()
+        elif len(self._pending) == 1 and self.window.max_delay is not None:
+            self._timer = asyncio.create_task(self._flush_after(self.window.max_delay))
+
+    async def flush(self) -> None:
+        """Deliver the pending chunks, if any."""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        async with self._lock:
+            if not self._pending:
+                return
+            chunks, self._pending = self._pending, []
+            self.batches += 1
+            await self.callback(chunks)
+
+    async def close(self) -> None:
+        """Deliver whatever is left at the end of the stream."""
+        await self.flush()
+        # Wait for a batch a timer may still be delivering
+        if self._delivering:
+            await asyncio.wait(self._delivering)
+        self._raise_timer_error()
+
+    def cancel(self) -> None:
+        """Drop pending chunks, for a stream that failed."""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        for task in self._delivering:
+            task.cancel()
+        self._pending = []
+
+    async def _flush_after(self, delay: float) -> None:
+        await asyncio.sleep(delay)
+        # From here on the flush must not be cancelled by the next size-triggered flush
+        task = asyncio.current_task()
+        assert task is not None
+        self._timer = None
+        self._delivering.add(task)
+        task.add_done_callback(self._delivering.discard)
+        try:
+            await self.flush()
+        except Exception as e:
+            # Raised to the stream on its next chunk, or at the end
+            self._error = e
+
+    def _raise_timer_error(self) -> None:
+        if self._error is not None:
+            error, self._error = self._error, None
+            raise error
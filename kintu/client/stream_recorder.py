@@ -0,0 +1,62 @@
+import json
+import os
+import tempfile
+from typing import IO
+
+from kintu.types.complete import SpilledStreamChunks, StreamChunk, StreamRetention
+
+
+class StreamRecorder:
+    """Keeps the raw chunks of one streamed response according to a StreamRetention."""
+
+    def __init__(self, retention: StreamRetention, spill_dir: str | None = None):
+        self.retention = retention
+        self.count = 0
+        self.chunks: list[StreamChunk] = []
+        self._file: IO[str] | None = None
+        self._path: str | None = None
+        if retention == StreamRetention.DISK:
+            fd, self._path = tempfile.mkstemp(
+                prefix="kintu-stream-", suffix=".jsonl", dir=spill_dir
+            )
+            self._file = os.fdopen(fd, "w", encoding="utf-8")
+
+    @property
+    def needs_chunks(self) -> bool:
+        """Whether record() needs a StreamChunk object rather than just the raw data."""
+        return self.retention in (StreamRetention.ALL, StreamRetention.FIRST_LAST)
+
+    def record(self, raw: str, timestamp: float, chunk: StreamChunk | None = None) -> None:
+        """Record the next chunk. raw is its JSON text as received."""
+        if self.retention == StreamRetention.ALL:
+            assert chunk is not None
+            self.chunks.append(chunk)
+        elif self.retention == StreamRetention.FIRST_LAST:
+            assert chunk is not None
+            if len(self.chunks) < 2:
+                self.chunks.append(chunk)
+            else:
+                self.chunks[1] = chunk
+        elif self._file is not None:
+            # Raw newlines can only be whitespace between JSON tokens, so this keeps the
+            # chunk on one line without decoding and re-encoding it
+            data = raw.replace("\n", " ")
+            self._file.write(
+                f'{{"chunk_index":{self.count},"timestamp":{json.dumps(timestamp)},'
+                f'"provider_data":{data}}}\n'
+            )
+        self.count += 1
+
+    def result(self) -> list[StreamChunk] | SpilledStreamChunks:
+        """The provider_response for the reply. Closes the spill file."""
+        if self._file is not None and self._path is not None:
+            self._file.close()
+            return SpilledStreamChunks(path=self._path, count=self.count)
+        return self.chunks
+
+    def discard(self) -> None:
+        """Drop anything written to disk, for a stream that failed."""
+        if self._file is not None and self._path is not None:
+            self._file.close()
+            os.unlink(self._path)
+            self._file = None
@@ -0,0 +1,82 @@
+import weakref
+from collections.abc import Callable, Hashable
+from typing import Any
+
+from kintu.types.content import Content
+from kintu.types.llmsdk import LLMSDK
+from kintu.types.message import Message
+
+
+class _Entry:
+    __slots__ = ("ref", "content", "translations")
+
+    def __init__(self, ref: weakref.ref[Message], content: Content):
+        self.ref = ref
+        self.content = content
+        self.translations: dict[tuple[LLMSDK, Hashable], Any] = {}
+
+
+class MessageTranslationCache:
+    """
+    Memoizes the wire form of each Message per LLMSDK.
+
+    A multi-turn conversation resends its whole history every turn, so without this turn
+    N translates N messages. With it, only the messages added since the last turn are
+    translated. Entries live exactly as long as the Message they belong to.
+
+    Messages are treated as immutable once sent. Assigning a new content to a Message
+    is detected, but mutating a Content in place is not and will send the stale form.
+    """
+
+    def __init__(self) -> None:
+        self.hits = 0
+        self.misses = 0
+        self._entries: dict[int, _Entry] = {}
+
+    def get_or_translate(
+        self,
+        llmsdk: LLMSDK,
+        message: Message,
+        context: Hashable,
+        translate: Callable[[], Any],
+    ) -> Any:
+        """
+        Return the cached translation of message, or call translate() and cache it.
+
+        context holds anything else the translation depends on (e.g. referenced file ids),
+        so that different contexts are cached separately.
+        """
+        entry = self._entry(message)
+        key = (llmsdk, context)
+        if key in entry.translations:
+            self.hits += 1
+            return entry.translations[key]
+        self.misses += 1
+        translated = translate()
+        entry.translations[key] = translated
+        return translated
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def _entry(self, message: Message) -> _Entry:
+        key = id(message)
+        entry = self._entries.get(key)
+        if entry is not None and entry.ref() is message:
+            if entry.content is not message.content:
+                entry.content = message.content
+                entry.translations.clear()
+            return entry
+
+        def forget(ref: weakref.ref[Message]) -> None:
+            # Only drop the entry if it still belongs to the message that died
+            current = self._entries.get(key)
+            if current is not None and current.ref is ref:
+                del self._entries[key]
+
+        entry = _Entry(weakref.ref(message, forget), message.content)
+        self._entries[key] = entry
+        return entry
@@ -1,9 +1,13 @@
 import os
-from typing import Dict
+import re
+import time
+from typing import Dict, List, Optional
+from kintu.types.complete import LLMUsage
 from kintu.types.provider import Provider
 from kintu.types.model import Model
 from kintu.model_library.model_library import get_spec
-from kintu.types.errors import MissingCredentialsError
+from kintu.types.errors import MissingCredentialsError, ProviderAPIError
+from kintu.utilities import key_digest, rate_limit_remaining, rate_limit_reset, retry_after
 
 # Environment variable names for each provider
 ENV_VAR_MAPPING = {
@@ -14,13 +18,55 @@ ENV_VAR_MAPPING = {
     Provider.TOGETHER: "TOGETHER_API_KEY",
 }
 
+# How long a key rests after a 429 that did not say when to retry
+DEFAULT_COOLDOWN = 30.0
+
+
+class ApiKey:
+    """One key in a provider's pool, with its load and health."""
+    def __init__(self, provider: Provider, name: str, secret: str):
+        self.provider = provider
+        self.name = name  # Where the key came from, e.g. OPENAI_API_KEY_2
+        self.secret = secret
+        self.id = key_digest(secret)  # Stable across processes, unlike the name
+        self.in_flight = 0
+        self.requests = 0
+        self.tokens = 0  # Total tokens of the replies, from LLMUsage
+        self.rate_limited = 0  # 429 responses
+        self.errors = 0  # Other failed requests
+        # Left in the provider's current window, as last reported in response headers
+        self.remaining_requests: Optional[int] = None
+        self.remaining_tokens: Optional[int] = None
+        self.cooldown_until = 0.0  # time.monotonic() before which the key is skipped
+
+    def in_cooldown(self, now: Optional[float] = None) -> bool:
+        return self.cooldown_until > (time.monotonic() if now is None else now)
+
+    def __repr__(self) -> str:
+        return f"ApiKey({self.name}, in_flight={self.in_flight}, requests={self.requests})"
+
+
 class CredentialManager:
-    """Manages API credentials for all LLM providers."""
-    def __init__(self, verbose: bool = False):
-        """Initialize and load available credentials from environment."""
+    """
+    Manages API credentials for all LLM providers.
+
+    A provider can have a pool of keys: its environment variable, numbered variants
+    (OPENAI_API_KEY_1, OPENAI_API_KEY_2, ...) and lines of a key file. Each request is
+    given the least-loaded key that is not cooling down after a 429 or an exhausted
+    rate limit window (see acquire_key and release_key).
+    """
+    def __init__(self, verbose: bool = False, key_file: Optional[str] = None):
+        """
+        Initialize and load available credentials from environment.
+
+        key_file holds one `ENV_VAR=key` per line (e.g. `OPENAI_API_KEY=sk-...`, repeated
+        for several keys); blank lines and lines starting with # are skipped.
+        """
         self.verbose = verbose
-        self._credentials: Dict[Provider, str] = {}
+        self._keys: Dict[Provider, List[ApiKey]] = {}
         self._load_credentials()
+        if key_file is not None:
+            self._load_key_file(key_file)
 
     def vlog(self, *args):
         if self.verbose:
@@ -30,13 +76,133 @@ class CredentialManager:
         """Load credentials from environment variables."""
         for provider, env_var in ENV_VAR_MAPPING.items():
             self.vlog(f"CredentialManager: Checking for {env_var}...")
-            api_key = os.environ.get(env_var)
-            if api_key:
-                self.vlog(f"✓ Found {env_var}")
-                self._credentials[provider] = api_key
-            else:
+            numbered = re.compile(rf"{env_var}_(\d+)")
+            names = [env_var] + sorted(
+                (name for name in os.environ if numbered.fullmatch(name)),
+                key=lambda name: int(name.rsplit("_", 1)[1]),
+            )
+            for name in names:
+                api_key = os.environ.get(name)
+                if api_key:
+                    self.vlog(f"✓ Found {name}")
+                    self._add_key(provider, name, api_key)
+            if provider not in self._keys:
                 self.vlog(f"ⅹ Missing {env_var}")
 
+    def _load_key_file(self, path: str) -> None:
+        """Load credentials from a file of `ENV_VAR=key` lines."""
+        providers = {env_var: provider for provider, env_var in ENV_VAR_MAPPING.items()}
+        with open(path) as f:
+            for line_number, line in enumerate(f, start=1):
+                line = line.strip()
+                if not line or line.startswith("#"):
+                    continue
+                env_var, _, api_key = line.partition("=")
+                provider = providers.get(re.sub(r"_\d+$", "", env_var.strip()))
+                if provider is None or not api_key.strip():
+                    raise ValueError(
+                        f"{path}:{line_number}: expected ENV_VAR=key for a known provider"
+                    )
+                self._add_key(provider, f"{path}:{line_number}", api_key.strip())
+
+    def _add_key(self, provider: Provider, name: str, secret: str) -> None:
+        pool = self._keys.setdefault(provider, [])
+        if all(key.secret != secret for key in pool):
+            pool.append(ApiKey(provider, name, secret))
+
+    def keys(self, provider: Provider) -> List[ApiKey]:
+        """The pool of keys for a provider, for inspecting their usage."""
+        return list(self._keys.get(provider, []))
+
+    def acquire_key(self, provider: Provider, key_id: Optional[str] = None) -> ApiKey:
+        """
+        Pick the key for a request: the least-loaded one that is not in cooldown, or the
+        one that leaves cooldown first if all are. Hand it back with release_key. Wait
+        out cooldown_left first so the key is not sent while it is still throttled.
+
+        With key_id, the key whose ApiKey.id it is, for requests about resources (such as
+        batches) that only the key that created them can see.
+
+        Raises MissingCredentialsError if credentials are missing.
+        """
+        if key_id is None:
+            key = self._select(provider)
+        else:
+            key = self._find(provider, key_id)
+        key.in_flight += 1
+        key.requests += 1
+        return key
+
+    def cooldown_left(self, provider: Provider) -> float:
+        """Seconds until one of provider's keys leaves cooldown, 0.0 if one already has."""
+        pool = self._keys.get(provider)
+        if not pool:
+            return 0.0
+        return max(0.0, min(key.cooldown_until for key in pool) - time.monotonic())
+
+    def release_key(
+        self,
+        key: ApiKey,
+        usage: Optional[LLMUsage] = None,
+        error: Optional[BaseException] = None,
+        headers: Optional[Dict[str, str]] = None,
+    ) -> None:
+        """Record how a request with key went: its usage, or the error it failed with."""
+        key.in_flight -= 1
+        now = time.monotonic()
+        if usage is not None:
+            key.tokens += (
+                usage.input_uncached_tokens
+                + usage.input_cached_tokens
+                + usage.input_cache_write_tokens
+                + usage.completion_tokens
+                + usage.reasoning_tokens
+            )
+        if isinstance(error, ProviderAPIError):
+            headers = error.headers
+            if error.status_code == 429:
+                key.rate_limited += 1
+                # Retry-After: 0 means retry now, not that the header is missing
+                wait = retry_after(headers)
+                if wait is None:
+                    wait = rate_limit_reset(headers)
+                if wait is None:
+                    wait = DEFAULT_COOLDOWN
+                key.cooldown_until = max(key.cooldown_until, now + wait)
+            else:
+                key.errors += 1
+        elif error is not None and isinstance(error, Exception):
+            key.errors += 1
+        if headers:
+            remaining_requests, remaining_tokens = rate_limit_remaining(headers)
+            if remaining_requests is not None:
+                key.remaining_requests = remaining_requests
+            if remaining_tokens is not None:
+                key.remaining_tokens = remaining_tokens
+            if remaining_requests == 0 or remaining_tokens == 0:
+                # The window is spent: rest the key until it resets
+                reset = rate_limit_reset(headers)
+                if reset is not None:
+                    key.cooldown_until = max(key.cooldown_until, now + reset)
+
+    def _find(self, provider: Provider, key_id: str) -> ApiKey:
+        for key in self._keys.get(provider, []):
+            if key.id == key_id:
+                return key
+        raise MissingCredentialsError(
+            f"The {provider.value} key {key_id} is no longer among the loaded credentials."
+        )
+
+    def _select(self, provider: Provider) -> ApiKey:
+        pool = self._keys.get(provider)
+        if not pool:
+            raise MissingCredentialsError(f"Missing credentials for {provider.value} provider.")
+        now = time.monotonic()
+        ready = [key for key in pool if not key.in_cooldown(now)]
+        if not ready:
+            return min(pool, key=lambda key: key.cooldown_until)
+        return min(ready, key=lambda key: (key.in_flight, key.requests))
+
     def get_api_key_for_model(self, model: Model) -> str:
         """
         Get API key for a model.
@@ -49,18 +215,17 @@ class CredentialManager:
 
     def get_api_key(self, provider: Provider) -> str:
         """
-        Get API key for a provider if available.
+        Get API key for a provider if available. With several keys, this is the key
+        acquire_key would pick, without counting a request against it.
 
         Raises MissingCredentialsError if credentials are missing.
         """
-        if not self.has_api_key(provider):
-            raise MissingCredentialsError(f"Missing credentials for {provider.value} provider.")
-        return self._credentials.get(provider)
+        return self._select(provider).secret
 
 
     def has_api_key(self, provider: Provider) -> bool:
         """Check if we have the API Key for a Provider."""
-        return provider in self._credentials
+        return provider in self._keys
 
     def has_api_key_for_model(self, model: Model) -> bool:
         """Check if we have the API Key for a Model."""
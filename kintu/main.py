@@ -1,6 +1,63 @@
-def main():
-    print("Hello from kintu!")
+import argparse
+import asyncio
+import sys
+from collections.abc import Sequence
+
+from kintu.client.complete_many import DEFAULT_MAX_CONCURRENCY
+from kintu.client.jsonl_runner import run_jsonl
+from kintu.client.kintu_client import KintuClient
+
+
+async def _run(args: argparse.Namespace) -> int:
+    async with KintuClient() as client:
+        summary = await run_jsonl(
+            client,
+            args.input,
+            args.output,
+            checkpoint_path=args.checkpoint,
+            max_concurrency=args.concurrency,
+            overwrite=args.overwrite,
+        )
+    print(
+        f"{summary.completed} completed, {summary.skipped} skipped, {summary.failed} failed, "
+        f"${summary.cost:.4f}",
+        file=sys.stderr,
+    )
+    return 1 if summary.failed else 0
+
+
+def main(argv: Sequence[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(prog="kintu")
+    commands = parser.add_subparsers(dest="command", required=True)
+    run = commands.add_parser(
+        "run",
+        help="Complete a JSONL file of requests",
+        description=(
+            "Complete every request of a JSONL file, appending replies to a JSONL file as they "
+            "arrive. Run the same command again to resume an interrupted run: rows already "
+            "completed are skipped, and failed rows are retried."
+        ),
+    )
+    run.add_argument("input", help="JSONL file with one request per line")
+    run.add_argument("output", help="JSONL file the replies are appended to")
+    run.add_argument(
+        "--concurrency",
+        type=int,
+        default=DEFAULT_MAX_CONCURRENCY,
+        help=f"Maximum requests in flight (default {DEFAULT_MAX_CONCURRENCY})",
+    )
+    run.add_argument("--checkpoint", help="Checkpoint database (default <output>.checkpoint)")
+    run.add_argument(
+        "--overwrite",
+        action="store_true",
+        help="Replace an output file that the checkpoint has no record of",
+    )
+    args = parser.parse_args(argv)
+    try:
+        return asyncio.run(_run(args))
+    except FileExistsError as e:
+        parser.error(str(e))
 
 
 if __name__ == "__main__":
-    main()
+    sys.exit(main())
@@ -1,8 +1,14 @@
 from kintu.types.llmsdk import LLMSDK
 from kintu.types.model import Model
-from kintu.types.model_spec import ModelFeatures, ModelPricing, ModelSpec
+from kintu.types.model_spec import ModelFeatures, ModelPricing, ModelSpec, ModelVisionLimits
 from kintu.types.provider import Provider
 
+# Images with a long edge over 1568px (~1.15 megapixels) are scaled down by the API.
+# Up to 100 images per request.
+ANTHROPIC_VISION_LIMITS = ModelVisionLimits(
+    max_pixels=1_150_000, max_images=100, preferred_format="JPEG"
+)
+
 ANTHROPIC_MODEL_LIBRARY: dict[str, ModelSpec] = {
     Model.claude_4_1_opus_20250805: ModelSpec(
         model_id=Model.claude_4_1_opus_20250805,
@@ -19,11 +25,16 @@ ANTHROPIC_MODEL_LIBRARY: dict[str, ModelSpec] = {
             code_execution=True,
         ),
         pricing=ModelPricing(
-            input_nocache=15.0, output=75.0, input_cache_read=1.5, input_cache_write=18.75
+            input_nocache=15.0,
+            output=75.0,
+            input_cache_read=1.5,
+            input_cache_write=18.75,
+            batch_discount=0.5,
         ),
         context_window=200_000,
         max_output_tokens=32_000,
         temperature_range=(0.0, 1.0),
+        vision_limits=ANTHROPIC_VISION_LIMITS,
         release_date="2025-08-05",
     ),
 
@@ -42,11 +53,16 @@ ANTHROPIC_MODEL_LIBRARY: dict[str, ModelSpec] = {
             code_execution=True,
         ),
         pricing=ModelPricing(
-            input_nocache=15.0, output=75.0, input_cache_read=1.5, input_cache_write=18.75
+            input_nocache=15.0,
+            output=75.0,
+            input_cache_read=1.5,
+            input_cache_write=18.75,
+            batch_discount=0.5,
         ),
         context_window=200_000,
         max_output_tokens=32_000,
         temperature_range=(0.0, 1.0),
+        vision_limits=ANTHROPIC_VISION_LIMITS,
         release_date="2025-05-14",
     ),
     Model.claude_4_sonnet_20250514: ModelSpec(
@@ -64,11 +80,16 @@ ANTHROPIC_MODEL_LIBRARY: dict[str, ModelSpec] = {
             code_execution=True,
         ),
         pricing=ModelPricing(
-            input_nocache=3.0, output=15.0, input_cache_read=0.3, input_cache_write=3.75
+            input_nocache=3.0,
+            output=15.0,
+            input_cache_read=0.3,
+            input_cache_write=3.75,
+            batch_discount=0.5,
         ),
         context_window=1_000_000,
         max_output_tokens=64_000,
         temperature_range=(0.0, 1.0),
+        vision_limits=ANTHROPIC_VISION_LIMITS,
         release_date="2025-05-14",
     ),
     Model.claude_3_7_sonnet_20250219: ModelSpec(
@@ -86,11 +107,16 @@ ANTHROPIC_MODEL_LIBRARY: dict[str, ModelSpec] = {
             code_execution=True,
         ),
         pricing=ModelPricing(
-            input_nocache=3.0, output=15.0, input_cache_read=0.3, input_cache_write=3.75
+            input_nocache=3.0,
+            output=15.0,
+            input_cache_read=0.3,
+            input_cache_write=3.75,
+            batch_discount=0.5,
         ),
         context_window=200_000,
         max_output_tokens=64_000,
         temperature_range=(0.0, 1.0),
+        vision_limits=ANTHROPIC_VISION_LIMITS,
         release_date="2025-02-19",
     ),
     Model.claude_3_5_haiku_20241022: ModelSpec(
@@ -108,11 +134,16 @@ ANTHROPIC_MODEL_LIBRARY: dict[str, ModelSpec] = {
             code_execution=True,
         ),
         pricing=ModelPricing(
-            input_nocache=0.8, output=4.0, input_cache_read=0.08, input_cache_write=1.0
+            input_nocache=0.8,
+            output=4.0,
+            input_cache_read=0.08,
+            input_cache_write=1.0,
+            batch_discount=0.5,
         ),
         context_window=200_000,
         max_output_tokens=8_192,
         temperature_range=(0.0, 1.0),
+        vision_limits=ANTHROPIC_VISION_LIMITS,
         release_date="2024-10-22",
     ),
 }
@@ -1,8 +1,19 @@
 from kintu.types.llmsdk import LLMSDK
 from kintu.types.model import Model
-from kintu.types.model_spec import ModelFeatures, ModelPricing, ModelSpec
+from kintu.types.model_spec import (
+    GEMMA_3N_VISION_LIMITS,
+    ModelFeatures,
+    ModelPricing,
+    ModelSpec,
+    ModelVisionLimits,
+)
 from kintu.types.provider import Provider
 
+# Images are scaled to fit 3072x3072 and tiled into 768x768 crops. Up to 3600 images.
+GEMINI_VISION_LIMITS = ModelVisionLimits(
+    max_pixels=3072 * 3072, max_images=3600, preferred_format="JPEG"
+)
+
 GEMINI_MODEL_LIBRARY: dict[str, ModelSpec] = {
     Model.gemini_2_5_pro: ModelSpec(
         model_id=Model.gemini_2_5_pro,
@@ -19,11 +30,16 @@ GEMINI_MODEL_LIBRARY: dict[str, ModelSpec] = {
             code_execution=True,
         ),
         pricing=ModelPricing(
-            input_nocache=1.25, output=10.0, input_cache_read=0.0, input_cache_write=0.0
+            input_nocache=1.25,
+            output=10.0,
+            input_cache_read=0.0,
+            input_cache_write=0.0,
+            batch_discount=0.5,
         ),
         context_window=1_048_576,
         max_output_tokens=65_535,
         temperature_range=(0.0, 2.0),
+        vision_limits=GEMINI_VISION_LIMITS,
         release_date="2025-06-17",
     ),
     Model.gemini_2_5_flash: ModelSpec(
@@ -41,11 +57,16 @@ GEMINI_MODEL_LIBRARY: dict[str, ModelSpec] = {
             code_execution=True,
         ),
         pricing=ModelPricing(
-            input_nocache=0.3, output=2.5, input_cache_read=0.0, input_cache_write=0.0
+            input_nocache=0.3,
+            output=2.5,
+            input_cache_read=0.0,
+            input_cache_write=0.0,
+            batch_discount=0.5,
         ),
         context_window=1_048_576,
         max_output_tokens=65_535,
         temperature_range=(0.0, 2.0),
+        vision_limits=GEMINI_VISION_LIMITS,
         release_date="2025-06-17",
     ),
     Model.gemini_2_5_flash_lite: ModelSpec(
@@ -63,11 +84,16 @@ GEMINI_MODEL_LIBRARY: dict[str, ModelSpec] = {
             code_execution=True,
         ),
         pricing=ModelPricing(
-            input_nocache=0.1, output=0.4, input_cache_read=0.0, input_cache_write=0.0
+            input_nocache=0.1,
+            output=0.4,
+            input_cache_read=0.0,
+            input_cache_write=0.0,
+            batch_discount=0.5,
         ),
         context_window=1_048_576,
         max_output_tokens=65_535,
         temperature_range=(0.0, 2.0),
+        vision_limits=GEMINI_VISION_LIMITS,
         release_date="2025-06-17",
     ),
     Model.gemma_3n_e2b_it: ModelSpec(  # DONE, NOT TESTED
@@ -90,6 +116,7 @@ GEMINI_MODEL_LIBRARY: dict[str, ModelSpec] = {
         context_window=32_000,  # Shared between input and output
         max_output_tokens=32_000,
         temperature_range=(0.0, 1.0),  # Gemma is 0.0 to 1.0 based on AI Studio UI
+        vision_limits=GEMMA_3N_VISION_LIMITS,
         release_date="2025-06-25",
     ),
     Model.gemma_3n_e4b_it: ModelSpec(  # DONE, NOT TESTED
@@ -112,6 +139,7 @@ GEMINI_MODEL_LIBRARY: dict[str, ModelSpec] = {
         context_window=32_000,
         max_output_tokens=32_000,
         temperature_range=(0.0, 1.0),  # Gemma is 0.0 to 1.0 based on AI Studio UI
+        vision_limits=GEMMA_3N_VISION_LIMITS,
         release_date="2025-06-25",
     ),
 }
@@ -1,8 +1,13 @@
 from kintu.types.llmsdk import LLMSDK
 from kintu.types.model import Model
-from kintu.types.model_spec import ModelFeatures, ModelPricing, ModelSpec
+from kintu.types.model_spec import ModelFeatures, ModelPricing, ModelSpec, ModelVisionLimits
 from kintu.types.provider import Provider
 
+# Llama 4 tiles images into at most 16 336x336 patches. Groq accepts 5 images per request.
+LLAMA_4_GROQ_VISION_LIMITS = ModelVisionLimits(
+    max_pixels=16 * 336 * 336, max_images=5, preferred_format="JPEG"
+)
+
 GROQ_MODEL_LIBRARY: dict[str, ModelSpec] = {
     Model.llama_3_1_8b_groq: ModelSpec(
         # https://console.groq.com/docs/model/llama-3.1-8b-instant
@@ -74,6 +79,7 @@ GROQ_MODEL_LIBRARY: dict[str, ModelSpec] = {
         context_window=131_072,
         max_output_tokens=1024,
         temperature_range=(0.0, 2.0),
+        vision_limits=LLAMA_4_GROQ_VISION_LIMITS,
         release_date="2025-04-05",
     ),
     Model.deepseek_r1_distill_llama_3_3_70b_groq: ModelSpec(
@@ -111,6 +117,7 @@ GROQ_MODEL_LIBRARY: dict[str, ModelSpec] = {
         llmsdk_model_id="groq/meta-llama/llama-4-maverick-17b-128e-instruct",
         provider_model_id="meta-llama/llama-4-maverick-17b-128e-instruct",
         model_label="Llama 4 Maverick 17B (Groq via LiteLLM)",
+        equivalence_group="llama-4-maverick-17b",
         features=ModelFeatures(
             vision=True,
             thinking=False,
@@ -124,6 +131,7 @@ GROQ_MODEL_LIBRARY: dict[str, ModelSpec] = {
         context_window=131_072,
         max_output_tokens=8_192,
         temperature_range=(0.0, 2.0),
+        vision_limits=LLAMA_4_GROQ_VISION_LIMITS,
         release_date="2025-04-05",
     ),
     Model.llama4_scout_groq: ModelSpec(
@@ -136,6 +144,7 @@ GROQ_MODEL_LIBRARY: dict[str, ModelSpec] = {
         llmsdk_model_id="groq/meta-llama/llama-4-scout-17b-16e-instruct",
         provider_model_id="meta-llama/llama-4-scout-17b-16e-instruct",
         model_label="Llama 4 Scout 17B (Groq via LiteLLM)",
+        equivalence_group="llama-4-scout-17b",
         features=ModelFeatures(
             vision=False,
             thinking=False,
@@ -206,6 +215,7 @@ GROQ_MODEL_LIBRARY: dict[str, ModelSpec] = {
         llmsdk_model_id="groq/moonshotai/kimi-k2-instruct",
         provider_model_id="moonshotai/kimi-k2-instruct",
         model_label="Kimi K2 Instruct (Groq via LiteLLM)",
+        equivalence_group="kimi-k2-instruct",
         features=ModelFeatures(
             vision=False,
             thinking=False,
@@ -230,6 +240,7 @@ GROQ_MODEL_LIBRARY: dict[str, ModelSpec] = {
         llmsdk_model_id="groq/openai/gpt-oss-120b",
         provider_model_id="openai/gpt-oss-120b",
         model_label="OpenAI GPT OSS 120B (Groq via LiteLLM)",
+        equivalence_group="gpt-oss-120b",
         features=ModelFeatures(
             vision=False,
             thinking=True,
@@ -254,6 +265,7 @@ GROQ_MODEL_LIBRARY: dict[str, ModelSpec] = {
         llmsdk_model_id="groq/openai/gpt-oss-20b",
         provider_model_id="openai/gpt-oss-20b",
         model_label="OpenAI GPT OSS 20B (Groq via LiteLLM)",
+        equivalence_group="gpt-oss-20b",
         features=ModelFeatures(
             vision=False,
             thinking=True,
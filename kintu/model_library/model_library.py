@@ -20,3 +20,15 @@ def get_spec(model: Model) -> ModelSpec:
         raise KeyError(f"No specification found for model: {model}")
 
     return MODEL_LIBRARY[model]
+
+
+def equivalents(model: Model) -> list[Model]:
+    """The model followed by the other models in its equivalence group, in library order."""
+    group = get_spec(model).equivalence_group
+    if group is None:
+        return [model]
+    return [model] + [
+        spec.model_id
+        for spec in MODEL_LIBRARY.values()
+        if spec.equivalence_group == group and spec.model_id != model
+    ]
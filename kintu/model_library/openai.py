@@ -1,8 +1,14 @@
 from kintu.types.llmsdk import LLMSDK
 from kintu.types.model import Model
-from kintu.types.model_spec import ModelFeatures, ModelPricing, ModelSpec
+from kintu.types.model_spec import ModelFeatures, ModelPricing, ModelSpec, ModelVisionLimits
 from kintu.types.provider import Provider
 
+# High detail images are fit to 2048x2048 and then to 768px on the short side.
+# Up to 500 images per request.
+OPENAI_VISION_LIMITS = ModelVisionLimits(
+    max_pixels=2048 * 768, max_images=500, preferred_format="JPEG"
+)
+
 OPENAI_MODEL_LIBRARY: dict[str, ModelSpec] = {
     Model.gpt_5: ModelSpec(
         # https://platform.openai.com/docs/models/gpt-5
@@ -20,11 +26,16 @@ OPENAI_MODEL_LIBRARY: dict[str, ModelSpec] = {
             code_execution=True,
         ),
         pricing=ModelPricing(
-            input_nocache=1.25, output=10.0, input_cache_read=0.125, input_cache_write=0.0
+            input_nocache=1.25,
+            output=10.0,
+            input_cache_read=0.125,
+            input_cache_write=0.0,
+            batch_discount=0.5,
         ),
         context_window=400_000,
         max_output_tokens=128_000,
         temperature_range=(0.0, 2.0),
+        vision_limits=OPENAI_VISION_LIMITS,
         release_date="2025-08-07",
     ),
     Model.gpt_5_mini: ModelSpec(
@@ -43,11 +54,16 @@ OPENAI_MODEL_LIBRARY: dict[str, ModelSpec] = {
             code_execution=True,
         ),
         pricing=ModelPricing(
-            input_nocache=0.25, output=2.0, input_cache_read=0.025, input_cache_write=0.0
+            input_nocache=0.25,
+            output=2.0,
+            input_cache_read=0.025,
+            input_cache_write=0.0,
+            batch_discount=0.5,
         ),
         context_window=400_000,
         max_output_tokens=128_000,
         temperature_range=(0.0, 2.0),
+        vision_limits=OPENAI_VISION_LIMITS,
         release_date="2025-08-07",
     ),
     Model.gpt_5_nano: ModelSpec(
@@ -66,11 +82,16 @@ OPENAI_MODEL_LIBRARY: dict[str, ModelSpec] = {
             code_execution=True,
         ),
         pricing=ModelPricing(
-            input_nocache=0.05, output=0.4, input_cache_read=0.005, input_cache_write=0.0
+            input_nocache=0.05,
+            output=0.4,
+            input_cache_read=0.005,
+            input_cache_write=0.0,
+            batch_discount=0.5,
         ),
         context_window=400_000,
         max_output_tokens=128_000,
         temperature_range=(0.0, 2.0),
+        vision_limits=OPENAI_VISION_LIMITS,
         release_date="2025-08-07",
     ),
     Model.gpt_4_1: ModelSpec(
@@ -89,11 +110,16 @@ OPENAI_MODEL_LIBRARY: dict[str, ModelSpec] = {
             code_execution=True,
         ),
         pricing=ModelPricing(
-            input_nocache=2.0, output=8.0, input_cache_read=0.5, input_cache_write=0.0
+            input_nocache=2.0,
+            output=8.0,
+            input_cache_read=0.5,
+            input_cache_write=0.0,
+            batch_discount=0.5,
         ),
         context_window=1_047_576,
         max_output_tokens=32_768,
         temperature_range=(0.0, 2.0),
+        vision_limits=OPENAI_VISION_LIMITS,
         release_date="2025-04-14",
     ),
     Model.gpt_4_1_mini: ModelSpec(
@@ -112,11 +138,16 @@ OPENAI_MODEL_LIBRARY: dict[str, ModelSpec] = {
             code_execution=True,
         ),
         pricing=ModelPricing(
-            input_nocache=0.4, output=1.6, input_cache_read=0.1, input_cache_write=0.0
+            input_nocache=0.4,
+            output=1.6,
+            input_cache_read=0.1,
+            input_cache_write=0.0,
+            batch_discount=0.5,
         ),
         context_window=1_047_576,
         max_output_tokens=32_768,
         temperature_range=(0.0, 2.0),
+        vision_limits=OPENAI_VISION_LIMITS,
         release_date="2025-04-14",
     ),
     Model.gpt_4_1_nano: ModelSpec(
@@ -135,11 +166,16 @@ OPENAI_MODEL_LIBRARY: dict[str, ModelSpec] = {
             code_execution=True,
         ),
         pricing=ModelPricing(
-            input_nocache=0.1, output=0.4, input_cache_read=0.025, input_cache_write=0.0
+            input_nocache=0.1,
+            output=0.4,
+            input_cache_read=0.025,
+            input_cache_write=0.0,
+            batch_discount=0.5,
         ),
         context_window=1_047_576,
         max_output_tokens=32_768,
         temperature_range=(0.0, 2.0),
+        vision_limits=OPENAI_VISION_LIMITS,
         release_date="2025-04-14",
     ),
     Model.o4_mini: ModelSpec(
@@ -158,11 +194,16 @@ OPENAI_MODEL_LIBRARY: dict[str, ModelSpec] = {
             code_execution=True,
         ),
         pricing=ModelPricing(
-            input_nocache=1.1, output=4.4, input_cache_read=0.275, input_cache_write=0.0
+            input_nocache=1.1,
+            output=4.4,
+            input_cache_read=0.275,
+            input_cache_write=0.0,
+            batch_discount=0.5,
         ),
         context_window=200_000,
         max_output_tokens=100_000,
         temperature_range=(0.0, 2.0),
+        vision_limits=OPENAI_VISION_LIMITS,
         release_date="2025-04-16",
     ),
     Model.o3_pro: ModelSpec(
@@ -182,11 +223,16 @@ OPENAI_MODEL_LIBRARY: dict[str, ModelSpec] = {
             code_execution=True,
         ),
         pricing=ModelPricing(
-            input_nocache=20.0, output=80.0, input_cache_read=0.0, input_cache_write=0.0
+            input_nocache=20.0,
+            output=80.0,
+            input_cache_read=0.0,
+            input_cache_write=0.0,
+            batch_discount=0.5,
         ),
         context_window=200_000,
         max_output_tokens=100_000,
         temperature_range=(0.0, 2.0),
+        vision_limits=OPENAI_VISION_LIMITS,
         release_date="2025-06-10",
     ),
     Model.o3: ModelSpec(
@@ -205,11 +251,16 @@ OPENAI_MODEL_LIBRARY: dict[str, ModelSpec] = {
             code_execution=True,
         ),
         pricing=ModelPricing(
-            input_nocache=2.0, output=8.0, input_cache_read=0.5, input_cache_write=0.0
+            input_nocache=2.0,
+            output=8.0,
+            input_cache_read=0.5,
+            input_cache_write=0.0,
+            batch_discount=0.5,
         ),
         context_window=200_000,
         max_output_tokens=100_000,
         temperature_range=(0.0, 2.0),
+        vision_limits=OPENAI_VISION_LIMITS,
         release_date="2025-04-16",
     ),
 }
@@ -1,8 +1,21 @@
 from kintu.types.llmsdk import LLMSDK
 from kintu.types.model import Model
-from kintu.types.model_spec import ModelFeatures, ModelPricing, ModelSpec
+from kintu.types.model_spec import (
+    GEMMA_3N_VISION_LIMITS,
+    ModelFeatures,
+    ModelPricing,
+    ModelSpec,
+    ModelVisionLimits,
+)
 from kintu.types.provider import Provider
 
+# Llama 4 tiles images into at most 16 336x336 patches
+LLAMA_4_TOGETHER_VISION_LIMITS = ModelVisionLimits(
+    max_pixels=16 * 336 * 336, preferred_format="JPEG"
+)
+# Llama 3.2 Vision uses up to 4 560x560 tiles
+LLAMA_3_2_VISION_LIMITS = ModelVisionLimits(max_pixels=4 * 560 * 560, preferred_format="JPEG")
+
 TOGETHER_MODEL_LIBRARY: dict[str, ModelSpec] = {
     Model.llama_4_scout_17b_together: ModelSpec(
         model_id=Model.llama_4_scout_17b_together,
@@ -11,6 +24,7 @@ TOGETHER_MODEL_LIBRARY: dict[str, ModelSpec] = {
         llmsdk_model_id="together_ai/meta-llama/Llama-4-Scout-17B-16E-Instruct",
         provider_model_id="meta-llama/Llama-4-Scout-17B-16E-Instruct",
         model_label="Llama 4 Scout 17B (Together AI)",
+        equivalence_group="llama-4-scout-17b",
         features=ModelFeatures(
             vision=True,
             thinking=False,
@@ -24,6 +38,7 @@ TOGETHER_MODEL_LIBRARY: dict[str, ModelSpec] = {
         context_window=1_048_576,
         max_output_tokens=1_048_576,
         temperature_range=(0.0, 2.0),
+        vision_limits=LLAMA_4_TOGETHER_VISION_LIMITS,
         release_date="2025-04-05",
     ),
     Model.llama_4_maverick_17b_together: ModelSpec(
@@ -33,6 +48,7 @@ TOGETHER_MODEL_LIBRARY: dict[str, ModelSpec] = {
         llmsdk_model_id="together_ai/meta-llama/Llama-4-Maverick-17B-128E-Instruct-FP8",
         provider_model_id="meta-llama/Llama-4-Maverick-17B-128E-Instruct-FP8",
         model_label="Llama 4 Maverick 17B (Together AI)",
+        equivalence_group="llama-4-maverick-17b",
         features=ModelFeatures(
             vision=True,
             thinking=False,
@@ -46,6 +62,7 @@ TOGETHER_MODEL_LIBRARY: dict[str, ModelSpec] = {
         context_window=1_048_576,
         max_output_tokens=1_048_576,
         temperature_range=(0.0, 2.0),
+        vision_limits=LLAMA_4_TOGETHER_VISION_LIMITS,
         release_date="2025-04-05",
     ),
     Model.llama_3_2_11b_vision_together: ModelSpec(
@@ -68,6 +85,7 @@ TOGETHER_MODEL_LIBRARY: dict[str, ModelSpec] = {
         context_window=128_000,
         max_output_tokens=128_000,
         temperature_range=(0.0, 2.0),
+        vision_limits=LLAMA_3_2_VISION_LIMITS,
         release_date="2024-04-18",
     ),
     Model.qwen3_235b_thinking_together: ModelSpec(
@@ -165,6 +183,7 @@ TOGETHER_MODEL_LIBRARY: dict[str, ModelSpec] = {
         llmsdk_model_id="together_ai/openai/gpt-oss-20b",
         provider_model_id="openai/gpt-oss-20b",
         model_label="OpenAI GPT OSS 20B (Together AI)",
+        equivalence_group="gpt-oss-20b",
         features=ModelFeatures(
             vision=False,
             thinking=True,
@@ -187,6 +206,7 @@ TOGETHER_MODEL_LIBRARY: dict[str, ModelSpec] = {
         llmsdk_model_id="together_ai/openai/gpt-oss-120b",
         provider_model_id="openai/gpt-oss-120b",
         model_label="OpenAI GPT OSS 120B (Together AI)",
+        equivalence_group="gpt-oss-120b",
         features=ModelFeatures(
             vision=False,
             thinking=True,
@@ -212,6 +232,7 @@ TOGETHER_MODEL_LIBRARY: dict[str, ModelSpec] = {
         llmsdk_model_id="together_ai/moonshotai/Kimi-K2-Instruct",
         provider_model_id="moonshotai/Kimi-K2-Instruct",
         model_label="Kimi K2 Instruct (Together AI)",
+        equivalence_group="kimi-k2-instruct",
         features=ModelFeatures(
             vision=False,
             thinking=False,
@@ -247,6 +268,7 @@ TOGETHER_MODEL_LIBRARY: dict[str, ModelSpec] = {
         context_window=32_000,
         max_output_tokens=32_000,
         temperature_range=(0.0, 2.0),
+        vision_limits=GEMMA_3N_VISION_LIMITS,
         release_date="2025-06-25",
     ),
     Model.deepseek_r1_0528_tput_together: ModelSpec(
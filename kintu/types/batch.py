@@ -0,0 +1,30 @@
+import enum
+from typing import Any
+
+from pydantic import BaseModel
+
+from kintu.types.model import Model
+from kintu.types.provider import Provider
+
+
+class BatchStatus(str, enum.Enum):
+    IN_PROGRESS = "in_progress"  # Queued, running or finalizing
+    COMPLETED = "completed"  # Results are ready; single requests may still have failed
+    FAILED = "failed"
+    CANCELLED = "cancelled"
+    EXPIRED = "expired"  # Not finished within the provider's completion window
+
+
+class BatchJob(BaseModel):
+    """A batch of completions submitted to a provider's batch API (see BatchRunner)."""
+
+    id: str  # The provider's batch id (a resource name for Gemini)
+    provider: Provider
+    model: Model
+    status: BatchStatus
+    request_count: int  # Requests carry their index in the batch as custom id
+    submitted_at: float  # Unix time
+    provider_data: dict[str, Any] = {}  # The provider's latest batch object
+    cost: float | None = None  # USD at batch prices, once the results are in
+    # ApiKey.id of the key that submitted the batch: only it can see the batch
+    api_key_id: str | None = None
@@ -1,6 +1,9 @@
 from __future__ import annotations
 
-from typing import Any, Protocol
+import enum
+import json
+from collections.abc import Iterator
+from typing import Any, Protocol, runtime_checkable
 
 from pydantic import BaseModel, ConfigDict
 
@@ -26,10 +29,34 @@ class LLMUsage(BaseModel):
 
 class RequestTiming(BaseModel):
     # All times in seconds
-    ttft: float  # Time to first token. Maybe be a reasoning token.
+    ttft: float  # Time to first token. Maybe be a reasoning token. Without streaming, duration.
     duration: float  # Total request duration
 
 
+class StreamRetention(str, enum.Enum):
+    # What a streamed CompleteReply keeps of the raw chunks in provider_response. The reply
+    # messages are built incrementally either way.
+    ALL = "all"  # list of every StreamChunk
+    FIRST_LAST = "first_last"  # list of the first and last StreamChunk
+    NONE = "none"  # empty list
+    DISK = "disk"  # SpilledStreamChunks, one JSON line per chunk in a temporary file
+
+
+class Priority(str, enum.Enum):
+    # Scheduling class of a request when a Scheduler queues it. A higher class is always
+    # sent first; within a class, tenants share capacity by weight.
+    INTERACTIVE = "interactive"  # A user is waiting
+    DEFAULT = "default"
+    BULK = "bulk"  # Backfills and offline jobs
+
+
+class StreamBatchWindow(BaseModel):
+    """When stream_batch_callback is called: whichever limit is reached first."""
+
+    max_chunks: int | None = 64
+    max_delay: float | None = 0.02  # Seconds since the first chunk of the batch
+
+
 # Core API types
 class CompleteInput(BaseModel):
     messages: list[Message]
@@ -50,6 +77,19 @@ class CompleteInput(BaseModel):
     # Streaming
     stream: bool = False
     stream_callback: AsyncStreamCallback | None = None
+    # Receives chunks in batches, flushed when a window fills up or times out
+    stream_batch_callback: AsyncStreamBatchCallback | None = None
+    stream_batch_window: StreamBatchWindow = StreamBatchWindow()
+    stream_retention: StreamRetention = StreamRetention.ALL
+    stream_spill_dir: str | None = None  # For StreamRetention.DISK, default temp directory
+
+    # Scheduling (see Scheduler). Neither changes the reply.
+    priority: Priority = Priority.DEFAULT
+    tenant: str | None = None  # Tag that capacity is shared fairly between
+
+    # Absolute time.time() by which the reply is needed. Past it, the request is abandoned
+    # with DeadlineExceededError, and no retry or failover starts that cannot finish by it.
+    deadline: float | None = None
 
     model_config = ConfigDict(arbitrary_types_allowed=True)
 
@@ -64,28 +104,67 @@ class CompleteReply(BaseModel):
     usage: LLMUsage
     timing: RequestTiming
 
-    # Raw provider data (always preserved)
-    provider_response: Any | list[Any]  # Single response or list of stream chunks
+    # Raw provider data. A single response, or stream chunks as set by stream_retention
+    provider_response: Any | list[Any]
     # TODO: Better typing
 
     model_config = ConfigDict(arbitrary_types_allowed=True)
 
 
 # Streaming types
+class StreamDeltaType(str, enum.Enum):
+    TEXT = "text"
+    THINKING = "thinking"
+    TOOL_CALL = "tool_call"  # text is a fragment of the arguments JSON
+
+
+class StreamDelta(BaseModel):
+    """An incremental piece of the reply, decoded from a provider chunk."""
+
+    type: StreamDeltaType
+    # Output item the delta extends. Deltas of the same type and index belong together.
+    index: int
+    text: str = ""
+    # Set on the first delta of each tool call
+    tool_id: str | None = None
+    tool_name: str | None = None
+
+
 class StreamChunk(BaseModel):
     """
     A streaming chunk with provider data and timing.
 
-    kintu does not interpret the provider data at all.
+    kintu does not interpret the provider data at all. The typed deltas decoded from it
+    are in `deltas`.
     """
 
     provider_data: Any
     timestamp: float
     chunk_index: int
+    deltas: list[StreamDelta] = []
 
     model_config = ConfigDict(arbitrary_types_allowed=True)
 
 
-# Streaming callback
+class SpilledStreamChunks(BaseModel):
+    """Stream chunks written to disk under StreamRetention.DISK. The caller owns the file."""
+
+    path: str
+    count: int
+
+    def chunks(self) -> Iterator[StreamChunk]:
+        """Read the chunks back, one at a time."""
+        with open(self.path, encoding="utf-8") as f:
+            for line in f:
+                yield StreamChunk.model_validate(json.loads(line))
+
+
+# Streaming callback. Runtime checkable so pydantic can validate it on CompleteInput.
+@runtime_checkable
 class AsyncStreamCallback(Protocol):
     async def __call__(self, chunk: StreamChunk) -> None: ...
+
+
+@runtime_checkable
+class AsyncStreamBatchCallback(Protocol):
+    async def __call__(self, chunks: list[StreamChunk]) -> None: ...
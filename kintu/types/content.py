@@ -1,10 +1,78 @@
 from __future__ import annotations
 
-from typing import Any
+import mmap
+import os
+from typing import Any, TypeVar
 
 from PIL import Image
 from pydantic import BaseModel, ConfigDict
 
+ModelT = TypeVar("ModelT", bound=BaseModel)
+
+
+class _TrustedLayout:
+    """What construct_trusted needs to know about a model class, computed once."""
+
+    __slots__ = ("names", "fields_set", "defaults", "private")
+
+    def __init__(self, cls: type[BaseModel]):
+        self.names = tuple(cls.model_fields)
+        self.fields_set = set(self.names)
+        self.defaults = {
+            name: field for name, field in cls.model_fields.items() if not field.is_required()
+        }
+        self.private = cls.__private_attributes__
+
+
+_TRUSTED_LAYOUTS: dict[type[BaseModel], _TrustedLayout] = {}
+
+
+def construct_trusted(cls: type[ModelT], values: dict[str, Any]) -> ModelT:
+    """
+    Build a model from already-valid field values, skipping validation.
+
+    Unlike `model_construct`, every instance of a class shares one
+    `__pydantic_fields_set__` holding all of its fields, which saves a set (and a GC
+    tracked container) per instance: about a third less memory for a large history.
+    It is not faster than validated construction, whose validator runs in compiled
+    code. Values are stored as given and never checked, so this is only for data kintu
+    produced itself or has already validated; only the field names are.
+
+    Raises ValueError for a name that is not a field or a required field left out.
+    """
+    layout = _TRUSTED_LAYOUTS.get(cls)
+    if layout is None:
+        layout = _TRUSTED_LAYOUTS[cls] = _TrustedLayout(cls)
+    if tuple(values) == layout.names:
+        # Every field given, in declaration order, which serialization follows
+        data = dict(values)
+    elif values.keys() == layout.fields_set:
+        data = {name: values[name] for name in layout.names}
+    else:
+        unknown = values.keys() - layout.fields_set
+        if unknown:
+            raise ValueError(f"{cls.__name__} has no fields {', '.join(sorted(unknown))}")
+        missing = [
+            name for name in layout.names if name not in values and name not in layout.defaults
+        ]
+        if missing:
+            raise ValueError(f"{cls.__name__} requires fields {', '.join(missing)}")
+        data = {
+            name: values[name]
+            if name in values
+            else layout.defaults[name].get_default(call_default_factory=True)
+            for name in layout.names
+        }
+    instance = cls.__new__(cls)
+    object.__setattr__(instance, "__dict__", data)
+    object.__setattr__(instance, "__pydantic_fields_set__", layout.fields_set)
+    object.__setattr__(instance, "__pydantic_extra__", None)
+    private = None
+    if layout.private:
+        private = {name: attribute.get_default() for name, attribute in layout.private.items()}
+    object.__setattr__(instance, "__pydantic_private__", private)
+    return instance
+
 
 # Content is a general holder for entities that go into/out of the LLM. Usually you will send the
 # LLM a series of Messages, each of which will be associated with a single specific Content type.
@@ -15,6 +83,15 @@ class Content(BaseModel):
 
     model_config = ConfigDict(arbitrary_types_allowed=True)
 
+    @classmethod
+    def trusted(cls: type[ModelT], **values: Any) -> ModelT:
+        """
+        Construct without validation, to save memory in large histories built from
+        trusted data (e.g. parsed provider responses or a stored conversation). See
+        construct_trusted.
+        """
+        return construct_trusted(cls, values)
+
 
 class TextContent(Content):
     text: str
@@ -25,9 +102,28 @@ class ImageContent(Content):
 
 
 class DocumentContent(Content):
-    document: bytes
+    # A memoryview (see from_path) is kept as-is, so large documents are never copied
+    document: bytes | memoryview
     _openai_filename: str | None = None
 
+    @classmethod
+    def from_path(cls, path: str | os.PathLike[str]) -> DocumentContent:
+        """
+        Create a DocumentContent backed by a read-only memory map of a file.
+
+        The file is paged in by the OS as the request body is streamed out, instead of
+        being read into memory up front.
+        """
+        with open(path, "rb") as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                document: bytes | memoryview = b""
+            else:
+                # The memoryview keeps the map alive; the file descriptor is not needed
+                document = memoryview(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ))
+        content = cls(document=document)
+        content._openai_filename = os.path.basename(path)
+        return content
+
 
 class ThinkingContent(Content):
     thinking: str
@@ -53,6 +149,7 @@ class ToolResultContent(Content):
 class AnthropicRedactedThinkingContent(Content):
     data: str
 
+
 # Anthropic-specific content types
 class AnthropicServerToolUse(Content):
     """Anthropic server-side tool use (web search, code execution, etc.)"""
@@ -1,3 +1,6 @@
+from typing import Any
+
+
 class KintuError(Exception):
     """Base class for all Kintu errors."""
 
@@ -14,3 +17,73 @@ class InvalidLiteLLMModelError(KintuError):
     """Raised when a model is not a valid LiteLLM model."""
 
     pass
+
+
+class UnsupportedContentError(KintuError):
+    """Raised when a Content type cannot be sent to the model's LLM SDK."""
+
+    pass
+
+
+class TooManyImagesError(KintuError):
+    """Raised when a request has more images than the model accepts."""
+
+    pass
+
+
+class ProviderAPIError(KintuError):
+    """Raised when a provider responds with a non-success HTTP status."""
+
+    def __init__(
+        self,
+        message: str,
+        status_code: int,
+        body: str = "",
+        headers: dict[str, str] | None = None,
+    ):
+        super().__init__(message)
+        self.status_code = status_code
+        self.body = body
+        self.headers = headers or {}
+        # Seconds the provider asked to wait, set by RetryPolicy when too long to wait for
+        self.retry_after: float | None = None
+
+
+class ProviderConnectionError(KintuError):
+    """Raised when a provider cannot be reached or the connection drops mid-request."""
+
+    pass
+
+
+class RetriesExhaustedError(KintuError):
+    """Raised when a retryable error persists through every attempt a RetryPolicy allows."""
+
+    def __init__(self, message: str, attempts: int, last_error: BaseException):
+        super().__init__(message)
+        self.attempts = attempts
+        self.last_error = last_error
+
+
+class CircuitOpenError(KintuError):
+    """Raised without sending a request while a provider's circuit breaker is open."""
+
+    def __init__(self, message: str, provider: str, retry_in: float):
+        super().__init__(message)
+        self.provider = provider
+        self.retry_in = retry_in  # Seconds until the breaker lets a trial request through
+
+
+class BatchError(KintuError):
+    """Raised for a batch that failed or expired, or a request in a batch that did."""
+
+    def __init__(self, message: str, body: Any = None):
+        super().__init__(message)
+        self.body = body  # The provider's error object, where it sent one
+
+
+class DeadlineExceededError(KintuError):
+    """Raised once a CompleteInput's deadline has passed, or when work cannot finish by it."""
+
+    def __init__(self, message: str, deadline: float):
+        super().__init__(message)
+        self.deadline = deadline  # The input's deadline, in time.time() seconds
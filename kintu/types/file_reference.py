@@ -0,0 +1,19 @@
+import time
+
+from pydantic import BaseModel
+
+from kintu.types.provider import Provider
+
+
+class FileReference(BaseModel):
+    """A file uploaded to a provider's Files API, sent in place of inline content."""
+
+    provider: Provider
+    file_id: str  # Anthropic/OpenAI file id, or the Gemini file resource name
+    mime_type: str
+    uri: str | None = None  # Gemini references files by URI
+    expires_at: float | None = None  # Unix time, None if the provider keeps it until deleted
+
+    def is_expired(self, margin: float = 0.0) -> bool:
+        """Whether the file expires within `margin` seconds from now."""
+        return self.expires_at is not None and self.expires_at - margin <= time.time()
@@ -1,6 +1,8 @@
+from typing import Any
+
 from pydantic import BaseModel, ConfigDict
 
-from kintu.types.content import Content
+from kintu.types.content import Content, construct_trusted
 from kintu.types.role import Role
 
 
@@ -9,3 +11,8 @@ class Message(BaseModel):
     content: Content
 
     model_config = ConfigDict(arbitrary_types_allowed=True)
+
+    @classmethod
+    def trusted(cls, role: Role, content: Content, **values: Any) -> "Message":
+        """Construct without validation. See Content.trusted."""
+        return construct_trusted(cls, {"role": role, "content": content, **values})
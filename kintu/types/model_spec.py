@@ -1,5 +1,6 @@
 from pydantic import BaseModel, Field
 
+from kintu.types.complete import LLMUsage
 from kintu.types.llmsdk import LLMSDK
 from kintu.types.model import Model
 from kintu.types.provider import Provider
@@ -18,6 +19,40 @@ class ModelPricing(BaseModel):
     input_nocache: float = Field(description="Cost per million input tokens that are neither written to cache or read from cache")
     input_cache_read: float = Field(description="Cost per million cached input tokens")
     input_cache_write: float = Field(description="Cost to write million tokens to cache")
+    batch_discount: float | None = Field(
+        default=None,
+        description="Multiplier on all prices through the provider's batch API, if it has one",
+    )
+
+    def cost(self, usage: LLMUsage, batch: bool = False) -> float:
+        """USD cost of a request's usage. Reasoning tokens are billed as output."""
+        total = (
+            usage.input_uncached_tokens * self.input_nocache
+            + usage.input_cached_tokens * self.input_cache_read
+            + usage.input_cache_write_tokens * self.input_cache_write
+            + (usage.completion_tokens + usage.reasoning_tokens) * self.output
+        ) / 1_000_000
+        if batch:
+            if self.batch_discount is None:
+                raise ValueError("The model has no batch pricing")
+            total *= self.batch_discount
+        return total
+
+
+class ModelVisionLimits(BaseModel):
+    # Images beyond these limits are downscaled by the provider anyway, so kintu can fit them
+    # before upload (see ImagePreprocessor)
+    max_pixels: int | None = Field(
+        default=None, description="Largest image area (width * height) the model uses as-is"
+    )
+    max_images: int | None = Field(default=None, description="Maximum images per request")
+    preferred_format: str = Field(
+        default="JPEG", description="PIL format name images are recompressed to"
+    )
+
+
+# Gemma 3n encodes images at up to 768x768, whichever provider serves it
+GEMMA_3N_VISION_LIMITS = ModelVisionLimits(max_pixels=768 * 768, preferred_format="JPEG")
 
 
 class ModelSpec(BaseModel):
@@ -28,6 +63,10 @@ class ModelSpec(BaseModel):
     llmsdk_model_id: str = Field(description="The ID used by the LLM SDK")
     provider_model_id: str = Field(description="The ID used by the provider's API")
     model_label: str = Field(description="Human-readable name")
+    equivalence_group: str | None = Field(
+        default=None,
+        description="Shared by models that serve the same weights via different providers",
+    )
 
     features: ModelFeatures
     pricing: ModelPricing
@@ -35,5 +74,6 @@ class ModelSpec(BaseModel):
     context_window: int
     max_output_tokens: int
     temperature_range: tuple[float, float]
+    vision_limits: ModelVisionLimits | None = None  # Only set for models with vision
 
     release_date: str = Field(description="Model release date")
@@ -1,11 +1,260 @@
 import base64
+import email.utils
+import hashlib
 import io
+import re
+import threading
+import weakref
+from collections import OrderedDict
+from datetime import datetime, timezone
 
 from PIL import Image
 
 
+def image_digest(image: Image.Image) -> str:
+    """Content hash of an image's pixels, mode and size."""
+    hasher = hashlib.blake2b(digest_size=16)
+    hasher.update(f"{image.mode}:{image.size[0]}x{image.size[1]}:".encode("ascii"))
+    if image.mode == "P":
+        # Palette images with the same indices can render differently
+        hasher.update(bytes(image.getpalette() or []))
+    hasher.update(image.tobytes())
+    return hasher.hexdigest()
+
+
+# Digests of live Image objects, by id (see cached_image_digest)
+_IMAGE_DIGESTS: dict[int, tuple[weakref.ref[Image.Image], str]] = {}
+
+
+def cached_image_digest(image: Image.Image) -> str:
+    """
+    image_digest, remembered for as long as the Image object lives, so an image sent on
+    every turn is only hashed once. Images are not expected to change once in a Content.
+    """
+    digest = known_image_digest(image)
+    if digest is None:
+        digest = remember_image_digest(image, image_digest(image))
+    return digest
+
+
+def known_image_digest(image: Image.Image) -> str | None:
+    """The image's digest if it was already computed, without hashing it."""
+    memo = _IMAGE_DIGESTS.get(id(image))
+    if memo is not None and memo[0]() is image:
+        return memo[1]
+    return None
+
+
+def remember_image_digest(image: Image.Image, digest: str) -> str:
+    """Record an image's digest computed elsewhere, e.g. in a worker process."""
+    key = id(image)
+    _IMAGE_DIGESTS[key] = (weakref.ref(image, lambda _: _IMAGE_DIGESTS.pop(key, None)), digest)
+    return digest
+
+
+def key_digest(api_key: str) -> str:
+    """Short hash that tells API keys apart, e.g. in cache keys, without revealing them."""
+    return hashlib.blake2b(api_key.encode("utf-8"), digest_size=8).hexdigest()
+
+
+def encode_image(image: Image.Image, format: str, quality: int | None = None) -> bytes:
+    """Encode a PIL Image into the given format (e.g. PNG, JPEG, WEBP)."""
+    buffer = io.BytesIO()
+    if format == "JPEG" and image.mode not in ("RGB", "L"):
+        if "A" in image.getbands() or image.mode == "P":
+            # JPEG has no alpha channel, so flatten onto white rather than black
+            rgba = image.convert("RGBA")
+            flattened = Image.new("RGB", rgba.size, (255, 255, 255))
+            flattened.paste(rgba, mask=rgba.getchannel("A"))
+            image = flattened
+        else:
+            image = image.convert("RGB")
+    if quality is None:
+        image.save(buffer, format=format)
+    else:
+        image.save(buffer, format=format, quality=quality)
+    return buffer.getvalue()
+
+
+class EncodedImageCache:
+    """
+    Bounded LRU cache of base64-encoded images.
+
+    Entries are keyed by the image's content digest and the target format, so the same
+    pixels are only encoded once per format no matter how many ImageContent objects or
+    turns they appear in. Both the number of entries and the total size of the stored
+    payloads are bounded.
+    """
+
+    def __init__(self, max_entries: int = 256, max_bytes: int = 256 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict[tuple[str, str], str] = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def get_or_encode(self, image: Image.Image, format: str = "PNG") -> str:
+        """Get the base64 payload for an image, encoding it on a miss."""
+        key = (cached_image_digest(image), format)
+        cached = self.get(key)
+        if cached is not None:
+            return cached
+        payload = base64.b64encode(encode_image(image, format)).decode("utf-8")
+        self.put(key, payload)
+        return payload
+
+    def get(self, key: tuple[str, str]) -> str | None:
+        """Look up a payload by (digest, format), counting the hit or miss."""
+        with self._lock:
+            payload = self._entries.get(key)
+            if payload is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return payload
+
+    def put(self, key: tuple[str, str], payload: str) -> None:
+        """Store a payload, evicting least recently used entries to stay within bounds."""
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._size -= len(previous)
+            if len(payload) > self.max_bytes:
+                return
+            self._entries[key] = payload
+            self._size += len(payload)
+            while len(self._entries) > self.max_entries or self._size > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._size -= len(evicted)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+            self.hits = 0
+            self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @property
+    def size_bytes(self) -> int:
+        return self._size
+
+
+# Process-wide cache used by image_to_base64 and the client backends
+IMAGE_CACHE = EncodedImageCache()
+
+
+def image_to_base64(image: Image.Image, format: str = "PNG") -> str:
+    """Convert PIL Image to a base64 string in the given format, using IMAGE_CACHE."""
+    return IMAGE_CACHE.get_or_encode(image, format)
+
+
 def image_to_base64_png(image: Image.Image) -> str:
     """Convert PIL Image to base64 string."""
-    buffer = io.BytesIO()
-    image.save(buffer, format="PNG")
-    return base64.b64encode(buffer.getvalue()).decode("utf-8")
+    return image_to_base64(image, "PNG")
+
+
+# Rate limit headers, lowercase. Providers report the reset either as a duration
+# ("6m0s", "250ms", "2") or, for Anthropic, as an RFC 3339 timestamp.
+_REMAINING_REQUESTS_HEADERS = (
+    "x-ratelimit-remaining-requests",
+    "anthropic-ratelimit-requests-remaining",
+)
+_REMAINING_TOKENS_HEADERS = ("x-ratelimit-remaining-tokens", "anthropic-ratelimit-tokens-remaining")
+_RESET_HEADERS = (
+    "x-ratelimit-reset-requests",
+    "x-ratelimit-reset-tokens",
+    "x-ratelimit-reset",
+    "anthropic-ratelimit-requests-reset",
+    "anthropic-ratelimit-tokens-reset",
+)
+# The remaining count and reset time reported for the same window
+_WINDOW_HEADERS = (
+    ("x-ratelimit-remaining-requests", "x-ratelimit-reset-requests"),
+    ("x-ratelimit-remaining-tokens", "x-ratelimit-reset-tokens"),
+    ("anthropic-ratelimit-requests-remaining", "anthropic-ratelimit-requests-reset"),
+    ("anthropic-ratelimit-tokens-remaining", "anthropic-ratelimit-tokens-reset"),
+)
+_DURATION_PART = re.compile(r"(\d+(?:\.\d+)?)(ms|s|m|h)")
+_DURATION_UNITS = {"ms": 0.001, "s": 1.0, "m": 60.0, "h": 3600.0}
+
+
+def parse_wait(value: str) -> float | None:
+    """Seconds from now given by a duration, an RFC 3339 timestamp or an HTTP date."""
+    value = value.strip()
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    parts = _DURATION_PART.findall(value)
+    if parts and "".join(number + unit for number, unit in parts) == value:
+        return sum(float(number) * _DURATION_UNITS[unit] for number, unit in parts)
+    try:
+        when = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    except ValueError:
+        try:
+            when = email.utils.parsedate_to_datetime(value)
+        except (TypeError, ValueError):
+            return None
+    if when.tzinfo is None:
+        return None
+    return max(0.0, (when - datetime.now(timezone.utc)).total_seconds())
+
+
+def retry_after(headers: dict[str, str]) -> float | None:
+    """Seconds a provider asked to wait before retrying, if it said."""
+    headers = {key.lower(): value for key, value in headers.items()}
+    if "retry-after-ms" in headers:
+        try:
+            return max(0.0, float(headers["retry-after-ms"]) / 1000)
+        except ValueError:
+            pass
+    if "retry-after" in headers:
+        return parse_wait(headers["retry-after"])
+    return None
+
+
+def rate_limit_remaining(headers: dict[str, str]) -> tuple[int | None, int | None]:
+    """Requests and tokens left in the current rate limit window, where reported."""
+    headers = {key.lower(): value for key, value in headers.items()}
+
+    def first_int(names: tuple[str, ...]) -> int | None:
+        for name in names:
+            if name in headers:
+                try:
+                    return int(float(headers[name]))
+                except ValueError:
+                    return None
+        return None
+
+    return first_int(_REMAINING_REQUESTS_HEADERS), first_int(_REMAINING_TOKENS_HEADERS)
+
+
+def rate_limit_reset(headers: dict[str, str]) -> float | None:
+    """
+    Seconds until the spent rate limit window resets: the latest reset of the windows
+    with nothing remaining, or of every reported window when none is known to be spent.
+    """
+    headers = {key.lower(): value for key, value in headers.items()}
+    waits = {name: parse_wait(headers[name]) for name in _RESET_HEADERS if name in headers}
+    known = {name: wait for name, wait in waits.items() if wait is not None}
+    spent = [
+        known[reset]
+        for remaining, reset in _WINDOW_HEADERS
+        if reset in known and _is_zero(headers.get(remaining))
+    ]
+    if spent:
+        return max(spent)
+    return max(known.values()) if known else None
+
+
+def _is_zero(value: str | None) -> bool:
+    try:
+        return value is not None and float(value) <= 0
+    except ValueError:
+        return False
@@ -1,7 +1,22 @@
 """Pytest configuration and shared fixtures."""
 
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
 import pytest
 
+from kintu.client.http_pool import HTTPPool
+from kintu.client.kintu_client import KintuClient
+from kintu.credential_manager import ENV_VAR_MAPPING
+from kintu.types.complete import CompleteInput
+from kintu.types.content import TextContent
+from kintu.types.message import Message
+from kintu.types.model import Model
+from kintu.types.provider import Provider
+from kintu.types.role import Role
+
 
 @pytest.fixture
 def sample_config():
@@ -11,3 +26,212 @@ def sample_config():
         "model": "test-model",
         "temperature": 0.7,
     }
+
+
+class StubResponse:
+    """A canned HTTP response served by the stub provider server."""
+
+    def __init__(
+        self,
+        body: bytes | dict | list,
+        status: int = 200,
+        content_type: str = "application/json",
+        headers: dict[str, str] | None = None,
+        delay: float = 0.0,
+    ):
+        if not isinstance(body, bytes):
+            body = json.dumps(body).encode("utf-8")
+        self.body = body
+        self.status = status
+        self.content_type = content_type
+        self.headers = headers or {}
+        self.delay = delay  # Seconds to wait before responding
+
+
+def sse_body(events: list[dict]) -> bytes:
+    """Encode events as a text/event-stream body."""
+    return b"".join(f"data: {json.dumps(event)}\n\n".encode("utf-8") for event in events)
+
+
+# Provider replies and inputs shared by the client tests
+ANTHROPIC_REPLY = {
+    "content": [{"type": "text", "text": "Hello from Claude"}],
+    "usage": {"input_tokens": 10, "output_tokens": 5, "cache_read_input_tokens": 2},
+}
+
+OPENAI_REPLY = {
+    "output": [
+        {
+            "type": "reasoning",
+            "id": "rs_1",
+            "summary": [{"type": "summary_text", "text": "Thinking..."}],
+        },
+        {"type": "message", "content": [{"type": "output_text", "text": "Hello from GPT"}]},
+    ],
+    "usage": {
+        "input_tokens": 20,
+        "input_tokens_details": {"cached_tokens": 5},
+        "output_tokens": 12,
+        "output_tokens_details": {"reasoning_tokens": 4},
+    },
+}
+
+GEMINI_REPLY = {
+    "candidates": [
+        {
+            "content": {
+                "role": "model",
+                "parts": [{"functionCall": {"name": "lookup", "args": {"q": "kintu"}}}],
+            }
+        }
+    ],
+    "usageMetadata": {"promptTokenCount": 7, "candidatesTokenCount": 3},
+}
+
+CHAT_REPLY = {
+    "choices": [{"message": {"role": "assistant", "content": "Hello from Groq"}}],
+    "usage": {"prompt_tokens": 4, "completion_tokens": 6},
+}
+
+
+def block_delta(index: int, **delta) -> dict:
+    return {"type": "content_block_delta", "index": index, "delta": delta}
+
+
+ANTHROPIC_EVENTS = [
+    {"type": "message_start", "message": {"usage": {"input_tokens": 3}}},
+    {"type": "content_block_start", "index": 0, "content_block": {"type": "thinking"}},
+    block_delta(0, type="thinking_delta", thinking="Hm"),
+    block_delta(0, type="signature_delta", signature="sig"),
+    {"type": "content_block_stop", "index": 0},
+    {"type": "content_block_start", "index": 1, "content_block": {"type": "text", "text": ""}},
+    block_delta(1, type="text_delta", text="Hel"),
+    block_delta(1, type="text_delta", text="lo"),
+    {"type": "content_block_stop", "index": 1},
+    {
+        "type": "content_block_start",
+        "index": 2,
+        "content_block": {"type": "tool_use", "id": "toolu_1", "name": "lookup", "input": {}},
+    },
+    block_delta(2, type="input_json_delta", partial_json='{"q": '),
+    block_delta(2, type="input_json_delta", partial_json='"kintu"}'),
+    {"type": "content_block_stop", "index": 2},
+    {"type": "message_delta", "usage": {"output_tokens": 9}},
+    {"type": "message_stop"},
+]
+
+
+def make_input(model: Model, **kwargs) -> CompleteInput:
+    return CompleteInput(
+        messages=[
+            Message(role=Role.SYSTEM, content=TextContent(text="Be brief.")),
+            Message(role=Role.USER, content=TextContent(text="Hi")),
+        ],
+        model=model,
+        **kwargs,
+    )
+
+
+class StubProviderServer:
+    """
+    Local HTTP/1.1 server standing in for provider APIs.
+
+    Responses are registered per path (query string ignored) and every request is
+    recorded together with the client port, so tests can check connection reuse.
+    """
+
+    def __init__(self):
+        self.responses: dict[str, list[StubResponse]] = {}
+        self.requests: list[dict] = []
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, format, *args):
+                pass
+
+            def _handle(self):
+                length = int(self.headers.get("Content-Length") or 0)
+                raw = self.rfile.read(length) if length else b""
+                path = self.path.split("?")[0]
+                stub.requests.append(
+                    {
+                        "method": self.command,
+                        "path": self.path,
+                        "headers": dict(self.headers),
+                        "body": raw,
+                        "client_port": self.client_address[1],
+                    }
+                )
+                queue = stub.responses.get(path)
+                if not queue:
+                    response = StubResponse({"error": f"no stub for {path}"}, status=404)
+                else:
+                    # The last registered response is sticky
+                    response = queue.pop(0) if len(queue) > 1 else queue[0]
+                if response.delay:
+                    time.sleep(response.delay)
+                self.send_response(response.status)
+                self.send_header("Content-Type", response.content_type)
+                self.send_header("Content-Length", str(len(response.body)))
+                for key, value in response.headers.items():
+                    self.send_header(key, value)
+                self.end_headers()
+                self.wfile.write(response.body)
+
+            do_GET = _handle
+            do_POST = _handle
+            do_PUT = _handle
+            do_DELETE = _handle
+
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.httpd.daemon_threads = True
+        self.thread = threading.Thread(
+            target=self.httpd.serve_forever, kwargs={"poll_interval": 0.05}, daemon=True
+        )
+
+    @property
+    def url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def add(self, path: str, response: StubResponse) -> None:
+        self.responses.setdefault(path, []).append(response)
+
+    def json_body(self, index: int = -1) -> dict:
+        return json.loads(self.requests[index]["body"])
+
+    def start(self) -> None:
+        self.thread.start()
+
+    def stop(self) -> None:
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+@pytest.fixture
+def stub_server():
+    """A running StubProviderServer."""
+    server = StubProviderServer()
+    server.start()
+    yield server
+    server.stop()
+
+
+@pytest.fixture
+def api_keys(monkeypatch):
+    """Fake API keys for every provider."""
+    for env_var in ENV_VAR_MAPPING.values():
+        monkeypatch.setenv(env_var, f"test-{env_var.lower()}")
+
+
+@pytest.fixture
+def client_factory(stub_server):
+    """Builds KintuClients that send every provider's requests to the stub server."""
+
+    def make(**kwargs) -> KintuClient:
+        pool = HTTPPool(base_urls={provider: stub_server.url for provider in Provider})
+        return KintuClient(pool=pool, **kwargs)
+
+    return make
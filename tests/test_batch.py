@@ -0,0 +1,229 @@
+"""Tests for provider batch APIs against a local fake batch server."""
+
+import asyncio
+import json
+
+import pytest
+
+from kintu.client.batch import BatchRunner
+from kintu.client.http_pool import HTTPPool
+from kintu.client.kintu_client import KintuClient
+from kintu.model_library.model_library import get_spec
+from kintu.types.batch import BatchStatus
+from kintu.types.complete import LLMUsage
+from kintu.types.content import TextContent
+from kintu.types.errors import BatchError, ProviderAPIError
+from kintu.types.model import Model
+from kintu.types.provider import Provider
+from tests.conftest import ANTHROPIC_REPLY, GEMINI_REPLY, OPENAI_REPLY, StubResponse, make_input
+
+
+def jsonl(records: list[dict]) -> bytes:
+    return b"".join(json.dumps(record).encode("utf-8") + b"\n" for record in records)
+
+
+def make_runner(stub_server) -> BatchRunner:
+    pool = HTTPPool(base_urls={provider: stub_server.url for provider in Provider})
+    return BatchRunner(KintuClient(pool=pool), poll_interval=0.01)
+
+
+def test_cost_at_batch_prices():
+    pricing = get_spec(Model.claude_4_sonnet_20250514).pricing
+    usage = LLMUsage(input_uncached_tokens=1_000_000, completion_tokens=1_000_000)
+    assert pricing.cost(usage) == pricing.input_nocache + pricing.output
+    assert pricing.cost(usage, batch=True) == pricing.cost(usage) / 2
+
+
+def test_anthropic(stub_server, api_keys):
+    stub_server.add(
+        "/v1/messages/batches", StubResponse({"id": "b1", "processing_status": "in_progress"})
+    )
+    path = "/v1/messages/batches/b1"
+    stub_server.add(path, StubResponse({"id": "b1", "processing_status": "in_progress"}))
+    stub_server.add(path, StubResponse({"id": "b1", "processing_status": "ended"}))
+    results = [
+        {"custom_id": "1", "result": {"type": "errored", "error": {"type": "overloaded"}}},
+        {"custom_id": "0", "result": {"type": "succeeded", "message": ANTHROPIC_REPLY}},
+    ]
+    stub_server.add(f"{path}/results", StubResponse(jsonl(results), content_type="text/plain"))
+    runner = make_runner(stub_server)
+    model = Model.claude_4_sonnet_20250514
+
+    async def run():
+        async with runner.client:
+            job = await runner.submit([make_input(model), make_input(model, max_tokens=50)])
+            assert job.status == BatchStatus.IN_PROGRESS
+            job = await runner.wait(job)
+            return job, await runner.results(job)
+
+    job, (reply, error) = asyncio.run(run())
+    assert job.status == BatchStatus.COMPLETED
+    assert reply.messages[0].content == TextContent(text="Hello from Claude")
+    assert (reply.usage.input_uncached_tokens, reply.usage.input_cached_tokens) == (10, 2)
+    assert isinstance(error, BatchError)
+    assert job.cost == pytest.approx(get_spec(model).pricing.cost(reply.usage) / 2)
+    submitted = stub_server.json_body(0)["requests"]
+    assert [request["custom_id"] for request in submitted] == ["0", "1"]
+    assert submitted[1]["params"]["max_tokens"] == 50
+    assert "stream" not in submitted[0]["params"]
+
+
+def test_openai(stub_server, api_keys):
+    stub_server.add("/v1/files", StubResponse({"id": "file-in"}))
+    stub_server.add("/v1/batches", StubResponse({"id": "batch_1", "status": "validating"}))
+    stub_server.add(
+        "/v1/batches/batch_1",
+        StubResponse(
+            {
+                "id": "batch_1",
+                "status": "completed",
+                "output_file_id": "file-out",
+                "error_file_id": "file-err",
+            }
+        ),
+    )
+    output = [{"custom_id": "0", "response": {"status_code": 200, "body": OPENAI_REPLY}}]
+    errors = [
+        {"custom_id": "1", "response": {"status_code": 400, "body": {"error": "bad"}}},
+    ]
+    stub_server.add("/v1/files/file-out/content", StubResponse(jsonl(output)))
+    stub_server.add("/v1/files/file-err/content", StubResponse(jsonl(errors)))
+    runner = make_runner(stub_server)
+    inputs = [make_input(Model.gpt_5_mini), make_input(Model.gpt_5_mini)]
+
+    async def run():
+        async with runner.client:
+            replies = await runner.run(inputs, return_exceptions=True)
+            with pytest.raises(BatchError):
+                await runner.run(inputs)
+            return replies
+
+    replies = asyncio.run(run())
+    assert replies[0].messages[-1].content == TextContent(text="Hello from GPT")
+    assert replies[0].usage.reasoning_tokens == 4
+    assert isinstance(replies[1], BatchError)
+    upload = stub_server.requests[0]["body"].replace(b" ", b"")
+    assert b'"custom_id":"0"' in upload
+    assert b'"url":"/v1/responses"' in upload
+    assert stub_server.json_body(1) == {
+        "input_file_id": "file-in",
+        "endpoint": "/v1/responses",
+        "completion_window": "24h",
+    }
+
+
+def test_gemini(stub_server, api_keys):
+    stub_server.add(
+        "/v1beta/models/gemini-2.5-flash:batchGenerateContent",
+        StubResponse({"name": "batches/g1", "metadata": {"state": "BATCH_STATE_PENDING"}}),
+    )
+    stub_server.add(
+        "/v1beta/batches/g1",
+        StubResponse(
+            {
+                "name": "batches/g1",
+                "metadata": {"state": "BATCH_STATE_SUCCEEDED"},
+                "done": True,
+                "response": {
+                    "inlinedResponses": {
+                        "inlinedResponses": [
+                            {"response": GEMINI_REPLY, "metadata": {"key": "0"}},
+                        ]
+                    }
+                },
+            }
+        ),
+    )
+    runner = make_runner(stub_server)
+
+    async def run():
+        async with runner.client:
+            return await runner.run([make_input(Model.gemini_2_5_flash)])
+
+    replies = asyncio.run(run())
+    assert replies[0].provider == Provider.GEMINI
+    assert replies[0].usage.completion_tokens == 3
+    batch = stub_server.json_body(0)["batch"]["input_config"]["requests"]["requests"]
+    assert batch[0]["metadata"] == {"key": "0"}
+    assert batch[0]["request"]["systemInstruction"] == {"parts": [{"text": "Be brief."}]}
+
+
+def test_failed_batch(stub_server, api_keys):
+    stub_server.add("/v1/files", StubResponse({"id": "file-in"}))
+    stub_server.add("/v1/batches", StubResponse({"id": "batch_1", "status": "failed"}))
+    runner = make_runner(stub_server)
+
+    async def run():
+        async with runner.client:
+            return await runner.run([make_input(Model.gpt_5_mini)], return_exceptions=True)
+
+    replies = asyncio.run(run())
+    assert isinstance(replies[0], BatchError)
+
+
+def test_failed_submit_cancels_accepted_batches(stub_server, api_keys):
+    stub_server.add(
+        "/v1/messages/batches", StubResponse({"id": "b1", "processing_status": "in_progress"})
+    )
+    stub_server.add(
+        "/v1/messages/batches/b1/cancel", StubResponse({"id": "b1", "processing_status": "ended"})
+    )
+    runner = make_runner(stub_server)
+    inputs = [make_input(Model.claude_4_sonnet_20250514), make_input(Model.gpt_5_mini)]
+
+    async def run():
+        async with runner.client:
+            await runner.run(inputs)
+
+    with pytest.raises(ProviderAPIError):
+        asyncio.run(run())
+    assert "/v1/messages/batches/b1/cancel" in [request["path"] for request in stub_server.requests]
+
+
+def test_results_of_unfinished_batch(stub_server, api_keys):
+    stub_server.add(
+        "/v1/messages/batches", StubResponse({"id": "b1", "processing_status": "in_progress"})
+    )
+    runner = make_runner(stub_server)
+
+    async def run():
+        async with runner.client:
+            job = await runner.submit([make_input(Model.claude_4_sonnet_20250514)])
+            await runner.results(job)
+
+    with pytest.raises(BatchError, match="in progress"):
+        asyncio.run(run())
+
+
+def test_provider_without_batch_api(stub_server, api_keys):
+    runner = make_runner(stub_server)
+    with pytest.raises(BatchError):
+        asyncio.run(runner.submit([make_input(Model.llama_3_1_8b_groq)]))
+
+
+def test_same_key_for_the_whole_job(stub_server, api_keys, monkeypatch):
+    # Keys can belong to different organizations, which cannot see each other's batches
+    monkeypatch.setenv("ANTHROPIC_API_KEY_2", "test-second-org")
+    path = "/v1/messages/batches/b1"
+    stub_server.add(
+        "/v1/messages/batches", StubResponse({"id": "b1", "processing_status": "in_progress"})
+    )
+    stub_server.add(path, StubResponse({"id": "b1", "processing_status": "ended"}))
+    results = [{"custom_id": "0", "result": {"type": "succeeded", "message": ANTHROPIC_REPLY}}]
+    stub_server.add(f"{path}/results", StubResponse(jsonl(results), content_type="text/plain"))
+    stub_server.add(f"{path}/cancel", StubResponse({"id": "b1", "processing_status": "ended"}))
+    runner = make_runner(stub_server)
+
+    async def run():
+        async with runner.client:
+            job = await runner.submit([make_input(Model.claude_4_sonnet_20250514)])
+            job = await runner.wait(job)
+            await runner.results(job)
+            await runner.cancel(job)
+            return job
+
+    job = asyncio.run(run())
+    assert job.api_key_id is not None
+    keys = {request["headers"]["x-api-key"] for request in stub_server.requests}
+    assert len(stub_server.requests) == 4
+    assert len(keys) == 1
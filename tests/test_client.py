@@ -0,0 +1,163 @@
+"""Tests for KintuClient dispatch and connection pooling against a local stub server."""
+
+import asyncio
+
+import pytest
+
+from kintu.client.http_pool import HTTPPool
+from kintu.types.complete import StreamChunk
+from kintu.types.content import TextContent, ThinkingContent, ToolCallContent
+from kintu.types.errors import ProviderAPIError
+from kintu.types.model import Model
+from kintu.types.provider import Provider
+from tests.conftest import (
+    ANTHROPIC_REPLY,
+    CHAT_REPLY,
+    GEMINI_REPLY,
+    OPENAI_REPLY,
+    StubResponse,
+    make_input,
+    sse_body,
+)
+
+
+class TestDispatch:
+    """Each LLMSDK is routed to its own wire format."""
+
+    def test_anthropic(self, client_factory, stub_server, api_keys):
+        stub_server.add("/v1/messages", StubResponse(ANTHROPIC_REPLY))
+
+        async def run():
+            async with client_factory() as client:
+                return await client.complete(make_input(Model.claude_4_sonnet_20250514))
+
+        reply = asyncio.run(run())
+        assert reply.provider == Provider.ANTHROPIC
+        assert reply.messages[0].content == TextContent(text="Hello from Claude")
+        assert reply.usage.input_uncached_tokens == 10
+        assert reply.usage.input_cached_tokens == 2
+        body = stub_server.json_body()
+        assert body["system"] == [{"type": "text", "text": "Be brief."}]
+        assert body["messages"] == [{"role": "user", "content": [{"type": "text", "text": "Hi"}]}]
+        assert stub_server.requests[-1]["headers"]["x-api-key"] == "test-anthropic_api_key"
+
+    def test_openai(self, client_factory, stub_server, api_keys):
+        stub_server.add("/v1/responses", StubResponse(OPENAI_REPLY))
+
+        async def run():
+            async with client_factory() as client:
+                return await client.complete(make_input(Model.gpt_5_mini))
+
+        reply = asyncio.run(run())
+        assert isinstance(reply.messages[0].content, ThinkingContent)
+        assert reply.messages[0].content.reasoning_id == "rs_1"
+        assert reply.messages[1].content == TextContent(text="Hello from GPT")
+        assert reply.usage.input_uncached_tokens == 15
+        assert reply.usage.completion_tokens == 8
+        assert reply.usage.reasoning_tokens == 4
+
+    def test_gemini(self, client_factory, stub_server, api_keys):
+        stub_server.add(
+            "/v1beta/models/gemini-2.5-flash:generateContent", StubResponse(GEMINI_REPLY)
+        )
+
+        async def run():
+            async with client_factory() as client:
+                return await client.complete(make_input(Model.gemini_2_5_flash, temperature=0.5))
+
+        reply = asyncio.run(run())
+        content = reply.messages[0].content
+        assert isinstance(content, ToolCallContent)
+        assert content.tool_name == "lookup"
+        assert content.input == {"q": "kintu"}
+        body = stub_server.json_body()
+        assert body["systemInstruction"] == {"parts": [{"text": "Be brief."}]}
+        # 0.5 on kintu's 0-1 scale maps to the middle of Gemini's 0-2 range
+        assert body["generationConfig"]["temperature"] == 1.0
+
+    def test_litellm(self, client_factory, stub_server, api_keys):
+        stub_server.add("/v1/chat/completions", StubResponse(CHAT_REPLY))
+
+        async def run():
+            async with client_factory() as client:
+                return await client.complete(make_input(Model.llama_3_1_8b_groq))
+
+        reply = asyncio.run(run())
+        assert reply.provider == Provider.GROQ
+        assert reply.messages[0].content == TextContent(text="Hello from Groq")
+        assert stub_server.json_body()["model"] == "llama-3.1-8b-instant"
+
+
+class TestConnectionPool:
+    def test_connection_reused_across_calls(self, client_factory, stub_server, api_keys):
+        stub_server.add("/v1/messages", StubResponse(ANTHROPIC_REPLY))
+
+        async def run():
+            async with client_factory() as client:
+                for _ in range(3):
+                    await client.complete(make_input(Model.claude_3_5_haiku_20241022))
+
+        asyncio.run(run())
+        ports = {request["client_port"] for request in stub_server.requests}
+        assert len(stub_server.requests) == 3
+        assert len(ports) == 1
+
+    def test_one_pool_per_provider(self):
+        pool = HTTPPool()
+        assert pool.client(Provider.GROQ) is pool.client(Provider.GROQ)
+        assert pool.client(Provider.GROQ) is not pool.client(Provider.TOGETHER)
+        asyncio.run(pool.aclose())
+
+
+class TestStreaming:
+    def test_anthropic_stream(self, client_factory, stub_server, api_keys):
+        events = [
+            {"type": "message_start", "message": {"usage": {"input_tokens": 3}}},
+            {"type": "content_block_start", "index": 0, "content_block": {"type": "text"}},
+            {
+                "type": "content_block_delta",
+                "index": 0,
+                "delta": {"type": "text_delta", "text": "Hel"},
+            },
+            {
+                "type": "content_block_delta",
+                "index": 0,
+                "delta": {"type": "text_delta", "text": "lo"},
+            },
+            {"type": "content_block_stop", "index": 0},
+            {"type": "message_delta", "usage": {"output_tokens": 2}},
+            {"type": "message_stop"},
+        ]
+        stub_server.add(
+            "/v1/messages", StubResponse(sse_body(events), content_type="text/event-stream")
+        )
+        received: list[StreamChunk] = []
+
+        async def callback(chunk: StreamChunk) -> None:
+            received.append(chunk)
+
+        async def run():
+            async with client_factory() as client:
+                inp = make_input(
+                    Model.claude_4_sonnet_20250514, stream=True, stream_callback=callback
+                )
+                return await client.complete(inp)
+
+        reply = asyncio.run(run())
+        assert len(received) == len(events)
+        assert reply.messages[0].content == TextContent(text="Hello")
+        assert reply.usage.input_uncached_tokens == 3
+        assert reply.usage.completion_tokens == 2
+
+
+class TestErrors:
+    def test_api_error(self, client_factory, stub_server, api_keys):
+        stub_server.add("/v1/messages", StubResponse({"error": "overloaded"}, status=529))
+
+        async def run():
+            async with client_factory() as client:
+                await client.complete(make_input(Model.claude_4_sonnet_20250514))
+
+        with pytest.raises(ProviderAPIError) as excinfo:
+            asyncio.run(run())
+        assert excinfo.value.status_code == 529
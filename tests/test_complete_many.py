@@ -0,0 +1,165 @@
+"""Tests for complete_many."""
+
+import asyncio
+import itertools
+
+import pytest
+
+from kintu.client.complete_many import complete_many
+from kintu.client.http_pool import HTTPPool
+from kintu.client.kintu_client import KintuClient
+from kintu.types.errors import ProviderAPIError
+from kintu.types.model import Model
+from kintu.types.provider import Provider
+from tests.conftest import ANTHROPIC_REPLY, StubResponse, make_input
+from tests.test_response_cache import make_reply
+
+MODEL = Model.claude_4_sonnet_20250514
+
+
+def numbered(count: int | None = None):
+    """Inputs whose max_tokens carries their number."""
+    numbers = itertools.count(1) if count is None else range(1, count + 1)
+    return (make_input(MODEL, max_tokens=n) for n in numbers)
+
+
+def fake_complete(delays: dict[int, float] | None = None, fail: set[int] = frozenset()):
+    state = {"in_flight": 0, "peak": 0}
+
+    async def complete(inp):
+        state["in_flight"] += 1
+        state["peak"] = max(state["peak"], state["in_flight"])
+        try:
+            await asyncio.sleep((delays or {}).get(inp.max_tokens, 0.001))
+        finally:
+            state["in_flight"] -= 1
+        if inp.max_tokens in fail:
+            raise ProviderAPIError("failed", status_code=500)
+        return make_reply(str(inp.max_tokens))
+
+    return complete, state
+
+
+def text(reply) -> str:
+    return reply.messages[0].content.text
+
+
+async def collect(results):
+    return [(index, result) async for index, result in results]
+
+
+class TestCompleteMany:
+    def test_input_order(self):
+        complete, state = fake_complete(delays={1: 0.05})
+        results = asyncio.run(collect(complete_many(complete, numbered(10), max_concurrency=3)))
+        assert [(index, text(reply)) for index, reply in results] == [
+            (i, str(i + 1)) for i in range(10)
+        ]
+        assert state["peak"] == 3
+
+    def test_as_completed(self):
+        complete, _ = fake_complete(delays={1: 0.05})
+        results = asyncio.run(
+            collect(complete_many(complete, numbered(4), max_concurrency=4, ordered=False))
+        )
+        assert [index for index, _ in results][-1] == 0
+        assert sorted(index for index, _ in results) == [0, 1, 2, 3]
+
+    def test_pulls_lazily_with_backpressure(self):
+        complete, _ = fake_complete()
+        pulled = []
+
+        def inputs():
+            for inp in numbered():
+                pulled.append(inp)
+                yield inp
+
+        async def run():
+            results = complete_many(complete, inputs(), max_concurrency=4)
+            first = [await anext(results) for _ in range(3)]
+            # The caller stopped pulling: nothing beyond the running window was read
+            await asyncio.sleep(0.05)
+            count = len(pulled)
+            await results.aclose()
+            return first, count
+
+        first, count = asyncio.run(run())
+        assert [index for index, _ in first] == [0, 1, 2]
+        assert count <= 3 + 4 + 4
+
+    def test_async_iterable(self):
+        complete, _ = fake_complete()
+
+        async def inputs():
+            for inp in numbered(5):
+                await asyncio.sleep(0)
+                yield inp
+
+        results = asyncio.run(collect(complete_many(complete, inputs(), max_concurrency=2)))
+        assert [text(reply) for _, reply in results] == ["1", "2", "3", "4", "5"]
+
+    def test_return_exceptions(self):
+        complete, _ = fake_complete(fail={2})
+        progress = []
+        results = asyncio.run(
+            collect(
+                complete_many(
+                    complete,
+                    numbered(3),
+                    return_exceptions=True,
+                    on_progress=progress.append,
+                )
+            )
+        )
+        assert isinstance(results[1][1], ProviderAPIError)
+        assert text(results[2][1]) == "3"
+        final = progress[-1]
+        assert (final.submitted, final.completed, final.failed, final.in_flight) == (3, 2, 1, 0)
+
+    def test_error_cancels_the_rest(self):
+        complete, state = fake_complete(delays={1: 0.001, 2: 1.0, 3: 1.0}, fail={1})
+        with pytest.raises(ProviderAPIError):
+            asyncio.run(collect(complete_many(complete, numbered(3))))
+        assert state["in_flight"] == 0
+
+    def test_replies_arriving_with_an_error_are_yielded(self):
+        async def complete(inp):
+            # Inputs 1 and 3 finish in the same round as input 2 fails
+            await asyncio.sleep(0.01)
+            if inp.max_tokens == 2:
+                raise ProviderAPIError("failed", status_code=500)
+            return make_reply(str(inp.max_tokens))
+
+        for ordered, expected in [(True, ["1"]), (False, ["1", "3"])]:
+            received = []
+
+            async def run():
+                async for _, reply in complete_many(complete, numbered(3), ordered=ordered):
+                    received.append(text(reply))
+
+            with pytest.raises(ProviderAPIError):
+                asyncio.run(run())
+            assert received == expected
+
+    def test_cancelled_request(self):
+        async def complete(inp):
+            if inp.max_tokens == 2:
+                raise asyncio.CancelledError
+            return make_reply(str(inp.max_tokens))
+
+        results = asyncio.run(collect(complete_many(complete, numbered(3), return_exceptions=True)))
+        assert isinstance(results[1][1], asyncio.CancelledError)
+        assert [text(results[0][1]), text(results[2][1])] == ["1", "3"]
+
+
+def test_client_complete_many(stub_server, api_keys):
+    stub_server.add("/v1/messages", StubResponse(ANTHROPIC_REPLY))
+
+    async def run():
+        pool = HTTPPool(base_urls={provider: stub_server.url for provider in Provider})
+        async with KintuClient(pool=pool) as client:
+            return await collect(client.complete_many(numbered(5), max_concurrency=2))
+
+    results = asyncio.run(run())
+    assert [index for index, _ in results] == [0, 1, 2, 3, 4]
+    assert len(stub_server.requests) == 5
@@ -0,0 +1,120 @@
+"""Tests for AIMD concurrency control."""
+
+import asyncio
+
+import pytest
+
+from kintu.client.concurrency import AdaptiveConcurrency, CongestionReason
+from kintu.client.http_pool import HTTPPool
+from kintu.client.kintu_client import KintuClient
+from kintu.model_library.model_library import get_spec
+from kintu.types.errors import ProviderAPIError
+from kintu.types.model import Model
+from kintu.types.provider import Provider
+from tests.conftest import ANTHROPIC_REPLY, StubResponse, make_input
+
+MODEL = Model.claude_4_sonnet_20250514
+KEY = (Provider.ANTHROPIC, MODEL)
+
+
+def overloaded(status: int = 429) -> ProviderAPIError:
+    return ProviderAPIError("throttled", status_code=status)
+
+
+class TestAdaptiveConcurrency:
+    def test_additive_increase(self):
+        concurrency = AdaptiveConcurrency(initial_limit=4)
+        spec = get_spec(MODEL)
+
+        async def run():
+            for _ in range(8):
+                permit = await concurrency.acquire(spec)
+                concurrency.release(permit, ttft=0.1, error=None)
+
+        asyncio.run(run())
+        # About one more slot per limit's worth of replies
+        assert 5.5 < concurrency.limits()[KEY] < 6
+
+    def test_one_decrease_per_round(self):
+        concurrency = AdaptiveConcurrency(initial_limit=8)
+        spec = get_spec(MODEL)
+
+        async def run():
+            permits = [await concurrency.acquire(spec) for _ in range(4)]
+            for permit in permits:
+                concurrency.release(permit, ttft=None, error=overloaded())
+            permit = await concurrency.acquire(spec)
+            concurrency.release(permit, ttft=None, error=overloaded(503))
+
+        asyncio.run(run())
+        assert concurrency.limits()[KEY] == 2
+        reasons = [event.reason for event in concurrency.events]
+        assert reasons == [CongestionReason.RATE_LIMITED, CongestionReason.SERVER_ERROR]
+        assert (concurrency.events[0].limit_before, concurrency.events[0].limit_after) == (8, 4)
+
+    def test_latency_spike(self):
+        concurrency = AdaptiveConcurrency(initial_limit=8, latency_samples=5)
+        spec = get_spec(MODEL)
+
+        async def run():
+            for _ in range(5):
+                concurrency.release(await concurrency.acquire(spec), ttft=0.1, error=None)
+            concurrency.release(await concurrency.acquire(spec), ttft=0.5, error=None)
+
+        asyncio.run(run())
+        assert concurrency.events[-1].reason == CongestionReason.LATENCY
+        assert concurrency.limits()[KEY] < 5
+
+    def test_baseline_follows_lasting_shift(self):
+        concurrency = AdaptiveConcurrency(initial_limit=8, latency_samples=5)
+        spec = get_spec(MODEL)
+
+        async def run():
+            for _ in range(5):
+                concurrency.release(await concurrency.acquire(spec), ttft=0.1, error=None)
+            # The model is now five times slower, for good
+            for _ in range(100):
+                concurrency.release(await concurrency.acquire(spec), ttft=0.5, error=None)
+
+        asyncio.run(run())
+        assert 0 < len(concurrency.events) < 20
+        # No longer cut: the limit has grown back from its low
+        assert concurrency.limits()[KEY] > concurrency.events[-1].limit_after + 1
+
+    def test_waiters_served_in_order(self):
+        concurrency = AdaptiveConcurrency(initial_limit=1)
+        spec = get_spec(MODEL)
+        order = []
+
+        async def worker(name):
+            permit = await concurrency.acquire(spec)
+            order.append(name)
+            await asyncio.sleep(0.01)
+            concurrency.release(permit, ttft=0.01, error=None)
+
+        async def run():
+            await asyncio.gather(*(worker(name) for name in range(4)))
+
+        asyncio.run(run())
+        assert order == [0, 1, 2, 3]
+        assert concurrency.in_flight()[KEY] == 0
+
+
+def test_client_reports_errors(stub_server, api_keys):
+    stub_server.add(
+        "/v1/messages",
+        StubResponse({"error": "slow down"}, status=429, headers={"retry-after": "0"}),
+    )
+    stub_server.add("/v1/messages", StubResponse(ANTHROPIC_REPLY))
+    concurrency = AdaptiveConcurrency(initial_limit=4)
+
+    async def run():
+        pool = HTTPPool(base_urls={provider: stub_server.url for provider in Provider})
+        async with KintuClient(pool=pool, concurrency=concurrency) as client:
+            with pytest.raises(ProviderAPIError):
+                await client.complete(make_input(MODEL))
+            await client.complete(make_input(MODEL))
+
+    asyncio.run(run())
+    assert concurrency.limits()[KEY] == pytest.approx(2.5)
+    assert concurrency.in_flight()[KEY] == 0
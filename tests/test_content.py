@@ -0,0 +1,71 @@
+"""Tests for the trusted, validation-free construction path."""
+
+import pytest
+
+from kintu.client.backends.openai import OpenAIBackend
+from kintu.model_library.model_library import get_spec
+from kintu.types.complete import CompleteInput
+from kintu.types.content import (
+    AnthropicServerToolUse,
+    DocumentContent,
+    TextContent,
+    ToolCallContent,
+    ToolResultContent,
+)
+from kintu.types.message import Message
+from kintu.types.model import Model
+from kintu.types.role import Role
+
+
+class TestTrustedConstruction:
+    def test_equal_to_validated(self):
+        call = ToolCallContent.trusted(tool_id="1", tool_name="lookup", input={"q": "x"})
+        assert call == ToolCallContent(tool_id="1", tool_name="lookup", input={"q": "x"})
+        assert call.model_dump() == {
+            "tool_id": "1",
+            "tool_name": "lookup",
+            "input": {"q": "x"},
+            "openai_id": None,
+        }
+        result = ToolResultContent.trusted(tool_id="1", results=[TextContent.trusted(text="ok")])
+        assert Message.trusted(Role.TOOL, result) == Message(
+            role=Role.TOOL,
+            content=ToolResultContent(tool_id="1", results=[TextContent(text="ok")]),
+        )
+
+    def test_defaults_are_not_shared(self):
+        first = AnthropicServerToolUse.trusted(tool_id="a", tool_name="web_search")
+        second = AnthropicServerToolUse.trusted(tool_id="b", tool_name="web_search")
+        first.input["query"] = "x"
+        assert second.input == {}
+
+    def test_field_names_are_checked(self):
+        with pytest.raises(ValueError, match="no fields tool"):
+            ToolCallContent.trusted(tool="1", tool_name="lookup", input={}, openai_id=None)
+        with pytest.raises(ValueError, match="no fields extra"):
+            TextContent.trusted(text="a", extra=1)
+        with pytest.raises(ValueError, match="requires fields tool_name"):
+            ToolCallContent.trusted(tool_id="1", input={})
+
+    def test_private_attributes_and_assignment(self):
+        document = DocumentContent.trusted(document=b"%PDF")
+        assert document._openai_filename is None
+        message = Message.trusted(Role.USER, TextContent.trusted(text="a"))
+        message.content = document
+        assert message.content is document
+
+    def test_translates_like_validated(self):
+        spec = get_spec(Model.gpt_4_1)
+        trusted = CompleteInput(
+            messages=[Message.trusted(Role.USER, TextContent.trusted(text="hi"))],
+            model=Model.gpt_4_1,
+        )
+        validated = CompleteInput(
+            messages=[Message(role=Role.USER, content=TextContent(text="hi"))],
+            model=Model.gpt_4_1,
+        )
+        backend = OpenAIBackend()
+        assert (
+            backend.build_request(trusted, spec, "key").json_body
+            == backend.build_request(validated, spec, "key").json_body
+        )
@@ -0,0 +1,133 @@
+"""Tests for multi-key credential pools."""
+
+import asyncio
+import time
+
+import pytest
+
+from kintu.client.http_pool import HTTPPool
+from kintu.client.kintu_client import KintuClient
+from kintu.credential_manager import CredentialManager
+from kintu.types.complete import LLMUsage
+from kintu.types.errors import ProviderAPIError
+from kintu.types.model import Model
+from kintu.types.provider import Provider
+from tests.conftest import ANTHROPIC_REPLY, StubResponse, make_input
+
+
+@pytest.fixture
+def key_pool(monkeypatch):
+    """Two Anthropic keys, plus the base key repeated as the first numbered one."""
+    monkeypatch.setenv("ANTHROPIC_API_KEY", "key-a")
+    monkeypatch.setenv("ANTHROPIC_API_KEY_1", "key-a")
+    monkeypatch.setenv("ANTHROPIC_API_KEY_2", "key-b")
+
+
+def throttled(headers: dict[str, str]) -> ProviderAPIError:
+    return ProviderAPIError("slow down", status_code=429, headers=headers)
+
+
+class TestKeyPool:
+    def test_numbered_env_vars(self, key_pool):
+        keys = CredentialManager().keys(Provider.ANTHROPIC)
+        assert [key.name for key in keys] == ["ANTHROPIC_API_KEY", "ANTHROPIC_API_KEY_2"]
+
+    def test_key_file(self, tmp_path, monkeypatch):
+        monkeypatch.delenv("GROQ_API_KEY", raising=False)
+        path = tmp_path / "keys"
+        path.write_text("# org keys\nGROQ_API_KEY=gsk-1\n\nGROQ_API_KEY_2=gsk-2\n")
+        keys = CredentialManager(key_file=str(path)).keys(Provider.GROQ)
+        assert [key.secret for key in keys] == ["gsk-1", "gsk-2"]
+
+    def test_least_loaded(self, key_pool):
+        credentials = CredentialManager()
+        first = credentials.acquire_key(Provider.ANTHROPIC)
+        second = credentials.acquire_key(Provider.ANTHROPIC)
+        assert {first.secret, second.secret} == {"key-a", "key-b"}
+        credentials.release_key(first, usage=LLMUsage(input_uncached_tokens=3, completion_tokens=4))
+        assert credentials.acquire_key(Provider.ANTHROPIC) is first
+        assert (first.requests, first.in_flight, first.tokens) == (2, 1, 7)
+
+    def test_rate_limited_key_cools_down(self, key_pool):
+        credentials = CredentialManager()
+        first = credentials.acquire_key(Provider.ANTHROPIC)
+        credentials.release_key(first, error=throttled({"retry-after": "60"}))
+        assert first.rate_limited == 1 and first.in_cooldown()
+        for _ in range(3):
+            assert credentials.acquire_key(Provider.ANTHROPIC) is not first
+
+    def test_exhausted_window_cools_down(self, key_pool):
+        credentials = CredentialManager()
+        first = credentials.acquire_key(Provider.ANTHROPIC)
+        credentials.release_key(
+            first,
+            headers={
+                "anthropic-ratelimit-requests-remaining": "0",
+                "anthropic-ratelimit-tokens-remaining": "12000",
+                "anthropic-ratelimit-requests-reset": "2099-01-01T00:00:00Z",
+            },
+        )
+        assert (first.remaining_requests, first.remaining_tokens) == (0, 12000)
+        assert first.in_cooldown()
+
+    def test_all_cooling_picks_first_to_recover(self, key_pool):
+        credentials = CredentialManager()
+        first = credentials.acquire_key(Provider.ANTHROPIC)
+        second = credentials.acquire_key(Provider.ANTHROPIC)
+        credentials.release_key(first, error=throttled({"retry-after": "60"}))
+        credentials.release_key(second, error=throttled({"retry-after": "5"}))
+        assert credentials.acquire_key(Provider.ANTHROPIC) is second
+        assert 4 < credentials.cooldown_left(Provider.ANTHROPIC) <= 5
+
+    def test_retry_after_zero_means_now(self, key_pool):
+        credentials = CredentialManager()
+        first = credentials.acquire_key(Provider.ANTHROPIC)
+        credentials.release_key(first, error=throttled({"retry-after": "0"}))
+        assert first.rate_limited == 1 and not first.in_cooldown()
+
+
+def test_client_waits_out_the_cooldown(stub_server, monkeypatch):
+    monkeypatch.setenv("ANTHROPIC_API_KEY", "key-a")
+    stub_server.add(
+        "/v1/messages",
+        StubResponse({"error": "slow down"}, status=429, headers={"retry-after": "0.3"}),
+    )
+    stub_server.add("/v1/messages", StubResponse(ANTHROPIC_REPLY))
+    credentials = CredentialManager()
+
+    async def run():
+        pool = HTTPPool(base_urls={provider: stub_server.url for provider in Provider})
+        async with KintuClient(credentials=credentials, pool=pool) as client:
+            with pytest.raises(ProviderAPIError):
+                await client.complete(make_input(Model.claude_4_sonnet_20250514))
+            start = time.monotonic()
+            await client.complete(make_input(Model.claude_4_sonnet_20250514))
+            return time.monotonic() - start
+
+    # The only key is not sent again until its cooldown is over
+    assert asyncio.run(run()) >= 0.25
+    assert len(stub_server.requests) == 2
+
+
+def test_client_moves_off_a_throttled_key(stub_server, key_pool):
+    stub_server.add(
+        "/v1/messages",
+        StubResponse({"error": "slow down"}, status=429, headers={"retry-after": "60"}),
+    )
+    stub_server.add("/v1/messages", StubResponse(ANTHROPIC_REPLY))
+    credentials = CredentialManager()
+
+    async def run():
+        pool = HTTPPool(base_urls={provider: stub_server.url for provider in Provider})
+        async with KintuClient(credentials=credentials, pool=pool) as client:
+            with pytest.raises(ProviderAPIError):
+                await client.complete(make_input(Model.claude_4_sonnet_20250514))
+            await client.complete(make_input(Model.claude_4_sonnet_20250514))
+
+    asyncio.run(run())
+    used = [request["headers"]["x-api-key"] for request in stub_server.requests]
+    assert used[0] != used[1]
+    keys = {key.secret: key for key in credentials.keys(Provider.ANTHROPIC)}
+    assert keys[used[0]].rate_limited == 1
+    assert keys[used[1]].tokens == 17
+    assert all(key.in_flight == 0 for key in keys.values())
@@ -0,0 +1,170 @@
+"""Tests for CompleteInput deadlines."""
+
+import asyncio
+import time
+
+import pytest
+
+from kintu.client.failover import Failover
+from kintu.client.rate_limiter import RateLimit, RateLimiter
+from kintu.client.retry import RetryPolicy
+from kintu.client.single_flight import SingleFlight
+from kintu.model_library.model_library import get_spec
+from kintu.types.complete import Priority
+from kintu.types.errors import DeadlineExceededError, ProviderAPIError
+from kintu.types.model import Model
+from tests.conftest import ANTHROPIC_REPLY, CHAT_REPLY, StubResponse, make_input
+
+MODEL = Model.claude_4_sonnet_20250514
+GROQ = Model.openai_gpt_oss_120b_groq
+TOGETHER = Model.openai_gpt_oss_120b_together
+
+
+def test_slow_reply(client_factory, stub_server, api_keys):
+    stub_server.add("/v1/messages", StubResponse(ANTHROPIC_REPLY, delay=2.0))
+
+    async def run():
+        async with client_factory() as client:
+            await client.complete(make_input(MODEL, deadline=time.time() + 0.1))
+
+    start = time.monotonic()
+    with pytest.raises(DeadlineExceededError):
+        asyncio.run(run())
+    assert time.monotonic() - start < 1.0
+
+
+def test_slow_stream(client_factory, stub_server, api_keys):
+    stub_server.add("/v1/messages", StubResponse(ANTHROPIC_REPLY, delay=2.0))
+
+    async def run():
+        async with client_factory() as client:
+            inp = make_input(MODEL, deadline=time.time() + 0.1)
+            async with client.stream(inp) as stream:
+                async for _ in stream:
+                    pass
+
+    with pytest.raises(DeadlineExceededError):
+        asyncio.run(run())
+
+
+def test_passed_deadline_sends_nothing(client_factory, stub_server, api_keys):
+    async def run():
+        async with client_factory() as client:
+            await client.complete(make_input(MODEL, deadline=time.time() - 1))
+
+    with pytest.raises(DeadlineExceededError):
+        asyncio.run(run())
+    assert stub_server.requests == []
+
+
+def test_no_retry_past_deadline():
+    policy = RetryPolicy(base_delay=1.0)
+    calls = []
+
+    async def attempt():
+        calls.append(1)
+        raise ProviderAPIError("overloaded", status_code=503)
+
+    with pytest.raises(DeadlineExceededError) as raised:
+        asyncio.run(policy.run(get_spec(MODEL), attempt, deadline=time.time() + 0.5))
+    assert isinstance(raised.value.__cause__, ProviderAPIError)
+    assert calls == [1]
+    assert (policy.retries, policy.out_of_time) == (0, 1)
+
+
+def test_retry_within_deadline():
+    policy = RetryPolicy(base_delay=0.001, max_delay=0.001)
+    calls = []
+
+    async def attempt():
+        calls.append(1)
+        if len(calls) == 1:
+            raise ProviderAPIError("overloaded", status_code=503)
+        return "ok"
+
+    assert asyncio.run(policy.run(get_spec(MODEL), attempt, deadline=time.time() + 5)) == "ok"
+    assert policy.retries == 1
+
+
+def test_no_failover_past_deadline(client_factory, stub_server, api_keys):
+    stub_server.add("/v1/chat/completions", StubResponse({"error": "down"}, status=503))
+    stub_server.add("/v1/chat/completions", StubResponse(CHAT_REPLY))
+    failover = Failover(latency_slo={TOGETHER: 5.0})
+
+    async def run():
+        async with client_factory(failover=failover) as client:
+            await client.complete(make_input(GROQ, deadline=time.time() + 1.0))
+
+    with pytest.raises(DeadlineExceededError):
+        asyncio.run(run())
+    assert len(stub_server.requests) == 1
+    assert failover.failovers == 0
+
+
+def test_rate_limit_wait_past_deadline(client_factory, stub_server, api_keys):
+    stub_server.add("/v1/messages", StubResponse(ANTHROPIC_REPLY))
+    limiter = RateLimiter({MODEL: RateLimit(requests_per_minute=1)})
+
+    async def run():
+        async with client_factory(rate_limiter=limiter) as client:
+            await client.complete(make_input(MODEL))
+            with pytest.raises(DeadlineExceededError):
+                await client.complete(make_input(MODEL, deadline=time.time() + 5))
+
+    start = time.monotonic()
+    asyncio.run(run())
+    assert time.monotonic() - start < 1.0
+    assert len(stub_server.requests) == 1
+    assert limiter.throttled == 0
+
+
+def test_coalesced_callers_keep_their_own_deadline(client_factory, stub_server, api_keys):
+    stub_server.add("/v1/messages", StubResponse(ANTHROPIC_REPLY, delay=0.3))
+    single_flight = SingleFlight()
+
+    async def run():
+        async with client_factory(single_flight=single_flight) as client:
+            return await asyncio.gather(
+                client.complete(make_input(MODEL)),
+                client.complete(make_input(MODEL, deadline=time.time() + 0.1)),
+                return_exceptions=True,
+            )
+
+    leader, follower = asyncio.run(run())
+    assert leader.messages[0].content.text == "Hello from Claude"
+    assert isinstance(follower, DeadlineExceededError)
+    assert (single_flight.requests, single_flight.coalesced) == (1, 1)
+
+
+def test_later_deadline_does_not_join_earlier_one(client_factory, stub_server, api_keys):
+    stub_server.add("/v1/messages", StubResponse(ANTHROPIC_REPLY, delay=0.1))
+    single_flight = SingleFlight()
+
+    async def run():
+        async with client_factory(single_flight=single_flight) as client:
+            # The first request gives up on retries by its deadline, too soon for the second
+            return await asyncio.gather(
+                client.complete(make_input(MODEL, deadline=time.time() + 1.0)),
+                client.complete(make_input(MODEL, deadline=time.time() + 5.0)),
+                client.complete(make_input(MODEL, deadline=time.time() + 2.0)),
+            )
+
+    replies = asyncio.run(run())
+    assert all(reply.messages[0].content.text == "Hello from Claude" for reply in replies)
+    # The third caller joins the second's flight, which now owns the key
+    assert (single_flight.requests, single_flight.coalesced) == (2, 1)
+
+
+def test_priorities_are_not_coalesced(client_factory, stub_server, api_keys):
+    stub_server.add("/v1/messages", StubResponse(ANTHROPIC_REPLY, delay=0.05))
+    single_flight = SingleFlight()
+
+    async def run():
+        async with client_factory(single_flight=single_flight) as client:
+            await asyncio.gather(
+                client.complete(make_input(MODEL, priority=Priority.BULK)),
+                client.complete(make_input(MODEL, priority=Priority.INTERACTIVE)),
+            )
+
+    asyncio.run(run())
+    assert single_flight.requests == 2
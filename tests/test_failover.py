@@ -0,0 +1,131 @@
+"""Tests for failover between equivalent model deployments."""
+
+import asyncio
+
+import pytest
+from PIL import Image
+
+from kintu.client.failover import Failover
+from kintu.model_library.model_library import equivalents
+from kintu.types.content import ImageContent, TextContent
+from kintu.types.errors import ProviderAPIError
+from kintu.types.message import Message
+from kintu.types.model import Model
+from kintu.types.provider import Provider
+from kintu.types.role import Role
+from tests.conftest import CHAT_REPLY, StubResponse, make_input, sse_body
+
+GROQ = Model.openai_gpt_oss_120b_groq
+TOGETHER = Model.openai_gpt_oss_120b_together
+
+CHAT_EVENTS = [
+    {"choices": [{"index": 0, "delta": {"role": "assistant", "content": "Hi"}}]},
+    {"choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}]},
+    {"choices": [], "usage": {"prompt_tokens": 4, "completion_tokens": 1}},
+]
+
+
+class TestEquivalents:
+    def test_groups(self):
+        assert equivalents(GROQ) == [GROQ, TOGETHER]
+        assert equivalents(TOGETHER) == [TOGETHER, GROQ]
+        assert equivalents(Model.kimi_k2_instruct) == [
+            Model.kimi_k2_instruct,
+            Model.kimi_k2_instruct_together,
+        ]
+        assert equivalents(Model.claude_4_sonnet_20250514) == [Model.claude_4_sonnet_20250514]
+
+    def test_candidates_skip_deployments_without_vision(self):
+        failover = Failover()
+        image = ImageContent(image=Image.new("RGB", (8, 8)))
+        inp = make_input(Model.llama_4_scout_17b_together).model_copy(
+            update={
+                "messages": [
+                    Message(role=Role.USER, content=TextContent(text="Hi")),
+                    Message(role=Role.USER, content=image),
+                ]
+            }
+        )
+        # Llama 4 Scout on Groq is text-only
+        assert failover.candidates(inp) == [Model.llama_4_scout_17b_together]
+        assert failover.candidates(make_input(Model.llama_4_scout_17b_together)) == [
+            Model.llama_4_scout_17b_together,
+            Model.llama4_scout_groq,
+        ]
+
+
+def test_fails_over_on_server_error(client_factory, stub_server, api_keys):
+    stub_server.add("/v1/chat/completions", StubResponse({"error": "down"}, status=503))
+    stub_server.add("/v1/chat/completions", StubResponse(CHAT_REPLY))
+    failover = Failover(cooldown=60.0)
+
+    async def run():
+        async with client_factory(failover=failover) as client:
+            first = await client.complete(make_input(GROQ))
+            second = await client.complete(make_input(GROQ))
+            return first, second
+
+    first, second = asyncio.run(run())
+    assert first.provider == Provider.TOGETHER
+    assert first.model == TOGETHER
+    keys = [request["headers"]["Authorization"] for request in stub_server.requests]
+    assert keys == [
+        "Bearer test-groq_api_key",
+        "Bearer test-together_api_key",
+        "Bearer test-together_api_key",
+    ]
+    assert failover.failovers == 1
+    assert failover.degraded(GROQ)
+    # Groq is degraded, so the next request starts at Together
+    assert second.provider == Provider.TOGETHER
+
+
+def test_fatal_error_does_not_fail_over(client_factory, stub_server, api_keys):
+    stub_server.add("/v1/chat/completions", StubResponse({"error": "bad"}, status=400))
+    failover = Failover()
+
+    async def run():
+        async with client_factory(failover=failover) as client:
+            await client.complete(make_input(GROQ))
+
+    with pytest.raises(ProviderAPIError):
+        asyncio.run(run())
+    assert len(stub_server.requests) == 1
+    assert failover.failovers == 0
+
+
+def test_slow_stream_degrades_deployment(client_factory, stub_server, api_keys):
+    stub_server.add(
+        "/v1/chat/completions",
+        StubResponse(sse_body(CHAT_EVENTS), content_type="text/event-stream", delay=0.1),
+    )
+    stub_server.add(
+        "/v1/chat/completions",
+        StubResponse(sse_body(CHAT_EVENTS), content_type="text/event-stream"),
+    )
+    failover = Failover(latency_slo={GROQ: 0.05})
+
+    async def run():
+        async with client_factory(failover=failover) as client:
+            first = await client.complete(make_input(GROQ, stream=True))
+            second = await client.complete(make_input(GROQ, stream=True))
+            return first, second
+
+    first, second = asyncio.run(run())
+    assert first.provider == Provider.GROQ
+    assert second.provider == Provider.TOGETHER
+    assert failover.slow == 1
+
+
+def test_slow_unstreamed_reply_keeps_deployment(client_factory, stub_server, api_keys):
+    # Without streaming, TTFT is the whole request, so it is not held to the SLO
+    stub_server.add("/v1/chat/completions", StubResponse(CHAT_REPLY, delay=0.1))
+    failover = Failover(latency_slo={GROQ: 0.05})
+
+    async def run():
+        async with client_factory(failover=failover) as client:
+            await client.complete(make_input(GROQ))
+            return await client.complete(make_input(GROQ))
+
+    assert asyncio.run(run()).provider == Provider.GROQ
+    assert failover.slow == 0
@@ -0,0 +1,170 @@
+"""Tests for the upload-once Files API reference cache."""
+
+import asyncio
+import os
+import time
+
+from kintu.client.file_cache import FileReferenceCache
+from kintu.client.http_pool import HTTPPool
+from kintu.client.kintu_client import KintuClient
+from kintu.types.complete import CompleteInput
+from kintu.types.content import DocumentContent, TextContent
+from kintu.types.file_reference import FileReference
+from kintu.types.message import Message
+from kintu.types.model import Model
+from kintu.types.provider import Provider
+from kintu.types.role import Role
+from tests.conftest import StubResponse
+
+PDF_BYTES = b"%PDF-1.4\n" + os.urandom(2048)
+
+OPENAI_REPLY = {"output": [], "usage": {"input_tokens": 1, "output_tokens": 1}}
+GEMINI_REPLY = {"candidates": [], "usageMetadata": {"promptTokenCount": 1}}
+
+
+def document_input(model: Model, document: bytes = PDF_BYTES) -> CompleteInput:
+    return CompleteInput(
+        messages=[
+            Message(role=Role.USER, content=DocumentContent(document=document)),
+            Message(role=Role.USER, content=TextContent(text="Summarize this")),
+        ],
+        model=model,
+    )
+
+
+def run_completions(stub_server, file_cache: FileReferenceCache, inputs: list[CompleteInput]):
+    async def run():
+        pool = HTTPPool(base_urls={p: stub_server.url for p in Provider})
+        async with KintuClient(pool=pool, file_cache=file_cache) as client:
+            for inp in inputs:
+                await client.complete(inp)
+
+    asyncio.run(run())
+
+
+def request_paths(stub_server) -> list[str]:
+    return [request["path"].split("?")[0] for request in stub_server.requests]
+
+
+class TestFileReferenceCache:
+    def test_openai_uploads_once(self, stub_server, api_keys):
+        stub_server.add("/v1/files", StubResponse({"id": "file-abc"}))
+        stub_server.add("/v1/responses", StubResponse(OPENAI_REPLY))
+        cache = FileReferenceCache(min_bytes=1024)
+
+        # Equal bytes in distinct DocumentContent objects share one upload
+        run_completions(
+            stub_server, cache, [document_input(Model.gpt_4_1), document_input(Model.gpt_4_1)]
+        )
+
+        assert request_paths(stub_server) == ["/v1/files", "/v1/responses", "/v1/responses"]
+        assert b"user_data" in stub_server.requests[0]["body"]
+        assert PDF_BYTES in stub_server.requests[0]["body"]
+        part = stub_server.json_body()["input"][0]["content"][0]
+        assert part == {"type": "input_file", "file_id": "file-abc"}
+        assert (cache.uploads, cache.hits) == (1, 1)
+
+    def test_uploads_once_per_key(self, stub_server, api_keys, monkeypatch):
+        # A second key, possibly of another organization that cannot see the first's files
+        monkeypatch.setenv("OPENAI_API_KEY_2", "test-second-org")
+        stub_server.add("/v1/files", StubResponse({"id": "file-a"}))
+        stub_server.add("/v1/files", StubResponse({"id": "file-b"}))
+        stub_server.add("/v1/responses", StubResponse(OPENAI_REPLY))
+        cache = FileReferenceCache(min_bytes=1024)
+
+        run_completions(stub_server, cache, [document_input(Model.gpt_4_1)] * 3)
+
+        files = {}
+        for index, request in enumerate(stub_server.requests):
+            if request["path"] == "/v1/responses":
+                file_id = stub_server.json_body(index)["input"][0]["content"][0]["file_id"]
+                files.setdefault(request["headers"]["Authorization"], set()).add(file_id)
+        assert files == {
+            "Bearer test-openai_api_key": {"file-a"},
+            "Bearer test-second-org": {"file-b"},
+        }
+        assert (cache.uploads, cache.hits) == (2, 1)
+
+    def test_small_content_stays_inline(self, stub_server, api_keys):
+        stub_server.add("/v1/responses", StubResponse(OPENAI_REPLY))
+        cache = FileReferenceCache(min_bytes=1024 * 1024)
+
+        run_completions(stub_server, cache, [document_input(Model.gpt_4_1)])
+
+        assert request_paths(stub_server) == ["/v1/responses"]
+        assert "file_data" in stub_server.json_body()["input"][0]["content"][0]
+
+    def test_gemini_resumable_upload(self, stub_server, api_keys):
+        stub_server.add(
+            "/upload/v1beta/files",
+            StubResponse({}, headers={"X-Goog-Upload-URL": f"{stub_server.url}/upload/session"}),
+        )
+        stub_server.add(
+            "/upload/session",
+            StubResponse(
+                {
+                    "file": {
+                        "name": "files/abc",
+                        "uri": "https://generativelanguage.googleapis.com/v1beta/files/abc",
+                        "mimeType": "application/pdf",
+                        "expirationTime": "2099-01-01T00:00:00.123456789Z",
+                    }
+                }
+            ),
+        )
+        stub_server.add(
+            "/v1beta/models/gemini-2.5-flash:generateContent", StubResponse(GEMINI_REPLY)
+        )
+        cache = FileReferenceCache(min_bytes=1024)
+
+        run_completions(stub_server, cache, [document_input(Model.gemini_2_5_flash)])
+
+        upload = stub_server.requests[1]
+        assert upload["headers"]["X-Goog-Upload-Command"] == "upload, finalize"
+        assert upload["body"] == PDF_BYTES
+        part = stub_server.json_body()["contents"][0]["parts"][0]
+        assert part == {
+            "fileData": {
+                "mimeType": "application/pdf",
+                "fileUri": "https://generativelanguage.googleapis.com/v1beta/files/abc",
+            }
+        }
+
+    def test_expired_reference_is_reuploaded(self, stub_server, api_keys):
+        stub_server.add("/v1/files", StubResponse({"id": "file-new"}))
+        stub_server.add("/v1/responses", StubResponse(OPENAI_REPLY))
+        cache = FileReferenceCache(min_bytes=1024, expiry_margin=60)
+        inp = document_input(Model.gpt_4_1)
+        digest = cache._digest(inp.messages[0].content)
+        # Still valid, but inside the expiry margin
+        cache.put(
+            digest,
+            FileReference(
+                provider=Provider.OPENAI,
+                file_id="file-old",
+                mime_type="application/pdf",
+                expires_at=time.time() + 30,
+            ),
+            "test-openai_api_key",
+        )
+
+        run_completions(stub_server, cache, [inp])
+
+        assert request_paths(stub_server) == ["/v1/files", "/v1/responses"]
+        assert stub_server.json_body()["input"][0]["content"][0]["file_id"] == "file-new"
+
+    def test_lru_eviction(self):
+        cache = FileReferenceCache(max_entries=2)
+        for index in range(3):
+            cache.put(
+                f"digest-{index}",
+                FileReference(provider=Provider.OPENAI, file_id=f"file-{index}", mime_type="x"),
+                "key",
+            )
+        assert len(cache) == 2
+        assert cache.evictions == 1
+        assert cache.get(Provider.OPENAI, "digest-0", "key") is None
+        assert cache.get(Provider.OPENAI, "digest-2", "key") is not None
+        # References are per provider and per key
+        assert cache.get(Provider.ANTHROPIC, "digest-2", "key") is None
+        assert cache.get(Provider.OPENAI, "digest-2", "other-org-key") is None
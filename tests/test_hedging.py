@@ -0,0 +1,112 @@
+"""Tests for hedged requests."""
+
+import asyncio
+
+import pytest
+
+from kintu.client.hedging import Hedging
+from kintu.client.http_pool import HTTPPool
+from kintu.client.kintu_client import KintuClient
+from kintu.types.complete import RequestTiming, StreamChunk
+from kintu.types.errors import ProviderAPIError
+from kintu.types.model import Model
+from kintu.types.provider import Provider
+from tests.conftest import CHAT_REPLY, StubResponse, make_input
+from tests.test_response_cache import make_reply
+
+GROQ = Model.openai_gpt_oss_120b_groq
+TOGETHER = Model.openai_gpt_oss_120b_together
+
+
+def fake_attempt(ttfts: dict[Model, float], cancelled: list[Model]):
+    """An attempt that streams one chunk after the model's TTFT, then replies."""
+
+    async def attempt(inp, on_chunk):
+        try:
+            await asyncio.sleep(ttfts[inp.model])
+            if on_chunk is not None:
+                await on_chunk(
+                    StreamChunk(provider_data=inp.model.value, timestamp=0.0, chunk_index=0)
+                )
+            await asyncio.sleep(0.01)
+        except asyncio.CancelledError:
+            cancelled.append(inp.model)
+            raise
+        reply = make_reply(inp.model.value)
+        return reply.model_copy(
+            update={"timing": RequestTiming(ttft=ttfts[inp.model], duration=0.0)}
+        )
+
+    return attempt
+
+
+class TestHedging:
+    def test_delay_is_learned_percentile(self):
+        hedging = Hedging(percentile=0.95, min_samples=20, initial_delay=2.0)
+        assert hedging.delay(GROQ) == 2.0
+        for ms in range(1, 101):
+            hedging.observe(GROQ, ms / 1000)
+        assert hedging.delay(GROQ) == pytest.approx(0.095)
+        assert hedging.delay(TOGETHER) == 2.0
+
+    def test_fast_primary_is_not_hedged(self):
+        hedging = Hedging(initial_delay=0.1)
+        attempt = fake_attempt({GROQ: 0.01}, [])
+        reply = asyncio.run(hedging.run(make_input(GROQ), attempt, None))
+        assert reply.messages[0].content.text == GROQ.value
+        assert hedging.hedged == 0
+
+    def test_backup_streams_first(self):
+        hedging = Hedging(initial_delay=0.02)
+        cancelled = []
+        chunks = []
+
+        async def on_chunk(chunk):
+            chunks.append(chunk.provider_data)
+
+        attempt = fake_attempt({GROQ: 0.5, TOGETHER: 0.01}, cancelled)
+        reply = asyncio.run(hedging.run(make_input(GROQ, stream=True), attempt, on_chunk))
+        assert reply.messages[0].content.text == TOGETHER.value
+        assert chunks == [TOGETHER.value]
+        assert cancelled == [GROQ]
+        assert (hedging.hedged, hedging.backup_wins) == (1, 1)
+        # The primary's TTFT was at least the time until the backup's first chunk
+        assert hedging._ttfts[GROQ][0] >= 0.03
+
+    def test_same_model_without_equivalents(self):
+        hedging = Hedging(initial_delay=0.02)
+        models = []
+
+        async def attempt(inp, on_chunk):
+            models.append(inp.model)
+            await asyncio.sleep(0.5 if len(models) == 1 else 0.01)
+            return make_reply("done")
+
+        asyncio.run(hedging.run(make_input(Model.claude_4_sonnet_20250514), attempt, None))
+        assert models == [Model.claude_4_sonnet_20250514] * 2
+
+    def test_all_fail(self):
+        hedging = Hedging(initial_delay=0.01)
+
+        async def attempt(inp, on_chunk):
+            await asyncio.sleep(0.05)
+            raise ProviderAPIError("down", status_code=503)
+
+        with pytest.raises(ProviderAPIError):
+            asyncio.run(hedging.run(make_input(GROQ), attempt, None))
+        assert hedging.hedged == 1
+
+
+def test_client_hedges_to_equivalent(stub_server, api_keys):
+    stub_server.add("/v1/chat/completions", StubResponse(CHAT_REPLY, delay=0.5))
+    stub_server.add("/v1/chat/completions", StubResponse(CHAT_REPLY))
+    hedging = Hedging(initial_delay=0.05)
+
+    async def run():
+        pool = HTTPPool(base_urls={provider: stub_server.url for provider in Provider})
+        async with KintuClient(pool=pool, hedging=hedging) as client:
+            return await client.complete(make_input(GROQ))
+
+    reply = asyncio.run(run())
+    assert reply.provider == Provider.TOGETHER
+    assert hedging.backup_wins == 1
@@ -0,0 +1,125 @@
+"""Tests for fitting images to per-model vision limits."""
+
+import asyncio
+import io
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from PIL import Image
+
+from kintu import utilities
+from kintu.client.image_preprocessor import ImagePreprocessor, count_images, fit_image
+from kintu.model_library.model_library import get_spec
+from kintu.types.complete import CompleteInput
+from kintu.types.content import ImageContent, TextContent, ToolResultContent
+from kintu.types.errors import TooManyImagesError
+from kintu.types.message import Message
+from kintu.types.model import Model
+from kintu.types.role import Role
+from kintu.utilities import IMAGE_CACHE, image_digest, known_image_digest
+
+
+def screenshot(size: tuple[int, int] = (3840, 2160)) -> Image.Image:
+    return Image.new("RGB", size, (200, 100, 50))
+
+
+def image_input(model: Model, count: int = 1) -> CompleteInput:
+    messages = [
+        Message(role=Role.USER, content=ImageContent(image=screenshot())) for _ in range(count)
+    ]
+    messages.append(Message(role=Role.USER, content=TextContent(text="What is this?")))
+    return CompleteInput(messages=messages, model=model)
+
+
+class TestFitImage:
+    def test_downscales_to_max_pixels(self):
+        data = fit_image(screenshot(), 1_000_000, "JPEG", 85)
+        fitted = Image.open(io.BytesIO(data))
+        assert fitted.format == "JPEG"
+        assert fitted.size[0] * fitted.size[1] <= 1_000_000
+        # Aspect ratio is preserved
+        assert abs(fitted.size[0] / fitted.size[1] - 16 / 9) < 0.01
+
+    def test_small_image_untouched(self):
+        data = fit_image(screenshot((100, 50)), 1_000_000, "PNG", 85)
+        assert Image.open(io.BytesIO(data)).size == (100, 50)
+
+
+class TestImagePreprocessor:
+    def test_fits_images_in_process_pool(self):
+        spec = get_spec(Model.claude_4_sonnet_20250514)
+        preprocessor = ImagePreprocessor(max_workers=1)
+        try:
+            inp = asyncio.run(preprocessor.preprocess(image_input(spec.model_id), spec))
+        finally:
+            preprocessor.close()
+        image = inp.messages[0].content.image
+        assert image.format == spec.vision_limits.preferred_format
+        assert image.size[0] * image.size[1] <= spec.vision_limits.max_pixels
+        # Hashed by the worker, and the encoded payload already cached for the backends
+        assert known_image_digest(image) == image_digest(image)
+        assert IMAGE_CACHE.get((image_digest(image), image.format)) is not None
+
+    def test_fitted_images_are_memoized(self):
+        spec = get_spec(Model.gpt_4_1)
+        executor = ThreadPoolExecutor(max_workers=1)
+        preprocessor = ImagePreprocessor(executor=executor)
+        first = asyncio.run(preprocessor.preprocess(image_input(spec.model_id), spec))
+        calls = []
+        original_submit = executor.submit
+        executor.submit = lambda *args, **kwargs: (
+            calls.append(args) or original_submit(*args, **kwargs)
+        )
+        second = asyncio.run(preprocessor.preprocess(image_input(spec.model_id), spec))
+        executor.shutdown()
+        assert not calls
+        assert image_digest(first.messages[0].content.image) == image_digest(
+            second.messages[0].content.image
+        )
+
+    def test_already_fitted_input_is_unchanged(self):
+        spec = get_spec(Model.gpt_4_1)
+        preprocessor = ImagePreprocessor(executor=ThreadPoolExecutor(max_workers=1))
+        fitted = asyncio.run(preprocessor.preprocess(image_input(spec.model_id), spec))
+        assert asyncio.run(preprocessor.preprocess(fitted, spec)) is fitted
+
+    def test_image_within_limits_is_unchanged(self):
+        spec = get_spec(Model.gpt_4_1)
+        executor = ThreadPoolExecutor(max_workers=1)
+        executor.submit = lambda *args, **kwargs: pytest.fail("sent to the pool")
+        preprocessor = ImagePreprocessor(executor=executor)
+        # Built in memory, so it has no format, but small enough to send as it is
+        inp = CompleteInput(
+            messages=[Message(role=Role.USER, content=ImageContent(image=screenshot((640, 480))))],
+            model=spec.model_id,
+        )
+        assert asyncio.run(preprocessor.preprocess(inp, spec)) is inp
+
+    def test_memo_hit_hashes_only_the_original(self, monkeypatch):
+        spec = get_spec(Model.gpt_4_1)
+        preprocessor = ImagePreprocessor(executor=ThreadPoolExecutor(max_workers=1))
+        asyncio.run(preprocessor.preprocess(image_input(spec.model_id), spec))
+        hashed = []
+        monkeypatch.setattr(
+            utilities,
+            "image_digest",
+            lambda image: hashed.append(image) or image_digest(image),
+        )
+        asyncio.run(preprocessor.preprocess(image_input(spec.model_id), spec))
+        assert len(hashed) == 1
+
+    def test_too_many_images(self):
+        spec = get_spec(Model.llama4_maverick_groq)
+        preprocessor = ImagePreprocessor(executor=ThreadPoolExecutor(max_workers=1))
+        with pytest.raises(TooManyImagesError):
+            asyncio.run(preprocessor.preprocess(image_input(spec.model_id, count=6), spec))
+
+    def test_images_in_tool_results(self):
+        spec = get_spec(Model.gpt_4_1)
+        result = ToolResultContent(tool_id="call_1", results=[ImageContent(image=screenshot())])
+        inp = CompleteInput(messages=[Message(role=Role.TOOL, content=result)], model=spec.model_id)
+        assert count_images(inp.messages) == 1
+        preprocessor = ImagePreprocessor(executor=ThreadPoolExecutor(max_workers=1))
+        fitted = asyncio.run(preprocessor.preprocess(inp, spec))
+        image = fitted.messages[0].content.results[0].image
+        assert image.format == "JPEG"
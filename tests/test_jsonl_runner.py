@@ -0,0 +1,150 @@
+"""Tests for the resumable JSONL runner behind `kintu run`."""
+
+import asyncio
+import io
+import json
+
+import pytest
+from PIL import Image
+
+from kintu.client.http_pool import HTTPPool
+from kintu.client.jsonl_runner import parse_row, run_jsonl
+from kintu.client.kintu_client import KintuClient
+from kintu.types.content import TextContent
+from kintu.types.model import Model
+from kintu.types.provider import Provider
+from kintu.types.role import Role
+from tests.conftest import ANTHROPIC_REPLY, StubResponse
+
+MODEL = Model.claude_4_sonnet_20250514
+
+
+def row(row_id: str, **kw) -> str:
+    return json.dumps(
+        {"id": row_id, "model": MODEL.value, "messages": [{"role": "user", "content": "Hi"}], **kw}
+    )
+
+
+def run(stub_server, input_path, output_path, errors=None):
+    async def go():
+        pool = HTTPPool(base_urls={provider: stub_server.url for provider in Provider})
+        async with KintuClient(pool=pool) as client:
+            return await run_jsonl(
+                client, input_path, output_path, max_concurrency=1, errors=errors
+            )
+
+    return asyncio.run(go())
+
+
+def read_jsonl(path) -> list[dict]:
+    return [json.loads(line) for line in path.read_text().splitlines()]
+
+
+def test_parse_row():
+    inp = parse_row(
+        {
+            "model": MODEL.value,
+            "max_tokens": 20,
+            "messages": [
+                {"role": "system", "content": "Be brief."},
+                {"role": "user", "content": {"type": "text", "text": "Hi"}},
+            ],
+        }
+    )
+    assert inp.model == MODEL
+    assert inp.max_tokens == 20
+    assert [message.role for message in inp.messages] == [Role.SYSTEM, Role.USER]
+    assert inp.messages[1].content == TextContent(text="Hi")
+    with pytest.raises(ValueError):
+        parse_row({"model": MODEL.value, "messages": [{"role": "user", "content": {"type": "x"}}]})
+
+
+def test_resumes_failed_rows(stub_server, api_keys, tmp_path):
+    input_path = tmp_path / "in.jsonl"
+    output_path = tmp_path / "out.jsonl"
+    input_path.write_text("\n".join([row("a"), "{not json", row("c"), "", row("e")]) + "\n")
+    stub_server.add("/v1/messages", StubResponse(ANTHROPIC_REPLY))
+    stub_server.add("/v1/messages", StubResponse({"error": "bad"}, status=400))
+    stub_server.add("/v1/messages", StubResponse(ANTHROPIC_REPLY))
+    errors = io.StringIO()
+
+    summary = run(stub_server, input_path, output_path, errors)
+    assert (summary.completed, summary.skipped, summary.failed) == (2, 0, 2)
+    assert summary.cost > 0
+    assert [line.split(":")[0] for line in errors.getvalue().splitlines()] == ["line 1", "line 2"]
+    replies = read_jsonl(output_path)
+    assert [(reply["line"], reply["id"]) for reply in replies] == [(0, "a"), (4, "e")]
+    assert replies[0]["text"] == "Hello from Claude"
+    assert replies[0]["usage"]["input_cached_tokens"] == 2
+    assert replies[0]["messages"][0]["content"]["type"] == "TextContent"
+
+    # Only the failed rows run again
+    summary = run(stub_server, input_path, output_path, io.StringIO())
+    assert (summary.completed, summary.skipped, summary.failed) == (1, 2, 1)
+    assert [reply["id"] for reply in read_jsonl(output_path)] == ["a", "e", "c"]
+    assert len(stub_server.requests) == 4
+
+
+def test_drops_replies_written_after_the_checkpoint(stub_server, api_keys, tmp_path):
+    input_path = tmp_path / "in.jsonl"
+    output_path = tmp_path / "out.jsonl"
+    input_path.write_text(row("a") + "\n")
+    stub_server.add("/v1/messages", StubResponse(ANTHROPIC_REPLY))
+    run(stub_server, input_path, output_path)
+    complete = output_path.read_text()
+    with output_path.open("a") as output:
+        output.write('{"line": 0, "id": "a", "te')
+
+    summary = run(stub_server, input_path, output_path)
+    assert (summary.completed, summary.skipped) == (0, 1)
+    assert output_path.read_text() == complete
+    assert len(stub_server.requests) == 1
+
+
+def test_reruns_lines_whose_replies_were_lost(stub_server, api_keys, tmp_path):
+    input_path = tmp_path / "in.jsonl"
+    output_path = tmp_path / "out.jsonl"
+    input_path.write_text(row("a") + "\n" + row("b") + "\n")
+    stub_server.add("/v1/messages", StubResponse(ANTHROPIC_REPLY))
+    run(stub_server, input_path, output_path)
+    first = output_path.read_text().splitlines(keepends=True)[0]
+    output_path.write_text(first)
+
+    summary = run(stub_server, input_path, output_path)
+    assert (summary.completed, summary.skipped) == (1, 1)
+    assert sorted(reply["line"] for reply in read_jsonl(output_path)) == [0, 1]
+    assert len(stub_server.requests) == 3
+
+
+def test_image_rows(stub_server, api_keys, tmp_path):
+    input_path = tmp_path / "in.jsonl"
+    output_path = tmp_path / "out.jsonl"
+    Image.new("RGB", (8, 8), "red").save(tmp_path / "red.png")
+    content = {"type": "image", "path": str(tmp_path / "red.png")}
+    input_path.write_text(row("a", messages=[{"role": "user", "content": content}]) + "\n")
+    stub_server.add("/v1/messages", StubResponse(ANTHROPIC_REPLY))
+
+    summary = run(stub_server, input_path, output_path)
+    assert summary.completed == 1
+    assert stub_server.json_body()["messages"][0]["content"][0]["type"] == "image"
+
+
+def test_keeps_output_the_checkpoint_does_not_know(stub_server, api_keys, tmp_path):
+    input_path = tmp_path / "in.jsonl"
+    output_path = tmp_path / "out.jsonl"
+    input_path.write_text(row("a") + "\n")
+    output_path.write_text('{"line": 0, "id": "from another run"}\n')
+    stub_server.add("/v1/messages", StubResponse(ANTHROPIC_REPLY))
+
+    with pytest.raises(FileExistsError):
+        run(stub_server, input_path, output_path)
+    assert read_jsonl(output_path) == [{"line": 0, "id": "from another run"}]
+    assert stub_server.requests == []
+
+    async def overwrite():
+        pool = HTTPPool(base_urls={provider: stub_server.url for provider in Provider})
+        async with KintuClient(pool=pool) as client:
+            return await run_jsonl(client, input_path, output_path, overwrite=True)
+
+    asyncio.run(overwrite())
+    assert [reply["id"] for reply in read_jsonl(output_path)] == ["a"]
@@ -75,6 +75,15 @@ class TestModelSpecSanityChecks:
                     f"{model_key}: Should not have code_execution"
                 )
 
+    def test_vision_models_have_vision_limits(self):
+        """Test that every vision model declares its vision limits, and only vision models."""
+        for model_key, spec in MODEL_LIBRARY.items():
+            if spec.features.vision:
+                assert spec.vision_limits is not None, f"{model_key}: Missing vision_limits"
+                assert spec.vision_limits.preferred_format in ("PNG", "JPEG", "WEBP")
+            else:
+                assert spec.vision_limits is None, f"{model_key}: vision_limits without vision"
+
     # Commented out test to identify placeholder values
     # def test_identify_placeholder_values(self):
     #     """Identify models with placeholder values that need to be filled."""
@@ -0,0 +1,137 @@
+"""Tests for the client-side RPM/TPM rate limiter."""
+
+import asyncio
+import multiprocessing
+
+import pytest
+
+from kintu.client.http_pool import HTTPPool
+from kintu.client.kintu_client import KintuClient
+from kintu.client.rate_limiter import RateLimit, RateLimiter, TokenBucket
+from kintu.client.shared_buckets import SharedBuckets
+from kintu.model_library.model_library import get_spec
+from kintu.types.errors import ProviderAPIError
+from kintu.types.model import Model
+from kintu.types.provider import Provider
+from tests.conftest import ANTHROPIC_REPLY, StubResponse, make_input
+
+MODEL = Model.claude_4_sonnet_20250514
+# Set by the api_keys fixture
+API_KEY = "test-anthropic_api_key"
+
+
+def run_completions(stub_server, limiter: RateLimiter, count: int, **kwargs) -> None:
+    async def run():
+        pool = HTTPPool(base_urls={provider: stub_server.url for provider in Provider})
+        async with KintuClient(pool=pool, rate_limiter=limiter) as client:
+            for _ in range(count):
+                await client.complete(make_input(MODEL, **kwargs))
+
+    asyncio.run(run())
+
+
+def take_shared(directory: str, count: int) -> None:
+    bucket = SharedBuckets("test", directory).bucket("requests", 6000)
+    for _ in range(count):
+        bucket.take(1)
+
+
+class TestTokenBucket:
+    def test_debt_is_paid_by_refill(self):
+        bucket = TokenBucket(per_minute=600)
+        assert bucket.take(600) == 0
+        assert bucket.take(20) == pytest.approx(2.0, abs=0.01)
+        bucket.give(20)
+        assert bucket.level == pytest.approx(0, abs=0.1)
+
+
+class TestRateLimiter:
+    def test_estimate(self):
+        limiter = RateLimiter({}, output_tokens=500)
+        # "Be brief." and "Hi" are 11 characters
+        assert limiter.estimate_tokens(make_input(MODEL)) == 2 + 500
+        assert limiter.estimate_tokens(make_input(MODEL, max_tokens=100)) == 2 + 100
+
+    def test_waits_for_the_token_bucket(self):
+        limiter = RateLimiter({MODEL: RateLimit(tokens_per_minute=6000)}, output_tokens=3000)
+        spec = get_spec(MODEL)
+
+        async def run():
+            inp = make_input(MODEL)
+            await limiter.acquire(inp, spec)
+            return await limiter.acquire(inp, spec)
+
+        reservation = asyncio.run(run())
+        # 6004 tokens against 6000 at 100 tokens per second
+        assert reservation.wait == pytest.approx(0.04, abs=0.01)
+        assert (limiter.requests, limiter.throttled) == (2, 1)
+
+    def test_provider_and_model_buckets_both_apply(self):
+        limiter = RateLimiter(
+            {Provider.ANTHROPIC: RateLimit(requests_per_minute=1), MODEL: RateLimit()}
+        )
+
+        async def run():
+            await limiter.acquire(make_input(MODEL), get_spec(MODEL))
+            task = asyncio.create_task(
+                limiter.acquire(make_input(Model.claude_3_5_haiku_20241022), get_spec(MODEL))
+            )
+            await asyncio.sleep(0.01)
+            assert limiter.throttled == 1
+            task.cancel()
+
+        asyncio.run(run())
+        # The cancelled wait gave its request back
+        assert limiter.request_bucket(Provider.ANTHROPIC).level == pytest.approx(0, abs=0.01)
+
+
+class TestReconcile:
+    def test_usage_replaces_the_estimate(self, stub_server, api_keys):
+        stub_server.add("/v1/messages", StubResponse(ANTHROPIC_REPLY))
+        limiter = RateLimiter({MODEL: RateLimit(tokens_per_minute=600)})
+        run_completions(stub_server, limiter, 1, max_tokens=100)
+        # 10 uncached input and 5 output tokens, instead of the 102 estimated
+        assert limiter.token_bucket(MODEL, API_KEY).level == pytest.approx(600 - 15, abs=1)
+
+    def test_failed_request_refunds_tokens(self, stub_server, api_keys):
+        stub_server.add("/v1/messages", StubResponse({"error": "overloaded"}, status=529))
+        limiter = RateLimiter({MODEL: RateLimit(requests_per_minute=10, tokens_per_minute=6000)})
+        with pytest.raises(ProviderAPIError):
+            run_completions(stub_server, limiter, 1, max_tokens=3000)
+        assert limiter.token_bucket(MODEL, API_KEY).level == pytest.approx(6000, abs=1)
+        # The request itself still counts against the provider's limit
+        assert limiter.request_bucket(MODEL, API_KEY).level == pytest.approx(9, abs=0.1)
+
+
+class TestSharedBuckets:
+    def test_shared_between_instances(self, tmp_path):
+        first = SharedBuckets("test", str(tmp_path)).bucket("tokens", 600)
+        second = SharedBuckets("test", str(tmp_path)).bucket("tokens", 600)
+        first.take(500)
+        assert second.take(200) == pytest.approx(10.0, abs=0.05)
+        assert SharedBuckets("other", str(tmp_path)).bucket("tokens", 600).level == 600
+
+    def test_atomic_across_processes(self, tmp_path):
+        workers = [
+            multiprocessing.Process(target=take_shared, args=(str(tmp_path), 1000))
+            for _ in range(4)
+        ]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        # Every take landed: 4000 of 6000, plus 100 per second of refill
+        level = SharedBuckets("test", str(tmp_path)).bucket("requests", 6000).level
+        assert 2000 <= level < 2300
+
+    def test_limiter_keys_buckets_per_api_key(self, tmp_path):
+        limiter = RateLimiter(
+            {MODEL: RateLimit(requests_per_minute=1)}, store=SharedBuckets("test", str(tmp_path))
+        )
+
+        async def run():
+            await limiter.acquire(make_input(MODEL), get_spec(MODEL), "key-1")
+            await limiter.acquire(make_input(MODEL), get_spec(MODEL), "key-2")
+
+        asyncio.run(run())
+        assert limiter.throttled == 0
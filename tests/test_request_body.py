@@ -0,0 +1,85 @@
+"""Tests for streamed request bodies and mmap-backed documents."""
+
+import asyncio
+import base64
+import json
+import os
+
+from kintu.client.http_pool import HTTPPool
+from kintu.client.kintu_client import KintuClient
+from kintu.client.request_body import Base64Blob, StreamingJSONBody, iter_base64
+from kintu.types.complete import CompleteInput
+from kintu.types.content import DocumentContent
+from kintu.types.message import Message
+from kintu.types.model import Model
+from kintu.types.provider import Provider
+from kintu.types.role import Role
+from tests.conftest import StubResponse
+
+PDF_BYTES = b"%PDF-1.4\n" + os.urandom(300_001)
+
+
+class TestStreamingJSONBody:
+    def test_iter_base64_matches_b64encode(self):
+        encoded = b"".join(iter_base64(PDF_BYTES, chunk_size=3 * 1000))
+        assert encoded == base64.b64encode(PDF_BYTES)
+
+    def test_body_matches_inline_serialization(self):
+        body = {
+            "messages": [
+                {"data": Base64Blob(PDF_BYTES)},
+                {"url": Base64Blob(memoryview(PDF_BYTES), prefix="data:application/pdf;base64,")},
+            ],
+            "note": "café",
+        }
+        streamed = StreamingJSONBody(body)
+        raw = streamed.read()
+        assert len(streamed) == len(raw)
+        decoded = json.loads(raw)
+        assert base64.b64decode(decoded["messages"][0]["data"]) == PDF_BYTES
+        assert decoded["messages"][1]["url"].startswith("data:application/pdf;base64,")
+        assert decoded["note"] == "café"
+
+    def test_body_without_blobs(self):
+        body = StreamingJSONBody({"a": [1, 2, {"b": None}]})
+        assert not body.has_blobs
+        assert json.loads(body.read()) == {"a": [1, 2, {"b": None}]}
+
+
+class TestDocumentFromPath:
+    def test_memory_mapped(self, tmp_path):
+        path = tmp_path / "report.pdf"
+        path.write_bytes(PDF_BYTES)
+        document = DocumentContent.from_path(path)
+        assert isinstance(document.document, memoryview)
+        assert bytes(document.document) == PDF_BYTES
+        assert document._openai_filename == "report.pdf"
+
+    def test_empty_file(self, tmp_path):
+        path = tmp_path / "empty.pdf"
+        path.write_bytes(b"")
+        assert DocumentContent.from_path(path).document == b""
+
+    def test_streamed_to_provider(self, tmp_path, stub_server, api_keys):
+        path = tmp_path / "report.pdf"
+        path.write_bytes(PDF_BYTES)
+        stub_server.add(
+            "/v1/responses",
+            StubResponse({"output": [], "usage": {"input_tokens": 1, "output_tokens": 1}}),
+        )
+        inp = CompleteInput(
+            messages=[Message(role=Role.USER, content=DocumentContent.from_path(path))],
+            model=Model.gpt_4_1,
+        )
+
+        async def run():
+            pool = HTTPPool(base_urls={Provider.OPENAI: stub_server.url})
+            async with KintuClient(pool=pool) as client:
+                await client.complete(inp)
+
+        asyncio.run(run())
+        part = stub_server.json_body()["input"][0]["content"][0]
+        assert part["filename"] == "report.pdf"
+        assert part["file_data"] == "data:application/pdf;base64," + base64.b64encode(
+            PDF_BYTES
+        ).decode("ascii")
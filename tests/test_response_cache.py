@@ -0,0 +1,128 @@
+"""Tests for input fingerprints and the persistent response cache."""
+
+import asyncio
+import multiprocessing
+import time
+
+from PIL import Image
+
+from kintu.client.fingerprint import fingerprint, hashes_media
+from kintu.client.http_pool import HTTPPool
+from kintu.client.kintu_client import KintuClient
+from kintu.client.response_cache import ResponseCache
+from kintu.types.complete import CompleteReply, LLMUsage, RequestTiming
+from kintu.types.content import ImageContent, TextContent
+from kintu.types.message import Message
+from kintu.types.model import Model
+from kintu.types.provider import Provider
+from kintu.types.role import Role
+from tests.conftest import ANTHROPIC_REPLY, StubResponse, make_input
+
+
+def image_input(color: tuple[int, int, int]):
+    return make_input(Model.claude_4_sonnet_20250514).model_copy(
+        update={
+            "messages": [
+                Message(role=Role.USER, content=ImageContent(image=Image.new("RGB", (8, 8), color)))
+            ]
+        }
+    )
+
+
+def make_reply(text: str = "x") -> CompleteReply:
+    return CompleteReply(
+        messages=[Message(role=Role.ASSISTANT, content=TextContent(text=text))],
+        model=Model.claude_4_sonnet_20250514,
+        provider=Provider.ANTHROPIC,
+        usage=LLMUsage(),
+        timing=RequestTiming(ttft=0.1, duration=0.2),
+        provider_response={},
+    )
+
+
+def fill(path: str, worker: int) -> None:
+    cache = ResponseCache(path)
+    for index in range(50):
+        cache.put_sync(f"{worker}:{index}", make_reply())
+        assert cache.get_sync(f"{worker}:{index}") is not None
+    cache.close()
+
+
+class TestFingerprint:
+    def test_equal_inputs(self):
+        model = Model.claude_4_sonnet_20250514
+        assert fingerprint(make_input(model)) == fingerprint(make_input(model))
+        assert fingerprint(make_input(model)) == fingerprint(make_input(model, stream=True))
+        assert fingerprint(make_input(model)) != fingerprint(make_input(model, temperature=0.5))
+        assert fingerprint(make_input(model)) != fingerprint(make_input(Model.gpt_4_1))
+
+    def test_images_hashed_by_pixels(self):
+        assert fingerprint(image_input((255, 0, 0))) == fingerprint(image_input((255, 0, 0)))
+        assert fingerprint(image_input((255, 0, 0))) != fingerprint(image_input((0, 255, 0)))
+
+    def test_image_hashed_once(self):
+        inp = image_input((255, 0, 0))
+        # A new image is worth hashing off the event loop; once hashed it is remembered
+        assert hashes_media(inp)
+        first = fingerprint(inp)
+        assert not hashes_media(inp)
+        assert fingerprint(inp) == first
+        assert not hashes_media(make_input(Model.claude_4_sonnet_20250514))
+
+
+class TestResponseCache:
+    def test_round_trip(self, tmp_path):
+        cache = ResponseCache(tmp_path / "cache.db")
+        assert cache.get_sync("a") is None
+        cache.put_sync("a", make_reply("hello"))
+        assert cache.get_sync("a").messages[0].content == TextContent(text="hello")
+        assert (cache.hits, cache.misses) == (1, 1)
+
+    def test_ttl(self, tmp_path):
+        cache = ResponseCache(tmp_path / "cache.db", ttl=0.05)
+        cache.put_sync("a", make_reply())
+        time.sleep(0.1)
+        assert cache.get_sync("a") is None
+        # Expired entries are purged by the next write
+        cache.put_sync("b", make_reply())
+        assert len(cache) == 1
+
+    def test_evicts_least_recently_read(self, tmp_path):
+        cache = ResponseCache(tmp_path / "cache.db")
+        cache.put_sync("a", make_reply())
+        size = cache.size()
+        cache.max_bytes = 2 * size
+        cache.put_sync("b", make_reply())
+        cache.get_sync("a")
+        cache.put_sync("c", make_reply())
+        assert cache.get_sync("b") is None
+        assert cache.get_sync("a") is not None and cache.get_sync("c") is not None
+        assert (cache.evictions, cache.size()) == (1, 2 * size)
+
+    def test_shared_across_processes(self, tmp_path):
+        path = str(tmp_path / "cache.db")
+        workers = [multiprocessing.Process(target=fill, args=(path, n)) for n in range(4)]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        assert [worker.exitcode for worker in workers] == [0] * 4
+        assert len(ResponseCache(path)) == 200
+
+
+def test_client_answers_repeats_from_cache(stub_server, api_keys, tmp_path):
+    stub_server.add("/v1/messages", StubResponse(ANTHROPIC_REPLY))
+
+    async def run():
+        pool = HTTPPool(base_urls={provider: stub_server.url for provider in Provider})
+        cache = ResponseCache(tmp_path / "cache.db")
+        async with KintuClient(pool=pool, response_cache=cache) as client:
+            first = await client.complete(make_input(Model.claude_4_sonnet_20250514))
+            second = await client.complete(make_input(Model.claude_4_sonnet_20250514))
+            await client.complete(make_input(Model.claude_4_sonnet_20250514, stream=False))
+            return first, second
+
+    first, second = asyncio.run(run())
+    assert len(stub_server.requests) == 1
+    assert second.messages == first.messages
+    assert second.usage == first.usage
@@ -0,0 +1,194 @@
+"""Tests for retries and circuit breakers."""
+
+import asyncio
+import random
+import time
+
+import pytest
+
+from kintu.client.retry import CircuitBreaker, CircuitState, RetryPolicy, is_retryable
+from kintu.model_library.model_library import get_spec
+from kintu.types.errors import (
+    CircuitOpenError,
+    ProviderAPIError,
+    ProviderConnectionError,
+    RetriesExhaustedError,
+    TooManyImagesError,
+)
+from kintu.types.llmsdk import LLMSDK
+from kintu.types.model import Model
+from kintu.types.provider import Provider
+from tests.conftest import ANTHROPIC_REPLY, StubResponse, make_input
+
+MODEL = Model.claude_4_sonnet_20250514
+
+
+def api_error(status: int, body: str = "", headers: dict[str, str] | None = None):
+    return ProviderAPIError("failed", status_code=status, body=body, headers=headers)
+
+
+class TestClassification:
+    def test_transient_statuses(self):
+        assert is_retryable(LLMSDK.OPENAI, api_error(429))
+        assert is_retryable(LLMSDK.GEMINI, api_error(503))
+        assert is_retryable(LLMSDK.ANTHROPIC, api_error(529))
+        assert not is_retryable(LLMSDK.OPENAI, api_error(529))
+        assert is_retryable(LLMSDK.OPENAI, ProviderConnectionError("reset"))
+
+    def test_fatal(self):
+        assert not is_retryable(LLMSDK.ANTHROPIC, api_error(400))
+        assert not is_retryable(LLMSDK.OPENAI, api_error(401))
+        assert not is_retryable(LLMSDK.OPENAI, api_error(429, body='{"code":"insufficient_quota"}'))
+        assert not is_retryable(LLMSDK.OPENAI, ValueError("bug"))
+
+
+class TestRetryPolicy:
+    def test_decorrelated_jitter(self):
+        policy = RetryPolicy(base_delay=1.0, max_delay=10.0, rng=random.Random(1))
+        delay = policy.base_delay
+        for _ in range(50):
+            previous, delay = delay, policy.next_delay(delay)
+            assert 1.0 <= delay <= min(10.0, previous * 3)
+
+    def test_retries_until_success(self):
+        policy = RetryPolicy(base_delay=0.001, max_delay=0.001)
+        failures = [api_error(503), ProviderConnectionError("reset")]
+
+        async def attempt():
+            if failures:
+                raise failures.pop(0)
+            return "ok"
+
+        assert asyncio.run(policy.run(get_spec(MODEL), attempt)) == "ok"
+        assert policy.retries == 2
+
+    def test_fatal_error_not_retried(self):
+        policy = RetryPolicy(base_delay=0.001)
+        calls = []
+
+        async def attempt():
+            calls.append(1)
+            raise api_error(400)
+
+        with pytest.raises(ProviderAPIError):
+            asyncio.run(policy.run(get_spec(MODEL), attempt))
+        assert len(calls) == 1
+
+    def test_exhausted(self):
+        policy = RetryPolicy(max_attempts=3, base_delay=0.001, max_delay=0.001)
+
+        async def attempt():
+            raise api_error(503)
+
+        with pytest.raises(RetriesExhaustedError) as info:
+            asyncio.run(policy.run(get_spec(MODEL), attempt))
+        assert info.value.attempts == 3
+        assert info.value.last_error.status_code == 503
+        assert policy.exhausted == 1
+
+    def test_long_retry_after_gives_up(self):
+        policy = RetryPolicy(base_delay=0.001, max_retry_after=5.0)
+
+        async def attempt():
+            raise api_error(429, headers={"retry-after": "120"})
+
+        with pytest.raises(ProviderAPIError) as info:
+            asyncio.run(policy.run(get_spec(MODEL), attempt))
+        assert info.value.retry_after == 120
+        assert (policy.retries, policy.exhausted) == (0, 0)
+
+    def test_non_provider_errors_leave_the_circuit_alone(self):
+        breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0.01)
+        policy = RetryPolicy(breaker=breaker)
+        breaker.before_request(Provider.ANTHROPIC)
+        breaker.record(Provider.ANTHROPIC, api_error(503))
+        time.sleep(0.02)
+
+        async def attempt():
+            raise TooManyImagesError("too many")
+
+        with pytest.raises(TooManyImagesError):
+            asyncio.run(policy.run(get_spec(MODEL), attempt))
+        # Still waiting for a trial that reaches the provider
+        assert breaker.state(Provider.ANTHROPIC) == CircuitState.HALF_OPEN
+        breaker.before_request(Provider.ANTHROPIC)
+
+
+class TestCircuitBreaker:
+    def test_opens_after_consecutive_outages(self):
+        breaker = CircuitBreaker(failure_threshold=3, reset_timeout=60.0)
+        for _ in range(3):
+            breaker.before_request(Provider.ANTHROPIC)
+            breaker.record(Provider.ANTHROPIC, api_error(502))
+        assert breaker.state(Provider.ANTHROPIC) == CircuitState.OPEN
+        with pytest.raises(CircuitOpenError) as info:
+            breaker.before_request(Provider.ANTHROPIC)
+        assert info.value.retry_in > 59
+        # Other providers are unaffected
+        breaker.before_request(Provider.OPENAI)
+
+    def test_throttling_is_not_an_outage(self):
+        breaker = CircuitBreaker(failure_threshold=2)
+        for error in (api_error(500), api_error(429), api_error(500)):
+            breaker.before_request(Provider.ANTHROPIC)
+            breaker.record(Provider.ANTHROPIC, error)
+        assert breaker.state(Provider.ANTHROPIC) == CircuitState.CLOSED
+
+    def test_half_open_trial(self):
+        breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0.01)
+        breaker.before_request(Provider.ANTHROPIC)
+        breaker.record(Provider.ANTHROPIC, ProviderConnectionError("refused"))
+        time.sleep(0.02)
+        breaker.before_request(Provider.ANTHROPIC)
+        assert breaker.state(Provider.ANTHROPIC) == CircuitState.HALF_OPEN
+        # Only one trial at a time
+        with pytest.raises(CircuitOpenError):
+            breaker.before_request(Provider.ANTHROPIC)
+        breaker.record(Provider.ANTHROPIC, None)
+        assert breaker.state(Provider.ANTHROPIC) == CircuitState.CLOSED
+
+    def test_failed_trial_reopens(self):
+        breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0.01)
+        breaker.before_request(Provider.ANTHROPIC)
+        breaker.record(Provider.ANTHROPIC, api_error(503))
+        time.sleep(0.02)
+        breaker.before_request(Provider.ANTHROPIC)
+        breaker.record(Provider.ANTHROPIC, api_error(503))
+        assert breaker.state(Provider.ANTHROPIC) == CircuitState.OPEN
+
+
+def test_client_honours_retry_after(client_factory, stub_server, api_keys):
+    stub_server.add(
+        "/v1/messages",
+        StubResponse({"error": "slow down"}, status=429, headers={"retry-after-ms": "200"}),
+    )
+    stub_server.add("/v1/messages", StubResponse(ANTHROPIC_REPLY))
+    retry = RetryPolicy(base_delay=0.001, max_delay=0.001)
+
+    async def run():
+        async with client_factory(retry=retry) as client:
+            start = time.perf_counter()
+            reply = await client.complete(make_input(MODEL))
+            return reply, time.perf_counter() - start
+
+    reply, elapsed = asyncio.run(run())
+    assert reply.messages
+    assert len(stub_server.requests) == 2
+    assert elapsed >= 0.2
+
+
+def test_client_fails_fast_while_open(client_factory, stub_server, api_keys):
+    stub_server.add("/v1/messages", StubResponse({"error": "down"}, status=503))
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=60.0)
+    retry = RetryPolicy(max_attempts=5, base_delay=0.001, max_delay=0.001, breaker=breaker)
+
+    async def run():
+        async with client_factory(retry=retry) as client:
+            with pytest.raises(CircuitOpenError):
+                await client.complete(make_input(MODEL))
+            with pytest.raises(CircuitOpenError):
+                await client.complete(make_input(MODEL))
+
+    asyncio.run(run())
+    assert len(stub_server.requests) == 2
+    assert breaker.rejected == 2
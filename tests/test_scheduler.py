@@ -0,0 +1,134 @@
+"""Tests for the priority and fair-share Scheduler."""
+
+import asyncio
+
+from kintu.client.http_pool import HTTPPool
+from kintu.client.kintu_client import KintuClient
+from kintu.client.scheduler import Scheduler
+from kintu.types.complete import Priority
+from kintu.types.model import Model
+from kintu.types.provider import Provider
+from tests.conftest import ANTHROPIC_REPLY, StubResponse, make_input
+
+MODEL = Model.claude_4_sonnet_20250514
+PROVIDER = Provider.ANTHROPIC
+
+
+async def grant_order(scheduler: Scheduler, requests: list[tuple[str, Priority, str | None]]):
+    """Queue the requests behind a held slot, then free it and record who goes in turn."""
+    held = await scheduler.acquire(make_input(MODEL), PROVIDER)
+    order = []
+
+    async def request(name, priority, tenant):
+        slot = await scheduler.acquire(
+            make_input(MODEL, priority=priority, tenant=tenant), PROVIDER
+        )
+        order.append(name)
+        await asyncio.sleep(0)
+        scheduler.release(slot)
+
+    tasks = []
+    for name, priority, tenant in requests:
+        tasks.append(asyncio.create_task(request(name, priority, tenant)))
+        await asyncio.sleep(0)
+    assert scheduler.queued() == {PROVIDER: len(requests)}
+    scheduler.release(held)
+    await asyncio.gather(*tasks)
+    return order
+
+
+class TestScheduler:
+    def test_priority_jumps_the_queue(self):
+        requests = [(f"bulk{i}", Priority.BULK, None) for i in range(3)]
+        requests += [
+            ("default", Priority.DEFAULT, None),
+            ("interactive", Priority.INTERACTIVE, None),
+        ]
+        order = asyncio.run(grant_order(Scheduler(default_capacity=1), requests))
+        assert order == ["interactive", "default", "bulk0", "bulk1", "bulk2"]
+
+    def test_tenants_take_turns(self):
+        requests = [("a", Priority.BULK, "a")] * 6 + [("b", Priority.BULK, "b")] * 2
+        order = asyncio.run(grant_order(Scheduler(default_capacity=1), requests))
+        assert order == ["a", "b", "a", "b", "a", "a", "a", "a"]
+
+    def test_weights(self):
+        scheduler = Scheduler(default_capacity=1, weights={"b": 2.0})
+        requests = [("a", Priority.BULK, "a")] * 4 + [("b", Priority.BULK, "b")] * 4
+        order = asyncio.run(grant_order(scheduler, requests))
+        assert order == ["a", "b", "b", "a", "b", "b", "a", "a"]
+
+    def test_cancelled_waiter_leaves_the_queue(self):
+        scheduler = Scheduler(default_capacity=1)
+
+        async def run():
+            held = await scheduler.acquire(make_input(MODEL), PROVIDER)
+            waiter = asyncio.create_task(scheduler.acquire(make_input(MODEL), PROVIDER))
+            await asyncio.sleep(0)
+            waiter.cancel()
+            await asyncio.gather(waiter, return_exceptions=True)
+            assert scheduler.queued() == {PROVIDER: 0}
+            scheduler.release(held)
+            await scheduler.acquire(make_input(MODEL), PROVIDER)
+
+        asyncio.run(run())
+        assert scheduler.in_flight() == {PROVIDER: 1}
+        assert scheduler.queued_requests == 1
+
+    def test_release_before_cancelled_waiter_runs(self):
+        scheduler = Scheduler(default_capacity=1)
+
+        async def run():
+            held = await scheduler.acquire(make_input(MODEL), PROVIDER)
+            waiter = asyncio.create_task(scheduler.acquire(make_input(MODEL), PROVIDER))
+            await asyncio.sleep(0)
+            waiter.cancel()
+            # The cancelled waiter's task has not run yet when the slot is freed
+            scheduler.release(held)
+            results = await asyncio.gather(waiter, return_exceptions=True)
+            assert isinstance(results[0], asyncio.CancelledError)
+            assert scheduler.in_flight() == {PROVIDER: 0}
+            slot = await asyncio.wait_for(scheduler.acquire(make_input(MODEL), PROVIDER), 1)
+            scheduler.release(slot)
+
+        asyncio.run(run())
+        assert scheduler.queued() == {PROVIDER: 0}
+
+    def test_capacity_per_provider(self):
+        scheduler = Scheduler(capacity={PROVIDER: 2}, default_capacity=1)
+
+        async def run():
+            for provider in [PROVIDER, PROVIDER, Provider.OPENAI]:
+                await scheduler.acquire(make_input(MODEL), provider)
+
+        asyncio.run(run())
+        assert scheduler.in_flight() == {PROVIDER: 2, Provider.OPENAI: 1}
+        assert scheduler.queued_requests == 0
+
+
+def test_client_sends_interactive_first(stub_server, api_keys):
+    stub_server.add("/v1/messages", StubResponse(ANTHROPIC_REPLY, delay=0.05))
+    scheduler = Scheduler(capacity={PROVIDER: 1})
+    finished = []
+
+    async def complete(client, name, priority):
+        await client.complete(make_input(MODEL, priority=priority))
+        finished.append(name)
+
+    async def run():
+        pool = HTTPPool(base_urls={provider: stub_server.url for provider in Provider})
+        async with KintuClient(pool=pool, scheduler=scheduler) as client:
+            tasks = []
+            for name, priority in [
+                ("bulk0", Priority.BULK),
+                ("bulk1", Priority.BULK),
+                ("bulk2", Priority.BULK),
+                ("interactive", Priority.INTERACTIVE),
+            ]:
+                tasks.append(asyncio.create_task(complete(client, name, priority)))
+                await asyncio.sleep(0.01)
+            await asyncio.gather(*tasks)
+
+    asyncio.run(run())
+    assert finished == ["bulk0", "interactive", "bulk1", "bulk2"]
+    assert scheduler.in_flight() == {PROVIDER: 0}
@@ -0,0 +1,123 @@
+"""Tests for the near-duplicate MinHash/LSH prompt cache."""
+
+import asyncio
+
+from kintu.client import similar_cache
+from kintu.client.http_pool import HTTPPool
+from kintu.client.kintu_client import KintuClient
+from kintu.client.similar_cache import SimilarPromptCache, minhash, shingles, similarity
+from kintu.types.complete import CompleteInput
+from kintu.types.content import TextContent
+from kintu.types.message import Message
+from kintu.types.model import Model
+from kintu.types.provider import Provider
+from kintu.types.role import Role
+from tests.conftest import ANTHROPIC_REPLY, StubResponse
+from tests.test_response_cache import make_reply
+
+PROMPT = (
+    "Classify the sentiment of the following customer review as positive, negative or "
+    "neutral. Answer with one word. Review received at {time}: the delivery was quick "
+    "and the product works exactly as described, would buy again from this seller."
+)
+
+
+def prompt_input(text: str, model: Model = Model.claude_4_sonnet_20250514, **kwargs):
+    return CompleteInput(
+        messages=[Message(role=Role.USER, content=TextContent(text=text))], model=model, **kwargs
+    )
+
+
+class TestMinHash:
+    def test_whitespace_and_case_ignored(self):
+        first = shingles(prompt_input("Hello   there\n world"))
+        assert first == shingles(prompt_input("hello there world"))
+
+    def test_similarity_estimate(self):
+        base = minhash(shingles(prompt_input(PROMPT.format(time="2025-01-01 10:00"))))
+        near = minhash(shingles(prompt_input(PROMPT.format(time="2025-03-17 18:42"))))
+        other = minhash(shingles(prompt_input("Translate this sentence into French please")))
+        assert similarity(base, near) > 0.8
+        assert similarity(base, other) < 0.1
+
+    def test_timestamps_masked(self):
+        first = shingles(prompt_input("Report for 2025-01-01T10:00:00Z, 3 alerts"))
+        assert first == shingles(prompt_input("Report for 2025-03-17T18:42:05Z, 3 alerts"))
+        assert first != shingles(prompt_input("Report for 2025-03-17T18:42:05Z, 4 alerts"))
+
+
+class TestSimilarPromptCache:
+    def test_timestamp_only_difference_hits_by_default(self):
+        cache = SimilarPromptCache()
+        prompt = "Summarize the incidents logged before {time} today"
+        cache.put_sync(prompt_input(prompt.format(time="9:15 am")), make_reply())
+        assert cache.get_sync(prompt_input(prompt.format(time="11:40 am"))) is not None
+        assert cache.get_sync(prompt_input("Summarize the incidents logged after 9:15 am")) is None
+
+    def test_near_duplicate_hit(self):
+        cache = SimilarPromptCache(default_threshold=0.8)
+        cache.put_sync(prompt_input(PROMPT.format(time="10:00")), make_reply("positive"))
+        reply = cache.get_sync(prompt_input(PROMPT.format(time="18:42")))
+        assert reply.messages[0].content.text == "positive"
+        assert cache.get_sync(prompt_input("Something else entirely")) is None
+        assert (cache.hits, cache.misses) == (1, 1)
+
+    def test_structure_must_match(self):
+        cache = SimilarPromptCache()
+        cache.put_sync(prompt_input(PROMPT), make_reply())
+        assert cache.get_sync(prompt_input(PROMPT, temperature=0.5)) is None
+        assert cache.get_sync(prompt_input(PROMPT, model=Model.gpt_4_1)) is None
+
+    def test_per_model_threshold(self):
+        cache = SimilarPromptCache(
+            thresholds={Model.claude_4_sonnet_20250514: 1.0}, default_threshold=None
+        )
+        cache.put_sync(prompt_input(PROMPT.format(time="10:00")), make_reply())
+        assert cache.get_sync(prompt_input(PROMPT.format(time="10:00"))) is not None
+        assert cache.get_sync(prompt_input(PROMPT.format(time="noon"))) is None
+        # No threshold: the model is never matched
+        gpt = prompt_input(PROMPT, model=Model.gpt_4_1)
+        cache.put_sync(gpt, make_reply())
+        assert cache.get_sync(gpt) is None
+
+    def test_persisted_and_evicted(self, tmp_path):
+        cache = SimilarPromptCache(tmp_path / "similar.db", max_entries=2)
+        for index in range(3):
+            cache.put_sync(prompt_input(f"prompt number {index} " * 5), make_reply())
+        assert (len(cache), cache.evictions) == (2, 1)
+        cache.close()
+        reopened = SimilarPromptCache(tmp_path / "similar.db")
+        assert reopened.get_sync(prompt_input("prompt number 0 " * 5)) is None
+        assert reopened.get_sync(prompt_input("prompt number 2 " * 5)) is not None
+
+
+def test_client_serves_near_duplicates(stub_server, api_keys):
+    stub_server.add("/v1/messages", StubResponse(ANTHROPIC_REPLY))
+
+    async def run():
+        pool = HTTPPool(base_urls={provider: stub_server.url for provider in Provider})
+        async with KintuClient(
+            pool=pool, similar_cache=SimilarPromptCache(default_threshold=0.8)
+        ) as client:
+            first = await client.complete(prompt_input(PROMPT.format(time="10:00")))
+            second = await client.complete(prompt_input(PROMPT.format(time="18:42")))
+            return first, second
+
+    first, second = asyncio.run(run())
+    assert len(stub_server.requests) == 1
+    assert second.messages == first.messages
+
+
+def test_client_signs_each_input_once(stub_server, api_keys, monkeypatch):
+    stub_server.add("/v1/messages", StubResponse(ANTHROPIC_REPLY))
+    signed = []
+    monkeypatch.setattr(similar_cache, "shingles", lambda inp: signed.append(inp) or shingles(inp))
+
+    async def run():
+        pool = HTTPPool(base_urls={provider: stub_server.url for provider in Provider})
+        async with KintuClient(pool=pool, similar_cache=SimilarPromptCache()) as client:
+            await client.complete(prompt_input(PROMPT.format(time="10:00")))
+
+    asyncio.run(run())
+    # One miss, then a put of the same input
+    assert len(signed) == 1
@@ -0,0 +1,166 @@
+"""Tests for coalescing identical in-flight completions."""
+
+import asyncio
+
+import pytest
+
+from kintu.client.single_flight import SingleFlight
+from kintu.types.complete import StreamChunk
+from kintu.types.model import Model
+from tests.conftest import ANTHROPIC_EVENTS, ANTHROPIC_REPLY, StubResponse, make_input, sse_body
+
+
+def fake_send(chunks: int, delay: float = 0.01):
+    """A send that publishes `chunks` chunks, `delay` seconds apart, then replies."""
+
+    async def send(publish):
+        for index in range(chunks):
+            await asyncio.sleep(delay)
+            await publish(StreamChunk(provider_data={}, timestamp=0.0, chunk_index=index))
+        return "reply"
+
+    return send
+
+
+class TestSingleFlight:
+    def test_late_waiter_gets_every_chunk_in_order(self):
+        flight = SingleFlight()
+        received: dict[str, list[int]] = {"early": [], "late": []}
+
+        def collect(name):
+            async def on_chunk(chunk):
+                received[name].append(chunk.chunk_index)
+                # A slow replay must not reorder or drop chunks published meanwhile
+                await asyncio.sleep(0.005)
+
+            return on_chunk
+
+        async def run():
+            send = fake_send(6)
+            early = asyncio.create_task(flight.run("k", collect("early"), send))
+            await asyncio.sleep(0.035)
+            late = asyncio.create_task(flight.run("k", collect("late"), send))
+            return await asyncio.gather(early, late)
+
+        assert asyncio.run(run()) == ["reply", "reply"]
+        assert received == {"early": list(range(6)), "late": list(range(6))}
+        assert (flight.requests, flight.coalesced, flight.in_flight) == (1, 1, 0)
+
+    def test_callback_error_fails_only_its_waiter(self):
+        flight = SingleFlight()
+
+        async def broken(chunk):
+            raise ValueError("consumer gone")
+
+        async def run():
+            send = fake_send(3)
+            return await asyncio.gather(
+                flight.run("k", broken, send), flight.run("k", None, send), return_exceptions=True
+            )
+
+        failed, reply = asyncio.run(run())
+        assert isinstance(failed, ValueError)
+        assert reply == "reply"
+
+    def test_abandoned_when_every_waiter_leaves(self):
+        flight = SingleFlight()
+
+        async def run():
+            send = fake_send(100)
+            waiters = [asyncio.create_task(flight.run("k", None, send)) for _ in range(2)]
+            await asyncio.sleep(0.02)
+            for waiter in waiters:
+                waiter.cancel()
+            await asyncio.gather(*waiters, return_exceptions=True)
+            await asyncio.sleep(0)
+
+        asyncio.run(run())
+        assert (flight.abandoned, flight.in_flight) == (1, 0)
+
+
+class TestClient:
+    def test_identical_inputs_send_once(self, client_factory, stub_server, api_keys):
+        stub_server.add("/v1/messages", StubResponse(ANTHROPIC_REPLY, delay=0.1))
+        flight = SingleFlight()
+
+        async def run():
+            async with client_factory(single_flight=flight) as client:
+                return await asyncio.gather(
+                    *(client.complete(make_input(Model.claude_4_sonnet_20250514)) for _ in range(5))
+                )
+
+        replies = asyncio.run(run())
+        assert len(stub_server.requests) == 1
+        assert all(reply is replies[0] for reply in replies)
+        assert (flight.requests, flight.coalesced) == (1, 4)
+
+    def test_cancelling_the_first_caller_keeps_the_request(
+        self, client_factory, stub_server, api_keys
+    ):
+        stub_server.add("/v1/messages", StubResponse(ANTHROPIC_REPLY, delay=0.1))
+        flight = SingleFlight()
+
+        async def run():
+            async with client_factory(single_flight=flight) as client:
+                inp = make_input(Model.claude_4_sonnet_20250514)
+                first = asyncio.create_task(client.complete(inp))
+                second = asyncio.create_task(client.complete(inp))
+                await asyncio.sleep(0.03)
+                first.cancel()
+                with pytest.raises(asyncio.CancelledError):
+                    await first
+                return await second
+
+        reply = asyncio.run(run())
+        assert reply.messages[0].content.text == "Hello from Claude"
+        assert len(stub_server.requests) == 1
+        assert flight.abandoned == 0
+
+    def test_stream_shared_with_every_waiter(self, client_factory, stub_server, api_keys):
+        stub_server.add(
+            "/v1/messages",
+            StubResponse(sse_body(ANTHROPIC_EVENTS), content_type="text/event-stream", delay=0.05),
+        )
+        received: list[list[int]] = [[], []]
+
+        def collect(index):
+            async def callback(chunk):
+                received[index].append(chunk.chunk_index)
+
+            return callback
+
+        async def run():
+            async with client_factory(single_flight=SingleFlight()) as client:
+                model = Model.claude_4_sonnet_20250514
+                await asyncio.gather(
+                    client.complete(make_input(model, stream=True, stream_callback=collect(0))),
+                    client.complete(make_input(model, stream=True, stream_callback=collect(1))),
+                )
+
+        asyncio.run(run())
+        assert received == [list(range(len(ANTHROPIC_EVENTS)))] * 2
+        assert len(stub_server.requests) == 1
+
+
+def test_replay_buffer_is_bounded():
+    flight = SingleFlight(max_replay_chunks=2)
+    received: dict[str, list[int]] = {"early": [], "late": []}
+
+    def collect(name):
+        async def on_chunk(chunk):
+            received[name].append(chunk.chunk_index)
+
+        return on_chunk
+
+    async def run():
+        send = fake_send(6)
+        early = asyncio.create_task(flight.run("k", collect("early"), send))
+        while len(received["early"]) < 3:
+            await asyncio.sleep(0.001)
+        # Three chunks are out, more than the buffer keeps: this caller sends its own
+        late = asyncio.create_task(flight.run("k", collect("late"), send))
+        return await asyncio.gather(early, late)
+
+    assert asyncio.run(run()) == ["reply", "reply"]
+    assert received == {"early": list(range(6)), "late": list(range(6))}
+    assert (flight.requests, flight.coalesced) == (2, 0)
@@ -0,0 +1,404 @@
+"""Tests for incremental stream accumulation and raw chunk retention."""
+
+import asyncio
+import json
+import os
+
+import pytest
+
+from kintu.client.backends.anthropic import AnthropicBackend
+from kintu.client.backends.gemini import GeminiBackend
+from kintu.client.backends.litellm import LiteLLMBackend
+from kintu.client.backends.openai import OpenAIBackend
+from kintu.client.retry import is_retryable
+from kintu.client.stream_batcher import StreamBatcher
+from kintu.types.complete import (
+    SpilledStreamChunks,
+    StreamBatchWindow,
+    StreamChunk,
+    StreamDeltaType,
+    StreamRetention,
+)
+from kintu.types.content import TextContent, ThinkingContent, ToolCallContent
+from kintu.types.errors import ProviderAPIError, ProviderConnectionError
+from kintu.types.llmsdk import LLMSDK
+from kintu.types.model import Model
+from tests.conftest import ANTHROPIC_EVENTS, StubResponse, block_delta, make_input, sse_body
+
+
+def stream_anthropic(client_factory, stub_server, **kwargs):
+    stub_server.add(
+        "/v1/messages",
+        StubResponse(sse_body(ANTHROPIC_EVENTS), content_type="text/event-stream"),
+    )
+
+    async def run():
+        async with client_factory() as client:
+            inp = make_input(Model.claude_4_sonnet_20250514, stream=True, **kwargs)
+            return await client.complete(inp)
+
+    return asyncio.run(run())
+
+
+class TestAccumulators:
+    def test_anthropic(self):
+        parsed = AnthropicBackend().parse_stream(ANTHROPIC_EVENTS)
+        assert [message.content for message in parsed.messages] == [
+            ThinkingContent(thinking="Hm", encrypted_data="sig"),
+            TextContent(text="Hello"),
+            ToolCallContent(tool_id="toolu_1", tool_name="lookup", input={"q": "kintu"}),
+        ]
+        assert parsed.usage.completion_tokens == 9
+
+    def test_anthropic_error_event(self):
+        error = {"type": "error", "error": {"type": "overloaded_error", "message": "Overloaded"}}
+        with pytest.raises(ProviderAPIError) as info:
+            AnthropicBackend().parse_stream(ANTHROPIC_EVENTS[:7] + [error])
+        assert info.value.status_code == 529
+        assert "overloaded_error" in str(info.value)
+        assert is_retryable(LLMSDK.ANTHROPIC, info.value)
+
+    def test_openai_failed_response(self):
+        failed = {
+            "type": "response.failed",
+            "response": {"error": {"code": "server_error", "message": "boom"}},
+        }
+        with pytest.raises(ProviderAPIError) as info:
+            OpenAIBackend().parse_stream([failed])
+        assert info.value.status_code == 500
+        assert is_retryable(LLMSDK.OPENAI, info.value)
+        error = {"type": "error", "code": "rate_limit_exceeded", "message": "slow down"}
+        with pytest.raises(ProviderAPIError) as info:
+            OpenAIBackend().parse_stream([error])
+        assert info.value.status_code == 429
+        # Cut off before the terminal event
+        delta = {"type": "response.output_text.delta", "delta": "Hel"}
+        with pytest.raises(ProviderConnectionError):
+            OpenAIBackend().parse_stream([delta])
+
+    def test_gemini_merges_adjacent_text(self):
+        events = [
+            {"candidates": [{"content": {"parts": [{"text": "Th", "thought": True}]}}]},
+            {"candidates": [{"content": {"parts": [{"text": "ink", "thought": True}]}}]},
+            {"candidates": [{"content": {"parts": [{"text": "An"}, {"text": "swer"}]}}]},
+            {"usageMetadata": {"promptTokenCount": 2, "candidatesTokenCount": 3}},
+        ]
+        parsed = GeminiBackend().parse_stream(events)
+        assert [message.content for message in parsed.messages] == [
+            ThinkingContent(thinking="Think"),
+            TextContent(text="Answer"),
+        ]
+
+    def test_litellm_tool_call_fragments(self):
+        events = [
+            {"choices": [{"delta": {"content": "Let me "}}]},
+            {"choices": [{"delta": {"content": "check"}}]},
+            {
+                "choices": [
+                    {
+                        "delta": {
+                            "tool_calls": [
+                                {"index": 0, "id": "call_1", "function": {"name": "lookup"}}
+                            ]
+                        }
+                    }
+                ]
+            },
+            {
+                "choices": [
+                    {"delta": {"tool_calls": [{"index": 0, "function": {"arguments": "{}"}}]}}
+                ]
+            },
+            {"choices": [], "usage": {"prompt_tokens": 4, "completion_tokens": 6}},
+        ]
+        parsed = LiteLLMBackend().parse_stream(events)
+        assert [message.content for message in parsed.messages] == [
+            TextContent(text="Let me check"),
+            ToolCallContent(tool_id="call_1", tool_name="lookup", input={}),
+        ]
+
+    def test_litellm_repeated_name_and_other_choices(self):
+        def fragment(arguments: str, choice: int = 0):
+            call = {"index": 0, "id": "call_1", "function": {"name": "lookup"}}
+            call["function"]["arguments"] = arguments
+            return {"choices": [{"index": choice, "delta": {"tool_calls": [call]}}]}
+
+        accumulator = LiteLLMBackend().stream_accumulator()
+        deltas = []
+        for event in [fragment('{"q": '), fragment('"other"}', choice=1), fragment('"x"}')]:
+            deltas.extend(accumulator.add(event))
+        assert [delta.tool_name for delta in deltas] == ["lookup", None]
+        assert [message.content for message in accumulator.finish().messages] == [
+            ToolCallContent(tool_id="call_1", tool_name="lookup", input={"q": "x"}),
+        ]
+
+    def test_litellm_reasoning_content(self):
+        accumulator = LiteLLMBackend().stream_accumulator()
+        deltas = accumulator.add({"choices": [{"delta": {"reasoning_content": "Hm"}}]})
+        assert [(delta.type, delta.text) for delta in deltas] == [(StreamDeltaType.THINKING, "Hm")]
+        assert accumulator.finish().messages[0].content == ThinkingContent(thinking="Hm")
+
+
+class TestRetention:
+    def test_all_by_default(self, client_factory, stub_server, api_keys):
+        reply = stream_anthropic(client_factory, stub_server)
+        assert [chunk.chunk_index for chunk in reply.provider_response] == list(
+            range(len(ANTHROPIC_EVENTS))
+        )
+
+    def test_none(self, client_factory, stub_server, api_keys):
+        received = []
+
+        async def callback(chunk):
+            received.append(chunk)
+
+        reply = stream_anthropic(
+            client_factory,
+            stub_server,
+            stream_retention=StreamRetention.NONE,
+            stream_callback=callback,
+        )
+        assert reply.provider_response == []
+        assert len(received) == len(ANTHROPIC_EVENTS)
+        assert reply.messages[1].content == TextContent(text="Hello")
+
+    def test_first_last(self, client_factory, stub_server, api_keys):
+        reply = stream_anthropic(
+            client_factory, stub_server, stream_retention=StreamRetention.FIRST_LAST
+        )
+        first, last = reply.provider_response
+        assert first.provider_data == ANTHROPIC_EVENTS[0]
+        assert last.chunk_index == len(ANTHROPIC_EVENTS) - 1
+        assert last.provider_data == ANTHROPIC_EVENTS[-1]
+
+    def test_disk(self, client_factory, stub_server, api_keys, tmp_path):
+        reply = stream_anthropic(
+            client_factory,
+            stub_server,
+            stream_retention=StreamRetention.DISK,
+            stream_spill_dir=str(tmp_path),
+        )
+        spilled = reply.provider_response
+        assert isinstance(spilled, SpilledStreamChunks)
+        assert os.path.dirname(spilled.path) == str(tmp_path)
+        assert spilled.count == len(ANTHROPIC_EVENTS)
+        assert [chunk.provider_data for chunk in spilled.chunks()] == ANTHROPIC_EVENTS
+        assert reply.messages[2].content.input == {"q": "kintu"}
+
+    def test_disk_spill_removed_when_stream_is_cut_off(
+        self, client_factory, stub_server, api_keys, tmp_path
+    ):
+        events = [{"type": "response.output_text.delta", "delta": "Hel"}]
+        stub_server.add(
+            "/v1/responses", StubResponse(sse_body(events), content_type="text/event-stream")
+        )
+
+        async def run():
+            async with client_factory() as client:
+                inp = make_input(
+                    Model.gpt_4_1,
+                    stream=True,
+                    stream_retention=StreamRetention.DISK,
+                    stream_spill_dir=str(tmp_path),
+                )
+                await client.complete(inp)
+
+        with pytest.raises(ProviderConnectionError):
+            asyncio.run(run())
+        assert os.listdir(tmp_path) == []
+
+    def test_disk_spill_removed_on_error(self, client_factory, stub_server, api_keys, tmp_path):
+        stub_server.add("/v1/messages", StubResponse({"error": "overloaded"}, status=529))
+
+        async def run():
+            async with client_factory() as client:
+                inp = make_input(
+                    Model.claude_4_sonnet_20250514,
+                    stream=True,
+                    stream_retention=StreamRetention.DISK,
+                    stream_spill_dir=str(tmp_path),
+                )
+                await client.complete(inp)
+
+        with pytest.raises(ProviderAPIError):
+            asyncio.run(run())
+        assert os.listdir(tmp_path) == []
+
+
+class TestStreamIterator:
+    def test_chunks_with_deltas(self, client_factory, stub_server, api_keys):
+        stub_server.add(
+            "/v1/messages",
+            StubResponse(sse_body(ANTHROPIC_EVENTS), content_type="text/event-stream"),
+        )
+
+        async def run():
+            async with client_factory() as client:
+                inp = make_input(Model.claude_4_sonnet_20250514)
+                async with client.stream(inp, buffer_size=2) as stream:
+                    chunks = [chunk async for chunk in stream]
+                return chunks, stream.reply
+
+        chunks, reply = asyncio.run(run())
+        assert len(chunks) == len(ANTHROPIC_EVENTS)
+        deltas = [delta for chunk in chunks for delta in chunk.deltas]
+        text = "".join(delta.text for delta in deltas if delta.type == StreamDeltaType.TEXT)
+        assert text == "Hello"
+        tool_deltas = [delta for delta in deltas if delta.type == StreamDeltaType.TOOL_CALL]
+        assert (tool_deltas[0].tool_id, tool_deltas[0].tool_name) == ("toolu_1", "lookup")
+        assert json.loads("".join(delta.text for delta in tool_deltas)) == {"q": "kintu"}
+        assert reply.messages[1].content == TextContent(text="Hello")
+
+    @pytest.mark.parametrize("use_context_manager", [True, False])
+    def test_break_releases_connection(
+        self, client_factory, stub_server, api_keys, use_context_manager
+    ):
+        events = [ANTHROPIC_EVENTS[5]] + [
+            block_delta(1, type="text_delta", text="x" * 100) for _ in range(5000)
+        ]
+        stub_server.add(
+            "/v1/messages", StubResponse(sse_body(events), content_type="text/event-stream")
+        )
+        stub_server.add("/v1/messages", StubResponse({"content": [], "usage": {}}))
+
+        async def run():
+            async with client_factory() as client:
+                inp = make_input(Model.claude_4_sonnet_20250514)
+                if use_context_manager:
+                    async with client.stream(inp, buffer_size=1) as stream:
+                        async for _ in stream:
+                            break
+                else:
+                    with pytest.warns(ResourceWarning):
+                        async for _ in client.stream(inp, buffer_size=1):
+                            break
+                # Let the cancelled read unwind
+                await asyncio.sleep(0.05)
+                assert asyncio.all_tasks() == {asyncio.current_task()}
+                await client.complete(inp)
+
+        asyncio.run(run())
+        first, second = stub_server.requests
+        # The abandoned connection was closed rather than returned to the pool
+        assert first["client_port"] != second["client_port"]
+
+    def test_client_closes_streams_left_open(self, client_factory, stub_server, api_keys):
+        events = [ANTHROPIC_EVENTS[5]] + [
+            block_delta(1, type="text_delta", text="x" * 100) for _ in range(5000)
+        ]
+        stub_server.add(
+            "/v1/messages", StubResponse(sse_body(events), content_type="text/event-stream")
+        )
+
+        async def run():
+            async with client_factory() as client:
+                stream = client.stream(make_input(Model.claude_4_sonnet_20250514), buffer_size=1)
+                async for _ in stream:
+                    break
+                await asyncio.sleep(0.05)
+                # Still referenced, so still reading
+                assert not stream._task.done()
+            assert stream._task.done()
+
+        asyncio.run(run())
+
+    def test_slow_consumer_stops_the_read(self, client_factory, stub_server, api_keys):
+        stub_server.add(
+            "/v1/messages",
+            StubResponse(sse_body(ANTHROPIC_EVENTS), content_type="text/event-stream"),
+        )
+        read: list[int] = []
+
+        async def callback(chunk):
+            read.append(chunk.chunk_index)
+
+        async def run():
+            async with client_factory() as client:
+                inp = make_input(Model.claude_4_sonnet_20250514, stream_callback=callback)
+                async with client.stream(inp, buffer_size=2) as stream:
+                    await stream.__anext__()
+                    await asyncio.sleep(0.05)
+                    # One chunk taken, two buffered, and one read but blocked on the buffer
+                    assert len(read) == 4
+                    remaining = [chunk async for chunk in stream]
+                assert len(remaining) == len(ANTHROPIC_EVENTS) - 1
+
+        asyncio.run(run())
+
+    def test_error_raised_from_iteration(self, client_factory, stub_server, api_keys):
+        stub_server.add("/v1/messages", StubResponse({"error": "overloaded"}, status=529))
+
+        async def run():
+            async with client_factory() as client:
+                async for _ in client.stream(make_input(Model.claude_4_sonnet_20250514)):
+                    pass
+
+        with pytest.raises(ProviderAPIError):
+            asyncio.run(run())
+
+
+def make_chunk(index: int) -> StreamChunk:
+    return StreamChunk(provider_data={}, timestamp=0.0, chunk_index=index)
+
+
+class TestBatchCallback:
+    def test_size_window(self):
+        batches: list[list[int]] = []
+
+        async def callback(chunks):
+            batches.append([chunk.chunk_index for chunk in chunks])
+
+        async def run():
+            batcher = StreamBatcher(callback, StreamBatchWindow(max_chunks=4, max_delay=None))
+            for index in range(10):
+                await batcher.add(make_chunk(index))
+            await batcher.close()
+
+        asyncio.run(run())
+        assert batches == [[0, 1, 2, 3], [4, 5, 6, 7], [8, 9]]
+
+    def test_time_window_flushes_a_paused_stream(self):
+        batches: list[list[int]] = []
+
+        async def callback(chunks):
+            batches.append([chunk.chunk_index for chunk in chunks])
+
+        async def run():
+            batcher = StreamBatcher(callback, StreamBatchWindow(max_chunks=100, max_delay=0.01))
+            await batcher.add(make_chunk(0))
+            await batcher.add(make_chunk(1))
+            await asyncio.sleep(0.05)
+            assert batches == [[0, 1]]
+            await batcher.add(make_chunk(2))
+            await batcher.close()
+
+        asyncio.run(run())
+        assert batches == [[0, 1], [2]]
+
+    def test_timer_callback_error_reaches_the_stream(self):
+        async def callback(chunks):
+            raise ValueError("relay closed")
+
+        async def run():
+            batcher = StreamBatcher(callback, StreamBatchWindow(max_chunks=100, max_delay=0.01))
+            await batcher.add(make_chunk(0))
+            await asyncio.sleep(0.05)
+            await batcher.add(make_chunk(1))
+
+        with pytest.raises(ValueError):
+            asyncio.run(run())
+
+    def test_complete(self, client_factory, stub_server, api_keys):
+        batches: list[list[int]] = []
+
+        async def callback(chunks):
+            batches.append([chunk.chunk_index for chunk in chunks])
+
+        stream_anthropic(
+            client_factory,
+            stub_server,
+            stream_batch_callback=callback,
+            stream_batch_window=StreamBatchWindow(max_chunks=6, max_delay=None),
+        )
+        assert [len(batch) for batch in batches] == [6, 6, 3]
+        assert sum(batches, []) == list(range(len(ANTHROPIC_EVENTS)))
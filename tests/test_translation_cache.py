@@ -0,0 +1,100 @@
+"""Tests for the per-message translation cache."""
+
+import gc
+
+import pytest
+
+from kintu.client.backends.anthropic import AnthropicBackend
+from kintu.client.backends.gemini import GeminiBackend
+from kintu.client.backends.litellm import LiteLLMBackend
+from kintu.client.backends.openai import OpenAIBackend
+from kintu.client.translation_cache import MessageTranslationCache
+from kintu.model_library.model_library import get_spec
+from kintu.types.complete import CompleteInput
+from kintu.types.content import TextContent, ToolCallContent, ToolResultContent
+from kintu.types.llmsdk import LLMSDK
+from kintu.types.message import Message
+from kintu.types.model import Model
+from kintu.types.role import Role
+
+BACKEND_MODELS = [
+    (AnthropicBackend(), Model.claude_4_sonnet_20250514),
+    (OpenAIBackend(), Model.gpt_4_1),
+    (GeminiBackend(), Model.gemini_2_5_flash),
+    (LiteLLMBackend(), Model.llama_3_3_70b_groq),
+]
+
+
+def conversation(turns: int) -> list[Message]:
+    messages = [Message(role=Role.SYSTEM, content=TextContent(text="Be brief"))]
+    for turn in range(turns):
+        messages.append(Message(role=Role.USER, content=TextContent(text=f"Question {turn}")))
+        messages.append(Message(role=Role.USER, content=TextContent(text="Use the tool")))
+        messages.append(
+            Message(
+                role=Role.ASSISTANT,
+                content=ToolCallContent(tool_id=f"call_{turn}", tool_name="lookup", input={}),
+            )
+        )
+        messages.append(
+            Message(
+                role=Role.TOOL,
+                content=ToolResultContent(
+                    tool_id=f"call_{turn}", results=[TextContent(text=f"Result {turn}")]
+                ),
+            )
+        )
+    return messages
+
+
+class TestMessageTranslationCache:
+    def test_reuses_translation_per_sdk(self):
+        cache = MessageTranslationCache()
+        message = Message(role=Role.USER, content=TextContent(text="hi"))
+        calls = []
+
+        def translate():
+            calls.append(1)
+            return {"text": "hi"}
+
+        first = cache.get_or_translate(LLMSDK.OPENAI, message, None, translate)
+        assert cache.get_or_translate(LLMSDK.OPENAI, message, None, translate) is first
+        cache.get_or_translate(LLMSDK.ANTHROPIC, message, None, translate)
+        assert len(calls) == 2
+        assert (cache.hits, cache.misses) == (1, 2)
+
+    def test_new_content_invalidates(self):
+        cache = MessageTranslationCache()
+        message = Message(role=Role.USER, content=TextContent(text="hi"))
+        cache.get_or_translate(LLMSDK.OPENAI, message, None, lambda: "hi")
+        message.content = TextContent(text="bye")
+        assert cache.get_or_translate(LLMSDK.OPENAI, message, None, lambda: "bye") == "bye"
+
+    def test_entries_die_with_messages(self):
+        cache = MessageTranslationCache()
+        message = Message(role=Role.USER, content=TextContent(text="hi"))
+        cache.get_or_translate(LLMSDK.OPENAI, message, None, lambda: "hi")
+        assert len(cache) == 1
+        del message
+        gc.collect()
+        assert len(cache) == 0
+
+
+@pytest.mark.parametrize("backend,model", BACKEND_MODELS)
+def test_incremental_turns_match_uncached(backend, model):
+    cache = MessageTranslationCache()
+    spec = get_spec(model)
+    messages = conversation(5)
+
+    backend.build_request(
+        CompleteInput(messages=messages[:-4], model=model), spec, "key", None, cache
+    )
+    misses = cache.misses
+    inp = CompleteInput(messages=messages, model=model)
+    cached = backend.build_request(inp, spec, "key", None, cache)
+
+    # Only the four messages of the new turn are translated
+    assert cache.misses - misses == 4
+    assert cached.json_body == backend.build_request(inp, spec, "key").json_body
+    # Merging neighbouring messages must not leak into the cached translations
+    assert cached.json_body == backend.build_request(inp, spec, "key", None, cache).json_body
@@ -0,0 +1,125 @@
+"""Tests for the utilities module."""
+
+import base64
+import io
+
+import pytest
+from PIL import Image
+
+from kintu import utilities
+from kintu.utilities import (
+    EncodedImageCache,
+    cached_image_digest,
+    image_digest,
+    parse_wait,
+    rate_limit_remaining,
+    rate_limit_reset,
+    retry_after,
+)
+
+
+def make_image(color: tuple[int, int, int], size: tuple[int, int] = (32, 32)) -> Image.Image:
+    return Image.new("RGB", size, color)
+
+
+class TestImageDigest:
+    def test_same_pixels_same_digest(self):
+        assert image_digest(make_image((255, 0, 0))) == image_digest(make_image((255, 0, 0)))
+
+    def test_different_pixels_mode_or_size(self):
+        red = make_image((255, 0, 0))
+        assert image_digest(red) != image_digest(make_image((0, 0, 255)))
+        assert image_digest(red) != image_digest(red.convert("RGBA"))
+        assert image_digest(red) != image_digest(make_image((255, 0, 0), size=(16, 64)))
+
+    def test_cached_per_object(self, monkeypatch):
+        red = make_image((255, 0, 0))
+        hashed = []
+        monkeypatch.setattr(
+            utilities, "image_digest", lambda image: hashed.append(image) or image_digest(image)
+        )
+        assert cached_image_digest(red) == cached_image_digest(red) == image_digest(red)
+        assert len(hashed) == 1
+        # An equal image in another object is hashed again
+        cached_image_digest(make_image((255, 0, 0)))
+        assert len(hashed) == 2
+
+
+class TestEncodedImageCache:
+    def test_hit_for_equal_pixels(self):
+        cache = EncodedImageCache()
+        first = cache.get_or_encode(make_image((1, 2, 3)))
+        second = cache.get_or_encode(make_image((1, 2, 3)))
+        assert first == second
+        assert (cache.hits, cache.misses) == (1, 1)
+        decoded = Image.open(io.BytesIO(base64.b64decode(first)))
+        assert decoded.format == "PNG"
+
+    def test_payload_per_format(self):
+        cache = EncodedImageCache()
+        image = make_image((10, 20, 30))
+        png = cache.get_or_encode(image, "PNG")
+        jpeg = cache.get_or_encode(image, "JPEG")
+        assert png != jpeg
+        assert len(cache) == 2
+        assert cache.misses == 2
+
+    def test_lru_eviction(self):
+        cache = EncodedImageCache(max_entries=2)
+        a, b, c = make_image((1, 1, 1)), make_image((2, 2, 2)), make_image((3, 3, 3))
+        cache.get_or_encode(a)
+        cache.get_or_encode(b)
+        cache.get_or_encode(a)  # a is now most recently used
+        cache.get_or_encode(c)  # evicts b
+        assert len(cache) == 2
+        cache.get_or_encode(a)
+        assert cache.hits == 2
+        cache.get_or_encode(b)
+        assert cache.misses == 4
+
+    def test_byte_bound(self):
+        cache = EncodedImageCache(max_bytes=1)
+        cache.get_or_encode(make_image((1, 1, 1)))
+        assert len(cache) == 0
+        assert cache.size_bytes == 0
+
+
+class TestRateLimitHeaders:
+    @pytest.mark.parametrize(
+        "value,seconds",
+        [("2", 2.0), ("0.5", 0.5), ("6m0s", 360.0), ("1m30.5s", 90.5), ("250ms", 0.25)],
+    )
+    def test_durations(self, value, seconds):
+        assert parse_wait(value) == pytest.approx(seconds)
+
+    def test_timestamps(self):
+        assert parse_wait("2000-01-01T00:00:00Z") == 0.0
+        assert parse_wait("Wed, 21 Oct 2099 07:28:00 GMT") > 0
+        assert parse_wait("soon") is None
+
+    def test_retry_after(self):
+        assert retry_after({"Retry-After": "3"}) == 3.0
+        assert retry_after({"retry-after-ms": "1500", "retry-after": "2"}) == 1.5
+        assert retry_after({}) is None
+
+    def test_remaining_and_reset(self):
+        headers = {
+            "x-ratelimit-remaining-requests": "59",
+            "x-ratelimit-remaining-tokens": "149000",
+            "x-ratelimit-reset-requests": "1s",
+            "x-ratelimit-reset-tokens": "6m0s",
+        }
+        assert rate_limit_remaining(headers) == (59, 149000)
+        assert rate_limit_reset(headers) == 360.0
+        assert rate_limit_remaining({}) == (None, None)
+
+    def test_reset_of_spent_window(self):
+        headers = {
+            "x-ratelimit-remaining-requests": "0",
+            "x-ratelimit-remaining-tokens": "149000",
+            "x-ratelimit-reset-requests": "1s",
+            "x-ratelimit-reset-tokens": "6m0s",
+        }
+        assert rate_limit_reset(headers) == 1.0
+        headers["x-ratelimit-remaining-tokens"] = "0"
+        assert rate_limit_reset(headers) == 360.0